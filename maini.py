@@ -1,16 +1,40 @@
 import sys
 import os
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QPushButton, QScrollArea, QGridLayout, QMenu, QInputDialog, QMessageBox, QLineEdit, QTabBar
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QPushButton, QScrollArea, QGridLayout, QMenu, QInputDialog, QMessageBox, QLineEdit, QTabBar, QStackedWidget, QSplitter, QPlainTextEdit, QCompleter, QListWidget, QListWidgetItem, QCheckBox
 )
-from PyQt6.QtGui import QIcon, QPixmap, QPainter, QColor, QCursor, QDragEnterEvent, QDropEvent, QDrag
-from PyQt6.QtCore import Qt, QSize, QMimeData, QPoint, QUrl, QEvent, QPropertyAnimation, QEasingCurve
+from PyQt6.QtGui import QIcon, QPixmap, QPainter, QColor, QCursor, QDragEnterEvent, QDropEvent, QDrag, QFontDatabase, QImageReader, QImageIOHandler
+from PyQt6.QtCore import Qt, QSize, QMimeData, QPoint, QPointF, QRectF, QUrl, QEvent, QPropertyAnimation, QEasingCurve, QObject, QRunnable, QThreadPool, QSocketNotifier, QFileSystemWatcher, QTimer, QStringListModel, QBuffer, QByteArray, QIODevice, pyqtSignal
 from pathlib import Path
-import shutil
-from mimetypes import guess_type
-import winshell
-import string
-import ctypes
+import itertools
+from array import array
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from maini_core import (
+    format_size, parse_mountinfo, get_mounts, get_disk_usage, clear_disk_usage_cache, mount_for_path,
+    make_tombstone, remove_tombstone, tombstone_owner_alive,
+    recover_tombstones, move_to_trash, iter_trash, restore_from_trash, delete_from_trash, empty_trash,
+    ListingCache, DirSnapshot, FLAG_TOMBSTONE, ContentSearch, DEFAULT_MAX_CONTENT_SIZE,
+    shared_archive_cache, is_archive, get_cache_dir, ProviderRegistry,
+    compress_formats, compress_paths, default_archive_path,
+    DuplicateFinder, HashCache, available_algorithms, compute_checksums, is_manifest, verify_manifest,
+    FilePreview, shared_type_cache, describe_type, compile_query, snapshot_columns, QueryError,
+    split_for_completion, complete_from_listing, list_for_completion,
+    SessionSnapshot, Thumbnail, load_session, save_session,
+    DiskUsageScan, DiskUsageCache, squarify, CopyJob, compare_trees, apply_sync,
+    IO_INTERACTIVE, IO_THUMBNAIL, IO_PREFETCH, IO_BULK, shared_io_scheduler, set_io_priority,
+    shared_memory_budget, shared_render_governor,
+)
+
+try:
+    import winshell
+except ImportError:
+    winshell = None
 
 USER_DIRS = {
     "Home": str(Path.home()),
@@ -29,12 +53,22 @@ def get_file_icon(path):
     # Для файлов и папок — системная иконка Windows
     return get_win_icon(path)
 
-def get_file_icon_or_preview(path):
-    if os.path.isdir(path):
+def path_to_url(path):
+    """Drag-and-drop URL for a local, archive or remote path"""
+    return QUrl(path) if "://" in path else QUrl.fromLocalFile(path)
+
+def url_to_path(url):
+    return url.toLocalFile() if url.isLocalFile() else url.toString()
+
+def get_file_icon_or_preview(path, is_dir=None, size=None):
+    """(QIcon or QPixmap, is_pixmap); with size, images are decoded straight to that box"""
+    if is_dir if is_dir is not None else os.path.isdir(path):
         return get_win_icon(path), False
-    mime, _ = guess_type(path)
-    if mime and mime.startswith('image'):
+    if is_image(path):
         try:
+            if size is not None:
+                # Полноразмерная картинка ради миниатюры 80px в памяти не появляется
+                return QPixmap.fromImage(decode_scaled_image(path, size, size)[0]), True
             pixmap = QPixmap(path)
             if not pixmap.isNull():
                 return pixmap, True
@@ -63,8 +97,323 @@ except ImportError:
     def get_win_icon(path):
         return QIcon("folder.png")
 
+class MountMonitor(QObject):
+    """Keeps the mount list cached and re-reads it only when the kernel reports a change"""
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mounts = get_mounts()
+        self._file = None
+        self.notifier = None
+        if os.path.exists("/proc/self/mountinfo"):
+            # mountinfo сигнализирует POLLPRI при изменении таблицы монтирования;
+            # QSocketNotifier типа Exception ждёт именно его, без отдельного потока
+            self._file = open("/proc/self/mountinfo", "rb")
+            self._file.read()
+            self.notifier = QSocketNotifier(self._file.fileno(), QSocketNotifier.Type.Exception, self)
+            self.notifier.activated.connect(self._on_mountinfo_changed)
+
+    def _on_mountinfo_changed(self):
+        self._file.seek(0)
+        mounts = parse_mountinfo(self._file.read().decode("utf-8", errors="replace"))
+        if mounts != self.mounts:
+            self.mounts = mounts
+            clear_disk_usage_cache()
+            self.changed.emit()
+
+    def refresh(self):
+        """Re-enumerate on platforms without change notification"""
+        if self.notifier is None:
+            mounts = get_mounts()
+            if mounts != self.mounts:
+                self.mounts = mounts
+                self.changed.emit()
+
+    def mount_for_path(self, path):
+        return mount_for_path(self.mounts, path)
+
+# Фоновые задачи: QRunnable в общем QThreadPool, результаты приходят в GUI-поток через сигналы
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(object)
+
+class Worker(QRunnable):
+    def __init__(self, fn, *args, with_progress=False, io_class=IO_PREFETCH, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.io_class = io_class
+        self.signals = WorkerSignals()
+        if with_progress:
+            self.kwargs["progress_callback"] = self.signals.progress.emit
+
+    def run(self):
+        # Потоки пула общие, поэтому приоритет диска ставится заново для каждой задачи
+        set_io_priority(self.io_class)
+        # Пока идёт интерактивная задача, фоновое копирование и удаление ждут в throttle()
+        gate = shared_io_scheduler.interactive() if self.io_class == IO_INTERACTIVE else nullcontext()
+        try:
+            with gate:
+                result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+class WorkerPool:
+    """Central scheduler for Worker tasks.
+
+    Queued tasks start in I/O class order (interactive, thumbnails, prefetch). Bulk jobs
+    get their own small pool, so a long copy never holds the threads that listing needs.
+    """
+    def __init__(self, bulk_threads=2):
+        self.pool = QThreadPool.globalInstance()
+        # Задачи в основном ждут диск или сеть, поэтому потоков больше, чем ядер
+        self.pool.setMaxThreadCount(max(4, self.pool.maxThreadCount()))
+        self.bulk_pool = QThreadPool()
+        self.bulk_pool.setMaxThreadCount(bulk_threads)
+
+    def start(self, worker):
+        if worker.io_class == IO_BULK:
+            self.bulk_pool.start(worker)
+        else:
+            self.pool.start(worker, worker.io_class)
+
+def scaling_mode():
+    """Smooth scaling unless the render governor has switched to fast rendering"""
+    if shared_render_governor.quality.smooth_scaling:
+        return Qt.TransformationMode.SmoothTransformation
+    return Qt.TransformationMode.FastTransformation
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+class ThumbnailCache:
+    """Scaled icons and image previews keyed by (path, mtime, size, icon size); GUI thread only.
+
+    With a MemoryBudget, thumbnails are charged by pixel size; visible_dirs() names the folders
+    on screen, and thumbnails of other folders are evicted first.
+    """
+    def __init__(self, max_items=2000, budget=None, visible_dirs=None):
+        self.max_items = max_items
+        self.budget = budget
+        self.visible_dirs = visible_dirs
+        self._pixmaps = OrderedDict()
+        self._degraded = set()  # миниатюры, сделанные при сниженном качестве отрисовки
+        if budget is not None:
+            budget.register("thumbnails", self._evict, self._offscreen if visible_dirs else None, main_thread_only=True)
+
+    def _evict(self, key):
+        self._pixmaps.pop(key, None)
+        self._degraded.discard(key)
+
+    def drop_degraded(self):
+        """Forget thumbnails made at reduced quality so they are rendered again; True if there were any"""
+        dropped = bool(self._degraded)
+        for key in self._degraded:
+            if self._pixmaps.pop(key, None) is not None and self.budget is not None:
+                self.budget.release("thumbnails", key)
+        self._degraded.clear()
+        return dropped
+
+    def _offscreen(self, key):
+        return os.path.dirname(key[0]) not in self.visible_dirs()
+
+    def _store(self, key, pixmap):
+        self._pixmaps[key] = pixmap
+        while len(self._pixmaps) > self.max_items:
+            old, _ = self._pixmaps.popitem(last=False)
+            self._degraded.discard(old)
+            if self.budget is not None:
+                self.budget.release("thumbnails", old)
+        if self.budget is not None:
+            self.budget.charge("thumbnails", key, pixmap_bytes(pixmap))
+
+    def pixmap(self, path, icon_size, is_disk=False, is_dir=None):
+        # Тип входит в ключ: после распознавания по содержимому иконка заменяется миниатюрой
+        file_type = None if is_dir or is_disk else shared_type_cache.lookup(path)
+        mime = file_type.mime if file_type else None
+        try:
+            st = os.stat(path)
+            key = (path, st.st_mtime_ns, st.st_size, icon_size, is_disk, mime)
+        except OSError:
+            key = (path, 0, 0, icon_size, is_disk, mime)
+        cached = self._pixmaps.get(key)
+        if cached is not None:
+            self._pixmaps.move_to_end(key)
+            if self.budget is not None:
+                self.budget.touch("thumbnails", key)
+            return cached
+        quality = shared_render_governor.quality
+        # При медленной отрисовке картинка декодируется в меньшем разрешении и растягивается быстро
+        decode_size = max(int(icon_size * quality.thumbnail_scale), 16)
+        if is_disk and os.path.exists("disk.png"):
+            icon_or_pixmap, is_pixmap = QIcon("disk.png"), False
+        else:
+            icon_or_pixmap, is_pixmap = get_file_icon_or_preview(path, is_dir, decode_size)
+        if is_pixmap:
+            pixmap = icon_or_pixmap.scaled(icon_size, icon_size, Qt.AspectRatioMode.KeepAspectRatio, scaling_mode())
+        else:
+            pixmap = icon_or_pixmap.pixmap(icon_size, icon_size)
+        self._store(key, pixmap)
+        if is_pixmap and (decode_size != icon_size or not quality.smooth_scaling):
+            self._degraded.add(key)
+        return pixmap
+
+    def export(self, root, names, icon_sizes):
+        """Thumbnails of names inside root at the given sizes, PNG-encoded for the session snapshot"""
+        wanted = {os.path.join(root, name): name for name in names}
+        thumbnails = []
+        for key, pixmap in list(self._pixmaps.items()):
+            path, mtime_ns, size, icon_size, is_disk, mime = key
+            name = wanted.get(path)
+            if name is None or is_disk or icon_size not in icon_sizes or key in self._degraded:
+                continue
+            data = QByteArray()
+            buffer = QBuffer(data)
+            buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+            if pixmap.save(buffer, "PNG"):
+                thumbnails.append(Thumbnail(name, mtime_ns, size, icon_size, mime, bytes(data)))
+        return thumbnails
+
+    def preload(self, path, thumbnail):
+        """Put a saved thumbnail back; its key holds the old mtime and size, so a changed file misses it"""
+        pixmap = QPixmap()
+        if pixmap.loadFromData(thumbnail.png, "PNG"):
+            self._store((path, thumbnail.mtime_ns, thumbnail.size, thumbnail.icon_size, False, thumbnail.mime), pixmap)
+
+def is_image(path):
+    # Тип по расширению, а для файлов без расширения — по содержимому, если его уже проверили в фоне
+    file_type = shared_type_cache.lookup(path)
+    return file_type is not None and file_type.category == "image"
+
+def decode_scaled_image(path, width, height):
+    """Decode an image straight to fit width x height; returns (QImage, original QSize).
+
+    QImageReader scales while decoding (JPEG decodes at 1/2, 1/4, 1/8 natively), so a 50 MP
+    photo never exists at full size in memory. QImage, unlike QPixmap, is safe off the GUI thread.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if reader.transformation() & QImageIOHandler.Transformation.TransformationRotate90:
+        # Повёрнутые по EXIF снимки масштабируются до поворота
+        width, height = height, width
+    if size.isValid() and (size.width() > width or size.height() > height):
+        reader.setScaledSize(size.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        raise OSError(reader.errorString())
+    return image, size
+
+class ImageFrameCache:
+    """Decoded preview frames keyed by (path, mtime, size, target box), bounded by bytes; GUI thread only"""
+    def __init__(self, max_bytes=96 * 1024 * 1024, budget=None):
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.used_bytes = 0
+        self._frames = OrderedDict()
+        if budget is not None:
+            budget.register("image_frames", self._evict, main_thread_only=True)
+
+    def _evict(self, key):
+        frame = self._frames.pop(key, None)
+        if frame is not None:
+            self.used_bytes -= pixmap_bytes(frame[0])
+
+    @staticmethod
+    def key(path, width, height):
+        try:
+            st = os.stat(path)
+            return (path, st.st_mtime_ns, st.st_size, width, height)
+        except OSError:
+            return (path, 0, 0, width, height)
+
+    def get(self, key):
+        frame = self._frames.get(key)
+        if frame is not None:
+            self._frames.move_to_end(key)
+            if self.budget is not None:
+                self.budget.touch("image_frames", key)
+        return frame
+
+    def put(self, key, pixmap, original_size):
+        old = self._frames.pop(key, None)
+        if old is not None:
+            self.used_bytes -= pixmap_bytes(old[0])
+        self._frames[key] = (pixmap, original_size)
+        self.used_bytes += pixmap_bytes(pixmap)
+        while self.used_bytes > self.max_bytes and len(self._frames) > 1:
+            evicted_key, (evicted, _) = self._frames.popitem(last=False)
+            self.used_bytes -= pixmap_bytes(evicted)
+            if self.budget is not None:
+                self.budget.release("image_frames", evicted_key)
+        if self.budget is not None:
+            self.budget.charge("image_frames", key, pixmap_bytes(pixmap))
+
+class EventLoopProbe(QObject):
+    """Timer that measures how late the GUI event loop serves it and reports to the render governor"""
+    def __init__(self, governor, interval_ms=200, parent=None):
+        super().__init__(parent)
+        self.governor = governor
+        self.interval = interval_ms / 1000
+        self._expected = time.monotonic() + self.interval
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+        self.timer.start()
+
+    def _tick(self):
+        now = time.monotonic()
+        # Опоздание срабатывания — столько цикл событий был занят чем-то другим
+        self.governor.record_latency(max(0.0, now - self._expected))
+        self._expected = now + self.interval
+
+class DirectoryWatcher(QObject):
+    """One QFileSystemWatcher for all panes; a folder is watched while any pane shows it"""
+    def __init__(self, listing_cache, parent=None):
+        super().__init__(parent)
+        self.listing_cache = listing_cache
+        self.pane_paths = {}
+        self._dirty = set()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        # Пачку изменений (например, копирование многих файлов) сводим в одно обновление
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(200)
+        self._timer.timeout.connect(self._flush)
+
+    def watch(self, pane, path):
+        """Make pane watch path (None stops watching)"""
+        old = self.pane_paths.pop(pane, None)
+        if old == path and path is not None:
+            self.pane_paths[pane] = path
+            return
+        if old and old not in self.pane_paths.values():
+            self.watcher.removePath(old)
+        if path:
+            if path not in self.pane_paths.values():
+                self.watcher.addPath(path)
+            self.pane_paths[pane] = path
+
+    def _on_directory_changed(self, path):
+        self.listing_cache.invalidate(path)
+        self._dirty.add(path)
+        self._timer.start()
+
+    def _flush(self):
+        dirty, self._dirty = self._dirty, set()
+        for pane, path in list(self.pane_paths.items()):
+            if path in dirty:
+                pane.refresh()
+
 class FileWidget(QFrame):
-    def __init__(self, name, path, is_dir, on_click, parent=None, main_window=None, scale_factor=1.0, is_disk=False):
+    def __init__(self, name, path, is_dir, on_click, parent=None, main_window=None, scale_factor=1.0, is_disk=False, subtitle=None):
         super().__init__(parent)
         #print(f"FileWidget: name={name}, path={path}, is_dir={is_dir}")  # Debug print
         self.path = path
@@ -79,20 +428,10 @@ class FileWidget(QFrame):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(5)
         
-        # Use disk.png for disks, otherwise get normal icon
-        if is_disk and os.path.exists("disk.png"):
-            icon_or_pixmap = QIcon("disk.png")
-            is_pixmap = False
-        else:
-            icon_or_pixmap, is_pixmap = get_file_icon_or_preview(path)
         # Scale icon size based on scale_factor
         icon_size = max(int(80 * scale_factor), 16)  # Minimum 16px
-        if is_pixmap:
-            pixmap = icon_or_pixmap.scaled(icon_size, icon_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-        else:
-            pixmap = icon_or_pixmap.pixmap(icon_size, icon_size)
         icon_label = QLabel()
-        icon_label.setPixmap(pixmap)
+        icon_label.setPixmap(self.icon_pixmap(icon_size))
         icon_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
         text_label = QLabel(name)
         text_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
@@ -101,6 +440,14 @@ class FileWidget(QFrame):
         text_label.setStyleSheet(f"font-size: {font_size}px; color: #333;")
         layout.addWidget(icon_label)
         layout.addWidget(text_label)
+        # Optional second line, e.g. free/total space for disks
+        self.subtitle_label = None
+        if subtitle is not None:
+            self.subtitle_label = QLabel(subtitle)
+            self.subtitle_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+            self.subtitle_label.setWordWrap(True)
+            self.subtitle_label.setStyleSheet(f"font-size: {max(font_size - 3, 8)}px; color: #888;")
+            layout.addWidget(self.subtitle_label)
         # Scale widget width based on scale_factor
         widget_width = max(int(110 * scale_factor), 50)  # Minimum 50px
         self.setFixedWidth(widget_width)
@@ -121,7 +468,7 @@ class FileWidget(QFrame):
             if (event.position().toPoint() - self._drag_start_pos).manhattanLength() > 10:
                 drag = QDrag(self)
                 mime = QMimeData()
-                mime.setUrls([QUrl.fromLocalFile(self.path)])
+                mime.setUrls([path_to_url(self.path)])
                 drag.setMimeData(mime)
                 drag.exec()
                 self._drag_start_pos = None
@@ -135,13 +482,21 @@ class FileWidget(QFrame):
         super().mouseReleaseEvent(event)
 
     def animate_click(self):
-        """Animate the file widget on click"""
-        if self.animation and self.animation.state() == QPropertyAnimation.State.Running:
-            self.animation.stop()
-        
-        # Create animation for scaling effect
-        self.animation = QPropertyAnimation(self, b"geometry")
-        self.animation.setDuration(200)  # 200ms duration
+        """Animate the file widget on click; both animations are created once and reused"""
+        if not shared_render_governor.quality.animations:
+            return
+        if self.animation is None:
+            # Анимации — дочерние объекты виджета: не копятся с каждым щелчком и удаляются вместе с ним
+            self.animation = QPropertyAnimation(self, b"geometry", self)
+            self.animation.setDuration(200)  # 200ms duration
+            self.animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+            self.animation2 = QPropertyAnimation(self, b"geometry", self)
+            self.animation2.setDuration(200)
+            self.animation2.setEasingCurve(QEasingCurve.Type.InCubic)
+            # Chain animations
+            self.animation.finished.connect(self.animation2.start)
+        self.animation.stop()
+        self.animation2.stop()
         
         # Get current geometry
         current_geometry = self.geometry()
@@ -153,20 +508,11 @@ class FileWidget(QFrame):
         dy = (current_geometry.height() - scaled_height) // 2
         scaled_geometry = current_geometry.adjusted(dx, dy, -dx, -dy)
         
-        # Set up animation
+        # Set up animation, then return to original size
         self.animation.setStartValue(current_geometry)
         self.animation.setEndValue(scaled_geometry)
-        self.animation.setEasingCurve(QEasingCurve.Type.OutCubic)
-        
-        # Add another animation to return to original size
-        self.animation2 = QPropertyAnimation(self, b"geometry")
-        self.animation2.setDuration(200)
         self.animation2.setStartValue(scaled_geometry)
         self.animation2.setEndValue(current_geometry)
-        self.animation2.setEasingCurve(QEasingCurve.Type.InCubic)
-        
-        # Chain animations
-        self.animation.finished.connect(self.animation2.start)
         self.animation.start()
     
     def update_scale(self, scale_factor):
@@ -176,25 +522,37 @@ class FileWidget(QFrame):
         text_label = self.layout().itemAt(1).widget() if self.layout().count() > 1 else None
         
         if icon_label:
-            # Get the original pixmap or icon
-            path = self.path
-            icon_or_pixmap, is_pixmap = get_file_icon_or_preview(path)
             icon_size = max(int(80 * scale_factor), 16)
-            if is_pixmap:
-                pixmap = icon_or_pixmap.scaled(icon_size, icon_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            else:
-                pixmap = icon_or_pixmap.pixmap(icon_size, icon_size)
-            icon_label.setPixmap(pixmap)
+            icon_label.setPixmap(self.icon_pixmap(icon_size))
         
         # Update text label font size
         if text_label:
             font_size = max(int(15 * scale_factor), 8)
             text_label.setStyleSheet(f"font-size: {font_size}px; color: #333;")
         
+        if self.subtitle_label:
+            self.subtitle_label.setStyleSheet(f"font-size: {max(int(15 * scale_factor) - 3, 8)}px; color: #888;")
+        
         # Update widget width
         widget_width = max(int(110 * scale_factor), 50)
         self.setFixedWidth(widget_width)
 
+    def icon_pixmap(self, icon_size):
+        """Icon or preview at icon_size, through the shared thumbnail cache when available"""
+        if self.main_window is not None:
+            return self.main_window.thumbnail_cache.pixmap(self.path, icon_size, self.is_disk, self.is_dir)
+        # Use disk.png for disks, otherwise get normal icon
+        if self.is_disk and os.path.exists("disk.png"):
+            return QIcon("disk.png").pixmap(icon_size, icon_size)
+        icon_or_pixmap, is_pixmap = get_file_icon_or_preview(self.path, self.is_dir)
+        if is_pixmap:
+            return icon_or_pixmap.scaled(icon_size, icon_size, Qt.AspectRatioMode.KeepAspectRatio, scaling_mode())
+        return icon_or_pixmap.pixmap(icon_size, icon_size)
+
+    def set_subtitle(self, text):
+        if self.subtitle_label:
+            self.subtitle_label.setText(text)
+
     def contextMenuEvent(self, event):
         menu = QMenu(self.main_window if self.main_window else self)
         menu.setStyleSheet("""
@@ -220,7 +578,9 @@ class FileWidget(QFrame):
                 margin: 4px 0 4px 0;
             }
         """)
-        menu.addAction("Открыть", lambda: self.main_window.file_clicked(self.path, self.is_dir))
+        menu.addAction("Открыть", lambda: self.on_click(self.path, self.is_dir))
+        if self.is_dir:
+            menu.addAction("Открыть в новой вкладке", lambda: self.main_window.new_tab(self.path))
         menu.addSeparator()
         menu.addAction("Копировать", lambda: self.main_window.set_clipboard(self.path, cut=False))
         menu.addAction("Вырезать", lambda: self.main_window.set_clipboard(self.path, cut=True))
@@ -228,253 +588,426 @@ class FileWidget(QFrame):
         menu.addSeparator()
         menu.addAction("Переименовать", lambda: self.main_window.rename_item(self.path))
         menu.addAction("Удалить", lambda: self.main_window.delete_item(self.path))
+        menu.addAction("Удалить навсегда", lambda: self.main_window.delete_item_permanently(self.path))
+        if not self.is_disk and os.path.exists(self.path):
+            compress_menu = QMenu("Сжать", menu)
+            compress_menu.setStyleSheet(menu.styleSheet())
+            for fmt in compress_formats():
+                compress_menu.addAction(f"в {fmt}", lambda fmt=fmt: self.main_window.compress_in_background(self.path, fmt))
+            menu.addMenu(compress_menu)
         menu.addSeparator()
+        if self.is_dir and os.path.isdir(self.path):
+            menu.addAction("Синхронизировать в…", lambda: self.main_window.sync_folder_dialog(self.path))
+            menu.addAction("Анализ занятого места", lambda: self.main_window.show_disk_usage(self.path))
         menu.addAction("Свойства", lambda: self.main_window.show_properties(self.path))
         menu.exec(event.globalPos())
+        menu.deleteLater()
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
 
     def dropEvent(self, event: QDropEvent):
-        for url in event.mimeData().urls():
-            src = url.toLocalFile()
-            if os.path.exists(src):
-                dst = os.path.join(self.path, os.path.basename(src)) if self.is_dir else os.path.dirname(self.path)
-                if os.path.isdir(src):
-                    shutil.copytree(src, dst, dirs_exist_ok=True)
-                else:
-                    shutil.copy2(src, dst)
+        sources = [url_to_path(url) for url in event.mimeData().urls()]
+        self.main_window.transfer(sources, self.path if self.is_dir else os.path.dirname(self.path))
         event.acceptProposedAction()
 
-class CustomWindow(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Window)
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setMinimumSize(900, 600)
-        self.setAcceptDrops(True)
-        self.history = []
-        self.current_path = USER_DIRS["Home"]
-        self.drag_pos = None
-        self.resizing = False
-        self.clipboard_path = None
-        self.clipboard_cut = False
-        self._window_drag_active = False
-        self._window_drag_pos = None
-        self._resize_direction = None
-        self._resize_start_pos = None
-        self._resize_start_geometry = None
-        self.all_entries = []  # Store all entries for search filtering
-        self.scale_factor = 1.0  # For file icon scaling
-        self.show_hidden = False  # For showing hidden files
-        self.view_mode = "grid"  # View mode: "grid" or "list"
-        # For progressive file loading
-        self.chunk_size = 50  # Number of files to load per chunk
-        self.loaded_entries = []  # Files already loaded and displayed
-        self.remaining_entries = []  # Files not yet loaded
-        self.loading_in_progress = False  # Flag to prevent multiple simultaneous loads
-        # For window maximize/restore state
-        self.is_maximized = False
-        self.normal_geometry = None  # Store geometry when windowed
-        
-        # Loading indicator
-        self.loading_label = QLabel("Загрузка файлов...")
-        self.loading_label.setStyleSheet("font-size: 16px; color: #666; padding: 10px;")
-        self.loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.loading_label.setVisible(False)
-        
-        self.init_ui()
-
-    def init_ui(self):
-        self.main_layout = QHBoxLayout(self)
-        self.main_layout.setContentsMargins(20, 20, 20, 20)
-        self.main_layout.setSpacing(0)
+class TrashItemWidget(QFrame):
+    def __init__(self, item, main_window, parent=None):
+        super().__init__(parent)
+        self.item = item
+        self.main_window = main_window
+        vbox = QVBoxLayout(self)
+        vbox.setContentsMargins(10, 10, 10, 10)
+        vbox.setSpacing(5)
+        icon_label = QLabel()
+        icon_label.setPixmap(QIcon("unknow.png").pixmap(64, 64) if os.path.exists("unknow.png") else QIcon().pixmap(64, 64))
+        icon_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        vbox.addWidget(icon_label)
+        name_label = QLabel(os.path.basename(item.original_path))
+        name_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        name_label.setStyleSheet("font-size: 15px; color: #333;")
+        vbox.addWidget(name_label)
+        path_label = QLabel(item.original_path)
+        path_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        path_label.setStyleSheet("font-size: 11px; color: #888;")
+        vbox.addWidget(path_label)
+        date_label = QLabel(item.deletion_date)
+        date_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        date_label.setStyleSheet("font-size: 11px; color: #888;")
+        vbox.addWidget(date_label)
+        self.setStyleSheet("QFrame:hover {background: #f0f4ff; border-radius: 10px;}")
 
-        # Сайдбар
-        self.sidebar = QFrame()
-        self.sidebar.setFixedWidth(200)
-        self.sidebar.setStyleSheet("""
-            QFrame {
-                background: #f5f6fa;
-                border-top-left-radius: 18px;
-                border-bottom-left-radius: 18px;
-            }
-        """)
-        self.sidebar_layout = QVBoxLayout(self.sidebar)
-        self.sidebar_layout.setContentsMargins(0, 16, 0, 16)
-        self.sidebar_layout.setSpacing(0)
-        
-        # Search input in sidebar
-        self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Поиск файлов...")
-        self.search_input.setStyleSheet("""
-            QLineEdit {
-                padding: 8px 12px;
-                font-size: 14px;
-                border: 1px solid #e0e4ea;
-                border-radius: 8px;
+    def contextMenuEvent(self, event):
+        menu = QMenu(self.main_window)
+        menu.setStyleSheet("""
+            QMenu {
                 background: #fff;
-                color: #000;
-                margin: 0 12px 12px 12px;
+                border: 1px solid #d0d0d0;
+                border-radius: 10px;
+                padding: 6px;
+                color: #222;
+                font-size: 15px;
+            }
+            QMenu::item {
+                padding: 8px 24px 8px 24px;
+                border-radius: 6px;
+            }
+            QMenu::item:selected {
+                background: #e6f0ff;
+                color: #1a73e8;
             }
         """)
-        self.search_input.textChanged.connect(self.on_search_text_changed)
-        self.sidebar_layout.addWidget(self.search_input)
+        menu.addAction("Восстановить", lambda: self.main_window.restore_trash_item(self.item))
+        if self.item.trash_dir is not None:
+            menu.addAction("Удалить навсегда", lambda: self.main_window.delete_trash_item(self.item))
+        menu.exec(event.globalPos())
+        menu.deleteLater()
 
-        # Список пунктов и иконок
-        self.sidebar_items = [
-            ("Home", "sample.png"),
-            ("Disks", "disk.png"),
-            ("Trash", "sample.png"),
-            ("sep", None),
-            ("Documents", "sample.png"),
-            ("Music", "sample.png"),
-            ("Pictures", "sample.png"),
-            ("Videos", "sample.png"),
-            ("Downloads", "sample.png"),
-        ]
-        self.sidebar_btns = {}
-        for name, icon in self.sidebar_items:
-            if name == "sep":
-                line = QFrame()
-                line.setFrameShape(QFrame.Shape.HLine)
-                line.setStyleSheet("color: #e0e4ea; background: #e0e4ea; margin: 8px 0 8px 0; height: 1px;")
-                self.sidebar_layout.addWidget(line)
-                continue
-            btn = QPushButton(f"  {name}")
-            btn.setIcon(QIcon(icon) if icon else QIcon())
-            btn.setIconSize(QSize(22, 22))
-            btn.setCursor(Qt.CursorShape.PointingHandCursor)
-            btn.setStyleSheet("""
-                QPushButton {
-                    font-size: 16px;
-                    color: #444;
-                    padding: 10px 0 10px 24px;
-                    border: none;
-                    text-align: left;
-                    border-radius: 8px;
-                    background: transparent;
-                }
-                QPushButton:hover {
-                    background: #e6f0ff;
-                }
-            """)
-            btn.clicked.connect(lambda checked, n=name: self.sidebar_navigate(n))
-            btn.installEventFilter(self)
-            self.sidebar_layout.addWidget(btn)
-            self.sidebar_btns[name] = btn
-        self.sidebar_layout.addStretch()
-        self.active_sidebar = None
+class PreviewPane(QFrame):
+    """Image, text or hex view of the selected file next to the folder area.
 
-        # Основная область
-        self.content = QFrame()
-        self.content.setStyleSheet("background: #fff; border-radius: 16px;")
-        self.content_layout = QVBoxLayout(self.content)
-        self.content_layout.setContentsMargins(0, 0, 0, 0)
-        self.content_layout.setSpacing(0)
+    Only one page is held in memory: the file is mmap'ed by FilePreview, and line numbers
+    come from an index built in the background, so multi-gigabyte logs open instantly.
+    Images are decoded in the background at the pane's size; the previous and next images
+    are decoded ahead into main_window.image_frames so arrow keys flip through them at once.
+    """
+    PAGE_LINES = 200
+    HEX_PAGE = 4096
+    IMAGE_BUCKET = 128  # размер кадра округляется, чтобы мелкие изменения размера не сбивали кэш
 
-        # Верхняя панель
-        self.topbar_frame = QFrame()
-        self.topbar_frame.setStyleSheet("""
-            QFrame {
-                background: #f8fafc;
-                border-top-left-radius: 16px;
-                border-top-right-radius: 16px;
-                border-bottom: 1px solid #e0e4ea;
-            }
-        """)
-        self.topbar_frame.setFixedHeight(60)
-        self.topbar_layout = QHBoxLayout(self.topbar_frame)
-        self.topbar_layout.setContentsMargins(24, 10, 24, 10)
-        self.topbar_layout.setSpacing(10)
-        self.back_btn = QPushButton("←")
-        self.back_btn.setFixedSize(32, 32)
-        self.back_btn.setStyleSheet("""
-            QPushButton {
-                font-size: 18px; border: none; background: transparent; color: #7a8ca3;
-            }
-            QPushButton:hover {
-                background: #e6f0ff; color: #1a73e8;
-            }
-        """)
-        self.back_btn.clicked.connect(self.go_back)
-        self.topbar_layout.addWidget(self.back_btn)
+    def __init__(self, pane, parent=None):
+        super().__init__(parent)
+        self.pane = pane
+        self.preview = None
+        self.index_cancel = None
+        self.mode = "text"  # "text" or "hex"
+        self.top_line = 0
+        self.hex_offset = 0
+        self.at_end = False
+        self.current_file = None
+        self.frame_pixmap = None  # Кадр в полном размере панели, до подгонки под QLabel
+        self.image_pending = set()  # Ключи кадров, которые сейчас декодируются
+        self.setMinimumWidth(260)
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.setStyleSheet("PreviewPane { background: #fafcff; border-left: 1px solid #e3eaf5; }")
 
-        # Breadcrumb + edit
-        self.breadcrumb_widget = QWidget()
-        self.breadcrumb_layout = QHBoxLayout(self.breadcrumb_widget)
-        self.breadcrumb_layout.setContentsMargins(0, 0, 0, 0)
-        self.breadcrumb_layout.setSpacing(0)
-        self.topbar_layout.addWidget(self.breadcrumb_widget, 1)
-        self.breadcrumb_edit = QLineEdit()
-        self.breadcrumb_edit.setVisible(False)
-        self.breadcrumb_edit.setStyleSheet("font-size: 18px; border: 1px solid #e0e4ea; border-radius: 8px; padding: 4px 10px; background: #fff; color: #000;")
-        self.breadcrumb_edit.returnPressed.connect(self.breadcrumb_edit_apply)
-        self.topbar_layout.addWidget(self.breadcrumb_edit, 1)
-        self.edit_path_btn = QPushButton("✎")
-        self.edit_path_btn.setFixedSize(28, 28)
-        self.edit_path_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
-        self.edit_path_btn.clicked.connect(self.breadcrumb_edit_mode)
-        self.topbar_layout.addWidget(self.edit_path_btn)
-        
-        # Add button for toggling hidden files
-        self.toggle_hidden_btn = QPushButton("👁")
-        self.toggle_hidden_btn.setFixedSize(28, 28)
-        self.toggle_hidden_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
-        self.toggle_hidden_btn.clicked.connect(self.toggle_hidden_files)
-        self.topbar_layout.addWidget(self.toggle_hidden_btn)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+        layout.setSpacing(6)
+        self.name_label = QLabel("Выберите файл")
+        self.name_label.setStyleSheet("font-size: 14px; font-weight: bold; color: #2d3a4a;")
+        layout.addWidget(self.name_label)
+
+        buttons = QHBoxLayout()
+        buttons.setSpacing(4)
+        self.text_buttons = []
+        style = "QPushButton { border: none; background: transparent; color: #7a8ca3; padding: 2px 6px; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }"
+        for text, handler in (("⤒", self.go_home), ("▲", lambda: self.page(-1)), ("▼", lambda: self.page(1)), ("Конец", self.go_tail)):
+            btn = QPushButton(text)
+            btn.setStyleSheet(style)
+            btn.clicked.connect(handler)
+            buttons.addWidget(btn)
+            self.text_buttons.append(btn)
+        self.mode_btn = QPushButton("HEX")
+        self.mode_btn.setStyleSheet(style)
+        self.mode_btn.clicked.connect(self.toggle_mode)
+        buttons.addWidget(self.mode_btn)
+        self.text_buttons.append(self.mode_btn)
+        buttons.addStretch()
+        open_btn = QPushButton("Открыть")
+        open_btn.setStyleSheet(style)
+        open_btn.clicked.connect(lambda: self.current_file and self.pane.open_file(self.current_file))
+        buttons.addWidget(open_btn)
+        layout.addLayout(buttons)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.text.setStyleSheet("QPlainTextEdit { border: none; background: white; color: #2d3a4a; }")
+        self.text.viewport().installEventFilter(self)
+        self.image_label = QLabel()
+        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.image_label.setMinimumSize(1, 1)
+        self.image_label.setStyleSheet("background: white;")
+        self.body = QStackedWidget()
+        self.body.addWidget(self.text)
+        self.body.addWidget(self.image_label)
+        layout.addWidget(self.body)
+        # После изменения размера панели кадр перекодируется под новый размер, но не на каждый пиксель
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(150)
+        self.resize_timer.timeout.connect(lambda: self.current_file and self.body.currentWidget() is self.image_label and self.request_image(self.current_file))
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("font-size: 12px; color: #7a8ca3;")
+        layout.addWidget(self.status_label)
 
-        # Add button for toggling view mode (grid/list)
-        self.toggle_view_btn = QPushButton("☰")
-        self.toggle_view_btn.setFixedSize(28, 28)
-        self.toggle_view_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
-        self.toggle_view_btn.clicked.connect(self.toggle_view_mode)
-        self.topbar_layout.addWidget(self.toggle_view_btn)
+    def eventFilter(self, obj, event):
+        # Прокрутка колесом за край страницы листает дальше
+        if obj is self.text.viewport() and event.type() == QEvent.Type.Wheel and self.preview is not None:
+            bar = self.text.verticalScrollBar()
+            delta = event.angleDelta().y()
+            if delta < 0 and bar.value() >= bar.maximum() and not self.at_end:
+                self.page(1)
+                return True
+            if delta > 0 and bar.value() <= bar.minimum() and (self.top_line > 0 or self.hex_offset > 0):
+                self.page(-1)
+                self.text.verticalScrollBar().setValue(self.text.verticalScrollBar().maximum())
+                return True
+        return super().eventFilter(obj, event)
 
-        # Кнопки управления окном
-        self.min_btn = QPushButton("–")
-        self.min_btn.setFixedSize(32, 32)
-        self.min_btn.setStyleSheet("""
-            QPushButton {
-                font-size: 18px; border: none; background: transparent; color: #7a8ca3;
-            }
-            QPushButton:hover {
-                background: #e6f0ff; color: #1a73e8;
-            }
-        """)
-        self.min_btn.clicked.connect(self.showMinimized)
-        
-        # Maximize/Restore button
-        self.max_btn = QPushButton("□")
-        self.max_btn.setFixedSize(32, 32)
-        self.max_btn.setStyleSheet("""
-            QPushButton {
-                font-size: 16px; border: none; background: transparent; color: #7a8ca3;
-            }
-            QPushButton:hover {
-                background: #e6f0ff; color: #1a73e8;
-            }
-        """)
-        self.max_btn.clicked.connect(self.toggle_maximize)
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key.Key_Left, Qt.Key.Key_Up):
+            self.step(-1)
+        elif event.key() in (Qt.Key.Key_Right, Qt.Key.Key_Down):
+            self.step(1)
+        else:
+            super().keyPressEvent(event)
+            return
+        event.accept()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.body.currentWidget() is self.image_label and self.current_file:
+            self.show_frame(self.frame_pixmap, None)
+            self.resize_timer.start()
+
+    def step(self, delta):
+        """Preview the previous or next file of the folder in display order"""
+        siblings = self.pane.preview_siblings()
+        if self.current_file not in siblings:
+            return
+        index = siblings.index(self.current_file) + delta
+        if 0 <= index < len(siblings):
+            self.show_file(siblings[index])
+
+    def show_file(self, path):
+        self.clear()
+        self.current_file = path
+        self.name_label.setText(os.path.basename(path))
+        self.setFocus()
+        if is_image(path):
+            self.show_image(path)
+            return
+        for btn in self.text_buttons:
+            btn.setVisible(True)
+        self.body.setCurrentWidget(self.text)
+        try:
+            self.preview = FilePreview(path)
+        except (OSError, ValueError) as e:
+            self.status_label.setText(f"Не удалось открыть: {e}")
+            return
+        self.mode = "text" if self.preview.is_text else "hex"
+        self.mode_btn.setText("HEX" if self.mode == "text" else "Текст")
+        self.render()
+        if self.preview.total_lines is None:
+            preview = self.preview
+            self.index_cancel = threading.Event()
+            worker = Worker(preview.build_index, self.index_cancel, with_progress=True, io_class=IO_PREFETCH)
+            worker.signals.progress.connect(lambda fraction: self.on_index_progress(preview, fraction))
+            worker.signals.finished.connect(lambda total: self.on_index_finished(preview, total))
+            self.pane.main_window.thread_pool.start(worker)
+
+    def frame_box(self):
+        size = self.body.size()
+        bucket = self.IMAGE_BUCKET
+        return max(bucket, -(-size.width() // bucket) * bucket), max(bucket, -(-size.height() // bucket) * bucket)
+
+    def show_image(self, path):
+        for btn in self.text_buttons:
+            btn.setVisible(False)
+        self.body.setCurrentWidget(self.image_label)
+        self.status_label.setText("Загрузка...")
+        self.request_image(path)
+        # Соседние картинки декодируются заранее
+        siblings = self.pane.preview_siblings()
+        if path in siblings:
+            index = siblings.index(path)
+            for neighbours in (reversed(siblings[:index]), siblings[index + 1:]):
+                nearest = next((p for p in neighbours if is_image(p)), None)
+                if nearest:
+                    self.request_image(nearest)
+
+    def request_image(self, path):
+        width, height = self.frame_box()
+        cache = self.pane.main_window.image_frames
+        key = cache.key(path, width, height)
+        frame = cache.get(key)
+        if frame is not None:
+            if path == self.current_file:
+                self.show_frame(*frame)
+            return
+        if key in self.image_pending:
+            return
+        self.image_pending.add(key)
+        # Картинка на экране идёт первой, соседние — как упреждающее чтение
+        worker = Worker(decode_scaled_image, path, width, height,
+                        io_class=IO_INTERACTIVE if path == self.current_file else IO_PREFETCH)
+        worker.signals.finished.connect(lambda result: self.on_image_decoded(key, path, result))
+        worker.signals.error.connect(lambda message: self.on_image_error(key, path, message))
+        self.pane.main_window.thread_pool.start(worker)
+
+    def on_image_decoded(self, key, path, result):
+        self.image_pending.discard(key)
+        image, original_size = result
+        pixmap = QPixmap.fromImage(image)
+        self.pane.main_window.image_frames.put(key, pixmap, original_size)
+        if path == self.current_file and self.body.currentWidget() is self.image_label:
+            self.show_frame(pixmap, original_size)
+
+    def on_image_error(self, key, path, message):
+        self.image_pending.discard(key)
+        if path == self.current_file:
+            self.status_label.setText(f"Не удалось открыть: {message}")
+
+    def show_frame(self, pixmap, original_size):
+        if pixmap is None:
+            return
+        self.frame_pixmap = pixmap
+        target = self.image_label.size()
+        if pixmap.width() > target.width() or pixmap.height() > target.height():
+            pixmap = pixmap.scaled(target, Qt.AspectRatioMode.KeepAspectRatio, scaling_mode())
+        self.image_label.setPixmap(pixmap)
+        if original_size is not None:
+            try:
+                size_text = format_size(os.path.getsize(self.current_file))
+            except OSError:
+                size_text = ""
+            self.status_label.setText(f"{original_size.width()} × {original_size.height()}  {size_text}".strip())
+
+    def clear(self):
+        """Drop the current file: stop indexing and unmap it"""
+        if self.index_cancel is not None:
+            self.index_cancel.set()
+            self.index_cancel = None
+        if self.preview is not None:
+            self.preview.close()
+            self.preview = None
+        self.top_line = 0
+        self.hex_offset = 0
+        self.at_end = False
+        self.current_file = None
+        self.text.clear()
+        self.image_label.clear()
+        self.frame_pixmap = None
+        self.name_label.setText("Выберите файл")
+        self.status_label.setText("")
+
+    def on_index_progress(self, preview, fraction):
+        if preview is self.preview and self.mode == "text":
+            self.update_status(f"индексация {int(fraction * 100)}%")
+
+    def on_index_finished(self, preview, total):
+        if preview is self.preview and total is not None:
+            self.update_status()
+
+    def update_status(self, extra=None):
+        preview = self.preview
+        if self.mode == "hex":
+            end = min(self.hex_offset + self.HEX_PAGE, preview.size)
+            text = f"Байты {self.hex_offset:,}–{end:,} из {preview.size:,}"
+        else:
+            shown = self.text.blockCount() if self.text.toPlainText() else 0
+            text = f"Строки {self.top_line + 1:,}–{self.top_line + shown:,}" if self.top_line is not None else f"Последние {shown} строк"
+            if preview.total_lines is not None:
+                text += f" из {preview.total_lines:,}"
+        if extra:
+            text += f" · {extra}"
+        self.status_label.setText(text.replace(",", " "))
+
+    def render(self):
+        if self.preview is None:
+            return
+        if self.mode == "hex":
+            rows = self.preview.hex_page(self.hex_offset, self.HEX_PAGE)
+            self.at_end = self.hex_offset + self.HEX_PAGE >= self.preview.size
+        else:
+            rows, self.at_end = self.preview.page_text(self.top_line, self.PAGE_LINES)
+        self.text.setPlainText("\n".join(rows))
+        self.update_status()
+
+    def page(self, delta):
+        if self.preview is None or (delta > 0 and self.at_end):
+            return
+        if self.mode == "hex":
+            self.hex_offset = max(0, self.hex_offset + delta * self.HEX_PAGE)
+        else:
+            if self.top_line is None:
+                # Из просмотра хвоста назад можно листать, только когда число строк уже известно
+                if self.preview.total_lines is None:
+                    return
+                self.top_line = max(0, self.preview.total_lines - self.PAGE_LINES)
+            self.top_line = max(0, self.top_line + delta * self.PAGE_LINES)
+        self.render()
+
+    def go_home(self):
+        self.top_line = 0
+        self.hex_offset = 0
+        self.render()
+
+    def go_tail(self):
+        if self.preview is None:
+            return
+        if self.mode == "hex":
+            self.hex_offset = max(0, (self.preview.size - 1) // self.HEX_PAGE * self.HEX_PAGE)
+            self.render()
+            return
+        # Хвост читается с конца файла и не ждёт индекса строк
+        lines = self.preview.tail_text(self.PAGE_LINES)
+        total = self.preview.total_lines
+        self.top_line = max(0, total - len(lines)) if total is not None else None
+        self.at_end = True
+        self.text.setPlainText("\n".join(lines))
+        self.text.verticalScrollBar().setValue(self.text.verticalScrollBar().maximum())
+        self.update_status()
+
+    def toggle_mode(self):
+        if self.preview is None:
+            return
+        self.mode = "hex" if self.mode == "text" else "text"
+        self.mode_btn.setText("HEX" if self.mode == "text" else "Текст")
+        if self.top_line is None:
+            self.top_line = 0
+        self.render()
+
+class FilePane(QFrame):
+    """One folder view: a tab or the second pane of dual-pane mode.
+
+    Listing cache, thumbnail cache, watcher and thread pool live on main_window and are shared
+    by all panes, so opening a folder that is already shown elsewhere costs nothing.
+    """
+    def __init__(self, main_window, parent=None):
+        super().__init__(parent)
+        self.main_window = main_window
+        self.history = []
+        self.current_path = USER_DIRS["Home"]
+        self.listing = None  # Shared DirSnapshot of current_path
+        self.visible_indices = array('I')  # Entries of the snapshot shown with the current hidden-files setting
+        # For progressive file loading: the pane pages through view_indices, nothing is copied
+        self.chunk_size = 50  # Number of files to load per chunk
+        self.view_indices = array('I')  # Snapshot indices in display order (filtered and sorted)
+        self.loaded_count = 0  # How many of view_indices already have widgets
+        self.loading_in_progress = False  # Flag to prevent multiple simultaneous loads
+        # What the folder area currently shows: "dir", "trash" or "disks"
+        self.current_view = "dir"
+        self.trash_iter = None  # Lazy iterator over trash items for paginated loading
+        self.trash_loaded = 0
+        self.disk_widgets = {}
+        self.provider = None  # LocationProvider of current_path: local, archive or remote
+        self.search_job = None  # Running ContentSearch or DuplicateFinder, cancelled by a new one or navigation
+        self.content_found = 0
+        self.search_status_label = None
+        self.type_sniff_cancel = None  # Фоновое определение типов файлов без расширения
+        self.folder_animation = None
+        self.columns_cache = None  # (listing, show_hidden, has_stat, EntryColumns) для фильтра-запроса
+        self.stat_pending = None  # Снимок, размеры и даты которого читаются в фоне для size:/modified:
         
-        self.close_btn = QPushButton("×")
-        self.close_btn.setFixedSize(32, 32)
-        self.close_btn.setStyleSheet("""
-            QPushButton {
-                font-size: 18px; border: none; background: transparent; color: #e57373;
-            }
-            QPushButton:hover {
-                background: #ffeaea; color: #d32f2f;
-            }
-        """)
-        self.close_btn.clicked.connect(self.close)
-        self.topbar_layout.addWidget(self.min_btn)
-        self.topbar_layout.addWidget(self.max_btn)
-        self.topbar_layout.addWidget(self.close_btn)
-        self.content_layout.addWidget(self.topbar_frame)
-        self.content_layout.setSpacing(0)
-        self.content_layout.setContentsMargins(0, 0, 0, 0)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
 
         # Прокручиваемая область с файлами и папками
         self.scroll = QScrollArea()
@@ -491,116 +1024,76 @@ class CustomWindow(QWidget):
         self.folders_layout.setContentsMargins(20, 20, 20, 20)
         self.scroll.setWidget(self.folders_widget)
         
-        # Add loading label to the layout
-        self.folders_layout.addWidget(self.loading_label, 0, 0, 1, 5)
-        
-        self.content_layout.addWidget(self.scroll)
+        # Справа от файлов — панель предпросмотра, включается кнопкой в верхней панели
+        self.preview = PreviewPane(self)
+        self.preview.setVisible(getattr(main_window, "preview_visible", False))
+        self.content_splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.content_splitter.setChildrenCollapsible(False)
+        self.content_splitter.addWidget(self.scroll)
+        self.content_splitter.addWidget(self.preview)
+        self.content_splitter.setStretchFactor(0, 3)
+        self.content_splitter.setStretchFactor(1, 2)
+        layout.addWidget(self.content_splitter)
+        self.folders_widget.installEventFilter(self)
+        self.scroll.viewport().installEventFilter(self)
         
         # Initialize grid centering
         self.center_grid_items()
 
-        # Вкладки дисков
-        self.disk_tabbar = QTabBar()
-        self.disk_tabbar.setExpanding(False)
-        self.disk_tabbar.setDrawBase(False)
-        self.disk_tabbar.setStyleSheet("""
-            QTabBar::tab {
-                background: #f5f6fa;
-                border: 1px solid #e0e4ea;
-                border-radius: 8px;
-                min-width: 60px;
-                min-height: 28px;
-                margin-right: 8px;
-                font-size: 15px;
-                color: #444;
-                padding: 4px 16px;
-            }
-            QTabBar::tab:selected {
-                background: #e6f0ff;
-                color: #1a73e8;
-            }
-        """)
-        self.disk_tabbar.setMovable(False)
-        self.disk_tabbar.tabBarClicked.connect(self.on_disk_tab_clicked)
-        self.content_layout.addWidget(self.disk_tabbar)
-        self.update_disk_tabs()
-
-        self.main_layout.addWidget(self.sidebar)
-        self.main_layout.addSpacing(20)
-        self.main_layout.addWidget(self.content)
-
-        # Вызов навигации по сайдбару только после создания всех элементов верхней панели
-        self.sidebar_navigate("Home")
-
-    def update_breadcrumb(self, path):
-        # Очищаем старые элементы
-        for i in reversed(range(self.breadcrumb_layout.count())):
-            w = self.breadcrumb_layout.itemAt(i).widget()
-            if w:
-                w.setParent(None)
-        parts = Path(path).parts
-        acc = ""
-        for i, part in enumerate(parts):
-            if i == 0 and os.name == "nt":
-                acc = part
-            else:
-                acc = os.path.join(acc, part) if acc else part
-            btn = QPushButton(part)
-            btn.setStyleSheet("QPushButton { background: transparent; border: none; color: #222; font-size: 18px; padding: 2px 8px; border-radius: 6px; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
-            btn.clicked.connect(lambda checked, p=acc: self.open_dir(p, add_history=True))
-            self.breadcrumb_layout.addWidget(btn)
-            if i < len(parts) - 1:
-                sep = QLabel("/")
-                sep.setStyleSheet("color: #b0b8c9; font-size: 18px; padding: 0 2px;")
-                self.breadcrumb_layout.addWidget(sep)
-
-    def breadcrumb_edit_mode(self):
-        self.breadcrumb_widget.setVisible(False)
-        self.breadcrumb_edit.setText(self.current_path)
-        self.breadcrumb_edit.setVisible(True)
-        self.breadcrumb_edit.setFocus()
-        self.breadcrumb_edit.selectAll()
-    
-    def toggle_hidden_files(self):
-        """Toggle visibility of hidden files"""
-        self.show_hidden = not self.show_hidden
-        # Update button appearance
-        if self.show_hidden:
-            self.toggle_hidden_btn.setStyleSheet("QPushButton { border: none; background: #e6f0ff; color: #1a73e8; } QPushButton:hover { background: #d9e6ff; }")
-        else:
-            self.toggle_hidden_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
-        # Re-open current directory to apply changes
-        self.open_dir(self.current_path, add_history=False)
+    def eventFilter(self, obj, event):
+        # Клик в любом месте панели делает её активной
+        if event.type() == QEvent.Type.MouseButtonPress:
+            self.main_window.set_active_pane(self)
+        # Handle paint event for folders_widget drag-over indication
+        elif obj is self.folders_widget and event.type() == QEvent.Type.Paint:
+            if getattr(self.folders_widget, '_drag_over', False):
+                painter = QPainter(self.folders_widget)
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                rect = self.folders_widget.rect()
+                painter.setBrush(QColor(230, 240, 255, 120))
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.drawRoundedRect(rect, 24, 24)
+        return super().eventFilter(obj, event)
 
-    def toggle_view_mode(self):
-        """Toggle between grid and list view modes"""
-        if self.view_mode == "grid":
-            self.view_mode = "list"
-            # Update button appearance for list view
-            self.toggle_view_btn.setStyleSheet("QPushButton { border: none; background: #e6f0ff; color: #1a73e8; } QPushButton:hover { background: #d9e6ff; }")
-        else:
-            self.view_mode = "grid"
-            # Update button appearance for grid view
-            self.toggle_view_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
-        # Re-open current directory to apply changes
+    def set_active(self, active):
+        self.setStyleSheet("FilePane { border: 2px solid #dbeafe; border-radius: 12px; }" if active else "")
+
+    def title(self):
+        if self.current_view == "trash":
+            return "Trash"
+        if self.current_view == "disks":
+            return "Disks"
+        if self.current_view == "duplicates":
+            return "Дубликаты"
+        if self.current_view == "search":
+            return f"Поиск: {self.main_window.search_input.text().strip()}"
+        return os.path.basename(self.current_path.rstrip("/\\")) or self.current_path
+
+    def refresh(self):
+        """Re-list the current folder keeping the scroll position"""
+        if self.current_view != "dir":
+            return
+        scroll_value = self.scroll.verticalScrollBar().value()
         self.open_dir(self.current_path, add_history=False)
+        self.scroll.verticalScrollBar().setValue(scroll_value)
 
-    def breadcrumb_edit_apply(self):
-        path = self.breadcrumb_edit.text()
-        if os.path.isdir(path):
-            self.open_dir(path, add_history=True)
-        self.breadcrumb_edit.setVisible(False)
-        self.breadcrumb_widget.setVisible(True)
-
-    def open_dir(self, path, add_history=True):
+    def open_dir(self, path, add_history=True, listing=None):
+        """Show path; a listing restored from the session snapshot is shown at once and re-read in the background"""
         #print(f"open_dir: path={path}, isdir={os.path.isdir(path)}")  # Debug print
-        if not os.path.isdir(path):
+        provider = self.main_window.providers.for_path(path)
+        # Удалённую папку проверит сам листинг в фоне, чтобы не ждать сеть в GUI-потоке
+        if provider is None or (not provider.remote and not provider.is_dir(path)):
             return
+        self.cancel_search_job()
         if add_history:
             self.history.append(self.current_path)
         self.current_path = path
-        self.update_breadcrumb(path)
-        self.update_disk_tabs()
+        self.current_view = "dir"
+        self.trash_iter = None
+        self.forget_view_widgets()
+        self.provider = provider
+        self.main_window.watcher.watch(self, path if provider.local else None)
+        self.main_window.on_pane_navigated(self)
         # Очистить старые виджеты
         while self.folders_layout.count():
             item = self.folders_layout.takeAt(0)
@@ -609,14 +1102,65 @@ class CustomWindow(QWidget):
                 widget.setParent(None)
                 widget.deleteLater()
         # Reset progressive loading state
-        self.loaded_entries = []
+        self.view_indices = array('I')
+        self.loaded_count = 0
         self.loading_in_progress = False
-        # Добавить папки и файлы
-        try:
-            entries = os.listdir(path)
-        except Exception as e:
+        restored = listing is not None
+        if listing is None and provider.remote:
+            listing = provider.cached_listing(path)
+        if provider.remote and listing is None:
+            self.list_remote_dir(path)
+            return
+        error = None
+        if listing is None:
+            try:
+                with shared_io_scheduler.interactive():
+                    listing = provider.list_dir(path)
+            except Exception as e:
+                error = e
+        self.show_listing(path, listing, error)
+        if restored:
+            self.revalidate_in_background(path)
+
+    def revalidate_in_background(self, path):
+        """Re-list path off the GUI thread and redraw only if the folder changed since the snapshot"""
+        shown = self.listing
+        worker = Worker(self.provider.list_dir, path, io_class=IO_PREFETCH)
+        worker.signals.finished.connect(
+            lambda listing, path=path: listing is not shown and self.current_view == "dir"
+            and self.current_path == path and self.listing is shown and self.refresh())
+        self.main_window.thread_pool.start(worker)
+
+    def list_remote_dir(self, path):
+        """List a remote folder in the background; the result is shown only if the pane is still there"""
+        label = QLabel("Загрузка...")
+        label.setStyleSheet("font-size: 16px; color: #666; padding: 10px;")
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.folders_layout.addWidget(label, 0, 0, 1, 5)
+        worker = Worker(self.provider.list_dir, path, io_class=IO_INTERACTIVE)
+        worker.signals.finished.connect(lambda listing, path=path: self.on_remote_listing(path, listing, None))
+        worker.signals.error.connect(lambda message, path=path: self.on_remote_listing(path, None, message))
+        self.main_window.thread_pool.start(worker)
+
+    def on_remote_listing(self, path, listing, error):
+        if self.current_view != "dir" or self.current_path != path:
+            return
+        while self.folders_layout.count():
+            item = self.folders_layout.takeAt(0)
+            if item and item.widget():
+                widget = item.widget()
+                widget.setParent(None)
+                widget.deleteLater()
+        self.show_listing(path, listing, error)
+
+    def show_listing(self, path, listing, error=None):
+        """Fill the folder area from a listing, or explain why the folder is inaccessible"""
+        # Добавить папки и файлы (листинг общий для всех вкладок и панелей).
+        # Архивы и WebDAV отдают DirListing — он переводится в такой же столбцовый снимок
+        snapshot = DirSnapshot.from_listing(listing) if listing is not None else DirSnapshot(path, 0, (), (), local=False)
+        self.listing = snapshot
+        if error is not None:
             # Show folder as "inaccessible" instead of going back
-            entries = []
             # Display a message in the folder area
             empty_widget = QWidget()
             vbox = QVBoxLayout(empty_widget)
@@ -634,33 +1178,30 @@ class CustomWindow(QWidget):
             detail_label.setStyleSheet("font-size: 16px; color: #888; margin-top: 8px;")
             detail_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
             vbox.addWidget(detail_label, alignment=Qt.AlignmentFlag.AlignHCenter)
-            error_label = QLabel(f"Ошибка: {str(e)}")
+            error_label = QLabel(f"Ошибка: {str(error)}")
             error_label.setStyleSheet("font-size: 14px; color: #888; margin-top: 8px;")
             error_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
             vbox.addWidget(error_label, alignment=Qt.AlignmentFlag.AlignHCenter)
             self.folders_layout.addWidget(empty_widget, 0, 0, 1, 5)
             self.folders_widget.adjustSize()
             self.scroll.verticalScrollBar().setValue(0)
-            self.back_btn.setEnabled(len(self.history) > 0)
             # Don't return here, continue with empty entries list
-        # Filter out hidden files if show_hidden is False
-        if not self.show_hidden:
-            self.all_entries = [e for e in entries if not e.startswith('.')]
-        else:
-            self.all_entries = entries[:]
-        self.all_entries.sort()
-        entries = self.all_entries[:]  # Work with a copy
-        
-        # Filter entries based on search text if provided
-        search_text = self.search_input.text().strip().lower()
-        if search_text:
-            entries = [e for e in entries if search_text in e.lower()]
-        entries.sort()
-        
-        # Set up progressive loading
-        self.remaining_entries = entries[:]
-        
-        if not entries:
+        # Tombstones are never shown; orphaned ones (owner process gone) get cleaned up
+        if self.provider.local:
+            for i in snapshot.indices_with(FLAG_TOMBSTONE):
+                e = snapshot.name(i)
+                if not tombstone_owner_alive(e):
+                    self.main_window.remove_tombstone_in_background(os.path.join(path, e))
+        # Filter out tombstones and, if show_hidden is False, hidden files
+        self.visible_indices = snapshot.visible_indices(self.main_window.show_hidden)
+        if self.provider.local:
+            self.sniff_types_in_background(path)
+        
+        # Filter entries based on search text if provided, in the chosen sort order
+        self.view_indices = self.display_indices()
+        self.loaded_count = 0
+        
+        if not self.view_indices:
             empty_widget = QWidget()
             vbox = QVBoxLayout(empty_widget)
             vbox.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
@@ -680,37 +1221,104 @@ class CustomWindow(QWidget):
             
         self.folders_widget.adjustSize()
         self.scroll.verticalScrollBar().setValue(0)
-        self.back_btn.setEnabled(len(self.history) > 0)
         
         # Add animation for directory switching
         self.animate_folder_transition()
         
         # Center grid items if in grid view
-        if self.view_mode == "grid":
+        if self.main_window.view_mode == "grid":
             self.center_grid_items()
     
+    def display_indices(self):
+        """Snapshot indices of visible entries matching the search box query, sorted by name or by type"""
+        snapshot = self.listing
+        visible = self.visible_indices
+        query = self.main_window.compiled_query()
+        if query is None:
+            text = self.main_window.name_filter_text().strip().lower()
+            indices = array('I', (i for i in visible if text in snapshot.name(i).lower()))
+        elif query.words or query.terms:
+            if query.needs_stat and snapshot.local and not snapshot.has_stat:
+                # Размеры и даты читаются в фоне, а пока фильтр применяется без size: и modified:
+                self.fill_stat_in_background(snapshot)
+                query = query.without_stat()
+            positions = query.filter_indices(self.entry_columns(query.needs_stat))
+            indices = array('I', (visible[p] for p in positions))
+        else:
+            indices = visible
+        if self.main_window.sort_mode == "type":
+            type_cache = self.main_window.type_cache
+            indices = array('I', sorted(indices, key=lambda i: type_cache.sort_key(os.path.join(self.current_path, snapshot.name(i)), snapshot.is_dir(i))))
+        return indices
+
+    def entry_columns(self, with_stat):
+        """Columns of the visible entries for the query filter, built once per snapshot"""
+        show_hidden = self.main_window.show_hidden
+        cached = self.columns_cache
+        if cached is not None and cached[0] is self.listing and cached[1] == show_hidden and (cached[2] or not with_stat):
+            return cached[3]
+        # Размеры и даты снимок получает одним проходом stat при первом size:/modified:, дальше они общие
+        columns = snapshot_columns(self.listing, self.visible_indices, with_stat)
+        self.columns_cache = (self.listing, show_hidden, self.listing.has_stat, columns)
+        return columns
+
+    def fill_stat_in_background(self, snapshot):
+        """Read sizes and mtimes of the snapshot on the bulk pool, then apply the full filter"""
+        self.main_window.search_input.setToolTip("Размеры и даты ещё читаются: size: и modified: пока не учтены")
+        if self.stat_pending is snapshot:
+            return
+        self.stat_pending = snapshot
+        worker = Worker(snapshot.ensure_stat, io_class=IO_BULK)
+        worker.signals.finished.connect(lambda _, snapshot=snapshot: self.on_stat_filled(snapshot))
+        self.main_window.thread_pool.start(worker)
+
+    def on_stat_filled(self, snapshot):
+        if self.stat_pending is snapshot:
+            self.stat_pending = None
+        if self.listing is snapshot:
+            if self.main_window.compiled_query() is not None:
+                self.main_window.search_input.setToolTip("")
+            self.refresh()
+
+    def sniff_types_in_background(self, path):
+        """Read magic bytes of files whose extension says nothing; re-render if any type changed"""
+        if self.type_sniff_cancel is not None:
+            self.type_sniff_cancel.set()
+        snapshot = self.listing
+        type_cache = self.main_window.type_cache
+        ambiguous = [os.path.join(path, snapshot.name(i)) for i in self.visible_indices
+                     if not snapshot.is_dir(i) and type_cache.from_extension(snapshot.name(i)) is None]
+        if not ambiguous:
+            self.type_sniff_cancel = None
+            return
+        self.type_sniff_cancel = threading.Event()
+        worker = Worker(type_cache.detect_many, ambiguous, self.type_sniff_cancel, io_class=IO_THUMBNAIL)
+        # Уже известные типы detect_many не возвращает, поэтому повторный показ папки не зацикливается
+        worker.signals.finished.connect(lambda found, path=path: found and self.current_view == "dir" and self.current_path == path and self.refresh())
+        self.main_window.thread_pool.start(worker)
+
     def load_next_chunk(self):
         """Load and display the next chunk of files"""
-        if self.loading_in_progress or not self.remaining_entries:
+        if self.loading_in_progress or self.loaded_count >= len(self.view_indices):
             return
-            
+        # Миниатюры читаются с диска в GUI-потоке, фоновые задачи пока подождут
+        shared_io_scheduler.note_interactive()
         self.loading_in_progress = True
-        # Take a chunk of entries to load
-        chunk = self.remaining_entries[:self.chunk_size]
-        self.remaining_entries = self.remaining_entries[self.chunk_size:]
-        self.loaded_entries.extend(chunk)
-        
-        # Get current index for layout positioning
-        current_idx = len(self.loaded_entries) - len(chunk)
+        # Take the next chunk of snapshot indices; slicing an array copies only the chunk
+        snapshot = self.listing
+        current_idx = self.loaded_count
+        chunk = self.view_indices[current_idx:current_idx + self.chunk_size]
+        self.loaded_count += len(chunk)
         
         # Create and add widgets for this chunk
-        for i, entry in enumerate(chunk):
+        for i, index in enumerate(chunk):
+            entry = snapshot.name(index)
             abs_path = os.path.join(self.current_path, entry)
-            is_dir = os.path.isdir(abs_path)
+            is_dir = snapshot.is_dir(index)
             
-            if self.view_mode == "grid":
+            if self.main_window.view_mode == "grid":
                 # Grid view (existing implementation)
-                fw = FileWidget(entry, abs_path, is_dir, self.file_clicked, main_window=self, scale_factor=self.scale_factor)
+                fw = FileWidget(entry, abs_path, is_dir, self.file_clicked, main_window=self.main_window, scale_factor=self.main_window.scale_factor)
                 row, col = divmod(current_idx + i, 5)
                 self.folders_layout.addWidget(fw, row, col)
             else:
@@ -721,35 +1329,31 @@ class CustomWindow(QWidget):
                 list_layout.setSpacing(10)
                 
                 # Get icon for the file/folder
-                icon_or_pixmap, is_pixmap = get_file_icon_or_preview(abs_path)
-                icon_size = max(int(32 * self.scale_factor), 16)  # Minimum 16px
+                icon_size = max(int(32 * self.main_window.scale_factor), 16)  # Minimum 16px
                 
                 icon_label = QLabel()
-                if is_pixmap:
-                    pixmap = icon_or_pixmap.scaled(icon_size, icon_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                    icon_label.setPixmap(pixmap)
-                else:
-                    pixmap = icon_or_pixmap.pixmap(icon_size, icon_size)
-                    icon_label.setPixmap(pixmap)
+                icon_label.setPixmap(self.main_window.thumbnail_cache.pixmap(abs_path, icon_size, is_dir=is_dir))
                 
                 # Name label
                 name_label = QLabel(entry)
                 name_label.setStyleSheet("font-size: 16px; color: #333;")
                 
+                # Type label
+                file_type = None if is_dir else self.main_window.type_cache.lookup(abs_path)
+                type_label = QLabel("Папка" if is_dir else describe_type(file_type, entry))
+                type_label.setStyleSheet("font-size: 14px; color: #888;")
+                type_label.setFixedWidth(int(150 * self.main_window.scale_factor))
+                
                 # Size label
                 try:
-                    size = os.path.getsize(abs_path) if not is_dir else 0
                     if is_dir:
                         size_text = "<ПАПКА>"
+                    elif snapshot.has_stat:
+                        size_text = format_size(snapshot.sizes[index])
+                    elif not self.provider.local:
+                        size_text = format_size(self.provider.entry_size(abs_path))
                     else:
-                        if size < 1024:
-                            size_text = f"{size} Б"
-                        elif size < 1024 * 1024:
-                            size_text = f"{size // 1024} КБ"
-                        elif size < 1024 * 1024 * 1024:
-                            size_text = f"{size // (1024 * 1024)} МБ"
-                        else:
-                            size_text = f"{size // (1024 * 1024 * 1024)} ГБ"
+                        size_text = format_size(os.path.getsize(abs_path))
                 except:
                     size_text = "Н/Д"
                 
@@ -760,6 +1364,7 @@ class CustomWindow(QWidget):
                 # Add widgets to layout
                 list_layout.addWidget(icon_label)
                 list_layout.addWidget(name_label, 1)  # Stretch factor 1 to take available space
+                list_layout.addWidget(type_label)
                 list_layout.addWidget(size_label)
                 
                 # Set widget properties
@@ -784,7 +1389,7 @@ class CustomWindow(QWidget):
                 self.folders_layout.addWidget(list_widget, current_idx + i, 0, 1, 5)
         
         # If there are more entries to load, set up automatic loading
-        if self.remaining_entries:
+        if self.loaded_count < len(self.view_indices):
             # Connect to scroll event to load more when user scrolls near the bottom
             # Using try-except to handle cases where connection already exists
             try:
@@ -800,7 +1405,7 @@ class CustomWindow(QWidget):
         
         
         # Center the grid items if we're in grid view mode
-        if self.view_mode == "grid":
+        if self.main_window.view_mode == "grid":
             self.center_grid_items()
          
         self.loading_in_progress = False
@@ -809,7 +1414,7 @@ class CustomWindow(QWidget):
     def center_grid_items(self):
         """Center grid items when there are fewer items than columns in the last row"""
         # Only apply centering in grid view mode
-        if self.view_mode != "grid":
+        if self.main_window.view_mode != "grid":
             return
             
         # Get the number of items in the grid
@@ -849,7 +1454,11 @@ class CustomWindow(QWidget):
                     self.folders_layout.setColumnStretch(i, 0)
     def check_scroll_for_loading(self, value):
         """Check if we need to load more files based on scroll position"""
-        if not self.remaining_entries or self.loading_in_progress:
+        if self.current_view == "trash":
+            if self.trash_iter is not None and value >= self.scroll.verticalScrollBar().maximum() * 0.8:
+                self.load_next_trash_chunk()
+            return
+        if self.loaded_count >= len(self.view_indices) or self.loading_in_progress:
             return
             
         # Get scroll bar and widget heights
@@ -867,13 +1476,19 @@ class CustomWindow(QWidget):
             if item and item.widget():
                 widget = item.widget()
                 if isinstance(widget, FileWidget):
-                    widget.update_scale(self.scale_factor)
+                    widget.update_scale(self.main_window.scale_factor)
     
     def animate_folder_transition(self):
         """Add a subtle animation when switching directories"""
-        # Create a property animation for the folders_widget
-        animation = QPropertyAnimation(self.folders_widget, b"geometry")
-        animation.setDuration(300)  # 300ms duration
+        if not shared_render_governor.quality.animations:
+            return
+        # One animation per pane, restarted on every switch
+        animation = self.folder_animation
+        if animation is None:
+            animation = self.folder_animation = QPropertyAnimation(self.folders_widget, b"geometry", self)
+            animation.setDuration(300)  # 300ms duration
+            animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+        animation.stop()
         
         # Get current geometry
         current_geometry = self.folders_widget.geometry()
@@ -889,10 +1504,1085 @@ class CustomWindow(QWidget):
         # Set up animation
         animation.setStartValue(scaled_geometry)
         animation.setEndValue(current_geometry)
-        animation.setEasingCurve(QEasingCurve.Type.OutCubic)
-        
-        # Start animation
-        animation.start(QPropertyAnimation.DeletionPolicy.DeleteWhenStopped)
+        animation.start()
+
+    def file_clicked(self, path, is_dir):
+        self.main_window.set_active_pane(self)
+        if is_dir or is_archive(path):
+            self.open_dir(path, add_history=True)
+        elif not self.provider.local and not os.path.exists(path):
+            # Файл из архива или с сервера копируется во временную папку в фоне и открывается оттуда
+            worker = Worker(self.fetch_for_opening, path, io_class=IO_INTERACTIVE)
+            worker.signals.finished.connect(lambda local_path: self.file_clicked(local_path, False))
+            worker.signals.error.connect(lambda message: WarningDialog("Ошибка", f"Не удалось получить файл:\n{path}\n\nОшибка: {message}", self.main_window).exec())
+            self.main_window.thread_pool.start(worker)
+        elif self.preview.isVisible() and os.path.isfile(path):
+            self.preview.show_file(path)
+        else:
+            self.open_file(path)
+
+    def open_file(self, path):
+        try:
+            os.startfile(path)
+        except Exception as e:
+            dialog = WarningDialog("Ошибка", f"Не удалось открыть файл:\n{path}\n\nОшибка: {str(e)}", self.main_window)
+            dialog.exec()
+
+    def preview_siblings(self):
+        """Files of the current folder in display order, for stepping through them in the preview"""
+        if self.current_view != "dir" or not self.provider.local:
+            return []
+        snapshot = self.listing
+        return [os.path.join(self.current_path, snapshot.name(i)) for i in self.view_indices if not snapshot.is_dir(i)]
+
+    def fetch_for_opening(self, path):
+        provider = self.main_window.providers.for_path(path)
+        dst_dir = os.path.join(get_cache_dir(), "opened", f"{zlib.crc32(provider.parent(path).encode()):08x}")
+        os.makedirs(dst_dir, exist_ok=True)
+        return provider.download(path, dst_dir)
+
+    def folders_drag_enter_event(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+            self.folders_widget._drag_over = True
+            self.folders_widget.update()
+
+    def folders_drag_leave_event(self, event):
+        self.folders_widget._drag_over = False
+        self.folders_widget.update()
+
+    def folders_drop_event(self, event):
+        self.main_window.transfer([url_to_path(url) for url in event.mimeData().urls()], self.current_path)
+        self.folders_widget._drag_over = False
+        self.folders_widget.update()
+        event.acceptProposedAction()
+
+
+    def contextMenuEvent(self, event):
+        # Контекстное меню для пустой области (например, вставить)
+        self.main_window.set_active_pane(self)
+        menu = QMenu(self)
+        menu.setStyleSheet("""
+            QMenu {
+                background: #fff;
+                border: 1px solid #d0d0d0;
+                border-radius: 10px;
+                padding: 6px;
+                color: #222;
+                font-size: 15px;
+            }
+            QMenu::item {
+                padding: 8px 24px 8px 24px;
+                border-radius: 6px;
+            }
+            QMenu::item:selected {
+                background: #e6f0ff;
+                color: #1a73e8;
+            }
+            QMenu::separator {
+                height: 1px;
+                background: #e0e0e0;
+                margin: 4px 0 4px 0;
+            }
+        """)
+        create_menu = QMenu("Создать", self)
+        create_menu.setStyleSheet(menu.styleSheet())
+        folder_icon = QIcon("folder.png") if os.path.exists("folder.png") else QIcon()
+        file_icon = QIcon("unknow.png") if os.path.exists("unknow.png") else QIcon()
+        create_menu.addAction(folder_icon, "Папка", self.main_window.create_folder_dialog)
+        create_menu.addAction(file_icon, "Текстовой файл", self.main_window.create_file_dialog)
+        if self.current_view == "trash":
+            menu.addAction("Очистить корзину", self.main_window.empty_trash_in_background)
+            menu.exec(event.globalPos())
+            menu.deleteLater()
+            return
+        menu.addMenu(create_menu)
+        menu.addAction("Вставить", lambda: self.main_window.paste_to(self.current_path))
+        if self.current_view == "dir":
+            sort_menu = QMenu("Сортировка", self)
+            sort_menu.setStyleSheet(menu.styleSheet())
+            for mode, text in (("name", "По имени"), ("type", "По типу")):
+                action = sort_menu.addAction(text, lambda mode=mode: self.main_window.set_sort_mode(mode))
+                action.setCheckable(True)
+                action.setChecked(self.main_window.sort_mode == mode)
+            menu.addMenu(sort_menu)
+            menu.addSeparator()
+            if self.provider.local:
+                menu.addAction("Найти дубликаты здесь", lambda: self.start_duplicate_search(self.current_path))
+                menu.addAction("Анализ занятого места", lambda: self.main_window.show_disk_usage(self.current_path))
+        menu.addSeparator()
+        # Сколько занимают миниатюры, кадры и листинги — чтобы держать окно в заданном объёме
+        menu.addAction(self.main_window.memory_usage_text()).setEnabled(False)
+        menu.exec(event.globalPos())
+        menu.deleteLater()
+
+    def open_recycle_bin_dir(self):
+        # Очистить старые виджеты
+        while self.folders_layout.count():
+            item = self.folders_layout.takeAt(0)
+            if item and item.widget():
+                widget = item.widget()
+                widget.setParent(None)
+                widget.deleteLater()
+        self.cancel_search_job()
+        self.current_view = "trash"
+        self.forget_view_widgets()
+        self.view_indices = array('I')
+        self.main_window.watcher.watch(self, None)
+        self.main_window.on_pane_navigated(self)
+        # Элементы корзины читаются лениво, страницами по chunk_size
+        self.trash_iter = iter_trash()
+        self.trash_loaded = 0
+        self.load_next_trash_chunk()
+        if self.trash_loaded == 0:
+            empty_widget = QWidget()
+            vbox = QVBoxLayout(empty_widget)
+            vbox.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
+            icon = QIcon("folder.png") if os.path.exists("folder.png") else QIcon()
+            icon_label = QLabel()
+            if not icon.isNull():
+                icon_label.setPixmap(icon.pixmap(120, 120))
+            vbox.addWidget(icon_label, alignment=Qt.AlignmentFlag.AlignHCenter)
+            text_label = QLabel("Корзина пуста")
+            text_label.setStyleSheet("font-size: 22px; color: #b0b8c9; margin-top: 16px;")
+            text_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+            vbox.addWidget(text_label, alignment=Qt.AlignmentFlag.AlignHCenter)
+            self.folders_layout.addWidget(empty_widget, 0, 0, 1, 5)
+        else:
+            try:
+                self.scroll.verticalScrollBar().valueChanged.disconnect(self.check_scroll_for_loading)
+            except (TypeError, AttributeError):
+                pass
+            self.scroll.verticalScrollBar().valueChanged.connect(self.check_scroll_for_loading)
+        self.folders_widget.adjustSize()
+        self.scroll.verticalScrollBar().setValue(0)
+
+    def load_next_trash_chunk(self):
+        """Load and display the next page of trash items"""
+        if self.trash_iter is None:
+            return
+        try:
+            chunk = list(itertools.islice(self.trash_iter, self.chunk_size))
+        except OSError:
+            chunk = []
+        if len(chunk) < self.chunk_size:
+            self.trash_iter = None
+        for item in chunk:
+            w = TrashItemWidget(item, self.main_window)
+            self.folders_layout.addWidget(w, self.trash_loaded // 5, self.trash_loaded % 5)
+            self.trash_loaded += 1
+        # Center items if fewer than 5
+        self.center_grid_items()
+        self.folders_widget.adjustSize()
+
+    def open_disks_dir(self):
+        # Clear existing widgets
+        while self.folders_layout.count():
+            item = self.folders_layout.takeAt(0)
+            if item and item.widget():
+                widget = item.widget()
+                widget.setParent(None)
+                widget.deleteLater()
+        
+        self.cancel_search_job()
+        self.current_view = "disks"
+        self.trash_iter = None
+        self.forget_view_widgets()
+        self.main_window.watcher.watch(self, None)
+        # Update breadcrumb to show "Disks"
+        self.main_window.on_pane_navigated(self)
+        
+        # Get all drives (cached by the mount monitor)
+        self.main_window.mount_monitor.refresh()
+        drives = self.main_window.mount_monitor.mounts
+        
+        if not drives:
+            # Show empty state if no drives found
+            empty_widget = QWidget()
+            vbox = QVBoxLayout(empty_widget)
+            vbox.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
+            icon = QIcon("disk.png") if os.path.exists("disk.png") else QIcon()
+            icon_label = QLabel()
+            if not icon.isNull():
+                icon_label.setPixmap(icon.pixmap(120, 120))
+            vbox.addWidget(icon_label, alignment=Qt.AlignmentFlag.AlignHCenter)
+            text_label = QLabel("Нет доступных дисков")
+            text_label.setStyleSheet("font-size: 22px; color: #b0b8c9; margin-top: 16px;")
+            text_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+            vbox.addWidget(text_label, alignment=Qt.AlignmentFlag.AlignHCenter)
+            self.folders_layout.addWidget(empty_widget, 0, 0, 1, 5)
+        else:
+            # Display each drive as a FileWidget
+            for idx, drive in enumerate(drives):
+                # Create a FileWidget for each drive with is_disk=True
+                name = self.main_window.mount_label(drive)
+                subtitle = {"network": "Сеть", "removable": "Съёмный"}.get(drive.kind, "")
+                fw = FileWidget(name, drive.mount_point, True, self.file_clicked, main_window=self.main_window, scale_factor=self.main_window.scale_factor, is_disk=True, subtitle=subtitle)
+                fw.setToolTip(f"{drive.mount_point}\n{drive.source} ({drive.fstype})")
+                self.folders_layout.addWidget(fw, idx // 5, idx % 5)
+                self.disk_widgets[drive.mount_point] = (fw, subtitle)
+            
+            # Center items if fewer than 5
+            self.center_grid_items()
+            # statvfs на сетевых дисках может зависнуть, поэтому размеры считаем в фоне
+            worker = Worker(self.collect_disk_usage, [d.mount_point for d in drives], with_progress=True)
+            worker.signals.progress.connect(self.on_disk_usage_ready)
+            self.main_window.thread_pool.start(worker)
+        
+        self.folders_widget.adjustSize()
+        self.scroll.verticalScrollBar().setValue(0)
+
+    def collect_disk_usage(self, mount_points, progress_callback=None):
+        for mount_point in mount_points:
+            try:
+                progress_callback((mount_point, get_disk_usage(mount_point)))
+            except OSError:
+                continue
+
+    def on_disk_usage_ready(self, result):
+        mount_point, (free, total) = result
+        if self.current_view != "disks" or mount_point not in self.disk_widgets:
+            return
+        fw, kind_text = self.disk_widgets[mount_point]
+        usage_text = f"{format_size(free)} свободно из {format_size(total)}"
+        fw.set_subtitle(f"{kind_text}\n{usage_text}" if kind_text else usage_text)
+
+    def start_content_search(self, query):
+        """Search file contents under current_path; matches stream in as they are found"""
+        self.cancel_search_job()
+        while self.folders_layout.count():
+            item = self.folders_layout.takeAt(0)
+            if item and item.widget():
+                widget = item.widget()
+                widget.setParent(None)
+                widget.deleteLater()
+        self.current_view = "search"
+        self.trash_iter = None
+        self.forget_view_widgets()
+        self.view_indices = array('I')
+        self.main_window.watcher.watch(self, None)
+        self.main_window.on_pane_navigated(self)
+        self.content_found = 0
+        self.search_status_label = QLabel(f"Поиск «{query}» в {self.current_path}...")
+        self.search_status_label.setStyleSheet("font-size: 16px; color: #666; padding: 10px;")
+        self.search_status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.folders_layout.addWidget(self.search_status_label, 0, 0, 1, 5)
+        try:
+            search = ContentSearch(self.current_path, query, max_size=self.main_window.content_search_max_size,
+                                   max_results=self.main_window.content_search_max_results,
+                                   show_hidden=self.main_window.show_hidden)
+        except re.error as e:
+            self.search_status_label.setText(f"Ошибка в регулярном выражении: {e}")
+            return
+        self.search_job = search
+        # Результаты приходят из пула потоков; устаревшие поиски отсекаются по объекту search
+        worker = Worker(self.run_content_search, search, with_progress=True)
+        worker.signals.progress.connect(lambda match, search=search: self.on_content_match(search, match))
+        worker.signals.finished.connect(lambda found, search=search: self.on_content_search_finished(search))
+        self.main_window.thread_pool.start(worker)
+        self.folders_widget.adjustSize()
+        self.scroll.verticalScrollBar().setValue(0)
+
+    def run_content_search(self, search, progress_callback=None):
+        return search.run(progress_callback)
+
+    def cancel_search_job(self):
+        if self.search_job is not None:
+            self.search_job.cancel()
+            self.search_job = None
+
+    def forget_view_widgets(self):
+        """Drop references to widgets of the previous view; they are deleted with the folder area"""
+        self.disk_widgets = {}
+        self.search_status_label = None
+
+    def shutdown(self):
+        """Stop the pane's background work before it is destroyed with its tab"""
+        self.cancel_search_job()
+        if self.type_sniff_cancel is not None:
+            self.type_sniff_cancel.set()
+            self.type_sniff_cancel = None
+        # Запоздавшие ответы воркеров сверяют current_view и не трогают удалённые виджеты
+        self.current_view = None
+        self.trash_iter = None
+        self.forget_view_widgets()
+        if self.folder_animation is not None:
+            self.folder_animation.stop()
+        self.preview.resize_timer.stop()
+        self.preview.clear()  # останавливает и фоновую индексацию файла
+
+    def on_content_match(self, search, match):
+        if search is not self.search_job or self.current_view != "search":
+            return
+        idx = self.content_found
+        self.content_found += 1
+        subtitle = f"стр. {match.line_number}: {match.line[:60]}"
+        fw = FileWidget(os.path.basename(match.path), match.path, False, self.file_clicked, main_window=self.main_window, scale_factor=self.main_window.scale_factor, subtitle=subtitle)
+        fw.setToolTip(f"{match.path}\n{match.line_number}: {match.line}")
+        self.folders_layout.addWidget(fw, 1 + idx // 5, idx % 5)
+        self.search_status_label.setText(f"Поиск... найдено: {self.content_found}")
+        self.folders_widget.adjustSize()
+
+    def on_content_search_finished(self, search):
+        if search is not self.search_job or self.current_view != "search":
+            return
+        self.search_job = None
+        if self.content_found == 0:
+            self.search_status_label.setText("Ничего не найдено")
+        elif search.max_results and self.content_found >= search.max_results:
+            self.search_status_label.setText(f"Показаны первые {self.content_found} совпадений")
+        else:
+            self.search_status_label.setText(f"Найдено файлов: {self.content_found}")
+
+    def start_duplicate_search(self, root):
+        """Find identical files under root; groups appear as soon as full hashes confirm them"""
+        self.cancel_search_job()
+        while self.folders_layout.count():
+            item = self.folders_layout.takeAt(0)
+            if item and item.widget():
+                widget = item.widget()
+                widget.setParent(None)
+                widget.deleteLater()
+        self.current_path = root
+        self.current_view = "duplicates"
+        self.trash_iter = None
+        self.forget_view_widgets()
+        self.view_indices = array('I')
+        self.main_window.watcher.watch(self, None)
+        self.main_window.on_pane_navigated(self)
+        self.duplicate_row = 1
+        self.duplicate_groups = 0
+        self.duplicate_wasted = 0
+        self.search_status_label = QLabel("Поиск файлов...")
+        self.search_status_label.setStyleSheet("font-size: 16px; color: #666; padding: 10px;")
+        self.search_status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.folders_layout.addWidget(self.search_status_label, 0, 0, 1, 5)
+        finder = DuplicateFinder(root, show_hidden=self.main_window.show_hidden, cache=self.main_window.hash_cache)
+        self.search_job = finder
+        worker = Worker(self.run_duplicate_search, finder, with_progress=True)
+        worker.signals.progress.connect(lambda event, finder=finder: self.on_duplicate_event(finder, event))
+        worker.signals.finished.connect(lambda groups, finder=finder: self.on_duplicate_search_finished(finder))
+        self.main_window.thread_pool.start(worker)
+        self.folders_widget.adjustSize()
+        self.scroll.verticalScrollBar().setValue(0)
+
+    def run_duplicate_search(self, finder, progress_callback=None):
+        # Группы и прогресс идут через один сигнал progress, поэтому помечаем их
+        return finder.run(on_group=lambda group: progress_callback(("group", group)),
+                          progress_callback=lambda *stage: progress_callback(("progress",) + stage))
+
+    def on_duplicate_event(self, finder, event):
+        if finder is not self.search_job or self.current_view != "duplicates":
+            return
+        if event[0] == "progress":
+            stage, done, total = event[1:]
+            if stage == "scan":
+                text = f"Поиск файлов: {done}"
+            elif stage == "partial":
+                text = f"Сравнение начала и конца файлов: {done} из {total}"
+            else:
+                text = f"Сравнение содержимого: {done} из {total}"
+            if self.duplicate_groups:
+                text += f" · групп: {self.duplicate_groups}"
+            self.search_status_label.setText(text)
+            return
+        group = event[1]
+        self.duplicate_groups += 1
+        self.duplicate_wasted += group.size * (len(group.paths) - 1)
+        header = QLabel(f"Копий: {len(group.paths)}, по {format_size(group.size)}")
+        header.setStyleSheet("font-size: 15px; color: #333; padding: 8px 0 0 4px;")
+        self.folders_layout.addWidget(header, self.duplicate_row, 0, 1, 5)
+        self.duplicate_row += 1
+        for idx, path in enumerate(group.paths):
+            subtitle = os.path.relpath(os.path.dirname(path), self.current_path)
+            fw = FileWidget(os.path.basename(path), path, False, self.file_clicked, main_window=self.main_window, scale_factor=self.main_window.scale_factor, subtitle=subtitle)
+            fw.setToolTip(path)
+            self.folders_layout.addWidget(fw, self.duplicate_row + idx // 5, idx % 5)
+        self.duplicate_row += (len(group.paths) + 4) // 5
+        self.folders_widget.adjustSize()
+
+    def on_duplicate_search_finished(self, finder):
+        if finder is not self.search_job or self.current_view != "duplicates":
+            return
+        self.search_job = None
+        if self.duplicate_groups == 0:
+            self.search_status_label.setText("Одинаковых файлов не найдено")
+        else:
+            self.search_status_label.setText(f"Групп: {self.duplicate_groups}, можно освободить {format_size(self.duplicate_wasted)}")
+
+class CustomWindow(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Window)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setMinimumSize(900, 600)
+        self.setAcceptDrops(True)
+        self.drag_pos = None
+        self.resizing = False
+        self.clipboard_path = None
+        self.clipboard_cut = False
+        self._window_drag_active = False
+        self._window_drag_pos = None
+        self._resize_direction = None
+        self._resize_start_pos = None
+        self._resize_start_geometry = None
+        self.scale_factor = 1.0  # For file icon scaling
+        self.show_hidden = False  # For showing hidden files
+        # Поиск по содержимому: файлы больше лимита пропускаются, выдача ограничена
+        self.content_search_max_size = DEFAULT_MAX_CONTENT_SIZE
+        self.content_search_max_results = 1000
+        self._query_cache = None  # (текст, Query) — запрос фильтра разбирается один раз
+        self.archive_cache = shared_archive_cache  # Оглавления zip/tar, открытых как папки
+        self.hash_cache = HashCache()  # Хэши для поиска дубликатов, переживают перезапуск
+        self.disk_usage_cache = DiskUsageCache()  # Готовые деревья анализа места: повторный вход без сканирования
+        self.disk_usage_dialog = None
+        self.view_mode = "grid"  # View mode: "grid" or "list"
+        self.preview_visible = False  # Панель предпросмотра текста/hex справа от файлов
+        self.sort_mode = "name"  # "name" or "type"
+        self.type_cache = shared_type_cache  # Типы файлов по расширению и по содержимому
+        # Shared by all tabs and panes: listings, thumbnails, watcher and the I/O pool
+        # Все кэши делят один бюджет памяти (MAINI_MEMORY_BUDGET, по умолчанию 256 МБ)
+        self.memory_budget = shared_memory_budget
+        self.listing_cache = ListingCache(budget=self.memory_budget)
+        self.thumbnail_cache = ThumbnailCache(budget=self.memory_budget, visible_dirs=self.visible_dirs)
+        self.image_frames = ImageFrameCache(budget=self.memory_budget)  # Кадры для панели предпросмотра, с соседними картинками
+        self.watcher = DirectoryWatcher(self.listing_cache, self)
+        # Локальные папки, папки внутри архивов и WebDAV (dav://host/path) за одним интерфейсом
+        self.providers = ProviderRegistry(self.listing_cache, self.archive_cache)
+        self.active_pane = None
+        self.second_pane = None
+        # Shared pool for background file operations
+        self.thread_pool = WorkerPool()
+        self.pending_tombstones = set()
+        # Фоновые задачи (сжатие и т.п.): ключ -> (текст состояния, threading.Event для отмены)
+        self.jobs = {}
+        # Прерванные копирования, которые не продолжились сами: ключ задачи -> CopyJob
+        self.interrupted_copies = {}
+        # Дочищаем tombstone'ы, оставшиеся после падения
+        self.thread_pool.start(Worker(recover_tombstones, io_class=IO_BULK))
+        # For window maximize/restore state
+        self.is_maximized = False
+        self.normal_geometry = None  # Store geometry when windowed
+        
+        self.init_ui()
+        # Копирования, прерванные падением или выключением, продолжаются с контрольной точки
+        self.resume_copy_jobs()
+        # Качество отрисовки подстраивается под измеренные кадры и задержку цикла событий
+        self.render_governor = shared_render_governor
+        self.render_governor.on_change = self.on_render_quality_changed
+        self.event_loop_probe = EventLoopProbe(self.render_governor, parent=self)
+
+    def event(self, event):
+        # Вся отрисовка окна идёт внутри UpdateRequest, поэтому его длительность — это время кадра
+        if event.type() == QEvent.Type.UpdateRequest:
+            started = time.perf_counter()
+            result = super().event(event)
+            self.render_governor.record_frame(time.perf_counter() - started)
+            return result
+        return super().event(event)
+
+    def on_render_quality_changed(self, quality):
+        # Когда качество вернулось, миниатюры, сделанные наспех, перерисовываются;
+        # при снижении видимое не трогаем — перерисовка сама стоила бы кадров
+        if quality.smooth_scaling and quality.thumbnail_scale == 1.0 and self.thumbnail_cache.drop_degraded():
+            self.update_scale()
+
+    def init_ui(self):
+        self.main_layout = QHBoxLayout(self)
+        self.main_layout.setContentsMargins(20, 20, 20, 20)
+        self.main_layout.setSpacing(0)
+
+        # Сайдбар
+        self.sidebar = QFrame()
+        self.sidebar.setFixedWidth(200)
+        self.sidebar.setStyleSheet("""
+            QFrame {
+                background: #f5f6fa;
+                border-top-left-radius: 18px;
+                border-bottom-left-radius: 18px;
+            }
+        """)
+        self.sidebar_layout = QVBoxLayout(self.sidebar)
+        self.sidebar_layout.setContentsMargins(0, 16, 0, 16)
+        self.sidebar_layout.setSpacing(0)
+        
+        # Search input in sidebar
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск файлов... (ext:log size:>100M modified:<7d)")
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                padding: 8px 12px;
+                font-size: 14px;
+                border: 1px solid #e0e4ea;
+                border-radius: 8px;
+                background: #fff;
+                color: #000;
+                margin: 0 12px 12px 12px;
+            }
+        """)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
+        self.sidebar_layout.addWidget(self.search_input)
+        # Переключатель: искать по именам в текущей папке или по содержимому файлов в глубину
+        self.content_search_btn = QPushButton("Искать в содержимом")
+        self.content_search_btn.setCheckable(True)
+        self.content_search_btn.setToolTip("Текст или /регулярное выражение/; поиск во всех вложенных папках")
+        self.content_search_btn.setStyleSheet("""
+            QPushButton {
+                padding: 6px 12px;
+                font-size: 13px;
+                border: 1px solid #e0e4ea;
+                border-radius: 8px;
+                background: #fff;
+                color: #555;
+                margin: 0 12px 12px 12px;
+            }
+            QPushButton:checked {
+                background: #e6f0ff;
+                color: #1a73e8;
+                border-color: #1a73e8;
+            }
+        """)
+        self.content_search_btn.toggled.connect(lambda _: self.on_search_text_changed(self.search_input.text()))
+        self.sidebar_layout.addWidget(self.content_search_btn)
+        # Поиск по содержимому запускается после паузы в наборе, а не на каждую букву
+        self.content_search_timer = QTimer(self)
+        self.content_search_timer.setSingleShot(True)
+        self.content_search_timer.setInterval(300)
+        self.content_search_timer.timeout.connect(self.start_content_search)
+
+        # Список пунктов и иконок
+        self.sidebar_items = [
+            ("Home", "sample.png"),
+            ("Disks", "disk.png"),
+            ("Trash", "sample.png"),
+            ("sep", None),
+            ("Documents", "sample.png"),
+            ("Music", "sample.png"),
+            ("Pictures", "sample.png"),
+            ("Videos", "sample.png"),
+            ("Downloads", "sample.png"),
+        ]
+        self.sidebar_btns = {}
+        for name, icon in self.sidebar_items:
+            if name == "sep":
+                line = QFrame()
+                line.setFrameShape(QFrame.Shape.HLine)
+                line.setStyleSheet("color: #e0e4ea; background: #e0e4ea; margin: 8px 0 8px 0; height: 1px;")
+                self.sidebar_layout.addWidget(line)
+                continue
+            btn = QPushButton(f"  {name}")
+            btn.setIcon(QIcon(icon) if icon else QIcon())
+            btn.setIconSize(QSize(22, 22))
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            btn.setStyleSheet("""
+                QPushButton {
+                    font-size: 16px;
+                    color: #444;
+                    padding: 10px 0 10px 24px;
+                    border: none;
+                    text-align: left;
+                    border-radius: 8px;
+                    background: transparent;
+                }
+                QPushButton:hover {
+                    background: #e6f0ff;
+                }
+            """)
+            btn.clicked.connect(lambda checked, n=name: self.sidebar_navigate(n))
+            btn.installEventFilter(self)
+            self.sidebar_layout.addWidget(btn)
+            self.sidebar_btns[name] = btn
+        self.sidebar_layout.addStretch()
+        self.active_sidebar = None
+
+        # Состояние фоновых задач внизу боковой панели
+        self.jobs_widget = QWidget()
+        jobs_layout = QHBoxLayout(self.jobs_widget)
+        jobs_layout.setContentsMargins(12, 8, 12, 0)
+        jobs_layout.setSpacing(6)
+        self.jobs_label = QLabel()
+        self.jobs_label.setWordWrap(True)
+        self.jobs_label.setStyleSheet("font-size: 12px; color: #666;")
+        jobs_layout.addWidget(self.jobs_label, 1)
+        self.jobs_cancel_btn = QPushButton("✕")
+        self.jobs_cancel_btn.setToolTip("Отменить фоновые задачи")
+        self.jobs_cancel_btn.setFixedSize(24, 24)
+        self.jobs_cancel_btn.setStyleSheet("QPushButton { border: none; color: #888; font-size: 14px; } QPushButton:hover { color: #d93025; }")
+        self.jobs_cancel_btn.clicked.connect(self.cancel_jobs)
+        jobs_layout.addWidget(self.jobs_cancel_btn, alignment=Qt.AlignmentFlag.AlignTop)
+        self.jobs_menu_btn = QPushButton("⋯")
+        self.jobs_menu_btn.setToolTip("Продолжить или забыть прерванное копирование")
+        self.jobs_menu_btn.setFixedSize(24, 24)
+        self.jobs_menu_btn.setStyleSheet("QPushButton { border: none; color: #888; font-size: 14px; } QPushButton:hover { color: #1a73e8; }")
+        self.jobs_menu_btn.clicked.connect(self.show_interrupted_copies_menu)
+        jobs_layout.addWidget(self.jobs_menu_btn, alignment=Qt.AlignmentFlag.AlignTop)
+        self.jobs_widget.setVisible(False)
+        self.sidebar_layout.addWidget(self.jobs_widget)
+
+        # Основная область
+        self.content = QFrame()
+        self.content.setStyleSheet("background: #fff; border-radius: 16px;")
+        self.content_layout = QVBoxLayout(self.content)
+        self.content_layout.setContentsMargins(0, 0, 0, 0)
+        self.content_layout.setSpacing(0)
+
+        # Верхняя панель
+        self.topbar_frame = QFrame()
+        self.topbar_frame.setStyleSheet("""
+            QFrame {
+                background: #f8fafc;
+                border-top-left-radius: 16px;
+                border-top-right-radius: 16px;
+                border-bottom: 1px solid #e0e4ea;
+            }
+        """)
+        self.topbar_frame.setFixedHeight(60)
+        self.topbar_layout = QHBoxLayout(self.topbar_frame)
+        self.topbar_layout.setContentsMargins(24, 10, 24, 10)
+        self.topbar_layout.setSpacing(10)
+        self.back_btn = QPushButton("←")
+        self.back_btn.setFixedSize(32, 32)
+        self.back_btn.setStyleSheet("""
+            QPushButton {
+                font-size: 18px; border: none; background: transparent; color: #7a8ca3;
+            }
+            QPushButton:hover {
+                background: #e6f0ff; color: #1a73e8;
+            }
+        """)
+        self.back_btn.clicked.connect(self.go_back)
+        self.topbar_layout.addWidget(self.back_btn)
+
+        # Breadcrumb + edit
+        self.breadcrumb_widget = QWidget()
+        self.breadcrumb_layout = QHBoxLayout(self.breadcrumb_widget)
+        self.breadcrumb_layout.setContentsMargins(0, 0, 0, 0)
+        self.breadcrumb_layout.setSpacing(0)
+        self.topbar_layout.addWidget(self.breadcrumb_widget, 1)
+        self.breadcrumb_edit = QLineEdit()
+        self.breadcrumb_edit.setVisible(False)
+        self.breadcrumb_edit.setStyleSheet("font-size: 18px; border: 1px solid #e0e4ea; border-radius: 8px; padding: 4px 10px; background: #fff; color: #000;")
+        self.breadcrumb_edit.returnPressed.connect(self.breadcrumb_edit_apply)
+        self.topbar_layout.addWidget(self.breadcrumb_edit, 1)
+        # Дополнение пути при наборе: родительская папка читается в фоне, набор не ждёт диска или сети
+        self.path_completion_model = QStringListModel(self)
+        self.path_completer = QCompleter(self.path_completion_model, self)
+        self.path_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.path_completer.setMaxVisibleItems(12)
+        self.path_completer.activated.connect(self.on_path_completion_chosen)
+        self.breadcrumb_edit.setCompleter(self.path_completer)
+        self.path_completion_listing = None  # (родительская папка, листинг) для ранжирования при наборе
+        self.path_completion_loading = None  # папка, которая сейчас читается в фоне
+        self.path_completion_timer = QTimer(self)
+        self.path_completion_timer.setSingleShot(True)
+        self.path_completion_timer.setInterval(80)
+        self.path_completion_timer.timeout.connect(self.update_path_completions)
+        self.breadcrumb_edit.textEdited.connect(lambda _: self.path_completion_timer.start())
+        self.edit_path_btn = QPushButton("✎")
+        self.edit_path_btn.setFixedSize(28, 28)
+        self.edit_path_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+        self.edit_path_btn.clicked.connect(self.breadcrumb_edit_mode)
+        self.topbar_layout.addWidget(self.edit_path_btn)
+        
+        # Add button for toggling hidden files
+        self.toggle_hidden_btn = QPushButton("👁")
+        self.toggle_hidden_btn.setFixedSize(28, 28)
+        self.toggle_hidden_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+        self.toggle_hidden_btn.clicked.connect(self.toggle_hidden_files)
+        self.topbar_layout.addWidget(self.toggle_hidden_btn)
+
+        # Add button for toggling view mode (grid/list)
+        self.toggle_view_btn = QPushButton("☰")
+        self.toggle_view_btn.setFixedSize(28, 28)
+        self.toggle_view_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+        self.toggle_view_btn.clicked.connect(self.toggle_view_mode)
+        self.topbar_layout.addWidget(self.toggle_view_btn)
+
+        # Add button for toggling dual-pane mode
+        self.toggle_dual_btn = QPushButton("◫")
+        self.toggle_dual_btn.setFixedSize(28, 28)
+        self.toggle_dual_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+        self.toggle_dual_btn.clicked.connect(self.toggle_dual_pane)
+        self.topbar_layout.addWidget(self.toggle_dual_btn)
+
+        # Кнопка панели предпросмотра
+        self.toggle_preview_btn = QPushButton("▤")
+        self.toggle_preview_btn.setFixedSize(28, 28)
+        self.toggle_preview_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+        self.toggle_preview_btn.clicked.connect(self.toggle_preview)
+        self.topbar_layout.addWidget(self.toggle_preview_btn)
+
+        # Кнопки управления окном
+        self.min_btn = QPushButton("–")
+        self.min_btn.setFixedSize(32, 32)
+        self.min_btn.setStyleSheet("""
+            QPushButton {
+                font-size: 18px; border: none; background: transparent; color: #7a8ca3;
+            }
+            QPushButton:hover {
+                background: #e6f0ff; color: #1a73e8;
+            }
+        """)
+        self.min_btn.clicked.connect(self.showMinimized)
+        
+        # Maximize/Restore button
+        self.max_btn = QPushButton("□")
+        self.max_btn.setFixedSize(32, 32)
+        self.max_btn.setStyleSheet("""
+            QPushButton {
+                font-size: 16px; border: none; background: transparent; color: #7a8ca3;
+            }
+            QPushButton:hover {
+                background: #e6f0ff; color: #1a73e8;
+            }
+        """)
+        self.max_btn.clicked.connect(self.toggle_maximize)
+        
+        self.close_btn = QPushButton("×")
+        self.close_btn.setFixedSize(32, 32)
+        self.close_btn.setStyleSheet("""
+            QPushButton {
+                font-size: 18px; border: none; background: transparent; color: #e57373;
+            }
+            QPushButton:hover {
+                background: #ffeaea; color: #d32f2f;
+            }
+        """)
+        self.close_btn.clicked.connect(self.close)
+        self.topbar_layout.addWidget(self.min_btn)
+        self.topbar_layout.addWidget(self.max_btn)
+        self.topbar_layout.addWidget(self.close_btn)
+        self.content_layout.addWidget(self.topbar_frame)
+        self.content_layout.setSpacing(0)
+        self.content_layout.setContentsMargins(0, 0, 0, 0)
+
+        # Вкладки: каждая вкладка — своя FilePane; вторая панель включается кнопкой ◫
+        self.tabs_row = QWidget()
+        tabs_layout = QHBoxLayout(self.tabs_row)
+        tabs_layout.setContentsMargins(16, 6, 16, 0)
+        tabs_layout.setSpacing(6)
+        self.tabbar = QTabBar()
+        self.tabbar.setExpanding(False)
+        self.tabbar.setDrawBase(False)
+        self.tabbar.setTabsClosable(True)
+        self.tabbar.setMovable(True)
+        self.tabbar.setStyleSheet("""
+            QTabBar::tab {
+                background: #f5f6fa;
+                border: 1px solid #e0e4ea;
+                border-radius: 8px;
+                min-width: 80px;
+                min-height: 24px;
+                margin-right: 6px;
+                font-size: 14px;
+                color: #444;
+                padding: 2px 10px;
+            }
+            QTabBar::tab:selected {
+                background: #e6f0ff;
+                color: #1a73e8;
+            }
+        """)
+        self.tabbar.currentChanged.connect(self.on_tab_changed)
+        self.tabbar.tabCloseRequested.connect(self.close_tab)
+        tabs_layout.addWidget(self.tabbar)
+        self.new_tab_btn = QPushButton("+")
+        self.new_tab_btn.setFixedSize(28, 28)
+        self.new_tab_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; font-size: 18px; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+        self.new_tab_btn.clicked.connect(lambda: self.new_tab(self.current_path))
+        tabs_layout.addWidget(self.new_tab_btn)
+        tabs_layout.addStretch()
+        self.content_layout.addWidget(self.tabs_row)
+
+        self.tab_stack = QStackedWidget()
+        self.pane_splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.pane_splitter.setChildrenCollapsible(False)
+        self.pane_splitter.addWidget(self.tab_stack)
+        self.content_layout.addWidget(self.pane_splitter)
+        self.new_tab()
+
+        # Вкладки дисков
+        self.disk_tabbar = QTabBar()
+        self.disk_tabbar.setExpanding(False)
+        self.disk_tabbar.setDrawBase(False)
+        self.disk_tabbar.setStyleSheet("""
+            QTabBar::tab {
+                background: #f5f6fa;
+                border: 1px solid #e0e4ea;
+                border-radius: 8px;
+                min-width: 60px;
+                min-height: 28px;
+                margin-right: 8px;
+                font-size: 15px;
+                color: #444;
+                padding: 4px 16px;
+            }
+            QTabBar::tab:selected {
+                background: #e6f0ff;
+                color: #1a73e8;
+            }
+        """)
+        self.disk_tabbar.setMovable(False)
+        self.disk_tabbar.tabBarClicked.connect(self.on_disk_tab_clicked)
+        self.content_layout.addWidget(self.disk_tabbar)
+        # Список дисков кэшируется и обновляется только при изменении таблицы монтирования
+        self.mount_monitor = MountMonitor(self)
+        self.mount_monitor.changed.connect(self.on_mounts_changed)
+        self.update_disk_tabs()
+
+        self.main_layout.addWidget(self.sidebar)
+        self.main_layout.addSpacing(20)
+        self.main_layout.addWidget(self.content)
+
+        # Вызов навигации по сайдбару только после создания всех элементов верхней панели.
+        # Если есть снимок прошлой сессии, первый экран рисуется из него без чтения диска
+        if not self.restore_session():
+            self.sidebar_navigate("Home")
+
+    # Вкладки и панели. Свойства ниже отдают состояние активной панели,
+    # поэтому файловые операции окна работают с той панелью, где был клик.
+    @property
+    def current_path(self):
+        return self.active_pane.current_path
+
+    @property
+    def history(self):
+        return self.active_pane.history
+
+    @property
+    def current_view(self):
+        return self.active_pane.current_view
+
+    def all_panes(self):
+        panes = [self.tabbar.tabData(i) for i in range(self.tabbar.count())]
+        if self.second_pane is not None and self.second_pane.isVisible():
+            panes.append(self.second_pane)
+        return [p for p in panes if p is not None]
+
+    def visible_dirs(self):
+        """Folders shown right now: the current tab and, in dual mode, the second pane"""
+        panes = [self.tab_stack.currentWidget(), self.second_pane]
+        return {pane.current_path for pane in panes if pane is not None and pane.isVisible() and pane.current_view == "dir"}
+
+    def memory_usage_text(self):
+        budget = self.memory_budget
+        text = f"Кэши в памяти: {format_size(budget.used)} из {format_size(budget.limit)}"
+        if self.render_governor.degraded:
+            text += " · упрощённая отрисовка"
+        return text
+
+    def open_dir(self, path, add_history=True):
+        self.active_pane.open_dir(path, add_history=add_history)
+
+    def open_recycle_bin_dir(self):
+        self.active_pane.open_recycle_bin_dir()
+
+    def open_disks_dir(self):
+        self.active_pane.open_disks_dir()
+
+    def update_scale(self):
+        for pane in self.all_panes():
+            pane.update_scale()
+
+    def refresh_all_panes(self):
+        for pane in self.all_panes():
+            if pane.current_view == "dir":
+                pane.open_dir(pane.current_path, add_history=False)
+
+    def new_tab(self, path=None):
+        pane = FilePane(self)
+        self.tab_stack.addWidget(pane)
+        index = self.tabbar.addTab("")
+        self.tabbar.setTabData(index, pane)
+        self.tabbar.setCurrentIndex(index)
+        self.on_tab_changed(index)
+        if path:
+            pane.open_dir(path, add_history=False)
+        return pane
+
+    def close_tab(self, index):
+        if self.tabbar.count() <= 1:
+            return
+        pane = self.tabbar.tabData(index)
+        self.tabbar.removeTab(index)
+        self.watcher.watch(pane, None)
+        self.tab_stack.removeWidget(pane)
+        pane.shutdown()
+        pane.deleteLater()
+
+    def on_tab_changed(self, index):
+        pane = self.tabbar.tabData(index)
+        if pane is None:
+            return
+        self.tab_stack.setCurrentWidget(pane)
+        self.set_active_pane(pane)
+
+    def toggle_dual_pane(self):
+        """Show or hide the second pane next to the tabs"""
+        if self.second_pane is None:
+            self.second_pane = FilePane(self)
+            self.pane_splitter.addWidget(self.second_pane)
+            self.second_pane.open_dir(self.current_path, add_history=False)
+            self.set_active_pane(self.second_pane)
+        elif self.second_pane.isVisible():
+            self.second_pane.setVisible(False)
+            self.watcher.watch(self.second_pane, None)
+            self.set_active_pane(self.tab_stack.currentWidget())
+        else:
+            self.second_pane.setVisible(True)
+            self.second_pane.open_dir(self.second_pane.current_path, add_history=False)
+            self.set_active_pane(self.second_pane)
+        dual = self.second_pane.isVisible()
+        for pane in (self.tab_stack.currentWidget(), self.second_pane):
+            pane.set_active(dual and pane is self.active_pane)
+        if dual:
+            self.toggle_dual_btn.setStyleSheet("QPushButton { border: none; background: #e6f0ff; color: #1a73e8; } QPushButton:hover { background: #d9e6ff; }")
+        else:
+            self.toggle_dual_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+
+    def toggle_preview(self):
+        """Show or hide the preview pane in every pane; hiding releases the previewed file"""
+        self.preview_visible = not self.preview_visible
+        panes = [self.tabbar.tabData(i) for i in range(self.tabbar.count())] + [self.second_pane]
+        for pane in filter(None, panes):
+            pane.preview.setVisible(self.preview_visible)
+            if not self.preview_visible:
+                pane.preview.clear()
+        if self.preview_visible:
+            self.toggle_preview_btn.setStyleSheet("QPushButton { border: none; background: #e6f0ff; color: #1a73e8; } QPushButton:hover { background: #d9e6ff; }")
+        else:
+            self.toggle_preview_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+
+    def set_active_pane(self, pane):
+        if pane is None or pane is self.active_pane:
+            return
+        previous = self.active_pane
+        self.active_pane = pane
+        dual = self.second_pane is not None and self.second_pane.isVisible()
+        if previous is not None:
+            previous.set_active(False)
+        pane.set_active(dual)
+        if hasattr(self, "disk_tabbar"):
+            self.on_pane_navigated(pane)
+
+    def on_pane_navigated(self, pane):
+        """Update tab title and, for the active pane, breadcrumb, back button and disk tab"""
+        # Пользователь ходит по папкам: фоновые копирования на время уступают диск
+        shared_io_scheduler.note_interactive()
+        for i in range(self.tabbar.count()):
+            if self.tabbar.tabData(i) is pane:
+                self.tabbar.setTabText(i, pane.title())
+                self.tabbar.setTabToolTip(i, pane.current_path)
+        if pane is not self.active_pane:
+            return
+        self.update_breadcrumb(pane.current_path if pane.current_view == "dir" else pane.title())
+        self.back_btn.setEnabled(len(pane.history) > 0)
+        self.sync_disk_tab_selection()
+
+    def update_breadcrumb(self, path):
+        # Очищаем старые элементы
+        while self.breadcrumb_layout.count():
+            w = self.breadcrumb_layout.takeAt(0).widget()
+            if w:
+                w.setParent(None)
+                w.deleteLater()
+        provider = self.providers.for_path(path)
+        parts = provider.breadcrumbs(path)
+        for i, (part, acc) in enumerate(parts):
+            btn = QPushButton(part)
+            btn.setStyleSheet("QPushButton { background: transparent; border: none; color: #222; font-size: 18px; padding: 2px 8px; border-radius: 6px; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }")
+            btn.clicked.connect(lambda checked, p=acc: self.open_dir(p, add_history=True))
+            self.breadcrumb_layout.addWidget(btn)
+            if i < len(parts) - 1:
+                sep = QLabel("/")
+                sep.setStyleSheet("color: #b0b8c9; font-size: 18px; padding: 0 2px;")
+                self.breadcrumb_layout.addWidget(sep)
+
+    def breadcrumb_edit_mode(self):
+        self.breadcrumb_widget.setVisible(False)
+        self.breadcrumb_edit.setText(self.current_path)
+        self.path_completion_listing = None
+        self.breadcrumb_edit.setVisible(True)
+        self.breadcrumb_edit.setFocus()
+        self.breadcrumb_edit.selectAll()
+    
+    def toggle_hidden_files(self):
+        """Toggle visibility of hidden files"""
+        self.show_hidden = not self.show_hidden
+        self.update_toggle_buttons()
+        # Re-open current directories to apply changes
+        self.refresh_all_panes()
+
+    def set_sort_mode(self, mode):
+        if mode != self.sort_mode:
+            self.sort_mode = mode
+            self.refresh_all_panes()
+
+    def toggle_view_mode(self):
+        """Toggle between grid and list view modes"""
+        self.view_mode = "list" if self.view_mode == "grid" else "grid"
+        self.update_toggle_buttons()
+        # Re-open current directories to apply changes
+        self.refresh_all_panes()
+
+    def update_toggle_buttons(self):
+        """Highlight the hidden-files and list-view buttons when they are on"""
+        on = "QPushButton { border: none; background: #e6f0ff; color: #1a73e8; } QPushButton:hover { background: #d9e6ff; }"
+        off = "QPushButton { border: none; background: transparent; color: #7a8ca3; } QPushButton:hover { background: #e6f0ff; color: #1a73e8; }"
+        self.toggle_hidden_btn.setStyleSheet(on if self.show_hidden else off)
+        self.toggle_view_btn.setStyleSheet(on if self.view_mode == "list" else off)
+
+    def breadcrumb_edit_apply(self):
+        path = self.breadcrumb_edit.text().strip()
+        self.path_completion_timer.stop()
+        self.path_completer.popup().hide()
+        if self.providers.for_path(path) is not None:
+            self.open_dir(path, add_history=True)
+        self.breadcrumb_edit.setVisible(False)
+        self.breadcrumb_widget.setVisible(True)
+
+    def update_path_completions(self):
+        """Rank the parent folder of the typed path; list it in the background if it is not in memory"""
+        parent, fragment = split_for_completion(self.breadcrumb_edit.text())
+        if parent is None:
+            self.show_path_completions([])
+            return
+        listing = None
+        if self.path_completion_listing is not None and self.path_completion_listing[0] == parent:
+            listing = self.path_completion_listing[1]
+        else:
+            # Уже прочитанная папка показывается сразу, а в фоне перечитывается
+            listing = self.providers.cached_listing(parent)
+            if self.path_completion_loading != parent:
+                self.path_completion_loading = parent
+                worker = Worker(list_for_completion, parent, self.providers, io_class=IO_INTERACTIVE)
+                worker.signals.finished.connect(lambda result, p=parent: self.on_path_completion_listing(p, result))
+                worker.signals.error.connect(lambda _, p=parent: self.on_path_completion_listing(p, None))
+                self.thread_pool.start(worker)
+        if listing is not None:
+            self.show_path_completions(complete_from_listing(listing, parent, fragment, self.show_hidden))
+
+    def on_path_completion_listing(self, parent, listing):
+        if self.path_completion_loading == parent:
+            self.path_completion_loading = None
+        if listing is None:
+            return
+        self.path_completion_listing = (parent, listing)
+        # Пока папка читалась, пользователь мог набрать ещё — ранжируем по текущему тексту
+        if self.breadcrumb_edit.isVisible() and split_for_completion(self.breadcrumb_edit.text())[0] == parent:
+            self.update_path_completions()
+
+    def show_path_completions(self, completions):
+        self.path_completion_model.setStringList(completions)
+        if completions and self.breadcrumb_edit.hasFocus():
+            self.path_completer.complete()
+        else:
+            self.path_completer.popup().hide()
+
+    def on_path_completion_chosen(self, path):
+        # Выбрана папка — дописываем разделитель и сразу предлагаем её содержимое
+        self.breadcrumb_edit.setText(path.rstrip("/\\") + ("/" if "://" in path else os.sep))
+        self.update_path_completions()
 
     def eventFilter(self, obj, event):
         # Handle sidebar button animations
@@ -901,31 +2591,39 @@ class CustomWindow(QWidget):
                 self.animate_button_press(obj, True)
             elif event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
                 self.animate_button_press(obj, False)
-        # Handle paint event for folders_widget drag-over indication
-        elif hasattr(self, 'folders_widget') and obj is self.folders_widget and event.type() == QEvent.Type.Paint:
-            if getattr(self.folders_widget, '_drag_over', False):
-                painter = QPainter(self.folders_widget)
-                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-                rect = self.folders_widget.rect()
-                painter.setBrush(QColor(230, 240, 255, 120))
-                painter.setPen(Qt.PenStyle.NoPen)
-                painter.drawRoundedRect(rect, 24, 24)
         return super().eventFilter(obj, event)
 
-    def file_clicked(self, path, is_dir):
-        if is_dir:
-            self.open_dir(path, add_history=True)
-        else:
+    def name_filter_text(self):
+        """Search box text used as a name filter; empty while searching contents"""
+        return "" if self.content_search_btn.isChecked() else self.search_input.text()
+
+    def compiled_query(self):
+        """Search box text compiled into a Query, once per text; None if it does not parse"""
+        text = self.name_filter_text()
+        if self._query_cache is None or self._query_cache[0] != text:
             try:
-                os.startfile(path)
-            except Exception as e:
-                dialog = WarningDialog("Ошибка", f"Не удалось открыть файл:\n{path}\n\nОшибка: {str(e)}", self)
-                dialog.exec()
+                query = compile_query(text)
+                self.search_input.setToolTip("")
+            except QueryError as e:
+                # Недописанный запрос фильтрует как обычный текст, а ошибка видна в подсказке
+                query = None
+                self.search_input.setToolTip(str(e))
+            self._query_cache = (text, query)
+        return self._query_cache[1]
 
     def on_search_text_changed(self, text):
+        if self.content_search_btn.isChecked() and text.strip():
+            self.content_search_timer.start()
+            return
+        self.content_search_timer.stop()
         # Re-open current directory with filtered entries
         self.open_dir(self.current_path, add_history=False)
 
+    def start_content_search(self):
+        query = self.search_input.text().strip()
+        if query and self.content_search_btn.isChecked():
+            self.active_pane.start_content_search(query)
+
     def go_back(self):
         if self.history:
             prev = self.history.pop()
@@ -937,15 +2635,7 @@ class CustomWindow(QWidget):
             event.acceptProposedAction()
 
     def dropEvent(self, event: QDropEvent):
-        for url in event.mimeData().urls():
-            src = url.toLocalFile()
-            if os.path.exists(src):
-                dst = os.path.join(self.current_path, os.path.basename(src))
-                if os.path.isdir(src):
-                    shutil.copytree(src, dst, dirs_exist_ok=True)
-                else:
-                    shutil.copy2(src, dst)
-        self.open_dir(self.current_path, add_history=False)
+        self.transfer([url_to_path(url) for url in event.mimeData().urls()], self.current_path)
         event.acceptProposedAction()
 
     # Кастомный resize и перемещение окна
@@ -1010,8 +2700,16 @@ class CustomWindow(QWidget):
             super().wheelEvent(event)
     
     def keyPressEvent(self, event):
-        """Handle Ctrl++ and Ctrl+- for zooming"""
+        """Handle Ctrl++ and Ctrl+- for zooming, Ctrl+T / Ctrl+W for tabs"""
         if event.modifiers() == Qt.KeyboardModifier.ControlModifier:
+            if event.key() == Qt.Key.Key_T:
+                self.new_tab(self.current_path)
+                event.accept()
+                return
+            elif event.key() == Qt.Key.Key_W:
+                self.close_tab(self.tabbar.currentIndex())
+                event.accept()
+                return
             if event.key() == Qt.Key.Key_Plus or event.key() == Qt.Key.Key_Equal:
                 # Zoom in (Ctrl++)
                 self.scale_factor = min(self.scale_factor * 1.1, 3.0)
@@ -1142,43 +2840,6 @@ class CustomWindow(QWidget):
                 
         self.setGeometry(new_geo)
 
-    # Drag and drop for folders area
-
-    def folders_drag_enter_event(self, event):
-        if event.mimeData().hasUrls():
-            event.acceptProposedAction()
-            self.folders_widget._drag_over = True
-            self.folders_widget.update()
-
-    def folders_drag_leave_event(self, event):
-        self.folders_widget._drag_over = False
-        self.folders_widget.update()
-
-    def folders_drop_event(self, event):
-        for url in event.mimeData().urls():
-            src = url.toLocalFile()
-            if os.path.exists(src):
-                dst = os.path.join(self.current_path, os.path.basename(src))
-                # Пропускать, если src и dst — один и тот же файл
-                try:
-                    if os.path.abspath(src) == os.path.abspath(dst):
-                        continue
-                    if os.path.isdir(src):
-                        shutil.copytree(src, dst, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(src, dst)
-                except shutil.SameFileError:
-                    continue
-        self.open_dir(self.current_path, add_history=False)
-        self.folders_widget._drag_over = False
-        self.folders_widget.update()
-        event.acceptProposedAction()
-
-
-    def showEvent(self, event):
-        super().showEvent(event)
-        self.folders_widget.installEventFilter(self)
-
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -1198,22 +2859,136 @@ class CustomWindow(QWidget):
     def paste_to(self, dst_dir):
         if not self.clipboard_path:
             return
-        name = os.path.basename(self.clipboard_path)
-        dst = os.path.join(dst_dir, name)
-        if os.path.isdir(self.clipboard_path):
-            if self.clipboard_cut:
-                shutil.move(self.clipboard_path, dst)
-            else:
-                shutil.copytree(self.clipboard_path, dst, dirs_exist_ok=True)
-        else:
-            if self.clipboard_cut:
-                shutil.move(self.clipboard_path, dst)
-            else:
-                shutil.copy2(self.clipboard_path, dst)
+        self.transfer([self.clipboard_path], dst_dir, move=self.clipboard_cut)
         if self.clipboard_cut:
             self.clipboard_path = None
             self.clipboard_cut = False
-        self.open_dir(self.current_path, add_history=False)
+
+    def transfer(self, sources, dst_dir, move=False):
+        """Copy or move sources into dst_dir through the location providers.
+
+        Local folders and archives are handled right away; anything touching a remote
+        location runs as a background job so the window never waits on the network.
+        """
+        sources = [src for src in sources if self.providers.for_path(src) is not None]
+        dst_provider = self.providers.for_path(dst_dir)
+        if not sources or dst_provider is None:
+            return
+        if not move and dst_provider.local and all(self.providers.for_path(src).local for src in sources):
+            # Локальное копирование идёт в фоне с журналом, чтобы большое копирование пережило перезапуск
+            self.start_copy_job(CopyJob(sources, dst_dir))
+            return
+        if not dst_provider.remote and not any(self.providers.for_path(src).remote for src in sources):
+            try:
+                for src in sources:
+                    self.providers.transfer(src, dst_dir, move)
+            except Exception as e:
+                WarningDialog("Ошибка", str(e), self).exec()
+            self.refresh_all_panes()
+            return
+        key = ("transfer", dst_dir, time.monotonic())
+        self.start_job(key, f"{'Перемещение' if move else 'Копирование'} в {os.path.basename(dst_dir) or dst_dir}...")
+        worker = Worker(self.run_transfer, sources, dst_dir, move, io_class=IO_BULK)
+        worker.signals.finished.connect(lambda _: (self.finish_job(key), self.refresh_all_panes()))
+        worker.signals.error.connect(lambda msg: (self.finish_job(key), self.refresh_all_panes(), WarningDialog("Ошибка", msg, self).exec()))
+        self.thread_pool.start(worker)
+
+    def run_transfer(self, sources, dst_dir, move):
+        return [self.providers.transfer(src, dst_dir, move) for src in sources]
+
+    def start_copy_job(self, job, resumed=False):
+        key = ("copy", job.journal_path)
+        name = os.path.basename(job.dst_dir) or job.dst_dir
+        verb = "Продолжение копирования" if resumed else "Копирование"
+        cancel_event = threading.Event()
+        self.start_job(key, f"{verb} в {name}...", cancel_event)
+        worker = Worker(self.run_copy_job, job, cancel_event, with_progress=True, io_class=IO_BULK)
+        worker.signals.progress.connect(
+            lambda progress: self.set_job_status(key, f"{verb} в {name}: {progress[0] * 100 // progress[1] if progress[1] else 100}%"
+                                                      f" · {format_size(progress[0])} из {format_size(progress[1])}"))
+        worker.signals.finished.connect(lambda result: self.on_copy_job_finished(key, job, result))
+        worker.signals.error.connect(lambda message: self.on_copy_job_error(key, job, message))
+        self.thread_pool.start(worker)
+
+    def run_copy_job(self, job, cancel_event, progress_callback=None):
+        last_report = 0.0
+
+        def report(done, total):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= 0.2 or done == total:
+                last_report = now
+                progress_callback((done, total))
+
+        return job.run(cancel_event, report)
+
+    def on_copy_job_finished(self, key, job, result):
+        self.finish_job(key)
+        if result is None:
+            # Отменено пользователем: недокопированные части и журнал больше не нужны
+            self.thread_pool.start(Worker(job.discard, io_class=IO_BULK))
+        self.refresh_all_panes()
+
+    def on_copy_job_error(self, key, job, message):
+        self.finish_job(key)
+        self.refresh_all_panes()
+        # Журнал остаётся: после ошибки (например, выдернули диск) копирование продолжится при следующем запуске
+        if os.path.exists(job.journal_path):
+            self.add_interrupted_copy(job)
+            if job.should_auto_resume():
+                message = f"Копирование прервано и продолжится при следующем запуске:\n{message}"
+            else:
+                message = f"Копирование прервано, и ошибка повторяется, поэтому само оно больше не продолжится:\n{message}"
+        WarningDialog("Ошибка", message, self).exec()
+
+    def resume_copy_jobs(self):
+        for job in CopyJob.pending():
+            # Задание, которое падает раз за разом, ждёт решения в списке задач, а не запускается снова
+            if not job.should_auto_resume() or not job.ready():
+                self.add_interrupted_copy(job)
+            # claim() блокирует журнал сразу: второй экземпляр программы это задание уже не возьмёт
+            elif job.claim():
+                self.start_copy_job(job, resumed=True)
+
+    def add_interrupted_copy(self, job):
+        """List a stopped copy in the jobs area, where it can be resumed or forgotten"""
+        key = ("copy", job.journal_path)
+        name = os.path.basename(job.dst_dir) or job.dst_dir
+        if job.errors:
+            reason = job.errors[-1]
+        elif not job.ready():
+            reason = "источник или папка назначения недоступны"
+        else:
+            reason = "слишком много неудачных попыток"
+        self.interrupted_copies[key] = job
+        self.start_job(key, f"Копирование в {name} прервано: {reason}")
+
+    def show_interrupted_copies_menu(self):
+        menu = QMenu(self)
+        for key, job in self.interrupted_copies.items():
+            name = os.path.basename(job.dst_dir) or job.dst_dir
+            menu.addAction(f"Продолжить копирование в {name}", lambda key=key: self.retry_copy_job(key))
+            menu.addAction(f"Забыть копирование в {name}", lambda key=key: self.forget_copy_job(key))
+        menu.exec(QCursor.pos())
+
+    def retry_copy_job(self, key):
+        job = self.interrupted_copies.pop(key, None)
+        if job is None:
+            return
+        self.finish_job(key)
+        if job.ready() and job.claim():
+            self.start_copy_job(job, resumed=True)
+            return
+        self.add_interrupted_copy(job)
+        WarningDialog("Ошибка", "Источник или папка назначения недоступны, либо копирование уже идёт в другом окне", self).exec()
+
+    def forget_copy_job(self, key):
+        """Drop the journal and the unfinished parts of a stopped copy; finished files stay"""
+        job = self.interrupted_copies.pop(key, None)
+        if job is None:
+            return
+        self.finish_job(key)
+        self.thread_pool.start(Worker(job.discard, io_class=IO_BULK))
 
     def rename_item(self, path):
         name, ok = QInputDialog.getText(self, "Переименовать", "Новое имя:", text=os.path.basename(path))
@@ -1223,64 +2998,134 @@ class CustomWindow(QWidget):
             self.open_dir(self.current_path, add_history=False)
 
     def delete_item(self, path):
-        dialog = QuestionDialog("Удалить", f"Удалить '{os.path.basename(path)}'?", self)
+        dialog = QuestionDialog("Удалить", f"Переместить '{os.path.basename(path)}' в корзину?", self)
         dialog.exec()
         # Check if the dialog was accepted (user clicked "Yes")
         if hasattr(dialog, 'result') and dialog.result:
             try:
-                if os.path.isdir(path):
-                    shutil.rmtree(path)
+                if winshell is not None and sys.platform.startswith("win"):
+                    winshell.delete_file(path, allow_undo=True, no_confirm=True, silent=True)
                 else:
-                    os.remove(path)
+                    move_to_trash(path)
                 self.open_dir(self.current_path, add_history=False)
             except Exception as e:
                 dialog = WarningDialog("Ошибка", str(e), self)
                 dialog.exec()
 
-    def show_properties(self, path):
-        info = os.stat(path)
-        size = info.st_size
-        mtime = info.st_mtime
-        is_dir = os.path.isdir(path)
-        msg = f"Путь: {path}\nТип: {'Папка' if is_dir else 'Файл'}\nРазмер: {size} байт\nИзменён: {mtime}"
-        dialog = InformationDialog("Свойства", msg, self)
+    def delete_item_permanently(self, path):
+        dialog = QuestionDialog("Удалить", f"Удалить '{os.path.basename(path)}' без возможности восстановления?", self)
         dialog.exec()
+        if hasattr(dialog, 'result') and dialog.result:
+            try:
+                tombstone = make_tombstone(path)
+            except Exception as e:
+                dialog = WarningDialog("Ошибка", str(e), self)
+                dialog.exec()
+                return
+            # Элемент уже исчез из вида, удаление дерева идёт в фоне
+            self.open_dir(self.current_path, add_history=False)
+            self.remove_tombstone_in_background(tombstone)
 
-    def contextMenuEvent(self, event):
-        # Контекстное меню для пустой области (например, вставить)
-        menu = QMenu(self)
-        menu.setStyleSheet("""
-            QMenu {
-                background: #fff;
-                border: 1px solid #d0d0d0;
-                border-radius: 10px;
-                padding: 6px;
-                color: #222;
-                font-size: 15px;
-            }
-            QMenu::item {
-                padding: 8px 24px 8px 24px;
-                border-radius: 6px;
-            }
-            QMenu::item:selected {
-                background: #e6f0ff;
-                color: #1a73e8;
-            }
-            QMenu::separator {
-                height: 1px;
-                background: #e0e0e0;
-                margin: 4px 0 4px 0;
-            }
-        """)
-        create_menu = QMenu("Создать", self)
-        create_menu.setStyleSheet(menu.styleSheet())
-        folder_icon = QIcon("folder.png") if os.path.exists("folder.png") else QIcon()
-        file_icon = QIcon("unknow.png") if os.path.exists("unknow.png") else QIcon()
-        create_menu.addAction(folder_icon, "Папка", self.create_folder_dialog)
-        create_menu.addAction(file_icon, "Текстовой файл", self.create_file_dialog)
-        menu.addMenu(create_menu)
-        menu.addAction("Вставить", lambda: self.paste_to(self.current_path))
-        menu.exec(event.globalPos())
+    def remove_tombstone_in_background(self, tombstone):
+        if tombstone in self.pending_tombstones:
+            return
+        self.pending_tombstones.add(tombstone)
+        worker = Worker(remove_tombstone, tombstone, io_class=IO_BULK)
+        worker.signals.finished.connect(self.pending_tombstones.discard)
+        # Неудалённый остаток остаётся в pending_tombstones, чтобы обновление папки не повторяло
+        # попытку и диалог; запись журнала сохраняется до следующего запуска
+        worker.signals.error.connect(lambda msg: WarningDialog("Удалено не всё", msg, self).exec())
+        self.thread_pool.start(worker)
+
+    def start_job(self, key, text, cancel_event=None):
+        self.jobs[key] = (text, cancel_event)
+        self.update_jobs_label()
+
+    def set_job_status(self, key, text):
+        if key in self.jobs:
+            self.jobs[key] = (text, self.jobs[key][1])
+            self.update_jobs_label()
+
+    def finish_job(self, key):
+        self.jobs.pop(key, None)
+        self.update_jobs_label()
+
+    def cancel_jobs(self):
+        for text, cancel_event in self.jobs.values():
+            if cancel_event is not None:
+                cancel_event.set()
+
+    def update_jobs_label(self):
+        self.jobs_label.setText("\n".join(text for text, _ in self.jobs.values()))
+        self.jobs_cancel_btn.setVisible(any(event is not None for _, event in self.jobs.values()))
+        self.jobs_menu_btn.setVisible(bool(self.interrupted_copies))
+        self.jobs_widget.setVisible(bool(self.jobs))
+
+    def compress_in_background(self, path, fmt):
+        dst = default_archive_path([path], fmt)
+        name = os.path.basename(dst)
+        cancel_event = threading.Event()
+        self.start_job(dst, f"Сжатие {name}...", cancel_event)
+        worker = Worker(self.run_compress, [path], dst, fmt, cancel_event, with_progress=True, io_class=IO_BULK)
+        worker.signals.progress.connect(lambda progress: self.on_compress_progress(dst, name, progress))
+        worker.signals.finished.connect(lambda result: (self.finish_job(dst), self.refresh_all_panes()))
+        worker.signals.error.connect(lambda msg: (self.finish_job(dst), WarningDialog("Ошибка", f"Не удалось создать архив:\n{msg}", self).exec()))
+        self.thread_pool.start(worker)
+
+    def run_compress(self, paths, dst, fmt, cancel_event, progress_callback=None):
+        return compress_paths(paths, dst, fmt, progress_callback=lambda done, total, speed: progress_callback((done, total, speed)),
+                              cancel_event=cancel_event)
+
+    def on_compress_progress(self, dst, name, progress):
+        done, total, speed = progress
+        percent = done * 100 // total if total else 100
+        self.set_job_status(dst, f"Сжатие {name}: {percent}% · {format_size(int(speed))}/с")
+
+    def sync_folder_dialog(self, src):
+        # По умолчанию — папка во второй панели, как в двухпанельных менеджерах
+        other = None
+        if self.second_pane is not None and self.second_pane.isVisible():
+            other = self.tab_stack.currentWidget() if self.active_pane is self.second_pane else self.second_pane
+        default = os.path.join(other.current_path, os.path.basename(src)) if other is not None else src
+        dst, ok = QInputDialog.getText(self, "Синхронизировать в", "Папка назначения:", text=default)
+        dst = dst.strip()
+        if not ok or not dst:
+            return
+        if os.path.abspath(dst) == os.path.abspath(src) or os.path.abspath(dst).startswith(os.path.abspath(src) + os.sep):
+            WarningDialog("Ошибка", "Нельзя синхронизировать папку саму в себя", self).exec()
+            return
+        SyncDialog(src, dst, self, self).exec()
+
+    def sync_in_background(self, plan, mirror):
+        key = ("sync", plan.dst, time.monotonic())
+        name = os.path.basename(plan.dst) or plan.dst
+        cancel_event = threading.Event()
+        self.start_job(key, f"Синхронизация {name}...", cancel_event)
+        worker = Worker(self.run_sync, plan, mirror, cancel_event, with_progress=True, io_class=IO_BULK)
+        worker.signals.progress.connect(
+            lambda progress: self.set_job_status(key, f"Синхронизация {name}: {progress[0] * 100 // progress[1] if progress[1] else 100}%"))
+        worker.signals.finished.connect(lambda _: (self.finish_job(key), self.refresh_all_panes()))
+        worker.signals.error.connect(lambda msg: (self.finish_job(key), self.refresh_all_panes(),
+                                                  WarningDialog("Ошибка", f"Синхронизация прервана:\n{msg}", self).exec()))
+        self.thread_pool.start(worker)
+
+    def run_sync(self, plan, mirror, cancel_event, progress_callback=None):
+        return apply_sync(plan, mirror, cancel_event, lambda done, total: progress_callback((done, total)))
+
+    def show_disk_usage(self, path):
+        # Окно немодальное: пока идёт сканирование, можно работать с файлами
+        if self.disk_usage_dialog is not None:
+            self.disk_usage_dialog.close()
+        self.disk_usage_dialog = DiskUsageDialog(path, self, self)
+        self.disk_usage_dialog.show()
+
+    def show_properties(self, path):
+        try:
+            dialog = PropertiesDialog(path, self, self)
+        except OSError as e:
+            ErrorDialog("Ошибка", str(e), self).exec()
+            return
+        dialog.exec()
 
     def create_file_dialog(self):
         name, ok = QInputDialog.getText(self, "Создать файл", "Имя файла:")
@@ -1332,120 +3177,105 @@ class CustomWindow(QWidget):
         if name in USER_DIRS:
             self.open_dir(USER_DIRS[name], add_history=True)
 
-    def open_recycle_bin_dir(self):
-        # Очистить старые виджеты
-        for i in reversed(range(self.folders_layout.count())):
-            widget = self.folders_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
+    def restore_session(self):
+        """Reopen the folder, view and zoom of the last session from its snapshot; False if there is none"""
+        session = load_session()
+        if session is None or "://" in session.path:
+            return False
+        # Без refresh_all_panes: папка вкладки ещё не открыта, а читать Home незачем
+        self.view_mode = session.view_mode if session.view_mode in ("grid", "list") else "grid"
+        self.show_hidden = session.show_hidden
+        self.update_toggle_buttons()
+        self.sort_mode = session.sort_mode if session.sort_mode in ("name", "type") else "name"
+        self.scale_factor = min(max(session.scale_factor, 0.3), 3.0)
+        for thumbnail in session.thumbnails:
+            self.thumbnail_cache.preload(os.path.join(session.path, thumbnail.name), thumbnail)
+        if session.listing is not None:
+            # В общем кэше снимок проживёт, пока не изменится mtime папки, как обычный листинг
+            self.listing_cache.seed(session.listing)
+        self.active_pane.open_dir(session.path, add_history=False, listing=session.listing)
+        return self.active_pane.current_view == "dir" and self.active_pane.current_path == session.path
+
+    def store_session(self):
+        """Save the active folder and its first screen for the next launch"""
+        pane = self.active_pane
+        if pane is None or pane.current_view != "dir" or not pane.provider.local:
+            return
+        listing = pane.listing if pane.listing.local else None
+        first_screen = [pane.listing.name(i) for i in pane.view_indices[:pane.chunk_size]]
+        icon_sizes = {max(int(80 * self.scale_factor), 16), max(int(32 * self.scale_factor), 16)}
+        session = SessionSnapshot(pane.current_path, self.view_mode, self.sort_mode, self.scale_factor, self.show_hidden,
+                                  listing, self.thumbnail_cache.export(pane.current_path, first_screen, icon_sizes))
+        try:
+            save_session(session)
+        except OSError:
+            pass
+
+    def closeEvent(self, event):
+        self.store_session()
+        super().closeEvent(event)
+
+    def restore_trash_item(self, item):
         try:
-            items = list(winshell.recycle_bin())
+            restore_from_trash(item)
         except Exception as e:
-            items = []
-        if not items:
-            empty_widget = QWidget()
-            vbox = QVBoxLayout(empty_widget)
-            vbox.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
-            icon = QIcon("folder.png") if os.path.exists("folder.png") else QIcon()
-            icon_label = QLabel()
-            if not icon.isNull():
-                icon_label.setPixmap(icon.pixmap(120, 120))
-            vbox.addWidget(icon_label, alignment=Qt.AlignmentFlag.AlignHCenter)
-            text_label = QLabel("Корзина пуста")
-            text_label.setStyleSheet("font-size: 22px; color: #b0b8c9; margin-top: 16px;")
-            text_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-            vbox.addWidget(text_label, alignment=Qt.AlignmentFlag.AlignHCenter)
-            self.folders_layout.addWidget(empty_widget, 0, 0, 1, 5)
-        else:
-            for idx, item in enumerate(items):
-                w = QWidget()
-                vbox = QVBoxLayout(w)
-                vbox.setContentsMargins(10, 10, 10, 10)
-                vbox.setSpacing(5)
-                icon_label = QLabel()
-                icon_label.setPixmap(QIcon("unknow.png").pixmap(64, 64) if os.path.exists("unknow.png") else QIcon().pixmap(64, 64))
-                icon_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-                vbox.addWidget(icon_label)
-                name_label = QLabel(os.path.basename(item.original_filename()))
-                name_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-                name_label.setStyleSheet("font-size: 15px; color: #333;")
-                vbox.addWidget(name_label)
-                path_label = QLabel(item.original_filename())
-                path_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-                path_label.setStyleSheet("font-size: 11px; color: #888;")
-                vbox.addWidget(path_label)
-                date_label = QLabel(str(item.recycle_date()))
-                date_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-                date_label.setStyleSheet("font-size: 11px; color: #888;")
-                vbox.addWidget(date_label)
-                self.folders_layout.addWidget(w, idx // 5, idx % 5)
-            
-            # Center items if fewer than 5
-            self.center_grid_items()
+            dialog = WarningDialog("Ошибка", f"Не удалось восстановить:\n{e}", self)
+            dialog.exec()
+        self.open_recycle_bin_dir()
 
-    def open_disks_dir(self):
-        # Clear existing widgets
-        for i in reversed(range(self.folders_layout.count())):
-            widget = self.folders_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        
-        # Update breadcrumb to show "Disks"
-        self.update_breadcrumb("Disks")
-        
-        # Get all drives
-        drives = self.get_windows_drives()
-        
-        if not drives:
-            # Show empty state if no drives found
-            empty_widget = QWidget()
-            vbox = QVBoxLayout(empty_widget)
-            vbox.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
-            icon = QIcon("disk.png") if os.path.exists("disk.png") else QIcon()
-            icon_label = QLabel()
-            if not icon.isNull():
-                icon_label.setPixmap(icon.pixmap(120, 120))
-            vbox.addWidget(icon_label, alignment=Qt.AlignmentFlag.AlignHCenter)
-            text_label = QLabel("Нет доступных дисков")
-            text_label.setStyleSheet("font-size: 22px; color: #b0b8c9; margin-top: 16px;")
-            text_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-            vbox.addWidget(text_label, alignment=Qt.AlignmentFlag.AlignHCenter)
-            self.folders_layout.addWidget(empty_widget, 0, 0, 1, 5)
-        else:
-            # Display each drive as a FileWidget
-            for idx, drive in enumerate(drives):
-                # Create a FileWidget for each drive with is_disk=True
-                fw = FileWidget(drive, drive, True, self.file_clicked, main_window=self, scale_factor=self.scale_factor, is_disk=True)
-                self.folders_layout.addWidget(fw, idx // 5, idx % 5)
-            
-            # Center items if fewer than 5
-            self.center_grid_items()
-        
-        self.folders_widget.adjustSize()
-        self.scroll.verticalScrollBar().setValue(0)
-        self.back_btn.setEnabled(len(self.history) > 0)
+    def delete_trash_item(self, item):
+        dialog = QuestionDialog("Удалить", f"Удалить '{item.name}' без возможности восстановления?", self)
+        dialog.exec()
+        if hasattr(dialog, 'result') and dialog.result:
+            try:
+                delete_from_trash(item)
+            except Exception as e:
+                dialog = WarningDialog("Ошибка", str(e), self)
+                dialog.exec()
+            self.open_recycle_bin_dir()
+
+    def empty_trash_in_background(self):
+        dialog = QuestionDialog("Очистить корзину", "Удалить все файлы из корзины без возможности восстановления?", self)
+        dialog.exec()
+        if not (hasattr(dialog, 'result') and dialog.result):
+            return
+        worker = Worker(empty_trash, io_class=IO_BULK)
+        worker.signals.finished.connect(lambda _: [p.open_recycle_bin_dir() for p in self.all_panes() if p.current_view == "trash"])
+        worker.signals.error.connect(lambda msg: WarningDialog("Ошибка", msg, self).exec())
+        self.thread_pool.start(worker)
+
+    def mount_label(self, mount):
+        if mount.mount_point in ("/", "\\") or len(mount.mount_point) <= 3:
+            return mount.mount_point
+        return os.path.basename(mount.mount_point.rstrip("/\\"))
+
+    def on_mounts_changed(self):
+        self.update_disk_tabs()
+        for pane in self.all_panes():
+            if pane.current_view == "disks":
+                pane.open_disks_dir()
 
     def update_disk_tabs(self):
         while self.disk_tabbar.count() > 0:
             self.disk_tabbar.removeTab(self.disk_tabbar.count() - 1)
-        drives = self.get_windows_drives()
-        for i, drive in enumerate(drives):
-            self.disk_tabbar.addTab(drive)
-            if self.current_path.lower().startswith(drive.lower()):
+        for i, drive in enumerate(self.mount_monitor.mounts):
+            self.disk_tabbar.addTab(self.mount_label(drive))
+            self.disk_tabbar.setTabData(i, drive.mount_point)
+            self.disk_tabbar.setTabToolTip(i, drive.mount_point)
+        self.sync_disk_tab_selection()
+
+    def sync_disk_tab_selection(self):
+        """Select the tab of the mount containing current_path without re-enumerating mounts"""
+        mount = self.mount_monitor.mount_for_path(self.current_path)
+        if mount is None:
+            return
+        for i in range(self.disk_tabbar.count()):
+            if self.disk_tabbar.tabData(i) == mount.mount_point:
                 self.disk_tabbar.setCurrentIndex(i)
-
-    def get_windows_drives(self):
-        drives = []
-        if sys.platform.startswith("win"):
-            bitmask = ctypes.windll.kernel32.GetLogicalDrives()
-            for letter in string.ascii_uppercase:
-                if bitmask & 1:
-                    drives.append(f"{letter}:/")
-                bitmask >>= 1
-        return drives
+                break
 
     def on_disk_tab_clicked(self, index):
-        drive = self.disk_tabbar.tabText(index)
+        drive = self.disk_tabbar.tabData(index)
         self.open_dir(drive, add_history=True)
 
     def animate_button_press(self, button, pressed):
@@ -1723,6 +3553,380 @@ class InformationDialog(CustomDialog):
     def accept(self):
         self.close()
 
+class PropertiesDialog(CustomDialog):
+    """File properties; checksums and manifest verification run in the background.
+
+    Closing the dialog cancels whatever is still being hashed.
+    """
+    def __init__(self, path, main_window, parent=None):
+        info = os.stat(path)
+        is_dir = os.path.isdir(path)
+        mtime = time.strftime("%d.%m.%Y %H:%M", time.localtime(info.st_mtime))
+        msg = f"Путь: {path}\nТип: {'Папка' if is_dir else 'Файл'}\nРазмер: {format_size(info.st_size)} ({info.st_size} байт)\nИзменён: {mtime}"
+        super().__init__("Свойства", msg, parent)
+        self.path = path
+        self.main_window = main_window
+        self.cancel_event = threading.Event()
+        self.checksum_labels = {}
+        self.verify_label = None
+        container_layout = self.container.layout()
+        if not is_dir:
+            self.setFixedSize(560, 440)
+            for name in available_algorithms():
+                label = QLabel(f"{name}: вычисляется...")
+                label.setWordWrap(True)
+                label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+                label.setStyleSheet("font-size: 12px; color: #444; font-family: monospace; border: none;")
+                container_layout.insertWidget(container_layout.count() - 1, label)
+                self.checksum_labels[name] = label
+            worker = Worker(self.run_checksums, path, with_progress=True)
+            worker.signals.progress.connect(self.on_checksum_progress)
+            worker.signals.finished.connect(self.on_checksums_ready)
+            worker.signals.error.connect(self.on_checksum_error)
+            self.main_window.thread_pool.start(worker)
+        else:
+            self.setFixedSize(480, 260)
+        self.buttons_layout.addStretch()
+        if not is_dir and is_manifest(path):
+            self.verify_label = QLabel("Файл содержит контрольные суммы других файлов")
+            self.verify_label.setWordWrap(True)
+            self.verify_label.setStyleSheet("font-size: 13px; color: #666; border: none;")
+            container_layout.insertWidget(container_layout.count() - 1, self.verify_label)
+            self.verify_button = self.add_button("Проверить")
+            self.verify_button.setFixedSize(100, 32)
+            self.verify_button.clicked.connect(self.start_verify)
+        ok_button = self.add_button("OK", "accept")
+        ok_button.clicked.connect(self.close)
+
+    def closeEvent(self, event):
+        self.cancel_event.set()
+        super().closeEvent(event)
+
+    def run_checksums(self, path, progress_callback=None):
+        return compute_checksums(path, progress_callback=lambda done, total: progress_callback(done * 100 // total),
+                                 cancel_event=self.cancel_event)
+
+    def on_checksum_progress(self, percent):
+        for name, label in self.checksum_labels.items():
+            label.setText(f"{name}: вычисляется... {percent}%")
+
+    def on_checksums_ready(self, digests):
+        if digests is None:
+            return
+        for name, digest in digests.items():
+            self.checksum_labels[name].setText(f"{name}: {digest}")
+
+    def on_checksum_error(self, message):
+        for name, label in self.checksum_labels.items():
+            label.setText(f"{name}: ошибка чтения ({message})")
+
+    def start_verify(self):
+        self.verify_button.setEnabled(False)
+        self.verify_failed = []
+        self.verify_label.setText("Проверка...")
+        worker = Worker(self.run_verify, self.path, with_progress=True)
+        worker.signals.progress.connect(self.on_verify_progress)
+        worker.signals.finished.connect(self.on_verify_finished)
+        worker.signals.error.connect(lambda message: self.verify_label.setText(f"Ошибка: {message}"))
+        self.main_window.thread_pool.start(worker)
+
+    def run_verify(self, path, progress_callback=None):
+        # Файлы из манифеста хэшируются параллельно в пуле verify_manifest
+        return verify_manifest(path, progress_callback=lambda result, done, total: progress_callback((result, done, total)),
+                               cancel_event=self.cancel_event)
+
+    def on_verify_progress(self, event):
+        result, done, total = event
+        if result.status != "ok":
+            self.verify_failed.append(result)
+        self.verify_label.setText(f"Проверено {done} из {total}, с ошибками: {len(self.verify_failed)}")
+
+    def on_verify_finished(self, results):
+        if self.cancel_event.is_set():
+            return
+        if not results:
+            self.verify_label.setText("В файле нет контрольных сумм")
+            return
+        if not self.verify_failed:
+            self.verify_label.setText(f"Все файлы совпадают ({len(results)})")
+            return
+        status_text = {"mismatch": "не совпадает", "missing": "нет файла", "error": "ошибка чтения"}
+        lines = [f"{r.entry.name}: {status_text[r.status] if r.entry.path else 'недопустимое имя'}" for r in self.verify_failed[:5]]
+        if len(self.verify_failed) > 5:
+            lines.append(f"и ещё {len(self.verify_failed) - 5}")
+        self.verify_label.setText(f"С ошибками {len(self.verify_failed)} из {len(results)}:\n" + "\n".join(lines))
+
+class SyncDialog(CustomDialog):
+    """Preview of a folder sync: compares both trees in the background, then hands the plan to a job.
+
+    Toggling mirror only filters the existing plan; toggling hashes compares again.
+    """
+    LIST_LIMIT = 500
+    MARKS = {"copy": "+", "mkdir": "+", "update": "~", "touch": "=", "delete": "−"}
+
+    def __init__(self, src, dst, main_window, parent=None):
+        super().__init__("Синхронизация", f"{src}\n→ {dst}", parent)
+        self.setFixedSize(640, 560)
+        self.src, self.dst = src, dst
+        self.main_window = main_window
+        self.cancel_event = threading.Event()
+        self.plan = None
+        container_layout = self.container.layout()
+        self.hash_box = QCheckBox("Сверять по содержимому файлы, у которых изменилось только время")
+        self.hash_box.toggled.connect(self.compare)
+        self.mirror_box = QCheckBox("Удалять в цели то, чего нет в источнике (в корзину)")
+        self.mirror_box.toggled.connect(self.render)
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        self.status_label.setStyleSheet("font-size: 13px; color: #666; border: none;")
+        self.list_widget = QListWidget()
+        self.list_widget.setStyleSheet("QListWidget { font-size: 13px; border: 1px solid #e0e4ea; border-radius: 8px; }")
+        for widget in (self.hash_box, self.mirror_box, self.status_label):
+            widget.setStyleSheet(widget.styleSheet() or "font-size: 13px; color: #444; border: none;")
+            container_layout.insertWidget(container_layout.count() - 1, widget)
+        container_layout.insertWidget(container_layout.count() - 1, self.list_widget, 1)
+        self.buttons_layout.addStretch()
+        self.start_button = self.add_button("Начать", "accept")
+        self.start_button.clicked.connect(self.start)
+        cancel_button = self.add_button("Отмена", "reject")
+        cancel_button.clicked.connect(self.close)
+        self.compare()
+
+    def closeEvent(self, event):
+        self.cancel_event.set()
+        super().closeEvent(event)
+
+    def compare(self):
+        self.cancel_event.set()
+        self.cancel_event = threading.Event()
+        self.plan = None
+        self.start_button.setEnabled(False)
+        self.list_widget.clear()
+        self.status_label.setText("Сравнение папок...")
+        worker = Worker(self.run_compare, self.src, self.dst, self.hash_box.isChecked(), self.cancel_event, with_progress=True)
+        event = self.cancel_event
+        worker.signals.progress.connect(lambda progress: not event.is_set() and self.on_compare_progress(progress))
+        worker.signals.finished.connect(lambda plan: not event.is_set() and self.on_plan_ready(plan))
+        worker.signals.error.connect(lambda message: self.status_label.setText(f"Ошибка: {message}"))
+        self.main_window.thread_pool.start(worker)
+
+    def run_compare(self, src, dst, use_hash, cancel_event, progress_callback=None):
+        return compare_trees(src, dst, use_hash, cancel_event, lambda stage, done, total: progress_callback((stage, done, total)))
+
+    def on_compare_progress(self, progress):
+        stage, done, total = progress
+        if stage == "hash":
+            self.status_label.setText(f"Сверка содержимого: {done} из {total}")
+
+    def on_plan_ready(self, plan):
+        if plan is None:
+            return
+        self.plan = plan
+        self.render()
+
+    def render(self):
+        if self.plan is None:
+            return
+        mirror = self.mirror_box.isChecked()
+        actions = self.plan.actions_for(mirror)
+        summary = self.plan.summary(mirror)
+        parts = []
+        for kind, text in (("copy", "новых"), ("update", "изменённых"), ("mkdir", "папок"), ("touch", "только время"), ("delete", "в корзину")):
+            count, size = summary.get(kind, (0, 0))
+            if count:
+                parts.append(f"{text}: {count}" + (f" ({format_size(size)})" if size and kind in ("copy", "update") else ""))
+        self.status_label.setText(", ".join(parts).capitalize() if parts else "Папки уже совпадают")
+        self.list_widget.clear()
+        for action in actions[:self.LIST_LIMIT]:
+            self.list_widget.addItem(f"{self.MARKS[action.kind]} {action.rel}")
+        if len(actions) > self.LIST_LIMIT:
+            self.list_widget.addItem(f"и ещё {len(actions) - self.LIST_LIMIT}")
+        self.start_button.setEnabled(bool(actions))
+
+    def start(self):
+        if self.plan is not None:
+            self.main_window.sync_in_background(self.plan, self.mirror_box.isChecked())
+        self.close()
+
+class TreemapWidget(QWidget):
+    """Squarified treemap of one folder's entries; a click on a folder emits entry_clicked"""
+    entry_clicked = pyqtSignal(object)
+    MAX_ENTRIES = 300  # мельче всё равно не разглядеть
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+        self.rects = []
+        self.setMouseTracking(True)
+        self.setMinimumSize(300, 200)
+
+    def set_entries(self, entries):
+        self.entries = [e for e in entries if e.size > 0][:self.MAX_ENTRIES]
+        self.layout_rects()
+        self.update()
+
+    def layout_rects(self):
+        sizes = [e.size for e in self.entries]
+        self.rects = [QRectF(*r) for r in squarify(sizes, 0, 0, self.width(), self.height())]
+
+    def resizeEvent(self, event):
+        self.layout_rects()
+        super().resizeEvent(event)
+
+    @staticmethod
+    def entry_color(entry):
+        if entry.kind == "dir":
+            # Цвет папки зависит от имени, чтобы при обновлении во время сканирования не мигал
+            return QColor.fromHsv(zlib.crc32(entry.name.encode("utf-8", "surrogateescape")) % 360, 90, 215)
+        return QColor("#aab4c0") if entry.kind == "file" else QColor("#d8dde4")
+
+    @staticmethod
+    def entry_label(entry):
+        return entry.name if entry.kind != "rest" else "Прочие файлы"
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#f5f6fa"))
+        for entry, rect in zip(self.entries, self.rects):
+            painter.fillRect(rect.adjusted(1, 1, -1, -1), self.entry_color(entry))
+            if rect.width() > 50 and rect.height() > 32:
+                painter.setPen(QColor("#222"))
+                text_rect = rect.adjusted(5, 3, -5, -3)
+                name = painter.fontMetrics().elidedText(self.entry_label(entry), Qt.TextElideMode.ElideRight, int(text_rect.width()))
+                painter.drawText(text_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, f"{name}\n{format_size(entry.size)}")
+        painter.end()
+
+    def entry_at(self, pos):
+        point = QPointF(pos)
+        for entry, rect in zip(self.entries, self.rects):
+            if rect.contains(point):
+                return entry
+        return None
+
+    def mousePressEvent(self, event):
+        entry = self.entry_at(event.position())
+        if entry is not None and event.button() == Qt.MouseButton.LeftButton:
+            self.entry_clicked.emit(entry)
+
+    def mouseMoveEvent(self, event):
+        entry = self.entry_at(event.position())
+        self.setToolTip(f"{self.entry_label(entry)} — {format_size(entry.size)}" if entry is not None else "")
+        self.setCursor(Qt.CursorShape.PointingHandCursor if entry is not None and entry.kind == "dir" else Qt.CursorShape.ArrowCursor)
+
+class DiskUsageDialog(CustomDialog):
+    """Where the space went: treemap and sorted list of a folder, filled in while the scan runs.
+
+    Drilling down only walks the tree already in memory. Finished scans stay in the window's
+    DiskUsageCache, so opening any folder inside one again shows it without rescanning.
+    """
+    LIST_LIMIT = 200
+
+    def __init__(self, path, main_window, parent=None):
+        super().__init__("Занятое место", path, parent)
+        self.setFixedSize(900, 640)
+        self.main_window = main_window
+        self.cancel_event = threading.Event()
+        self.scan = None
+        self.node = None
+        container_layout = self.container.layout()
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("font-size: 13px; color: #666; border: none;")
+        container_layout.insertWidget(container_layout.count() - 1, self.status_label)
+        self.treemap = TreemapWidget()
+        self.treemap.entry_clicked.connect(self.open_entry)
+        self.list_widget = QListWidget()
+        self.list_widget.setStyleSheet("QListWidget { font-size: 13px; border: 1px solid #e0e4ea; border-radius: 8px; }")
+        self.list_widget.itemClicked.connect(lambda item: self.open_entry(item.data(Qt.ItemDataRole.UserRole)))
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        splitter.addWidget(self.treemap)
+        splitter.addWidget(self.list_widget)
+        splitter.setSizes([540, 300])
+        container_layout.insertWidget(container_layout.count() - 1, splitter, 1)
+        self.up_button = self.add_button("Вверх")
+        self.up_button.clicked.connect(self.go_up)
+        self.rescan_button = self.add_button("Заново")
+        self.rescan_button.clicked.connect(self.rescan)
+        open_button = self.add_button("Открыть")
+        open_button.clicked.connect(lambda: self.node is not None and self.main_window.open_dir(self.node.path, add_history=True))
+        self.buttons_layout.addStretch()
+        ok_button = self.add_button("OK", "accept")
+        ok_button.clicked.connect(self.close)
+        scan, node = main_window.disk_usage_cache.find(path)
+        if node is not None:
+            self.scan, self.node = scan, node
+            self.render()
+        else:
+            self.start_scan(path)
+
+    def closeEvent(self, event):
+        self.cancel_event.set()
+        super().closeEvent(event)
+
+    def start_scan(self, path):
+        self.cancel_event.set()
+        self.cancel_event = threading.Event()
+        try:
+            scan = DiskUsageScan(path)
+        except OSError as e:
+            self.status_label.setText(f"Ошибка: {e}")
+            return
+        self.scan, self.node = scan, scan.root
+        worker = Worker(scan.run, self.cancel_event, with_progress=True)
+        # Дерево растёт в фоне, а окно раз в интервал перерисовывает показанную папку
+        worker.signals.progress.connect(lambda _, scan=scan: scan is self.scan and self.render())
+        worker.signals.finished.connect(lambda root, scan=scan: self.on_scan_finished(scan, root))
+        worker.signals.error.connect(lambda message: self.status_label.setText(f"Ошибка: {message}"))
+        self.main_window.thread_pool.start(worker)
+        self.render()
+
+    def on_scan_finished(self, scan, root):
+        if root is None:
+            return
+        self.main_window.disk_usage_cache.put(scan)
+        if scan is self.scan:
+            self.render()
+
+    def render(self):
+        scan, node = self.scan, self.node
+        with scan.lock:
+            entries = node.entries()
+            size, files, dirs = node.size, node.files, node.dirs
+        self.message_label.setText(node.path)
+        self.treemap.set_entries(entries)
+        self.list_widget.clear()
+        for entry in entries[:self.LIST_LIMIT]:
+            share = entry.size * 100 / size if size else 0
+            label = TreemapWidget.entry_label(entry) + ("/" if entry.kind == "dir" else "")
+            item = QListWidgetItem(f"{format_size(entry.size):>8}  {share:4.1f}%  {label}")
+            item.setData(Qt.ItemDataRole.UserRole, entry)
+            self.list_widget.addItem(item)
+        if scan.finished:
+            when = time.strftime("%H:%M", time.localtime(scan.finished_at))
+            text = f"{format_size(size)}, файлов: {files}, папок: {dirs}; просканировано в {when}"
+        else:
+            text = f"Сканирование... {format_size(size)}, файлов: {files}, папок: {dirs}"
+        if scan.errors:
+            text += f"; нет доступа: {scan.errors}"
+        self.status_label.setText(text)
+        self.up_button.setEnabled(node.parent is not None)
+
+    def open_entry(self, entry):
+        if entry is not None and entry.kind == "dir":
+            self.node = entry.node
+            self.render()
+
+    def go_up(self):
+        if self.node is not None and self.node.parent is not None:
+            self.node = self.node.parent
+            self.render()
+
+    def rescan(self):
+        if self.node is None:
+            return
+        path = self.node.path
+        self.main_window.disk_usage_cache.invalidate(path)
+        self.start_scan(path)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = CustomWindow()
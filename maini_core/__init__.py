@@ -0,0 +1,52 @@
+# Ядро файлового менеджера без зависимости от Qt: листинги, поиск, файловые операции,
+# корзина, диски и размеры. maini.py — графический клиент поверх этого пакета,
+# а `python -m maini_core` — консольный.
+from .paths import get_state_dir, get_cache_dir
+from .sizes import format_size, calculate_size
+from .mounts import (
+    MountInfo, parse_mountinfo, get_mounts, get_mount_points, get_disk_usage,
+    clear_disk_usage_cache, mount_for_path,
+)
+from .fileops import (
+    remove_path, copy_into, move_into, TOMBSTONE_PREFIX, is_tombstone, make_tombstone,
+    remove_tree_parallel, remove_tombstone, tombstone_owner_alive, recover_tombstones, RemovalError,
+)
+from .trash import (
+    TrashItem, find_mount_point, get_trash_dir_for, move_to_trash, iter_trash,
+    restore_from_trash, delete_from_trash, empty_trash,
+)
+from .checksums import (
+    available_algorithms, compute_checksums, is_manifest, parse_manifest, verify_manifest,
+    ManifestEntry, ManifestResult,
+)
+from .compress import compress_formats, compress_paths, default_archive_path
+from .ioscheduler import (
+    IO_INTERACTIVE, IO_THUMBNAIL, IO_PREFETCH, IO_BULK, IOScheduler, shared_io_scheduler, set_io_priority,
+)
+from .memory import MemoryBudget, shared_memory_budget, parse_budget
+from .leakcheck import LeakTracker, process_rss, python_object_types
+from .governor import Quality, QUALITY_LEVELS, RenderGovernor, shared_render_governor
+from .copyjob import CopyJob, CopyJobBusy, part_path
+from .sync import SyncAction, SyncPlan, compare_trees, apply_sync, scan_tree
+from .diskusage import UsageEntry, UsageNode, DiskUsageScan, DiskUsageCache, squarify
+from .duplicates import DuplicateGroup, DuplicateFinder, HashCache
+from .archives import (
+    ARCHIVE_SUFFIXES, ArchiveMember, ArchiveCache, shared_archive_cache, is_archive, split_archive_path,
+)
+from .providers import (
+    LocationProvider, LocalProvider, ArchiveProvider, WebDAVProvider, ProviderRegistry,
+)
+from .completion import (
+    complete_path, complete_from_listing, list_for_completion, match_score, rank_completions, split_for_completion,
+)
+from .preview import FilePreview
+from .session import SessionSnapshot, Thumbnail, load_session, save_session
+from .filetypes import FileType, TypeCache, shared_type_cache, describe_type, sniff_type
+from .query import Query, QueryError, EntryColumns, compile_query, build_columns, snapshot_columns
+from .snapshot import (
+    DirListing, DirSnapshot, ListingCache, visible_entries, FLAG_DIR, FLAG_HIDDEN, FLAG_LINK, FLAG_TOMBSTONE,
+)
+from .search import (
+    filter_by_name, find_by_name, ContentMatch, ContentSearch, compile_content_pattern,
+    search_file_content, iter_files, DEFAULT_MAX_CONTENT_SIZE,
+)
@@ -0,0 +1,226 @@
+import io
+import os
+import posixpath
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from collections import namedtuple, OrderedDict
+
+from .snapshot import DirListing
+
+# Архивы открываются как папки только для чтения. Путь внутри архива пишется
+# прямо после пути к архиву: /home/user/docs.zip/reports/2024.txt
+
+ARCHIVE_SUFFIXES = (".zip", ".jar", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+ArchiveMember = namedtuple("ArchiveMember", "name is_dir size mtime")
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+def archive_stem(path):
+    """Archive name without its archive suffix: docs.tar.gz -> docs"""
+    name = os.path.basename(path)
+    for suffix in sorted(ARCHIVE_SUFFIXES, key=len, reverse=True):
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)] or name
+    return name
+
+def split_archive_path(path):
+    """Split a virtual path into (archive_path, inner_path) or return None for ordinary paths"""
+    path = os.path.normpath(path)
+    inner = []
+    candidate = path
+    while True:
+        if candidate.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(candidate):
+            return candidate, "/".join(reversed(inner))
+        parent, name = os.path.split(candidate)
+        if parent == candidate or not name:
+            return None
+        inner.append(name)
+        candidate = parent
+
+def _clean_member_name(name):
+    """Normalized inner path, or None for names that would escape the archive"""
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if name in ("", ".") or name == ".." or name.startswith("../"):
+        return None
+    return name
+
+class ArchiveIndex:
+    """Directory tree of an archive, read once from its table of contents"""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.dirs = {"": {}}
+        self.members = {}
+        if zipfile.is_zipfile(archive_path):
+            self.kind = "zip"
+            with zipfile.ZipFile(archive_path) as zf:
+                for info in zf.infolist():
+                    mtime = _zip_mtime(info)
+                    self._add(info.filename, info.is_dir(), info.file_size, mtime)
+        else:
+            self.kind = "tar"
+            # Для сжатых tar оглавление есть только внутри потока, поэтому читаем его целиком один раз
+            with tarfile.open(archive_path) as tf:
+                for info in tf:
+                    if info.isdir() or info.isreg():
+                        self._add(info.name, info.isdir(), info.size, info.mtime)
+
+    def _add(self, raw_name, is_dir, size, mtime):
+        name = _clean_member_name(raw_name)
+        if name is None:
+            return
+        parent, base = posixpath.split(name)
+        self._ensure_dir(parent)
+        if is_dir:
+            self._ensure_dir(name)
+        member = ArchiveMember(base, is_dir, 0 if is_dir else size, mtime)
+        self.dirs[parent][base] = member
+        self.members[name] = (member, raw_name)
+
+    def _ensure_dir(self, name):
+        while name not in self.dirs:
+            self.dirs[name] = {}
+            parent, base = posixpath.split(name)
+            self.dirs.setdefault(parent, {})
+            self.dirs[parent].setdefault(base, ArchiveMember(base, True, 0, 0))
+            name = parent
+
+    def member(self, inner):
+        if inner == "":
+            return ArchiveMember("", True, 0, 0)
+        found = self.members.get(inner)
+        if found is not None:
+            return found[0]
+        if inner in self.dirs:
+            return ArchiveMember(posixpath.basename(inner), True, 0, 0)
+        return None
+
+    def raw_name(self, inner):
+        return self.members[inner][1]
+
+def _zip_mtime(info):
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0
+
+class _MemberStream(io.RawIOBase):
+    """Readable stream of one archive member; closing it closes the archive too"""
+
+    def __init__(self, archive, member_file):
+        self._archive = archive
+        self._file = member_file
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+            self._archive.close()
+        super().close()
+
+class ArchiveCache:
+    """Archive indexes keyed by the archive's path, mtime and size; safe to share between threads"""
+
+    def __init__(self, max_archives=8):
+        self.max_archives = max_archives
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self, archive_path):
+        st = os.stat(archive_path)
+        key = os.path.normcase(os.path.abspath(archive_path))
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is not None and cached[0] == (st.st_mtime_ns, st.st_size):
+                self._indexes.move_to_end(key)
+                return cached[1]
+        try:
+            index = ArchiveIndex(archive_path)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+            raise OSError(f"Не удалось прочитать архив: {e}") from e
+        with self._lock:
+            self._indexes[key] = ((st.st_mtime_ns, st.st_size), index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_archives:
+                self._indexes.popitem(last=False)
+        return index
+
+    def list_dir(self, path):
+        """DirListing of a folder inside an archive, the same shape ListingCache returns"""
+        archive_path, inner = split_archive_path(path)
+        index = self.index(archive_path)
+        entries = index.dirs.get(inner)
+        if entries is None:
+            raise NotADirectoryError(path)
+        mtime_ns = os.stat(archive_path).st_mtime_ns
+        return DirListing(path, mtime_ns, tuple(entries), frozenset(n for n, m in entries.items() if m.is_dir))
+
+    def member(self, path):
+        archive_path, inner = split_archive_path(path)
+        return self.index(archive_path).member(inner)
+
+    def open_member(self, path):
+        """Stream a file inside an archive without extracting it to disk"""
+        archive_path, inner = split_archive_path(path)
+        index = self.index(archive_path)
+        member = index.member(inner)
+        if member is None or member.is_dir:
+            raise FileNotFoundError(path)
+        raw_name = index.raw_name(inner)
+        if index.kind == "zip":
+            archive = zipfile.ZipFile(archive_path)
+            try:
+                return _MemberStream(archive, archive.open(raw_name))
+            except BaseException:
+                archive.close()
+                raise
+        archive = tarfile.open(archive_path)
+        try:
+            return _MemberStream(archive, archive.extractfile(raw_name))
+        except BaseException:
+            archive.close()
+            raise
+
+    def extract(self, path, dst_dir):
+        """Copy a file or folder out of an archive into dst_dir; returns the destination path"""
+        archive_path, inner = split_archive_path(path)
+        index = self.index(archive_path)
+        member = index.member(inner)
+        if member is None:
+            raise FileNotFoundError(path)
+        dst = os.path.join(dst_dir, posixpath.basename(inner) or archive_stem(archive_path))
+        if not member.is_dir:
+            with self.open_member(path) as src, open(dst, 'wb') as out:
+                shutil.copyfileobj(src, out, 1024 * 1024)
+            return dst
+        # Папку извлекаем за один проход по архиву: сжатый tar нельзя читать вразнобой
+        prefix = inner + "/" if inner else ""
+        os.makedirs(dst, exist_ok=True)
+        for name in index.dirs:
+            if name.startswith(prefix) and name != inner:
+                os.makedirs(os.path.join(dst, *name[len(prefix):].split("/")), exist_ok=True)
+        wanted = {raw: name for name, (m, raw) in index.members.items() if not m.is_dir and name.startswith(prefix)}
+        opener = zipfile.ZipFile if index.kind == "zip" else tarfile.open
+        with opener(archive_path) as archive:
+            members = archive.infolist() if index.kind == "zip" else archive
+            for info in members:
+                raw = info.filename if index.kind == "zip" else info.name
+                if raw not in wanted:
+                    continue
+                src = archive.open(info) if index.kind == "zip" else archive.extractfile(info)
+                with src, open(os.path.join(dst, *wanted[raw][len(prefix):].split("/")), 'wb') as out:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+        return dst
+
+# Общий для графического клиента и файловых операций кэш оглавлений
+shared_archive_cache = ArchiveCache()
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Контрольные суммы для окна «Свойства» и проверка по файлам SHA256SUMS и подобным
+
+CHECKSUM_CHUNK = 1024 * 1024
+
+ManifestEntry = namedtuple("ManifestEntry", "name path algorithm digest")
+ManifestResult = namedtuple("ManifestResult", "entry status")  # status: ok, mismatch, missing, error
+
+# Имя файла-манифеста -> алгоритм; для прочих алгоритм угадывается по длине хэша
+MANIFEST_NAMES = {
+    "SHA256SUMS": "sha256", "SHA512SUMS": "sha512", "SHA1SUMS": "sha1",
+    "MD5SUMS": "md5", "B2SUMS": "blake2b",
+}
+MANIFEST_SUFFIXES = {".sha256": "sha256", ".sha512": "sha512", ".sha1": "sha1", ".md5": "md5", ".b2": "blake2b"}
+DIGEST_LENGTHS = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+BSD_LINE = re.compile(r"^(\w+) \((.+)\) = ([0-9a-fA-F]+)$")
+BSD_ALGORITHMS = {"SHA256": "sha256", "SHA512": "sha512", "SHA1": "sha1", "MD5": "md5", "BLAKE2b": "blake2b"}
+
+def available_algorithms():
+    """Algorithms shown in Properties; xxh3 only when the xxhash package is installed"""
+    names = ["sha256", "blake2b"]
+    if xxhash is not None:
+        names.append("xxh3_64")
+    return names
+
+def new_hasher(name):
+    if name.startswith("xxh"):
+        if xxhash is None:
+            raise ValueError(f"{name} requires the xxhash package")
+        return getattr(xxhash, name)()
+    return hashlib.new(name)
+
+def compute_checksums(path, algorithms=None, progress_callback=None, cancel_event=None):
+    """Hash a file with several algorithms in one pass; returns {name: hexdigest} or None if cancelled.
+
+    progress_callback(done_bytes, total_bytes) is called at most once per percent.
+    """
+    hashers = {name: new_hasher(name) for name in (algorithms or available_algorithms())}
+    total = os.path.getsize(path)
+    done = 0
+    last_percent = -1
+    buf = bytearray(CHECKSUM_CHUNK)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            n = f.readinto(buf)
+            if not n:
+                break
+            # hashlib отпускает GIL на больших блоках, поэтому хэширование не тормозит интерфейс
+            for h in hashers.values():
+                h.update(view[:n])
+            done += n
+            if progress_callback and total:
+                percent = done * 100 // total
+                if percent != last_percent:
+                    last_percent = percent
+                    progress_callback(done, total)
+    return {name: h.hexdigest() for name, h in hashers.items()}
+
+def manifest_algorithm(manifest_path):
+    name = os.path.basename(manifest_path)
+    if name.upper() in MANIFEST_NAMES:
+        return MANIFEST_NAMES[name.upper()]
+    return MANIFEST_SUFFIXES.get(os.path.splitext(name)[1].lower())
+
+def is_manifest(path):
+    return manifest_algorithm(path) is not None
+
+def is_safe_manifest_name(name):
+    """Only relative names inside the manifest's folder; absolute paths and '..' could point anywhere"""
+    if not name or os.path.isabs(name) or name.startswith("\\"):
+        return False
+    return ".." not in re.split(r"[\\/]", name)
+
+def parse_manifest(manifest_path):
+    """Read GNU ("digest  name", "digest *name") and BSD ("SHA256 (name) = digest") lines.
+
+    Entries whose name leaves the manifest's folder get path None and are never opened.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    default = manifest_algorithm(manifest_path)
+    entries = []
+    with open(manifest_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith('#'):
+                continue
+            m = BSD_LINE.match(line)
+            if m:
+                algorithm = BSD_ALGORITHMS.get(m.group(1), m.group(1).lower())
+                name, digest = m.group(2), m.group(3)
+            else:
+                parts = line.split(None, 1)
+                if len(parts) != 2 or not re.fullmatch(r"[0-9a-fA-F]+", parts[0]):
+                    continue
+                digest, name = parts
+                if name.startswith('*'):
+                    name = name[1:]
+                algorithm = default or DIGEST_LENGTHS.get(len(digest))
+            if algorithm is None:
+                continue
+            path = os.path.join(base, name) if is_safe_manifest_name(name) else None
+            entries.append(ManifestEntry(name, path, algorithm, digest.lower()))
+    return entries
+
+def verify_manifest(manifest_path, workers=None, progress_callback=None, cancel_event=None):
+    """Check every file listed in a manifest on a thread pool; returns ManifestResults in manifest order.
+
+    progress_callback(result, done, total) is called as each file finishes.
+    """
+    entries = parse_manifest(manifest_path)
+    results = [None] * len(entries)
+
+    def check(entry):
+        if entry.path is None:
+            return "error"  # имя вне папки манифеста не проверяется
+        if not os.path.isfile(entry.path):
+            return "missing"
+        try:
+            digests = compute_checksums(entry.path, [entry.algorithm], cancel_event=cancel_event)
+        except (OSError, ValueError):
+            return "error"
+        if digests is None:
+            return "error"
+        return "ok" if digests[entry.algorithm] == entry.digest else "mismatch"
+
+    workers = workers or min(4, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(check, entry): i for i, entry in enumerate(entries)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            results[i] = ManifestResult(entries[i], future.result())
+            if progress_callback:
+                progress_callback(results[i], done, len(entries))
+            if cancel_event is not None and cancel_event.is_set():
+                for f in futures:
+                    f.cancel()
+                break
+    return [r for r in results if r is not None]
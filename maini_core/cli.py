@@ -0,0 +1,323 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from .checksums import available_algorithms, compute_checksums, verify_manifest
+from .completion import complete_path
+from .compress import compress_formats, compress_paths, default_archive_path
+from .diskusage import DiskUsageScan
+from .duplicates import DuplicateFinder, HashCache
+from .fileops import make_tombstone, remove_tombstone
+from .filetypes import TypeCache, describe_type
+from .preview import FilePreview
+from .providers import ProviderRegistry
+from .query import compile_query, snapshot_columns, QueryError
+from .search import find_by_name, ContentSearch, DEFAULT_MAX_CONTENT_SIZE
+from .sizes import calculate_size, format_size
+from .snapshot import DirSnapshot, ListingCache
+from .sync import compare_trees, apply_sync
+from .trash import move_to_trash, iter_trash, restore_from_trash, empty_trash
+
+def cmd_ls(args):
+    provider = ProviderRegistry().for_path(args.path)
+    listing = provider.list_dir(args.path)
+    try:
+        query = compile_query(args.search or "")
+    except QueryError as e:
+        print(e, file=sys.stderr)
+        return 2
+    snapshot = DirSnapshot.from_listing(listing)
+    visible = snapshot.visible_indices(args.all)
+    if args.long and provider.local:
+        snapshot.ensure_stat()
+    columns = snapshot_columns(snapshot, visible, query.needs_stat)
+    for position in query.filter_indices(columns):
+        index = visible[position]
+        name = snapshot.name(index)
+        is_dir = snapshot.is_dir(index)
+        if args.long:
+            path = os.path.join(args.path, name)
+            try:
+                size = snapshot.sizes[index] if snapshot.has_stat else provider.entry_size(path)
+                size_text = "<ПАПКА>" if is_dir else format_size(size)
+            except OSError:
+                size_text = "Н/Д"
+            print(f"{size_text:>10}  {name}{'/' if is_dir else ''}")
+        else:
+            print(name + ("/" if is_dir else ""))
+    return 0
+
+def cmd_find(args):
+    for path in find_by_name(args.root, args.text, args.all):
+        print(path)
+    return 0
+
+def cmd_grep(args):
+    search = ContentSearch(args.root, args.query, max_size=args.max_size, show_hidden=args.all)
+    search.run(lambda m: print(f"{m.path}:{m.line_number}: {m.line}"))
+    return 0 if search.found else 1
+
+def cmd_dupes(args):
+    finder = DuplicateFinder(args.roots, min_size=args.min_size, show_hidden=args.all,
+                             cache=None if args.no_cache else HashCache())
+    wasted = 0
+
+    def print_group(group):
+        nonlocal wasted
+        wasted += group.size * (len(group.paths) - 1)
+        print(f"{format_size(group.size)} x {len(group.paths)}")
+        for path in group.paths:
+            print(f"  {path}")
+
+    finder.run(on_group=print_group)
+    print(f"Можно освободить: {format_size(wasted)}")
+    return 0
+
+def cmd_checksum(args):
+    if args.check:
+        failed = 0
+        for result in verify_manifest(args.paths[0]):
+            print(f"{result.entry.name}: {result.status}")
+            failed += result.status != "ok"
+        return 1 if failed else 0
+    for path in args.paths:
+        for name, digest in compute_checksums(path, args.algorithm or None).items():
+            print(f"{name}  {digest}  {path}")
+    return 0
+
+def cmd_pack(args):
+    dst = args.output or default_archive_path(args.paths, args.format)
+
+    def report(done, total, speed):
+        print(f"\r{format_size(done)} из {format_size(total)}, {format_size(int(speed))}/с", end="", file=sys.stderr)
+
+    compress_paths(args.paths, dst, args.format, level=args.level, progress_callback=report)
+    print(file=sys.stderr)
+    print(dst)
+    return 0
+
+def cmd_view(args):
+    preview = FilePreview(args.path)
+    try:
+        if args.hex or not preview.is_text:
+            lines = preview.hex_page(args.offset, args.lines * 16)
+        elif args.tail:
+            lines = preview.tail_text(args.lines)
+        else:
+            lines, _ = preview.page_text(args.line, args.lines)
+        for line in lines:
+            print(line)
+    finally:
+        preview.close()
+    return 0
+
+def cmd_type(args):
+    cache = TypeCache()
+    for path in args.paths:
+        if os.path.isdir(path):
+            print(f"{'Папка':<20}  {'inode/directory':<40}  {path}")
+            continue
+        file_type = cache.detect(path)
+        print(f"{describe_type(file_type, path):<20}  {file_type.mime:<40}  {path}")
+    return 0
+
+def cmd_complete(args):
+    for path in complete_path(args.text, ProviderRegistry(), show_hidden=args.all, limit=args.limit):
+        print(path)
+    return 0
+
+def cmd_du(args):
+    for path in args.paths:
+        total, files, dirs = calculate_size(path)
+        print(f"{format_size(total):>10}  {total} байт, файлов: {files}, папок: {dirs}  {path}")
+    return 0
+
+def cmd_usage(args):
+    scan = DiskUsageScan(args.path, one_filesystem=not args.cross)
+    root = scan.run()
+    print(f"{format_size(root.size):>10}  файлов: {root.files}, папок: {root.dirs}  {root.name}")
+    for entry in root.entries()[:args.top]:
+        name = {"dir": (entry.name or "") + "/", "file": entry.name}.get(entry.kind, "(прочие файлы)")
+        share = entry.size * 100 / root.size if root.size else 0
+        print(f"{format_size(entry.size):>10}  {share:5.1f}%  {name}")
+    if scan.errors:
+        print(f"Нет доступа: {scan.errors}", file=sys.stderr)
+    return 0
+
+def cmd_sync(args):
+    plan = compare_trees(args.src, args.dst, use_hash=args.hash)
+    marks = {"copy": "+", "mkdir": "+", "update": "~", "touch": "=", "delete": "-"}
+    for action in plan.actions_for(args.mirror):
+        print(f"{marks[action.kind]} {action.rel}")
+    if not args.dry_run:
+        apply_sync(plan, args.mirror)
+    return 0
+
+def cmd_cp(args):
+    providers = ProviderRegistry()
+    for src in args.sources:
+        print(providers.transfer(src, args.dest))
+    return 0
+
+def cmd_mv(args):
+    providers = ProviderRegistry()
+    for src in args.sources:
+        print(providers.transfer(src, args.dest, move=True))
+    return 0
+
+def cmd_rm(args):
+    for path in args.paths:
+        if args.permanent:
+            remove_tombstone(make_tombstone(path))
+        else:
+            move_to_trash(path)
+    return 0
+
+def cmd_trash(args):
+    if args.action == "list":
+        for item in iter_trash():
+            print(f"{item.deletion_date}  {item.name}  {item.original_path}")
+    elif args.action == "restore":
+        for item in iter_trash():
+            if item.name in args.names or item.original_path in args.names:
+                restore_from_trash(item)
+                print(item.original_path)
+    elif args.action == "empty":
+        print(empty_trash())
+    return 0
+
+def cmd_bench(args):
+    """Time a core engine headlessly: min/median over --repeat runs"""
+    if args.engine == "ls":
+        cache = ListingCache()
+        runs = [
+            ("cold", lambda: ListingCache().list_dir(args.path).visible_indices()),
+            ("cached", lambda: cache.list_dir(args.path).visible_indices()),
+        ]
+    elif args.engine == "find":
+        runs = [("cold", lambda: sum(1 for _ in find_by_name(args.path, args.text or "")))]
+    else:
+        runs = [("cold", lambda: calculate_size(args.path))]
+    for label, fn in runs:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        print(f"{args.engine} {label}: min {min(times) * 1000:.2f} ms, median {statistics.median(times) * 1000:.2f} ms")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="maini_core", description="Файловые операции Maini без графического интерфейса")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ls", help="содержимое папки")
+    p.add_argument("path", nargs="?", default=".")
+    p.add_argument("-a", "--all", action="store_true", help="показывать скрытые файлы")
+    p.add_argument("-l", "--long", action="store_true", help="показывать размеры")
+    p.add_argument("-s", "--search", help="фильтр: слова из имени и ext:, size:, modified:, name:, type:, is:")
+    p.set_defaults(func=cmd_ls)
+
+    p = sub.add_parser("find", help="рекурсивный поиск по имени")
+    p.add_argument("root")
+    p.add_argument("text")
+    p.add_argument("-a", "--all", action="store_true", help="заходить в скрытые папки")
+    p.set_defaults(func=cmd_find)
+
+    p = sub.add_parser("grep", help="поиск по содержимому файлов")
+    p.add_argument("root")
+    p.add_argument("query", help="текст или /регулярное выражение/")
+    p.add_argument("-a", "--all", action="store_true", help="заходить в скрытые папки")
+    p.add_argument("--max-size", type=int, default=DEFAULT_MAX_CONTENT_SIZE, help="пропускать файлы больше (байт)")
+    p.set_defaults(func=cmd_grep)
+
+    p = sub.add_parser("dupes", help="поиск одинаковых файлов")
+    p.add_argument("roots", nargs="+")
+    p.add_argument("-a", "--all", action="store_true", help="заходить в скрытые папки")
+    p.add_argument("--min-size", type=int, default=1, help="пропускать файлы меньше (байт)")
+    p.add_argument("--no-cache", action="store_true", help="не использовать сохранённые хэши")
+    p.set_defaults(func=cmd_dupes)
+
+    p = sub.add_parser("checksum", help="контрольные суммы файлов")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("-a", "--algorithm", action="append", choices=available_algorithms() + ["md5", "sha1", "sha512"])
+    p.add_argument("-c", "--check", action="store_true", help="проверить файлы по манифесту (SHA256SUMS и т.п.)")
+    p.set_defaults(func=cmd_checksum)
+
+    p = sub.add_parser("pack", help="сжать файлы и папки в архив")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("-f", "--format", choices=sorted(set(compress_formats() + ["zip", "tar.gz"])), default="zip")
+    p.add_argument("-o", "--output", help="путь к архиву (по умолчанию рядом с первым файлом)")
+    p.add_argument("--level", type=int, help="уровень сжатия")
+    p.set_defaults(func=cmd_pack)
+
+    p = sub.add_parser("view", help="страница текста, хвост или hex-дамп файла")
+    p.add_argument("path")
+    p.add_argument("-n", "--lines", type=int, default=40, help="сколько строк показать")
+    p.add_argument("--line", type=int, default=0, help="с какой строки начать (с нуля)")
+    p.add_argument("--tail", action="store_true", help="последние строки файла")
+    p.add_argument("--hex", action="store_true", help="hex-дамп")
+    p.add_argument("--offset", type=int, default=0, help="смещение для hex-дампа")
+    p.set_defaults(func=cmd_view)
+
+    p = sub.add_parser("type", help="тип файла по расширению или содержимому")
+    p.add_argument("paths", nargs="+")
+    p.set_defaults(func=cmd_type)
+
+    p = sub.add_parser("complete", help="дополнение пути, как в строке адреса")
+    p.add_argument("text")
+    p.add_argument("-a", "--all", action="store_true", help="показывать скрытые папки")
+    p.add_argument("-n", "--limit", type=int, default=30)
+    p.set_defaults(func=cmd_complete)
+
+    p = sub.add_parser("du", help="размер файлов и папок")
+    p.add_argument("paths", nargs="+")
+    p.set_defaults(func=cmd_du)
+
+    p = sub.add_parser("usage", help="что занимает место в папке")
+    p.add_argument("path")
+    p.add_argument("-n", "--top", type=int, default=20, help="сколько крупнейших элементов показать")
+    p.add_argument("-x", "--cross", action="store_true", help="заходить в другие файловые системы")
+    p.set_defaults(func=cmd_usage)
+
+    p = sub.add_parser("sync", help="синхронизировать папку с другой: только новые и изменённые файлы")
+    p.add_argument("src")
+    p.add_argument("dst")
+    p.add_argument("--hash", action="store_true", help="файлы с тем же размером, но другим временем сверять по содержимому")
+    p.add_argument("--mirror", action="store_true", help="удалять в цели то, чего нет в источнике (в корзину)")
+    p.add_argument("-n", "--dry-run", action="store_true", help="только показать, что изменится")
+    p.set_defaults(func=cmd_sync)
+
+    for name, func, text in (("cp", cmd_cp, "копировать в папку"), ("mv", cmd_mv, "переместить в папку")):
+        p = sub.add_parser(name, help=text)
+        p.add_argument("sources", nargs="+")
+        p.add_argument("dest")
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("rm", help="переместить в корзину")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--permanent", action="store_true", help="удалить без корзины")
+    p.set_defaults(func=cmd_rm)
+
+    p = sub.add_parser("trash", help="работа с корзиной")
+    p.add_argument("action", choices=["list", "restore", "empty"])
+    p.add_argument("names", nargs="*")
+    p.set_defaults(func=cmd_trash)
+
+    p = sub.add_parser("bench", help="замер скорости движков")
+    p.add_argument("engine", choices=["ls", "find", "du"])
+    p.add_argument("path")
+    p.add_argument("text", nargs="?")
+    p.add_argument("-n", "--repeat", type=int, default=5)
+    p.set_defaults(func=cmd_bench)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,85 @@
+import heapq
+import os
+
+from .archives import ARCHIVE_SUFFIXES
+
+# Дополнение пути в строке адреса: папки (и архивы, которые открываются как папки)
+# из родительского каталога набранного пути, сначала по префиксу, потом нечётко.
+
+DEFAULT_LIMIT = 30
+
+def split_for_completion(text):
+    """(parent, fragment) of a partly typed path; parent is None while there is nothing to list"""
+    if "://" in text:
+        scheme, rest = text.split("://", 1)
+        if "/" not in rest:
+            return None, ""  # адрес сервера ещё не дописан
+        parent, fragment = text.rsplit("/", 1)
+        return (parent if parent.split("://", 1)[1] else None), fragment
+    text = os.path.expanduser(text)
+    parent, fragment = os.path.split(text)
+    return (parent or None), fragment
+
+def join_completion(parent, name):
+    return f"{parent.rstrip('/')}/{name}" if "://" in parent else os.path.join(parent, name)
+
+def match_score(fragment, name):
+    """Rank of name for fragment, lower is better, or None if it does not match.
+
+    Exact-case prefix beats any-case prefix, which beats a substring, which beats a fuzzy
+    subsequence ("dcmnt" -> "Documents"); within a tier earlier and tighter matches win.
+    """
+    if name.startswith(fragment):
+        return (0, 0)
+    lower_name, lower_fragment = name.lower(), fragment.lower()
+    if lower_name.startswith(lower_fragment):
+        return (1, 0)
+    pos = lower_name.find(lower_fragment)
+    if pos >= 0:
+        return (2, pos)
+    gaps, i = 0, -1
+    for ch in lower_fragment:
+        j = lower_name.find(ch, i + 1)
+        if j < 0:
+            return None
+        gaps += j - i - 1
+        i = j
+    return (3, gaps)
+
+def rank_completions(fragment, names, limit=DEFAULT_LIMIT):
+    """Best matching names for fragment, best first"""
+    scored = []
+    for name in names:
+        score = match_score(fragment, name)
+        if score is not None:
+            scored.append((score, name.lower(), name))
+    return [name for _, _, name in heapq.nsmallest(limit, scored)]
+
+def completion_candidates(listing, fragment, show_hidden=False):
+    """Names from a listing worth completing to: folders and archives, dotfiles only when asked for"""
+    dirs = listing.dirs
+    hidden_ok = show_hidden or fragment.startswith('.')
+    return [name for name in listing.names
+            if (name in dirs or name.lower().endswith(ARCHIVE_SUFFIXES)) and (hidden_ok or not name.startswith('.'))]
+
+def complete_from_listing(listing, parent, fragment, show_hidden=False, limit=DEFAULT_LIMIT):
+    names = rank_completions(fragment, completion_candidates(listing, fragment, show_hidden), limit)
+    return [join_completion(parent, name) for name in names]
+
+def list_for_completion(parent, providers):
+    """Listing of parent through providers, or None if it cannot be listed; may block on slow storage"""
+    provider = providers.for_path(parent)
+    if provider is None:
+        return None
+    try:
+        return provider.list_dir(parent)
+    except (OSError, ValueError):
+        return None
+
+def complete_path(text, providers, show_hidden=False, limit=DEFAULT_LIMIT):
+    """Completions for text, listing its parent through providers"""
+    parent, fragment = split_for_completion(text)
+    listing = list_for_completion(parent, providers) if parent is not None else None
+    if listing is None:
+        return []
+    return complete_from_listing(listing, parent, fragment, show_hidden, limit)
@@ -0,0 +1,161 @@
+import os
+import stat
+import tarfile
+import time
+import zipfile
+
+from .ioscheduler import shared_io_scheduler
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Сжатие файлов и папок в zip / tar.zst. Файлы читаются потоком по кускам,
+# результат пишется во временный .part и переименовывается только в конце.
+
+COMPRESS_CHUNK = 1024 * 1024
+
+# Эти форматы уже сжаты; в zip они кладутся как есть, чтобы не тратить процессор впустую
+PRECOMPRESSED_SUFFIXES = (
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".ogg", ".mp4", ".mkv", ".webm", ".avi",
+)
+
+class CompressCancelled(Exception):
+    pass
+
+def compress_formats():
+    """Formats offered in the UI; tar.zst needs the zstandard package, otherwise tar.gz"""
+    return ["zip", "tar.zst" if zstandard is not None else "tar.gz"]
+
+def default_archive_path(paths, fmt):
+    """dst for compressing paths: next to the first one, named after it, without overwriting"""
+    first = os.path.normpath(paths[0])
+    base = os.path.join(os.path.dirname(first), os.path.basename(first) if len(paths) == 1 else "Архив")
+    candidate = f"{base}.{fmt}"
+    counter = 2
+    while os.path.exists(candidate):
+        candidate = f"{base} ({counter}).{fmt}"
+        counter += 1
+    return candidate
+
+class _Progress:
+    """Byte counter shared by all members; reports at most every interval seconds"""
+
+    def __init__(self, total, progress_callback, cancel_event, interval=0.2):
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self.last_report = 0
+        self.interval = interval
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+
+    def add(self, n):
+        shared_io_scheduler.throttle(self.cancel_event)
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise CompressCancelled()
+        self.done += n
+        now = time.monotonic()
+        if self.progress_callback and (now - self.last_report >= self.interval or self.done == self.total):
+            self.last_report = now
+            elapsed = max(now - self.started, 1e-6)
+            self.progress_callback(self.done, self.total, self.done / elapsed)
+
+class _CountingReader:
+    """File wrapper that reports every chunk read, so tarfile can stream members"""
+
+    def __init__(self, f, progress):
+        self._f = f
+        self._progress = progress
+
+    def read(self, size=-1):
+        data = self._f.read(size if size and size > 0 else COMPRESS_CHUNK)
+        self._progress.add(len(data))
+        return data
+
+def _collect(paths):
+    """(path, arcname, is_dir, size) for everything to pack, arcnames relative to each path's parent"""
+    items = []
+    for root in paths:
+        root = os.path.normpath(root)
+        parent = os.path.dirname(root)
+        if os.path.isdir(root) and not os.path.islink(root):
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                items.append((dirpath, os.path.relpath(dirpath, parent), True, 0))
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.lstat(path)
+                    except OSError:
+                        continue
+                    size = st.st_size if stat.S_ISREG(st.st_mode) else 0
+                    items.append((path, os.path.relpath(path, parent), False, size))
+        else:
+            items.append((root, os.path.basename(root), False, os.lstat(root).st_size))
+    return items
+
+def _write_zip(dst, items, progress, level):
+    with zipfile.ZipFile(dst, 'w', zipfile.ZIP_DEFLATED, allowZip64=True, compresslevel=level) as zf:
+        for path, arcname, is_dir, size in items:
+            if is_dir:
+                zf.write(path, arcname)
+                continue
+            if not os.path.isfile(path) or os.path.islink(path):
+                continue
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED if arcname.lower().endswith(PRECOMPRESSED_SUFFIXES) else zipfile.ZIP_DEFLATED
+            with open(path, 'rb') as src, zf.open(info, 'w', force_zip64=size > 0x7fffffff) as out:
+                while True:
+                    chunk = src.read(COMPRESS_CHUNK)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    progress.add(len(chunk))
+
+def _write_tar(tf, items, progress):
+    for path, arcname, is_dir, size in items:
+        info = tf.gettarinfo(path, arcname)
+        if info is None:  # сокеты и прочие файлы, которые tar не умеет хранить
+            continue
+        if info.isreg():
+            with open(path, 'rb') as src:
+                tf.addfile(info, _CountingReader(src, progress))
+        else:
+            tf.addfile(info)
+
+def compress_paths(paths, dst, fmt="zip", level=None, threads=-1, progress_callback=None, cancel_event=None):
+    """Pack files and folders into dst; returns dst, or None if cancel_event was set.
+
+    progress_callback(done_bytes, total_bytes, bytes_per_second) is called a few times a second.
+    For tar.zst, zstd compresses blocks on `threads` worker threads (-1 = one per CPU).
+    """
+    items = _collect(paths)
+    progress = _Progress(sum(item[3] for item in items), progress_callback, cancel_event)
+    tmp = dst + ".part"
+    try:
+        if fmt == "zip":
+            _write_zip(tmp, items, progress, 6 if level is None else level)
+        elif fmt == "tar.zst":
+            if zstandard is None:
+                raise ValueError("tar.zst requires the zstandard package")
+            cctx = zstandard.ZstdCompressor(level=3 if level is None else level, threads=threads)
+            with open(tmp, 'wb') as fh, cctx.stream_writer(fh, closefd=False) as zw:
+                with tarfile.open(fileobj=zw, mode='w|') as tf:
+                    _write_tar(tf, items, progress)
+        elif fmt == "tar.gz":
+            with tarfile.open(tmp, 'w:gz', compresslevel=6 if level is None else level) as tf:
+                _write_tar(tf, items, progress)
+        else:
+            raise ValueError(f"Unknown archive format: {fmt}")
+        os.replace(tmp, dst)
+    except CompressCancelled:
+        os.remove(tmp)
+        return None
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return dst
@@ -0,0 +1,398 @@
+import errno
+import json
+import os
+import shutil
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .ioscheduler import shared_io_scheduler
+from .paths import get_state_dir
+
+# Копирование, которое переживает падение, выход из системы и выдернутый диск.
+# Каждый файл пишется во временный ".имя.maini-part" рядом с целью и переименовывается
+# на место одним os.replace, так что недописанный файл никогда не лежит под настоящим именем.
+# Журнал (JSON по строке) хранит готовые файлы и смещения в текущем, после перезапуска
+# задание продолжается с последней контрольной точки.
+#
+# Пока задание выполняется, его журнал заблокирован flock: второй экземпляр программы
+# не подхватит то же задание и не станет писать в те же .maini-part файлы.
+#
+# Каждый запуск и каждая ошибка тоже пишутся в журнал. Задание, которое раз за разом
+# падает без продвижения, при старте программы само больше не продолжается.
+
+JOURNAL_VERSION = 1
+PART_SUFFIX = ".maini-part"
+CHUNK_SIZE = 1024 * 1024
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+CHECKPOINT_SECONDS = 2.0
+MAX_AUTO_RESUMES = 3  # запусков подряд без единой контрольной точки
+
+def part_path(dst):
+    head, name = os.path.split(dst)
+    return os.path.join(head, f".{name}{PART_SUFFIX}")
+
+class CopyJobBusy(OSError):
+    """The job's journal is locked by another process, or the job has already finished there"""
+
+def journals_dir():
+    path = os.path.join(get_state_dir(), "copies")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class CopyJob:
+    """Copy sources into dst_dir with a checkpoint journal; run() again after a crash to resume.
+
+    The journal only ever records data that is already fsync'd: finished files are synced
+    and then listed at the next checkpoint, and a partial file's offset is written after its
+    bytes. A file listed as done is skipped on resume if source and target still match;
+    a partial file is continued only if the source has the same size and mtime as when
+    its offset was recorded.
+
+    claim() locks the journal for this process until the job ends; run() claims it itself.
+    Every run and every error is journaled too; should_auto_resume() uses them to stop
+    restarting a job that keeps failing.
+    """
+
+    def __init__(self, sources, dst_dir, journal_path=None):
+        self.sources = [os.path.abspath(src) for src in sources]
+        self.dst_dir = os.path.abspath(dst_dir)
+        self.journal_path = journal_path or os.path.join(journals_dir(), f"{uuid.uuid4().hex}.json")
+        self.done = {}  # относительный путь цели -> (размер, mtime_ns)
+        self.partial = {}  # относительный путь цели -> (байт в .maini-part, размер и mtime_ns источника)
+        self.attempts = 0  # запуски после последней контрольной точки
+        self.errors = []  # ошибки после последней контрольной точки, по порядку
+        self._journal = None
+        self._loaded = False
+
+    @classmethod
+    def load(cls, journal_path):
+        """Job from its journal; a torn last line (crash while appending) is ignored"""
+        with open(journal_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        header = json.loads(lines[0])
+        if header.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"журнал копирования версии {header.get('version')}")
+        job = cls(header["sources"], header["dst_dir"], journal_path)
+        job._loaded = True
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if "done" in record:
+                job.done[record["done"]] = (record["size"], record["mtime_ns"])
+                job.partial.pop(record["done"], None)
+            elif "part" in record:
+                # Записи без размера и mtime источника (старый журнал) продолжены не будут
+                job.partial[record["part"]] = (record["offset"], record.get("src_size"), record.get("src_mtime_ns"))
+            elif "attempt" in record:
+                job.attempts += 1
+                continue
+            elif "error" in record:
+                job.errors.append(record["error"])
+                continue
+            # Задание продвинулось: прежние неудачи больше не в счёт
+            job.attempts = 0
+            job.errors = []
+        return job
+
+    @classmethod
+    def pending(cls):
+        """Unfinished jobs left by earlier runs; jobs running right now (here or elsewhere) are skipped"""
+        jobs = []
+        for name in sorted(os.listdir(journals_dir())):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(journals_dir(), name)
+            try:
+                if _journal_locked(path):
+                    continue
+                jobs.append(cls.load(path))
+            except (OSError, ValueError, KeyError, IndexError):
+                continue
+        return jobs
+
+    def claim(self):
+        """Lock the journal for this process; False if another process runs the job or it has finished.
+
+        The lock is held until run() returns or release() is called.
+        """
+        if self._journal is not None:
+            return True
+        flags = os.O_WRONLY | os.O_APPEND
+        if not self._loaded:
+            flags |= os.O_CREAT
+        try:
+            fd = os.open(self.journal_path, flags, 0o600)
+        except FileNotFoundError:
+            return False  # задание уже завершил другой процесс и удалил журнал
+        journal = os.fdopen(fd, "a", encoding="utf-8")
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # Журнал могли удалить между open() и flock(): блокировка удалённого файла ничего не значит
+            if os.stat(self.journal_path).st_ino != os.fstat(fd).st_ino:
+                raise FileNotFoundError(self.journal_path)
+        except OSError:
+            journal.close()
+            return False
+        self._journal = journal
+        return True
+
+    def release(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def should_auto_resume(self):
+        """False once the job keeps failing without progress; run() by hand still works.
+
+        That is the same error twice in a row, or MAX_AUTO_RESUMES runs since the last checkpoint.
+        """
+        if len(self.errors) >= 2 and self.errors[-1] == self.errors[-2]:
+            return False
+        return self.attempts < MAX_AUTO_RESUMES
+
+    def ready(self):
+        """True if the sources and the target folder are all reachable, e.g. the drive is plugged back"""
+        return os.path.isdir(self.dst_dir) and all(os.path.lexists(src) for src in self.sources)
+
+    def destinations(self):
+        return [os.path.join(self.dst_dir, os.path.basename(os.path.normpath(src))) for src in self.sources]
+
+    def plan(self):
+        """[(src, relative dst, size)] of every file, plus the folders and symlinks to create"""
+        files, dirs, links = [], [], []
+        for src in self.sources:
+            base = os.path.basename(os.path.normpath(src))
+            if not os.path.lexists(src):
+                raise FileNotFoundError(errno.ENOENT, "Нет такого файла или папки", src)
+            if os.path.isfile(src):
+                files.append((src, base, os.path.getsize(src)))
+                continue
+            dirs.append(base)
+            for root, subdirs, names in os.walk(src):
+                rel_root = os.path.join(base, os.path.relpath(root, src)) if root != src else base
+                subdirs.sort()
+                for name in list(subdirs):
+                    path = os.path.join(root, name)
+                    if os.path.islink(path):
+                        links.append((path, os.path.join(rel_root, name)))
+                        subdirs.remove(name)
+                    else:
+                        dirs.append(os.path.join(rel_root, name))
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((path, os.path.join(rel_root, name), os.path.getsize(path)))
+                    except OSError:
+                        continue  # битая ссылка
+        return files, dirs, links
+
+    def _write(self, record, sync=False):
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if sync:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    def _is_done(self, src, rel, size):
+        """True if rel was finished earlier and neither side changed since"""
+        recorded = self.done.get(rel)
+        if recorded is None:
+            return False
+        try:
+            src_st = os.stat(src)
+            dst_st = os.stat(os.path.join(self.dst_dir, rel))
+        except OSError:
+            return False
+        return recorded == (size, src_st.st_mtime_ns) and dst_st.st_size == size and dst_st.st_mtime_ns == src_st.st_mtime_ns
+
+    def run(self, cancel_event=None, progress_callback=None):
+        """Copy everything not yet done; returns the destination paths, or None if cancelled.
+
+        progress_callback(done_bytes, total_bytes) is called after every chunk. On cancel the
+        journal and .maini-part files stay, so the job can be resumed or discarded.
+        """
+        if not self.claim():
+            raise CopyJobBusy(errno.EBUSY, "Это копирование уже выполняется в другом окне", self.journal_path)
+        try:
+            for src in self.sources:
+                if (self.dst_dir + os.sep).startswith(src.rstrip(os.sep) + os.sep):
+                    raise OSError(f"Нельзя скопировать папку в саму себя: {src}")
+            files, dirs, links = self.plan()
+            total = sum(size for _, _, size in files)
+            copied = 0
+
+            def advance(n):
+                nonlocal copied
+                copied += n
+                if progress_callback:
+                    progress_callback(copied, total)
+
+            if os.fstat(self._journal.fileno()).st_size == 0:
+                self._write({"version": JOURNAL_VERSION, "sources": self.sources, "dst_dir": self.dst_dir}, sync=True)
+            self._write({"attempt": int(time.time())}, sync=True)
+            self.attempts += 1
+            for rel in dirs:
+                os.makedirs(os.path.join(self.dst_dir, rel), exist_ok=True)
+            for src, rel in links:
+                dst = os.path.join(self.dst_dir, rel)
+                if not os.path.lexists(dst):
+                    os.symlink(os.readlink(src), dst)
+            unsynced = []  # готовые файлы, которые попадут в журнал на ближайшей контрольной точке
+            last_checkpoint = time.monotonic()
+            for src, rel, size in files:
+                dst = os.path.join(self.dst_dir, rel)
+                if self._is_done(src, rel, size) or os.path.abspath(src) == os.path.abspath(dst):
+                    advance(size)
+                    continue
+                if not self._copy_file(src, dst, rel, self.partial.get(rel), cancel_event, advance):
+                    self._checkpoint(unsynced)
+                    return None
+                unsynced.append((rel, dst))
+                if len(unsynced) >= 256 or time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                    self._checkpoint(unsynced)
+                    unsynced = []
+                    last_checkpoint = time.monotonic()
+            self._checkpoint(unsynced)
+            # Журнал удаляется, пока он ещё заблокирован, чтобы никто не подхватил готовое задание
+            os.remove(self.journal_path)
+        except BaseException as e:
+            # Задание, не успевшее записать даже заголовок, возобновлять нечего
+            if os.fstat(self._journal.fileno()).st_size == 0:
+                os.remove(self.journal_path)
+            elif isinstance(e, Exception):
+                self._record_error(e)
+            raise
+        finally:
+            self.release()
+        return self.destinations()
+
+    def _record_error(self, error):
+        try:
+            self._write({"error": str(error)}, sync=True)
+        except OSError:
+            return  # журнал на том же выдернутом диске: запуск всё равно посчитан
+        self.errors.append(str(error))
+
+    def _checkpoint(self, finished):
+        for rel, dst in finished:
+            _fsync_path(dst)
+        for rel, dst in finished:
+            st = os.stat(dst)
+            self._write({"done": rel, "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+            self.done[rel] = (st.st_size, st.st_mtime_ns)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        if finished:
+            self.attempts, self.errors = 0, []
+
+    def _checkpoint_part(self, fdst, rel, position, src_st):
+        fdst.flush()
+        os.fsync(fdst.fileno())
+        record = {"part": rel, "offset": position, "src_size": src_st.st_size, "src_mtime_ns": src_st.st_mtime_ns}
+        self._write(record, sync=True)
+        self.attempts, self.errors = 0, []
+
+    @staticmethod
+    def _resume_offset(part, partial, src_st):
+        """Offset to continue at, or 0 if the source changed or the part file lost data"""
+        if partial is None:
+            return 0
+        offset, src_size, src_mtime_ns = partial
+        if (src_size, src_mtime_ns) != (src_st.st_size, src_st.st_mtime_ns) or offset > src_st.st_size:
+            return 0
+        try:
+            return offset if os.path.getsize(part) >= offset else 0
+        except OSError:
+            return 0
+
+    def _copy_file(self, src, dst, rel, partial, cancel_event, advance):
+        """Copy src to dst through its .maini-part file; False if cancelled.
+
+        partial is the journaled (offset, source size, source mtime_ns) of an earlier attempt;
+        the copy resumes at offset only if the source still matches and the part file still
+        has that many bytes, otherwise the file starts over. The offset is journaled every
+        CHECKPOINT_BYTES and on cancel, always after an fsync of the data.
+        """
+        part = part_path(dst)
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        with open(src, "rb") as fsrc:
+            src_st = os.fstat(fsrc.fileno())
+            resume = self._resume_offset(part, partial, src_st)
+            with open(part, "r+b" if resume else "wb") as fdst:
+                if resume:
+                    fdst.truncate(resume)
+                    fsrc.seek(resume)
+                    fdst.seek(resume)
+                    advance(resume)
+                position = resume
+                since_checkpoint = 0
+                while True:
+                    shared_io_scheduler.throttle(cancel_event)
+                    if cancel_event is not None and cancel_event.is_set():
+                        self._checkpoint_part(fdst, rel, position, src_st)
+                        return False
+                    n = fsrc.readinto(buffer)
+                    if not n:
+                        break
+                    fdst.write(view[:n])
+                    position += n
+                    since_checkpoint += n
+                    advance(n)
+                    if since_checkpoint >= CHECKPOINT_BYTES:
+                        self._checkpoint_part(fdst, rel, position, src_st)
+                        since_checkpoint = 0
+        shutil.copystat(src, part)
+        os.replace(part, dst)
+        return True
+
+    def discard(self):
+        """Forget the job: remove its journal and partial files; finished files stay.
+
+        Does nothing and returns False while another process runs the job.
+        """
+        if not self.claim():
+            return False
+        try:
+            rels = set(self.partial)
+            try:
+                rels.update(rel for _, rel, _ in self.plan()[0])
+            except OSError:
+                pass  # источник пропал: известны только части из журнала
+            for rel in rels:
+                try:
+                    os.remove(part_path(os.path.join(self.dst_dir, rel)))
+                except OSError:
+                    pass
+            try:
+                os.remove(self.journal_path)
+            except OSError:
+                pass
+        finally:
+            self.release()
+        return True
+
+def _journal_locked(path):
+    """True if some job holds the journal's lock, including a job of this process"""
+    if fcntl is None:
+        return False
+    with open(path, "rb") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+    return False
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,260 @@
+import heapq
+import os
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Анализ занятого места: дерево папок с размерами, которое растёт по мере сканирования.
+# Папки читаются параллельно, а складывает размеры один поток, так что жёсткие ссылки
+# считаются один раз без блокировок на каждом файле.
+
+TOP_FILES = 32  # крупнейшие файлы папки, которые видны на карте; остальные идут одной суммой
+
+# kind: "dir" (node — UsageNode), "file" или "rest" (прочие файлы папки одной суммой)
+UsageEntry = namedtuple("UsageEntry", "name size kind node")
+
+def disk_size(st):
+    """Bytes actually allocated on disk; sparse files count less than their length"""
+    blocks = getattr(st, "st_blocks", None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+class UsageNode:
+    """One scanned folder; size, files and dirs cover the whole subtree"""
+    __slots__ = ("name", "parent", "children", "size", "files", "dirs", "file_bytes", "top_files", "scanned")
+
+    def __init__(self, name, parent=None):
+        self.name = name  # у корня — полный путь
+        self.parent = parent
+        self.children = {}
+        self.size = 0
+        self.files = 0
+        self.dirs = 0
+        self.file_bytes = 0  # файлы прямо в этой папке
+        self.top_files = []  # (size, name), по убыванию
+        self.scanned = False
+
+    @property
+    def path(self):
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return os.path.join(node.name, *reversed(parts))
+
+    def entries(self):
+        """Subfolders, largest files and the rest of the files, largest first"""
+        entries = [UsageEntry(name, child.size, "dir", child) for name, child in self.children.items()]
+        entries.extend(UsageEntry(name, size, "file", None) for size, name in self.top_files)
+        rest = self.file_bytes - sum(size for size, _ in self.top_files)
+        if rest > 0:
+            entries.append(UsageEntry(None, rest, "rest", None))
+        entries.sort(key=lambda e: e.size, reverse=True)
+        return entries
+
+def _scan_dir(path, dev):
+    """([(size, name)] of subdirs, [(size, name, inode key or None)] of files, error count); runs in a pool thread"""
+    subdirs, files, errors = [], [], 0
+    try:
+        it = os.scandir(path)
+    except OSError:
+        return subdirs, files, 1
+    with it:
+        for entry in it:
+            try:
+                st = entry.stat(follow_symlinks=False)
+                if entry.is_dir(follow_symlinks=False):
+                    # Другие файловые системы (/proc, подключённые диски) не сканируем, как du -x
+                    if dev is None or st.st_dev == dev:
+                        subdirs.append((disk_size(st), entry.name))
+                    continue
+            except OSError:
+                errors += 1
+                continue
+            key = (st.st_dev, st.st_ino) if st.st_nlink > 1 else None
+            files.append((disk_size(st), entry.name, key))
+    return subdirs, files, errors
+
+class DiskUsageScan:
+    """Parallel scan of a folder tree into UsageNodes.
+
+    run() blocks; while it runs, other threads may read the tree under self.lock, and
+    progress_callback(root) is called every interval seconds so a view can redraw.
+    """
+
+    def __init__(self, root, max_workers=None, one_filesystem=True):
+        self.root = UsageNode(os.path.abspath(root))
+        self.root.size = disk_size(os.stat(self.root.name))
+        self.max_workers = max_workers or min(16, (os.cpu_count() or 1) * 4)
+        self.one_filesystem = one_filesystem
+        self.lock = threading.Lock()
+        self.errors = 0
+        self.finished = False
+        self.finished_at = None
+        self._seen_inodes = set()
+        self._outstanding = 0
+        self._done = None
+
+    def _add(self, node, subdirs, files, errors):
+        """Attach one folder's results to the tree and add its totals to every ancestor"""
+        with self.lock:
+            own_bytes = 0
+            kept = []
+            for size, name, key in files:
+                if key is not None:
+                    if key in self._seen_inodes:
+                        continue
+                    self._seen_inodes.add(key)
+                own_bytes += size
+                kept.append((size, name))
+            self.errors += errors
+            node.file_bytes = own_bytes
+            node.top_files = heapq.nlargest(TOP_FILES, kept)
+            node.scanned = True
+            children = []
+            for size, name in subdirs:
+                # Место под саму папку (её записи каталога) считается внутри неё
+                child = node.children[name] = UsageNode(name, node)
+                child.size = size
+                own_bytes += size
+                children.append(child)
+            # Итоги сразу поднимаются до корня, так что частичное дерево всегда согласовано
+            up = node
+            while up is not None:
+                up.size += own_bytes
+                up.files += len(files)
+                up.dirs += len(children)
+                up = up.parent
+            self._outstanding += len(children) - 1
+            if not self._outstanding:
+                self._done.set()
+        return children
+
+    def _visit(self, executor, path, node, dev, cancel_event):
+        if cancel_event is not None and cancel_event.is_set():
+            children = self._add(node, (), (), 0)
+        else:
+            try:
+                results = _scan_dir(path, dev)
+            except Exception:
+                results = ((), (), 1)  # папка всё равно должна уменьшить счётчик, иначе run() не закончится
+            children = self._add(node, *results)
+        # Каждый поток сам дописывает свою папку в дерево и ставит в очередь подпапки:
+        # без передачи результатов в один поток на каждую папку
+        for child in children:
+            executor.submit(self._visit, executor, os.path.join(path, child.name), child, dev, cancel_event)
+
+    def run(self, cancel_event=None, progress_callback=None, interval=0.2):
+        """Scan the whole tree; returns the root node, or None if cancelled"""
+        root = self.root
+        dev = os.stat(root.name).st_dev if self.one_filesystem else None
+        self._outstanding = 1
+        self._done = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            executor.submit(self._visit, executor, root.name, root, dev, cancel_event)
+            while not self._done.wait(interval):
+                if progress_callback:
+                    progress_callback(root)
+        self._seen_inodes.clear()
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        self.finished = True
+        self.finished_at = time.time()
+        return root
+
+    def find(self, path):
+        """Node of path inside this tree, or None"""
+        rel = os.path.relpath(os.path.abspath(path), self.root.name)
+        if rel == os.curdir:
+            return self.root
+        if rel.startswith(os.pardir):
+            return None
+        node = self.root
+        with self.lock:
+            for part in rel.split(os.sep):
+                node = node.children.get(part)
+                if node is None:
+                    return None
+        return node
+
+class DiskUsageCache:
+    """Finished scans kept for the session; any folder inside one opens without rescanning"""
+
+    def __init__(self, max_scans=8):
+        self.max_scans = max_scans
+        self._scans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, scan):
+        with self._lock:
+            self._scans[scan.root.name] = scan
+            self._scans.move_to_end(scan.root.name)
+            while len(self._scans) > self.max_scans:
+                self._scans.popitem(last=False)
+
+    def find(self, path):
+        """(scan, node) of the most recent finished scan containing path, or (None, None)"""
+        with self._lock:
+            scans = list(reversed(self._scans.values()))
+        for scan in scans:
+            node = scan.find(path)
+            if node is not None:
+                return scan, node
+        return None, None
+
+    def invalidate(self, path):
+        """Forget scans that contain path or lie inside it"""
+        path = os.path.abspath(path)
+        with self._lock:
+            for root in list(self._scans):
+                if root == path or path.startswith(root.rstrip(os.sep) + os.sep) or root.startswith(path.rstrip(os.sep) + os.sep):
+                    del self._scans[root]
+
+def squarify(sizes, x, y, width, height):
+    """Squarified treemap: one (x, y, w, h) per size, for sizes sorted largest first.
+
+    Rows are laid along the shorter side and grown while that keeps the worst aspect
+    ratio from getting worse (Bruls, Huizing, van Wijk).
+    """
+    rects = []
+    sizes = [s for s in sizes]
+    total = float(sum(sizes))
+    if total <= 0 or width <= 0 or height <= 0:
+        return [(x, y, 0, 0) for _ in sizes]
+    scale = width * height / total
+    areas = [s * scale for s in sizes]
+    i = 0
+    while i < len(areas):
+        side = min(width, height)
+        row = [areas[i]]
+        i += 1
+        while i < len(areas) and _worst(row + [areas[i]], side) <= _worst(row, side):
+            row.append(areas[i])
+            i += 1
+        row_area = sum(row)
+        thickness = row_area / side if side else 0
+        offset = 0.0
+        for area in row:
+            length = area / thickness if thickness else 0
+            if width >= height:
+                rects.append((x, y + offset, thickness, length))
+            else:
+                rects.append((x + offset, y, length, thickness))
+            offset += length
+        if width >= height:
+            x += thickness
+            width -= thickness
+        else:
+            y += thickness
+            height -= thickness
+    return rects
+
+def _worst(row, side):
+    total = sum(row)
+    if total <= 0 or side <= 0:
+        return float("inf")
+    largest, smallest = max(row), min(row)
+    if smallest <= 0:
+        return float("inf")
+    return max(side * side * largest / (total * total), total * total / (side * side * smallest))
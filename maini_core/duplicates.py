@@ -0,0 +1,243 @@
+import hashlib
+import itertools
+import json
+import os
+import stat
+import threading
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .paths import get_cache_dir
+
+# Поиск дубликатов в три этапа: размер -> начало и конец файла -> полный хэш.
+# На каждый следующий этап попадают только файлы, у которых совпало всё предыдущее.
+
+DuplicateGroup = namedtuple("DuplicateGroup", "size digest paths")
+
+PARTIAL_BLOCK = 64 * 1024
+HASH_CHUNK = 1024 * 1024
+
+class HashCache:
+    """Digests persisted between runs, keyed by (dev, inode, size, mtime_ns).
+
+    A file that was modified gets a new key, so stale entries are never hit; they are
+    dropped least-recently-used first once the cache grows past max_entries.
+    """
+
+    def __init__(self, path=None, max_entries=200000):
+        self.path = path or os.path.join(get_cache_dir(), "hashes.json")
+        self.max_entries = max_entries
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(st, kind):
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{kind}"
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, st, kind):
+        with self._lock:
+            self._load()
+            key = self._key(st, kind)
+            digest = self._entries.pop(key, None)
+            if digest is not None:
+                # Попадание переносит запись в конец: save() вытесняет записи с начала
+                self._entries[key] = digest
+                self._dirty = True
+            return digest
+
+    def put(self, st, kind, digest):
+        with self._lock:
+            self._load()
+            self._entries[self._key(st, kind)] = digest
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            excess = len(self._entries) - self.max_entries
+            if excess > 0:
+                for key in list(itertools.islice(self._entries, excess)):
+                    del self._entries[key]
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError:
+                pass
+
+def partial_digest(path, size):
+    """Hash of the first and last PARTIAL_BLOCK bytes; for small files this is the whole file"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        h.update(f.read(PARTIAL_BLOCK))
+        if size > PARTIAL_BLOCK:
+            f.seek(max(PARTIAL_BLOCK, size - PARTIAL_BLOCK))
+            h.update(f.read(PARTIAL_BLOCK))
+    return h.hexdigest()
+
+def full_digest(path, cancel_event=None):
+    h = hashlib.blake2b(digest_size=20)
+    buf = bytearray(HASH_CHUNK)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+class DuplicateFinder:
+    """Find files with identical contents under roots; cancel() stops it from any thread.
+
+    progress_callback(stage, done, total) reports "scan", "partial" and "full" stages;
+    on_group(DuplicateGroup) is called as soon as each group is confirmed by full hashes.
+    Hardlinks to the same inode are one file, not duplicates.
+    """
+
+    def __init__(self, roots, min_size=1, show_hidden=False, workers=None, cache=None):
+        self.roots = [roots] if isinstance(roots, str) else list(roots)
+        self.min_size = max(1, min_size)
+        self.show_hidden = show_hidden
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self.cache = cache
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _walk(self, progress_callback):
+        by_size = defaultdict(list)
+        seen = set()
+        stack = list(self.roots)
+        count = 0
+        while stack and not self.cancelled:
+            current = stack.pop()
+            try:
+                it = os.scandir(current)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if not self.show_hidden and entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not stat.S_ISREG(st.st_mode) or st.st_size < self.min_size:
+                        continue
+                    if (st.st_dev, st.st_ino) in seen:
+                        continue
+                    seen.add((st.st_dev, st.st_ino))
+                    by_size[st.st_size].append((entry.path, st))
+                    count += 1
+                    if progress_callback and count % 1000 == 0:
+                        progress_callback("scan", count, 0)
+        if progress_callback:
+            progress_callback("scan", count, count)
+        return [files for files in by_size.values() if len(files) > 1]
+
+    def _digest(self, path, st, kind):
+        if self.cache is not None:
+            cached = self.cache.get(st, kind)
+            if cached is not None:
+                return cached
+        try:
+            if kind == "partial":
+                digest = partial_digest(path, st.st_size)
+            else:
+                digest = full_digest(path, self._cancelled)
+        except OSError:
+            return None
+        if digest is not None and self.cache is not None:
+            self.cache.put(st, kind, digest)
+        return digest
+
+    def _hash_stage(self, executor, candidates, kind, progress_callback, on_done=None):
+        """Hash every file of every candidate group and split the groups by digest.
+
+        on_done(groups) is called once per candidate group as soon as all of its files are hashed.
+        """
+        total = sum(len(files) for files in candidates)
+        done = 0
+        result = []
+        remaining = {}
+        buckets = {}
+        futures = {}
+        for gi, files in enumerate(candidates):
+            remaining[gi] = len(files)
+            buckets[gi] = defaultdict(list)
+            for path, st in files:
+                futures[executor.submit(self._digest, path, st, kind)] = (gi, path, st)
+        for future in as_completed(futures):
+            if self.cancelled:
+                break
+            gi, path, st = futures[future]
+            digest = future.result()
+            if digest is not None:
+                buckets[gi][digest].append((path, st))
+            done += 1
+            if progress_callback and (done % 64 == 0 or done == total):
+                progress_callback(kind, done, total)
+            remaining[gi] -= 1
+            if remaining[gi] == 0:
+                split = [(digest, files) for digest, files in buckets.pop(gi).items() if len(files) > 1]
+                result.extend(split)
+                if on_done:
+                    on_done(split)
+        if self.cancelled:
+            for future in futures:
+                future.cancel()
+        return result
+
+    def run(self, on_group=None, progress_callback=None):
+        """Return the list of DuplicateGroups, largest files first"""
+        groups = []
+
+        def confirm(split):
+            for digest, files in split:
+                group = DuplicateGroup(files[0][1].st_size, digest, sorted(path for path, st in files))
+                groups.append(group)
+                if on_group and not self.cancelled:
+                    on_group(group)
+
+        try:
+            by_size = self._walk(progress_callback)
+            # Крупные файлы первыми: они дают больше освобождаемого места
+            by_size.sort(key=lambda files: files[0][1].st_size, reverse=True)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # Файлы не длиннее двух блоков частичный хэш покрывает целиком
+                small = [files for files in by_size if files[0][1].st_size <= 2 * PARTIAL_BLOCK]
+                large = [files for files in by_size if files[0][1].st_size > 2 * PARTIAL_BLOCK]
+                partial = self._hash_stage(executor, large, "partial", progress_callback)
+                if not self.cancelled:
+                    self._hash_stage(executor, [files for _, files in partial], "full", progress_callback, confirm)
+                if not self.cancelled:
+                    self._hash_stage(executor, small, "partial", progress_callback, confirm)
+        finally:
+            if self.cache is not None:
+                self.cache.save()
+        groups.sort(key=lambda g: g.size, reverse=True)
+        return groups
@@ -0,0 +1,210 @@
+import errno
+import itertools
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .ioscheduler import shared_io_scheduler
+from .paths import get_state_dir
+
+def remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def copy_into(src, dst_dir):
+    """Copy src into dst_dir, merging into an existing folder; returns the destination path"""
+    if not os.path.exists(src):
+        from .archives import split_archive_path, shared_archive_cache
+        if split_archive_path(src) is not None:
+            return shared_archive_cache.extract(src, dst_dir)
+    dst = os.path.join(dst_dir, os.path.basename(os.path.normpath(src)))
+    # Пропускать, если src и dst — один и тот же файл
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return dst
+    try:
+        if os.path.isdir(src):
+            shutil.copytree(src, dst, dirs_exist_ok=True)
+        else:
+            shutil.copy2(src, dst)
+    except shutil.SameFileError:
+        pass
+    return dst
+
+def move_into(src, dst_dir):
+    dst = os.path.join(dst_dir, os.path.basename(os.path.normpath(src)))
+    if os.path.abspath(src) != os.path.abspath(dst):
+        shutil.move(src, dst)
+    return dst
+
+# Мгновенное удаление: цель сначала переименовывается в скрытый "tombstone" в той же
+# папке (исчезает из вида сразу), а само удаление идёт в фоне. Журнал tombstone'ов
+# позволяет дочистить их после падения.
+TOMBSTONE_PREFIX = ".maini-tombstone-"
+_tombstone_lock = threading.Lock()
+
+def _tombstone_journal_path():
+    return os.path.join(get_state_dir(), "tombstones")
+
+def _journal_tombstone(line):
+    with _tombstone_lock:
+        with open(_tombstone_journal_path(), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def is_tombstone(name):
+    return name.startswith(TOMBSTONE_PREFIX)
+
+def make_tombstone(path):
+    """Rename path to a hidden tombstone next to it and return the tombstone path"""
+    parent = os.path.dirname(os.path.abspath(path))
+    tombstone = os.path.join(parent, f"{TOMBSTONE_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}")
+    # Пишем в журнал до rename: после падения отсутствующий tombstone просто пропускается
+    _journal_tombstone("+" + tombstone)
+    os.rename(path, tombstone)
+    return tombstone
+
+class RemovalError(OSError):
+    """Some entries of a tree could not be removed; failures is [(path, OSError)]"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{path}: {error.strerror or error}" for path, error in failures[:5]]
+        if len(failures) > 5:
+            lines.append(f"и ещё {len(failures) - 5}")
+        super().__init__(f"Не удалось удалить элементов: {len(failures)}\n" + "\n".join(lines))
+
+def _unlink_dir_contents(path, failures):
+    """Unlink all non-directories in path relative to its dir fd; return subdirectory paths.
+
+    Entries that cannot be removed are appended to failures as (path, OSError) and skipped.
+    """
+    subdirs = []
+    shared_io_scheduler.throttle()
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY | getattr(os, "O_NOFOLLOW", 0))
+    except FileNotFoundError:
+        return subdirs
+    except OSError as e:
+        failures.append((path, e))
+        return subdirs
+    try:
+        with os.scandir(fd) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(os.path.join(path, entry.name))
+                    else:
+                        os.unlink(entry.name, dir_fd=fd)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    # Занятый или защищённый файл не останавливает удаление остального дерева
+                    failures.append((os.path.join(path, entry.name), e))
+    except OSError as e:
+        failures.append((path, e))
+    finally:
+        os.close(fd)
+    return subdirs
+
+def remove_tree_parallel(path, max_workers=None):
+    """Remove path, traversing directory levels in parallel with unlinkat-style calls.
+
+    Returns [(path, OSError)] for the entries that could not be removed; everything else is
+    gone. An empty list means the whole tree was removed.
+    """
+    failures = []
+    if not os.path.isdir(path) or os.path.islink(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            failures.append((path, e))
+        return failures
+    if os.unlink not in os.supports_dir_fd or not hasattr(os, "O_DIRECTORY"):
+        shutil.rmtree(path, onerror=lambda func, failed, exc_info: failures.append((failed, exc_info[1])))
+        return failures
+    max_workers = max_workers or min(8, (os.cpu_count() or 1) * 2)
+    levels = [[path]]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Файлы удаляются параллельно по уровням дерева, каталоги — потом снизу вверх
+        while levels[-1]:
+            next_level = []
+            for subdirs in executor.map(_unlink_dir_contents, levels[-1], itertools.repeat(failures)):
+                next_level.extend(subdirs)
+            levels.append(next_level)
+    failed_paths = [failed for failed, _ in failures]
+    for level in reversed(levels):
+        for directory in level:
+            try:
+                os.rmdir(directory)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Папка с неудалённым содержимым не пуста — об этом уже сказано выше
+                prefix = directory + os.sep
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST) or not any(f.startswith(prefix) for f in failed_paths):
+                    failures.append((directory, e))
+                    failed_paths.append(directory)
+    return failures
+
+def remove_tombstone(tombstone):
+    """Remove a tombstone tree; raises RemovalError and keeps the journal entry if anything is left"""
+    failures = remove_tree_parallel(tombstone)
+    if failures:
+        # Запись в журнале остаётся: recover_tombstones() попробует ещё раз после перезапуска
+        raise RemovalError(failures)
+    _journal_tombstone("-" + tombstone)
+    return tombstone
+
+def tombstone_owner_alive(name):
+    """True if the process that created this tombstone is still running"""
+    try:
+        pid = int(name[len(TOMBSTONE_PREFIX):].split("-", 1)[0])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+def recover_tombstones():
+    """Finish deletions left over by a crash and compact the journal; returns removed paths"""
+    journal = _tombstone_journal_path()
+    pending = []
+    with _tombstone_lock:
+        try:
+            with open(journal, encoding="utf-8") as f:
+                for line in f:
+                    line = line.rstrip("\n")
+                    if line.startswith("+"):
+                        pending.append(line[1:])
+                    elif line.startswith("-") and line[1:] in pending:
+                        pending.remove(line[1:])
+        except FileNotFoundError:
+            return []
+        stale = [t for t in pending if not tombstone_owner_alive(os.path.basename(t))]
+        alive = [t for t in pending if t not in stale]
+        with open(journal, "w", encoding="utf-8") as f:
+            f.writelines("+" + t + "\n" for t in alive + stale)
+    removed = []
+    for tombstone in stale:
+        if os.path.lexists(tombstone):
+            try:
+                remove_tombstone(tombstone)
+            except RemovalError:
+                continue  # остаётся в журнале до следующей попытки
+            removed.append(tombstone)
+        else:
+            _journal_tombstone("-" + tombstone)
+    return removed
@@ -0,0 +1,222 @@
+import mimetypes
+import os
+import threading
+from collections import namedtuple, OrderedDict
+
+from .search import is_binary_sample
+
+# Определение типа файла: сначала по расширению, а для файлов без расширения
+# или с ничего не говорящим (.bin, .dat) — по первым байтам содержимого.
+
+FileType = namedtuple("FileType", "mime category source")  # source: "ext" или "magic"
+
+SNIFF_SIZE = 512
+
+# Расширения, по которым тип угадать нельзя: такие файлы проверяются по содержимому
+AMBIGUOUS_SUFFIXES = {"", ".bin", ".dat", ".tmp", ".part", ".download", ".crdownload", ".bak", ".old", ".data", ".raw"}
+
+# (смещение, сигнатура, mime) — проверяются по порядку. Двухбайтовые BM и MZ сюда
+# не входят: с них начинается и обычный текст, поэтому они проверяются по заголовку
+MAGIC_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"\x00\x00\x01\x00", "image/x-icon"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (0, b"BZh", "application/x-bzip2"),
+    (0, b"\xfd7zXZ\x00", "application/x-xz"),
+    (0, b"\x28\xb5\x2f\xfd", "application/zstd"),
+    (0, b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (0, b"Rar!\x1a\x07", "application/vnd.rar"),
+    (257, b"ustar", "application/x-tar"),
+    (0, b"\x7fELF", "application/x-executable"),
+    (0, b"#!", "text/x-script"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"\x1aE\xdf\xa3", "video/x-matroska"),
+    (0, b"SQLite format 3\x00", "application/vnd.sqlite3"),
+)
+
+ARCHIVE_MIMES = {
+    "application/zip", "application/gzip", "application/x-bzip2", "application/x-xz", "application/zstd",
+    "application/x-7z-compressed", "application/vnd.rar", "application/x-tar", "application/x-compressed-tar",
+    "application/x-brotli", "application/java-archive",
+}
+DOCUMENT_MIMES = {"application/pdf", "application/msword", "application/rtf", "application/epub+zip"}
+EXECUTABLE_MIMES = {"application/x-executable", "application/x-msdownload", "application/x-sharedlib"}
+# Сжатые файлы mimetypes описывает через encoding, а не через mime
+ENCODING_MIMES = {"gzip": "application/gzip", "bzip2": "application/x-bzip2", "xz": "application/x-xz", "br": "application/x-brotli"}
+
+CATEGORY_NAMES = {
+    "folder": "Папка", "image": "Изображение", "video": "Видео", "audio": "Аудио", "text": "Текст",
+    "archive": "Архив", "document": "Документ", "executable": "Программа", "other": "Файл",
+}
+
+def mime_category(mime):
+    if mime is None:
+        return "other"
+    major = mime.split("/", 1)[0]
+    if major in ("image", "video", "audio", "text"):
+        return major
+    if mime in ARCHIVE_MIMES:
+        return "archive"
+    if mime in DOCUMENT_MIMES or mime.startswith("application/vnd.openxmlformats") or mime.startswith("application/vnd.oasis"):
+        return "document"
+    if mime in EXECUTABLE_MIMES:
+        return "executable"
+    if mime in ("application/json", "application/xml", "application/javascript", "application/x-sh"):
+        return "text"
+    return "other"
+
+BMP_DIB_HEADER_SIZES = {12, 40, 52, 56, 64, 108, 124}
+
+def is_bmp_header(data, size=None):
+    """BM followed by a consistent file header and a known DIB header size at offset 14"""
+    if len(data) < 18 or data[:2] != b"BM" or data[6:10] != b"\0\0\0\0":
+        return False
+    dib_size = int.from_bytes(data[14:18], "little")
+    if dib_size not in BMP_DIB_HEADER_SIZES or int.from_bytes(data[10:14], "little") < 14 + dib_size:
+        return False
+    # Поле размера файла некоторые программы оставляют нулевым
+    file_size = int.from_bytes(data[2:6], "little")
+    return size is None or file_size in (0, size)
+
+def is_pe_header(data):
+    """MZ whose e_lfanew points at a PE\\0\\0 signature"""
+    if len(data) < 64 or data[:2] != b"MZ":
+        return False
+    pe_offset = int.from_bytes(data[60:64], "little")
+    if pe_offset < 64:
+        return False
+    if pe_offset + 4 <= len(data):
+        return data[pe_offset:pe_offset + 4] == b"PE\0\0"
+    # Заголовок PE за пределами прочитанного: настоящая DOS-заглушка не бывает текстом
+    return is_binary_sample(data)
+
+def sniff_type(data, size=None):
+    """FileType from the first bytes of a file; size is the whole file's size, if known"""
+    for offset, signature, mime in MAGIC_SIGNATURES:
+        if data[offset:offset + len(signature)] == signature:
+            return FileType(mime, mime_category(mime), "magic")
+    if is_bmp_header(data, size):
+        return FileType("image/bmp", "image", "magic")
+    if is_pe_header(data):
+        return FileType("application/x-msdownload", "executable", "magic")
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return FileType("image/webp", "image", "magic")
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return FileType("audio/wav", "audio", "magic")
+    if data[4:8] == b"ftyp":
+        brand = data[8:12]
+        mime = "image/heic" if brand in (b"heic", b"heix", b"mif1") else "video/mp4"
+        return FileType(mime, mime_category(mime), "magic")
+    if data and not is_binary_sample(data):
+        return FileType("text/plain", "text", "magic")
+    return FileType("application/octet-stream", "other", "magic")
+
+def describe_type(file_type, name=None):
+    """Short label for the "Type" column, e.g. "Изображение PNG"; the suffix of name wins over the mime"""
+    if file_type is None:
+        return CATEGORY_NAMES["other"]
+    label = CATEGORY_NAMES.get(file_type.category, CATEGORY_NAMES["other"])
+    suffix = os.path.splitext(name)[1][1:] if name and file_type.source == "ext" else ""
+    if not suffix and file_type.mime:
+        suffix = file_type.mime.split("/", 1)[1].rsplit(".", 1)[-1]
+        if suffix.startswith("x-"):
+            suffix = suffix[2:]
+        if suffix in ("plain", "octet-stream", "executable", "script"):
+            suffix = ""
+    return f"{label} {suffix.upper()}" if suffix and file_type.category != "folder" else label
+
+class TypeCache:
+    """File types by extension, falling back to magic bytes; safe to share between threads.
+
+    Extension results are memoized per suffix and need no I/O. Sniffed results are keyed by
+    path and validated against (mtime, size), so a replaced file is sniffed again.
+    """
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._by_suffix = {}
+        self._sniffed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def from_extension(self, name):
+        """FileType from the name alone, or None when the extension says nothing"""
+        suffix = os.path.splitext(name)[1].lower()
+        if suffix in AMBIGUOUS_SUFFIXES:
+            return None
+        cached = self._by_suffix.get(suffix)
+        if cached is None:
+            mime, encoding = mimetypes.guess_type("x" + suffix)
+            mime = mime or ENCODING_MIMES.get(encoding)
+            if mime is None:
+                return None
+            cached = self._by_suffix[suffix] = FileType(mime, mime_category(mime), "ext")
+        return cached
+
+    def lookup(self, path):
+        """Known type without reading the file; None means it still has to be sniffed"""
+        file_type = self.from_extension(path)
+        if file_type is not None:
+            return file_type
+        with self._lock:
+            cached = self._sniffed.get(path)
+        if cached is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return cached[1] if cached[0] == (st.st_mtime_ns, st.st_size) else None
+
+    def needs_sniff(self, path):
+        return self.lookup(path) is None
+
+    def detect(self, path):
+        """Type of path, reading its first bytes if the name is not enough"""
+        file_type = self.lookup(path)
+        if file_type is not None:
+            return file_type
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            file_type = sniff_type(f.read(SNIFF_SIZE), st.st_size)
+        with self._lock:
+            self._sniffed[path] = ((st.st_mtime_ns, st.st_size), file_type)
+            self._sniffed.move_to_end(path)
+            while len(self._sniffed) > self.max_entries:
+                self._sniffed.popitem(last=False)
+        return file_type
+
+    def detect_many(self, paths, cancel_event=None):
+        """Sniff the paths that need it; returns {path: FileType} for the newly detected ones"""
+        found = {}
+        for path in paths:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if not self.needs_sniff(path):
+                continue
+            try:
+                found[path] = self.detect(path)
+            except OSError:
+                continue
+        return found
+
+    def sort_key(self, path, is_dir=False):
+        """Key for sorting by type: folders first, then by category, mime and name"""
+        name = os.path.basename(path).lower()
+        if is_dir:
+            return (0, "", "", name)
+        file_type = self.lookup(path)
+        if file_type is None:
+            return (1, "other", "", name)
+        return (1, file_type.category, file_type.mime, name)
+
+# Общий кэш типов для иконок, миниатюр и сортировки
+shared_type_cache = TypeCache()
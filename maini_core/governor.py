@@ -0,0 +1,90 @@
+import time
+from collections import deque, namedtuple
+
+# Качество отрисовки по измеренным задержкам. На удалённом рабочем столе или в виртуалке
+# без ускорения анимации и сглаженное масштабирование стоят дороже самого содержимого:
+# если кадры и цикл событий не укладываются в бюджет, качество снижается по ступеням,
+# а после нескольких секунд без промахов возвращается обратно.
+
+# animations — анимации щелчка и перехода между папками; smooth_scaling — сглаженное
+# масштабирование картинок; thumbnail_scale — доля разрешения, в котором декодируются миниатюры
+Quality = namedtuple("Quality", "animations smooth_scaling thumbnail_scale")
+
+# Ступени от полного качества вниз: сначала отключаются анимации, потом сглаживание,
+# в конце миниатюры декодируются вдвое меньше
+QUALITY_LEVELS = (
+    Quality(True, True, 1.0),
+    Quality(False, True, 1.0),
+    Quality(False, False, 1.0),
+    Quality(False, False, 0.5),
+)
+
+FRAME_BUDGET = 1 / 30  # отрисовка окна дольше этого — меньше 30 кадров в секунду
+LATENCY_BUDGET = 0.05  # опоздание таймера цикла событий, которое уже заметно на глаз
+
+class RenderGovernor:
+    """Picks a quality level from measured frame times and event-loop latency.
+
+    Feed it with record_frame() and record_latency(). When at least degrade_ratio of the
+    last window samples missed their budget, quality drops one level (at most once per
+    cooldown seconds); after recover_seconds without a miss it rises one level.
+    on_change(quality) is called on every level change.
+    """
+
+    def __init__(self, frame_budget=FRAME_BUDGET, latency_budget=LATENCY_BUDGET, window=20, degrade_ratio=0.3,
+                 cooldown=1.0, recover_seconds=5.0, on_change=None, clock=time.monotonic):
+        self.frame_budget = frame_budget
+        self.latency_budget = latency_budget
+        self.degrade_ratio = degrade_ratio
+        self.cooldown = cooldown
+        self.recover_seconds = recover_seconds
+        self.on_change = on_change
+        self.clock = clock
+        self.level = 0
+        self.misses = 0
+        self.last_frame = 0.0
+        self.last_latency = 0.0
+        self._window = deque(maxlen=window)  # True — промах бюджета
+        self._last_miss = self._last_change = clock()
+
+    @property
+    def quality(self):
+        return QUALITY_LEVELS[self.level]
+
+    @property
+    def degraded(self):
+        return self.level > 0
+
+    def record_frame(self, seconds):
+        self.last_frame = seconds
+        self._record(seconds > self.frame_budget)
+
+    def record_latency(self, seconds):
+        self.last_latency = seconds
+        self._record(seconds > self.latency_budget)
+
+    def _record(self, missed):
+        now = self.clock()
+        self._window.append(missed)
+        if missed:
+            self.misses += 1
+            self._last_miss = now
+        if now - self._last_change < self.cooldown:
+            return
+        # Решение по доле промахов в окне, а не по одному кадру: разовый тормоз
+        # (сборка мусора, большая папка) качество не роняет
+        full = len(self._window) == self._window.maxlen
+        if full and sum(self._window) >= self.degrade_ratio * len(self._window) and self.level < len(QUALITY_LEVELS) - 1:
+            self._set_level(self.level + 1, now)
+        elif self.level > 0 and now - self._last_miss >= self.recover_seconds and now - self._last_change >= self.recover_seconds:
+            self._set_level(self.level - 1, now)
+
+    def _set_level(self, level, now):
+        self.level = level
+        self._last_change = now
+        self._window.clear()
+        if self.on_change:
+            self.on_change(self.quality)
+
+# Общий для графического клиента: его читают кэш миниатюр, предпросмотр и анимации
+shared_render_governor = RenderGovernor()
@@ -0,0 +1,129 @@
+import ctypes
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Приоритеты ввода-вывода: листинг, который ждёт пользователь, не должен стоять в очереди
+# диска за копированием на десятки гигабайт. Классы — от важного к фоновому; числа
+# совпадают с приоритетами QThreadPool (больше — раньше из очереди).
+#
+# Фоновые задачи делают две вещи: переводят свой поток в класс idle ядра (ioprio_set,
+# только Linux), и между порциями работы вызывают throttle(), который придерживает их,
+# пока пользователь ходит по папкам.
+
+IO_INTERACTIVE = 3  # листинг открываемой папки, автодополнение, предпросмотр
+IO_THUMBNAIL = 2  # миниатюры и распознавание типов видимых файлов
+IO_PREFETCH = 1  # фоновое перечитывание, сканирование, поиск
+IO_BULK = 0  # копирование, синхронизация, удаление, сжатие
+
+IO_CLASS_NAMES = {IO_INTERACTIVE: "interactive", IO_THUMBNAIL: "thumbnail", IO_PREFETCH: "prefetch", IO_BULK: "bulk"}
+
+# linux/ioprio.h
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_NONE, _IOPRIO_CLASS_BE, _IOPRIO_CLASS_IDLE = 0, 2, 3
+_IOPRIO_CLASS_SHIFT = 13
+# Номер системного вызова ioprio_set по архитектурам; на остальных приоритеты просто не ставятся
+_SYS_IOPRIO_SET = {"x86_64": 251, "amd64": 251, "i386": 289, "i686": 289, "aarch64": 30, "arm64": 30,
+                   "riscv64": 30, "armv7l": 314, "armv6l": 314, "ppc64le": 273, "ppc64": 273, "s390x": 282}
+# Класс задачи -> (класс ядра, уровень 0..7 внутри best-effort)
+_KERNEL_IOPRIO = {
+    IO_INTERACTIVE: (_IOPRIO_CLASS_BE, 0),
+    IO_THUMBNAIL: (_IOPRIO_CLASS_BE, 4),
+    IO_PREFETCH: (_IOPRIO_CLASS_BE, 7),
+    IO_BULK: (_IOPRIO_CLASS_IDLE, 0),
+    None: (_IOPRIO_CLASS_NONE, 0),  # по умолчанию: приоритет выводится из nice
+}
+
+_libc = None
+_ioprio_supported = sys.platform.startswith("linux") and platform.machine() in _SYS_IOPRIO_SET
+
+def set_io_priority(io_class):
+    """Set the kernel I/O priority of the calling thread; False where not supported.
+
+    None restores the default, which matters for pool threads that run tasks of
+    different classes one after another.
+    """
+    global _libc, _ioprio_supported
+    if not _ioprio_supported:
+        return False
+    if _libc is None:
+        try:
+            _libc = ctypes.CDLL(None, use_errno=True)
+        except OSError:
+            _ioprio_supported = False
+            return False
+    kernel_class, level = _KERNEL_IOPRIO[io_class]
+    value = (kernel_class << _IOPRIO_CLASS_SHIFT) | level
+    # who = 0 — вызывающий поток (в Linux ioprio задаётся на поток, а не на процесс)
+    result = _libc.syscall(_SYS_IOPRIO_SET[platform.machine()], _IOPRIO_WHO_PROCESS, 0, value)
+    if result != 0 and ctypes.get_errno() == getattr(os, "ENOSYS", 38):
+        _ioprio_supported = False
+    return result == 0
+
+class IOScheduler:
+    """Shared gate between interactive I/O and bulk jobs.
+
+    Interactive code wraps its blocking I/O in interactive() or calls note_interactive()
+    on navigation; bulk loops call throttle() between chunks and are held back while
+    the user is active, up to max_pause seconds per call so a job never stalls for good.
+    """
+
+    def __init__(self, quiet=0.5, max_pause=5.0):
+        self.quiet = quiet  # сколько секунд после последнего действия пользователя фон ещё ждёт
+        self.max_pause = max_pause
+        self._condition = threading.Condition()
+        self._active = 0
+        self._last_interactive = 0.0
+        self.paused_seconds = 0.0  # сколько всего простояли фоновые задачи, для отладки
+
+    def note_interactive(self):
+        with self._condition:
+            self._last_interactive = time.monotonic()
+
+    @contextmanager
+    def interactive(self):
+        with self._condition:
+            self._active += 1
+            self._last_interactive = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._last_interactive = time.monotonic()
+                self._condition.notify_all()
+
+    def busy(self):
+        with self._condition:
+            return self._busy_locked(time.monotonic())
+
+    def _busy_locked(self, now):
+        return self._active > 0 or now - self._last_interactive < self.quiet
+
+    def throttle(self, cancel_event=None):
+        """Block a bulk job while interactive I/O is running or was just done"""
+        start = time.monotonic()
+        with self._condition:
+            now = start
+            while self._busy_locked(now) and now - start < self.max_pause:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                # Ждём конца интерактивной операции или тишины; короткий шаг — чтобы заметить отмену
+                wait = self.quiet if self._active else self._last_interactive + self.quiet - now
+                self._condition.wait(min(max(wait, 0.01), 0.1))
+                now = time.monotonic()
+            self.paused_seconds += now - start
+
+    @contextmanager
+    def bulk(self):
+        """Run the enclosed work in the idle I/O class, restoring the default afterwards"""
+        set_io_priority(IO_BULK)
+        try:
+            yield self
+        finally:
+            set_io_priority(None)
+
+shared_io_scheduler = IOScheduler()
@@ -0,0 +1,81 @@
+import gc
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+
+# Замеры для длинных прогонов (soak): живые объекты Python, QObject'ы и RSS процесса.
+# Счётчики снимаются после разогрева как базовая линия, дальше — раз в N шагов;
+# прогон проваливается, если к концу какой-то из них вырос больше порога.
+
+# Пороги роста от базовой линии: кэши к концу разогрева уже заполнены, так что честный
+# рост — это единицы объектов, а утечка в цикле навигации даёт тысячи
+DEFAULT_LIMITS = {"qobjects": 500, "pyobjects": 50000, "rss": 64 * 1024 * 1024}
+
+Sample = namedtuple("Sample", "step elapsed qobjects pyobjects rss")
+
+def process_rss():
+    """Resident set size of this process in bytes; peak RSS where the current one is unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # в Linux ru_maxrss в КБ
+
+def python_object_types():
+    """Counter of live gc-tracked objects by type name"""
+    gc.collect()
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+class LeakTracker:
+    """Samples object counts and RSS during a soak run and judges growth against limits.
+
+    count_qobjects is a callable returning the number of live QObjects, so this module
+    stays free of Qt; without it the QObject column stays zero.
+    """
+
+    def __init__(self, count_qobjects=None, limits=None):
+        self.count_qobjects = count_qobjects
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.samples = []
+        self.baseline = None
+        self._baseline_types = None
+        self._started = time.monotonic()
+
+    def sample(self, step):
+        gc.collect()
+        sample = Sample(step, time.monotonic() - self._started,
+                        self.count_qobjects() if self.count_qobjects else 0, len(gc.get_objects()), process_rss())
+        self.samples.append(sample)
+        return sample
+
+    def mark_baseline(self, step):
+        """Take the reference sample once warm-up has filled the caches"""
+        self.baseline = self.sample(step)
+        self._baseline_types = python_object_types()
+        return self.baseline
+
+    def growth(self):
+        """{metric: growth from the baseline to the last sample}"""
+        if self.baseline is None or not self.samples:
+            return {}
+        last = self.samples[-1]
+        return {name: getattr(last, name) - getattr(self.baseline, name) for name in self.limits}
+
+    def failures(self):
+        """[(metric, growth, limit)] for every metric that grew past its limit"""
+        return [(name, grown, self.limits[name]) for name, grown in self.growth().items() if grown > self.limits[name]]
+
+    def type_growth(self, top=15):
+        """Python types that gained the most live objects since the baseline"""
+        if self._baseline_types is None:
+            return []
+        diff = python_object_types()
+        diff.subtract(self._baseline_types)
+        return [(name, count) for name, count in diff.most_common(top) if count > 0]
@@ -0,0 +1,129 @@
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+# Общий бюджет памяти для всех кэшей: миниатюр, кадров предпросмотра, листингов папок.
+# Каждый кэш сообщает стоимость своих записей в байтах; когда сумма превышает лимит,
+# бюджет выселяет записи в порядке LRU по всем кэшам сразу, а сначала — те, что сейчас
+# не видны на экране (миниатюры папок, которые не открыты ни в одной панели).
+#
+# Лимит задаётся переменной окружения MAINI_MEMORY_BUDGET: "512M", "1G" или число байт.
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+BUDGET_ENV = "MAINI_MEMORY_BUDGET"
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?\s*$", re.IGNORECASE)
+
+# evict(key) убирает запись из кэша-владельца; offscreen(key) -> True, если запись не на экране;
+# main_thread_only — владельца можно трогать только из GUI-потока
+_Owner = namedtuple("_Owner", "evict offscreen main_thread_only")
+
+def parse_budget(text):
+    """Bytes from "512M", "1.5G", "64KiB" or a plain number; raises ValueError"""
+    match = _SIZE_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"непонятный размер: {text!r}")
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[unit.upper()])
+
+def budget_from_env():
+    try:
+        return parse_budget(os.environ[BUDGET_ENV])
+    except (KeyError, ValueError):
+        return DEFAULT_BUDGET
+
+class MemoryBudget:
+    """One byte limit shared by every registered cache.
+
+    Caches call charge() when they store an entry, touch() on a hit and release() when they
+    drop it themselves. Over the limit, entries are evicted oldest first, off-screen ones
+    before everything else. Eviction callbacks run without the budget's lock held, so a
+    cache may take its own lock inside them, but must not call charge() while holding it.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit if limit is not None else budget_from_env()
+        self.used = 0
+        self.evictions = 0
+        self._owners = {}
+        self._usage = {}  # имя кэша -> байт
+        self._entries = OrderedDict()  # (имя кэша, ключ) -> стоимость, старые первыми
+        self._lock = threading.Lock()
+
+    def register(self, name, evict, offscreen=None, main_thread_only=False):
+        with self._lock:
+            self._owners[name] = _Owner(evict, offscreen, main_thread_only)
+            self._usage.setdefault(name, 0)
+
+    def charge(self, name, key, cost):
+        """Record an entry of cost bytes (replacing its old cost) and evict if over the limit"""
+        entry = (name, key)
+        with self._lock:
+            old = self._entries.pop(entry, 0)
+            self._entries[entry] = cost
+            self.used += cost - old
+            self._usage[name] += cost - old
+        self.trim(keep=entry)
+
+    def touch(self, name, key):
+        with self._lock:
+            if (name, key) in self._entries:
+                self._entries.move_to_end((name, key))
+
+    def release(self, name, key):
+        with self._lock:
+            cost = self._entries.pop((name, key), None)
+            if cost is not None:
+                self.used -= cost
+                self._usage[name] -= cost
+
+    def set_limit(self, limit):
+        self.limit = limit
+        self.trim()
+
+    def usage(self):
+        """Bytes held by each registered cache; the total is self.used"""
+        with self._lock:
+            return dict(self._usage)
+
+    def trim(self, keep=None):
+        """Evict until under the limit; keep is an entry that must stay (the one just added)"""
+        with self._lock:
+            victims = self._pick_victims(keep)
+            for entry in victims:
+                cost = self._entries.pop(entry)
+                self.used -= cost
+                self._usage[entry[0]] -= cost
+            self.evictions += len(victims)
+        for name, key in victims:
+            self._owners[name].evict(key)
+
+    def _pick_victims(self, keep):
+        excess = self.used - self.limit
+        if excess <= 0:
+            return []
+        in_main_thread = threading.current_thread() is threading.main_thread()
+        candidates = [(entry, cost) for entry, cost in self._entries.items()
+                      if entry != keep and (in_main_thread or not self._owners[entry[0]].main_thread_only)]
+        victims, chosen = [], set()
+        # Сначала то, чего не видно ни в одной панели: выселение видимой миниатюры памяти
+        # почти не освобождает, её всё равно держит QLabel на экране
+        for offscreen_pass in (True, False):
+            for entry, cost in candidates:
+                if excess <= 0:
+                    break
+                if entry in chosen:
+                    continue
+                if offscreen_pass:
+                    offscreen = self._owners[entry[0]].offscreen
+                    if offscreen is None or not offscreen(entry[1]):
+                        continue
+                victims.append(entry)
+                chosen.add(entry)
+                excess -= cost
+        return victims
+
+# Общий бюджет для графического клиента
+shared_memory_budget = MemoryBudget()
@@ -0,0 +1,122 @@
+import os
+import re
+import sys
+import time
+import shutil
+import string
+import ctypes
+from collections import namedtuple
+
+# Точки монтирования: /proc/self/mountinfo на Linux, буквы дисков на Windows
+MountInfo = namedtuple("MountInfo", "mount_point source fstype kind")
+
+PSEUDO_FILESYSTEMS = {
+    "proc", "sysfs", "devtmpfs", "devpts", "tmpfs", "cgroup", "cgroup2", "securityfs", "pstore",
+    "debugfs", "tracefs", "configfs", "fusectl", "mqueue", "hugetlbfs", "bpf", "autofs", "binfmt_misc",
+    "rpc_pipefs", "nsfs", "efivarfs", "ramfs", "squashfs", "overlay", "fuse.portal", "fuse.gvfsd-fuse",
+}
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "ceph", "glusterfs", "afs", "davfs",
+    "fuse.sshfs", "fuse.rclone", "fuse.davfs2", "fuse.s3fs",
+}
+SYSTEM_MOUNT_PREFIXES = ("/proc", "/sys", "/dev", "/run", "/snap", "/var/lib/docker", "/boot/efi")
+REMOVABLE_MOUNT_PREFIXES = ("/media/", "/run/media/", "/mnt/")
+
+def _unescape_mount_field(field):
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+def _is_removable_device(source):
+    if not source.startswith("/dev/"):
+        return False
+    name = os.path.basename(os.path.realpath(source))
+    sys_path = os.path.realpath(os.path.join("/sys/class/block", name))
+    # Для разделов флаг removable лежит у родительского устройства
+    for candidate in (sys_path, os.path.dirname(sys_path)):
+        try:
+            with open(os.path.join(candidate, "removable")) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return False
+
+def parse_mountinfo(text, include_pseudo=False):
+    """Parse /proc/self/mountinfo into user-visible MountInfo entries.
+
+    include_pseudo keeps pseudo filesystems and system mounts as kind "system": the
+    disk list hides them, but a trash can still live there.
+    """
+    mounts = {}
+    for line in text.splitlines():
+        left, sep, right = line.partition(" - ")
+        fields, rfields = left.split(), right.split()
+        if not sep or len(fields) < 5 or len(rfields) < 2:
+            continue
+        mount_point = _unescape_mount_field(fields[4])
+        fstype, source = rfields[0], _unescape_mount_field(rfields[1])
+        if fstype in NETWORK_FILESYSTEMS:
+            kind = "network"
+        elif fstype in PSEUDO_FILESYSTEMS:
+            if not include_pseudo:
+                continue
+            kind = "system"
+        elif mount_point.startswith(REMOVABLE_MOUNT_PREFIXES) or _is_removable_device(source):
+            kind = "removable"
+        elif any(mount_point == p or mount_point.startswith(p + "/") for p in SYSTEM_MOUNT_PREFIXES):
+            if not include_pseudo:
+                continue
+            kind = "system"
+        else:
+            kind = "local"
+        # При повторном монтировании в ту же точку видна последняя запись
+        mounts[mount_point] = MountInfo(mount_point, source, fstype, kind)
+    return list(mounts.values())
+
+def get_mounts(include_pseudo=False):
+    if sys.platform.startswith("win"):
+        drives = []
+        bitmask = ctypes.windll.kernel32.GetLogicalDrives()
+        for letter in string.ascii_uppercase:
+            if bitmask & 1:
+                drives.append(MountInfo(f"{letter}:/", f"{letter}:", "", "local"))
+            bitmask >>= 1
+        return drives
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8", errors="replace") as f:
+            return parse_mountinfo(f.read(), include_pseudo)
+    except OSError:
+        return [MountInfo("/", "", "", "local")]
+
+def get_mount_points(include_pseudo=False):
+    return [m.mount_point for m in get_mounts(include_pseudo)]
+
+_disk_usage_cache = {}
+DISK_USAGE_TTL = 5.0
+
+def get_disk_usage(mount_point):
+    """Return (free, total) bytes from statvfs, cached for DISK_USAGE_TTL seconds"""
+    now = time.monotonic()
+    cached = _disk_usage_cache.get(mount_point)
+    if cached and now - cached[0] < DISK_USAGE_TTL:
+        return cached[1]
+    if hasattr(os, "statvfs"):
+        st = os.statvfs(mount_point)
+        usage = (st.f_bavail * st.f_frsize, st.f_blocks * st.f_frsize)
+    else:
+        total, _, free = shutil.disk_usage(mount_point)
+        usage = (free, total)
+    _disk_usage_cache[mount_point] = (now, usage)
+    return usage
+
+def clear_disk_usage_cache():
+    _disk_usage_cache.clear()
+
+def mount_for_path(mounts, path):
+    """Longest mount point in mounts containing path"""
+    best = None
+    norm = os.path.normcase(path)
+    for m in mounts:
+        prefix = os.path.normcase(m.mount_point).rstrip("/\\")
+        if norm == prefix or norm.startswith(prefix + os.sep):
+            if best is None or len(m.mount_point) > len(best.mount_point):
+                best = m
+    return best
@@ -0,0 +1,14 @@
+import os
+from pathlib import Path
+
+def get_state_dir():
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(str(Path.home()), ".local", "state")
+    path = os.path.join(base, "maini")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(str(Path.home()), ".cache")
+    path = os.path.join(base, "maini")
+    os.makedirs(path, exist_ok=True)
+    return path
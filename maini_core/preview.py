@@ -0,0 +1,137 @@
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+from .search import is_binary_sample, BINARY_SNIFF_SIZE
+
+# Просмотр больших файлов: текст страницами по строкам, хвост файла или hex.
+# Файл не читается целиком — mmap плюс разреженный индекс строк по блокам.
+
+INDEX_BLOCK = 64 * 1024
+MAX_LINE_BYTES = 4096  # длинные строки (минифицированный JSON и т.п.) обрезаются при показе
+HEX_WIDTH = 16
+
+class FilePreview:
+    """Paged read-only view of one file.
+
+    block_lines[k] is the number of newlines before byte k * INDEX_BLOCK; the index is built
+    block by block, in the background by build_index() or on demand when a page needs it,
+    and costs 8 bytes per 64 KiB of file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.is_text = self._mm is None or not is_binary_sample(self._mm[:BINARY_SNIFF_SIZE])
+        self.block_lines = array('Q', [0])
+        self.total_lines = None if self.size else 0
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._file.close()
+
+    def _index_next_block(self):
+        """Count one more block; returns False once the whole file is indexed"""
+        with self._lock:
+            if self._mm is None or self.total_lines is not None:
+                return False
+            k = len(self.block_lines) - 1
+            start = k * INDEX_BLOCK
+            end = min(start + INDEX_BLOCK, self.size)
+            newlines = self.block_lines[k] + self._mm[start:end].count(b"\n")
+            if end >= self.size:
+                # Последняя строка без перевода строки тоже считается
+                self.total_lines = newlines + (1 if self._mm[self.size - 1:self.size] != b"\n" else 0)
+                return False
+            self.block_lines.append(newlines)
+            return True
+
+    @property
+    def indexed_fraction(self):
+        if self.total_lines is not None:
+            return 1.0
+        return min(1.0, (len(self.block_lines) - 1) * INDEX_BLOCK / self.size)
+
+    def build_index(self, cancel_event=None, progress_callback=None):
+        """Index the whole file; progress_callback(fraction) is called every few MiB"""
+        count = 0
+        while self._index_next_block():
+            count += 1
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            if progress_callback and count % 64 == 0:
+                progress_callback(self.indexed_fraction)
+        return self.total_lines
+
+    def line_offset(self, line):
+        """Byte offset where 0-based line starts, or None past the end of the file"""
+        if line <= 0:
+            return 0
+        while self.block_lines[-1] < line and self._index_next_block():
+            pass
+        with self._lock:
+            if self._mm is None:
+                return None
+            k = bisect_left(self.block_lines, line) - 1
+            pos = k * INDEX_BLOCK
+            for _ in range(line - self.block_lines[k]):
+                nl = self._mm.find(b"\n", pos)
+                if nl == -1:
+                    return None
+                pos = nl + 1
+            return pos if pos < self.size else None
+
+    def _read_lines(self, pos, count):
+        lines = []
+        while len(lines) < count and pos < self.size:
+            end = self._mm.find(b"\n", pos)
+            if end == -1:
+                end = self.size
+            lines.append(self._mm[pos:min(end, pos + MAX_LINE_BYTES)].decode("utf-8", "replace").rstrip("\r"))
+            pos = end + 1
+        return lines, pos >= self.size
+
+    def page_text(self, start_line, count):
+        """(lines, at_end) for count lines starting at start_line"""
+        pos = self.line_offset(start_line)
+        with self._lock:
+            if pos is None or self._mm is None:
+                return [], True
+            return self._read_lines(pos, count)
+
+    def tail_text(self, count):
+        """The last count lines, found by scanning backwards from the end"""
+        with self._lock:
+            if self._mm is None:
+                return []
+            start = self.size
+            if self._mm[start - 1:start] == b"\n":
+                start -= 1
+            for _ in range(count):
+                start = self._mm.rfind(b"\n", 0, start)
+                if start == -1:
+                    break
+            lines, _ = self._read_lines(start + 1, count)
+            return lines
+
+    def hex_page(self, offset, length=4096):
+        """Classic hex dump lines for length bytes starting at offset"""
+        with self._lock:
+            if self._mm is None:
+                return []
+            data = self._mm[offset:offset + length]
+        rows = []
+        for i in range(0, len(data), HEX_WIDTH):
+            chunk = data[i:i + HEX_WIDTH]
+            hex_part = " ".join(f"{b:02x}" for b in chunk).ljust(HEX_WIDTH * 3 - 1)
+            text_part = "".join(chr(b) if 32 <= b < 127 else "." for b in chunk)
+            rows.append(f"{offset + i:08x}  {hex_part}  |{text_part}|")
+        return rows
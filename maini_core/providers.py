@@ -0,0 +1,508 @@
+import base64
+import errno
+import http.client
+import os
+import posixpath
+import queue
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlsplit, quote, unquote
+
+from .archives import shared_archive_cache, split_archive_path
+from .fileops import copy_into, move_into, remove_path
+from .snapshot import DirListing, ListingCache
+
+# Провайдеры мест: локальные папки, папки внутри архивов и удалённые серверы.
+# Панели не знают, где лежат файлы, — они спрашивают провайдера по пути.
+
+class LocationProvider(ABC):
+    """A kind of location the panes can browse.
+
+    local: paths are real filesystem paths (watchable, openable directly).
+    remote: list_dir may block on the network, so the GUI lists in the background.
+    Subclasses must implement the abstract methods; the rest have defaults.
+    """
+    local = False
+    remote = False
+    writable = True
+
+    @abstractmethod
+    def handles(self, path):
+        """True if path belongs to this provider"""
+
+    @abstractmethod
+    def is_dir(self, path):
+        """True if path is a folder on this provider"""
+
+    @abstractmethod
+    def list_dir(self, path):
+        """DirListing of path; raises OSError like os.scandir"""
+
+    def cached_listing(self, path):
+        """Listing that can be shown without I/O, or None"""
+        return None
+
+    @abstractmethod
+    def entry_size(self, path):
+        """Size of a file in bytes; raises OSError"""
+
+    def invalidate(self, path):
+        pass
+
+    def parent(self, path):
+        return os.path.dirname(path)
+
+    def copy_into(self, src, dst_dir):
+        """Copy src into dst_dir when both are on this provider; returns the destination path"""
+        raise OSError(errno.EROFS, "Место доступно только для чтения", dst_dir)
+
+    def move_into(self, src, dst_dir):
+        dst = self.copy_into(src, dst_dir)
+        self.remove(src)
+        return dst
+
+    @abstractmethod
+    def download(self, src, dst_dir):
+        """Copy src from this provider into a local folder"""
+
+    def upload(self, local_src, dst_dir):
+        """Copy a local file or folder into dst_dir on this provider"""
+        raise OSError(errno.EROFS, "Место доступно только для чтения", dst_dir)
+
+    def remove(self, path):
+        raise OSError(errno.EROFS, "Место доступно только для чтения", path)
+
+    def breadcrumbs(self, path):
+        """[(label, path)] from the root down to path"""
+        crumbs = []
+        acc = ""
+        for i, part in enumerate(Path(path).parts):
+            if i == 0 and os.name == "nt":
+                acc = part
+            else:
+                acc = os.path.join(acc, part) if acc else part
+            crumbs.append((part, acc))
+        return crumbs
+
+class LocalProvider(LocationProvider):
+    local = True
+
+    def __init__(self, listing_cache=None):
+        self.listing_cache = listing_cache or ListingCache()
+
+    def handles(self, path):
+        return "://" not in path
+
+    def is_dir(self, path):
+        return os.path.isdir(path)
+
+    def list_dir(self, path):
+        return self.listing_cache.list_dir(path)
+
+    def cached_listing(self, path):
+        return self.listing_cache.peek(path) if self.handles(path) else None
+
+    def entry_size(self, path):
+        return os.path.getsize(path)
+
+    def invalidate(self, path):
+        self.listing_cache.invalidate(path)
+
+    def copy_into(self, src, dst_dir):
+        return copy_into(src, dst_dir)
+
+    def move_into(self, src, dst_dir):
+        return move_into(src, dst_dir)
+
+    def download(self, src, dst_dir):
+        return copy_into(src, dst_dir)
+
+    def upload(self, local_src, dst_dir):
+        return copy_into(local_src, dst_dir)
+
+    def remove(self, path):
+        remove_path(path)
+
+class ArchiveProvider(LocationProvider):
+    """Read-only folders inside zip/tar archives: /path/docs.zip/inner/folder"""
+
+    writable = False
+
+    def __init__(self, archive_cache=None):
+        self.archive_cache = archive_cache or shared_archive_cache
+
+    def handles(self, path):
+        return "://" not in path and not os.path.isdir(path) and split_archive_path(path) is not None
+
+    def is_dir(self, path):
+        member = self.archive_cache.member(path)
+        return member is not None and member.is_dir
+
+    def list_dir(self, path):
+        return self.archive_cache.list_dir(path)
+
+    def entry_size(self, path):
+        member = self.archive_cache.member(path)
+        if member is None:
+            raise FileNotFoundError(path)
+        return member.size
+
+    def download(self, src, dst_dir):
+        return self.archive_cache.extract(src, dst_dir)
+
+# WebDAV: dav://[user:password@]host[:port]/path (davs:// — по HTTPS)
+
+DAV_SCHEMES = {"dav": "http", "davs": "https"}
+DAV_NS = "{DAV:}"
+PROPFIND_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<propfind xmlns="DAV:"><prop><resourcetype/><getcontentlength/><getlastmodified/></prop></propfind>'
+)
+TRANSFER_CHUNK = 1024 * 1024
+
+class _ConnectionPool:
+    """Keep-alive HTTP connections to one server, at most `size` in use at once"""
+
+    def __init__(self, scheme, host, port, size, timeout):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection()
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            # Закрытое сервером соединение http.client переоткроет сам при следующем запросе
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class WebDAVProvider(LocationProvider):
+    """Remote folders over WebDAV with pooled keep-alive connections.
+
+    Listings are cached for `ttl` seconds. After a folder is listed, its subfolders are
+    listed ahead of time on the pool's spare connections, so going deeper is usually instant.
+    """
+
+    remote = True
+
+    def __init__(self, ttl=30.0, pool_size=4, prefetch=8, timeout=15):
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self.prefetch = prefetch
+        self.timeout = timeout
+        self._pools = {}
+        self._listings = {}  # path -> (expires, DirListing, {name: (size, mtime, is_dir)})
+        self._prefetching = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def handles(self, path):
+        return path.split("://", 1)[0].lower() in DAV_SCHEMES
+
+    @staticmethod
+    def normalize(path):
+        scheme, rest = path.split("://", 1)
+        netloc, _, inner = rest.partition("/")
+        inner = posixpath.normpath("/" + inner).strip("/")
+        return f"{scheme.lower()}://{netloc}" + (f"/{inner}" if inner else "")
+
+    def _target(self, path):
+        """(pool, headers, quoted request path) for a virtual path"""
+        parts = urlsplit(self.normalize(path))
+        scheme = DAV_SCHEMES[parts.scheme]
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _ConnectionPool(scheme, parts.hostname, port, self.pool_size, self.timeout)
+        headers = {}
+        if parts.username:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            headers["Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+        return pool, headers, quote(parts.path or "/")
+
+    def _url(self, path):
+        """Absolute http(s) URL, needed for the Destination header of COPY/MOVE"""
+        pool, _, request_path = self._target(path)
+        return f"{pool.scheme}://{pool.host}:{pool.port}{request_path}"
+
+    def _request(self, path, method, headers=None, body=None, expect=(200, 201, 204, 207), sink=None, collection=False):
+        pool, all_headers, request_path = self._target(path)
+        all_headers.update(headers or {})
+        if collection and not request_path.endswith("/"):
+            request_path += "/"
+        for attempt in range(2):
+            try:
+                with pool.connection() as conn:
+                    conn.request(method, request_path, body=body, headers=all_headers)
+                    resp = conn.getresponse()
+                    status = resp.status
+                    if sink is not None and status == 200:
+                        while True:
+                            chunk = resp.read(TRANSFER_CHUNK)
+                            if not chunk:
+                                break
+                            sink.write(chunk)
+                        data = b""
+                    else:
+                        data = resp.read()
+                    if resp.will_close:
+                        conn.close()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Сервер закрыл простаивавшее keep-alive соединение — повторяем один раз на новом
+                if attempt or sink is not None:
+                    raise
+                if hasattr(body, "seek"):
+                    body.seek(0)
+        if status not in expect:
+            if status == 404:
+                raise FileNotFoundError(errno.ENOENT, "Не найдено", path)
+            if status in (401, 403):
+                raise PermissionError(errno.EACCES, f"Доступ запрещён (HTTP {status})", path)
+            raise OSError(errno.EIO, f"{method}: HTTP {status}", path)
+        return status, data
+
+    def _propfind(self, path, depth):
+        """{name: (size, mtime, is_dir)} of the children (depth 1) or {"": ...} of path itself (depth 0)"""
+        _, data = self._request(path, "PROPFIND", {"Depth": str(depth), "Content-Type": "application/xml"},
+                                PROPFIND_BODY, expect=(207,), collection=depth == 1)
+        base = unquote(urlsplit(self.normalize(path)).path).rstrip("/")
+        entries = {}
+        try:
+            root = ET.fromstring(data)
+        except ET.ParseError as e:
+            raise OSError(errno.EIO, f"Неверный ответ сервера: {e}", path)
+        for response in root.iter(DAV_NS + "response"):
+            href = unquote(urlsplit(response.findtext(DAV_NS + "href", "")).path).rstrip("/")
+            is_dir = response.find(f".//{DAV_NS}resourcetype/{DAV_NS}collection") is not None
+            size = int(response.findtext(f".//{DAV_NS}getcontentlength") or 0)
+            modified = response.findtext(f".//{DAV_NS}getlastmodified")
+            try:
+                mtime = parsedate_to_datetime(modified).timestamp() if modified else 0
+            except (TypeError, ValueError):
+                mtime = 0
+            name = "" if href == base else posixpath.basename(href)
+            if depth == 1 and not name:
+                continue
+            entries[name] = (size, mtime, is_dir)
+        return entries
+
+    def cached_listing(self, path):
+        if not self.handles(path):
+            return None
+        path = self.normalize(path)
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+        return None
+
+    def _cached_info(self, path):
+        path = self.normalize(path)
+        parent, name = posixpath.split(path)
+        with self._lock:
+            cached = self._listings.get(parent)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[2].get(name)
+        return None
+
+    def list_dir(self, path, prefetch=True):
+        path = self.normalize(path)
+        listing = self.cached_listing(path)
+        if listing is not None:
+            return listing
+        infos = self._propfind(path, 1)
+        listing = DirListing(path, 0, tuple(infos), frozenset(n for n, info in infos.items() if info[2]))
+        with self._lock:
+            self._listings[path] = (time.monotonic() + self.ttl, listing, infos)
+        if prefetch:
+            self._prefetch_children(path, listing)
+        return listing
+
+    def _prefetch_children(self, path, listing):
+        children = [posixpath.join(path, name) for name in sorted(listing.dirs)[:self.prefetch]]
+        with self._lock:
+            children = [c for c in children if c not in self._prefetching]
+            self._prefetching.update(children)
+            if children and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size)
+        for child in children:
+            self._executor.submit(self._prefetch_one, child)
+
+    def _prefetch_one(self, path):
+        try:
+            if self.cached_listing(path) is None:
+                self.list_dir(path, prefetch=False)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._prefetching.discard(path)
+
+    def stat(self, path):
+        info = self._cached_info(path)
+        if info is None:
+            info = self._propfind(path, 0).get("")
+        if info is None:
+            raise FileNotFoundError(errno.ENOENT, "Не найдено", path)
+        return info
+
+    def is_dir(self, path):
+        try:
+            return self.stat(path)[2]
+        except OSError:
+            return False
+
+    def entry_size(self, path):
+        return self.stat(path)[0]
+
+    def invalidate(self, path):
+        with self._lock:
+            self._listings.pop(self.normalize(path), None)
+
+    def parent(self, path):
+        return posixpath.dirname(self.normalize(path))
+
+    def breadcrumbs(self, path):
+        path = self.normalize(path)
+        scheme, rest = path.split("://", 1)
+        parts = rest.split("/")
+        crumbs = []
+        acc = f"{scheme}://{parts[0]}"
+        crumbs.append((urlsplit(acc).hostname or parts[0], acc))
+        for part in parts[1:]:
+            acc = f"{acc}/{part}"
+            crumbs.append((part, acc))
+        return crumbs
+
+    def _server_side(self, method, src, dst_dir):
+        dst = posixpath.join(self.normalize(dst_dir), posixpath.basename(self.normalize(src)))
+        self._request(src, method, {"Destination": self._url(dst), "Overwrite": "T", "Depth": "infinity"})
+        self.invalidate(dst_dir)
+        return dst
+
+    def copy_into(self, src, dst_dir):
+        return self._server_side("COPY", src, dst_dir)
+
+    def move_into(self, src, dst_dir):
+        dst = self._server_side("MOVE", src, dst_dir)
+        self.invalidate(self.parent(src))
+        return dst
+
+    def download(self, src, dst_dir):
+        dst = os.path.join(dst_dir, posixpath.basename(self.normalize(src)))
+        if self.stat(src)[2]:
+            os.makedirs(dst, exist_ok=True)
+            for name in self.list_dir(src, prefetch=False).names:
+                self.download(posixpath.join(self.normalize(src), name), dst)
+            return dst
+        tmp = dst + ".part"
+        try:
+            with open(tmp, 'wb') as out:
+                self._request(src, "GET", expect=(200,), sink=out)
+            os.replace(tmp, dst)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return dst
+
+    def upload(self, local_src, dst_dir):
+        dst = posixpath.join(self.normalize(dst_dir), os.path.basename(os.path.normpath(local_src)))
+        if os.path.isdir(local_src):
+            # 405 — папка уже существует
+            self._request(dst, "MKCOL", expect=(201, 405))
+            with os.scandir(local_src) as it:
+                for entry in it:
+                    self.upload(entry.path, dst)
+        else:
+            size = os.path.getsize(local_src)
+            with open(local_src, 'rb') as f:
+                self._request(dst, "PUT", {"Content-Length": str(size)}, f, expect=(200, 201, 204))
+        self.invalidate(dst_dir)
+        return dst
+
+    def remove(self, path):
+        self._request(path, "DELETE")
+        self.invalidate(self.parent(path))
+
+class ProviderRegistry:
+    """Finds the provider for a path and moves files between providers"""
+
+    def __init__(self, listing_cache=None, archive_cache=None):
+        self.providers = [WebDAVProvider(), ArchiveProvider(archive_cache), LocalProvider(listing_cache)]
+
+    def register(self, provider):
+        """Add a provider; it is asked before the built-in ones"""
+        self.providers.insert(0, provider)
+
+    def for_path(self, path):
+        for provider in self.providers:
+            if provider.handles(path):
+                return provider
+        return None
+
+    def cached_listing(self, path):
+        """Listing of path some provider already holds in memory; never touches the disk or network.
+
+        Unlike for_path() this is safe on the GUI thread: ArchiveProvider.handles() stats the path.
+        """
+        for provider in self.providers:
+            listing = provider.cached_listing(path)
+            if listing is not None:
+                return listing
+        return None
+
+    def transfer(self, src, dst_dir, move=False):
+        """Copy or move src into dst_dir, possibly between providers; returns the destination path"""
+        src_provider, dst_provider = self.for_path(src), self.for_path(dst_dir)
+        if src_provider is None or dst_provider is None:
+            raise FileNotFoundError(errno.ENOENT, "Неизвестное место", src if src_provider is None else dst_dir)
+        if src_provider is dst_provider:
+            dst = dst_provider.move_into(src, dst_dir) if move else dst_provider.copy_into(src, dst_dir)
+        elif dst_provider.local:
+            dst = src_provider.download(src, dst_dir)
+        elif src_provider.local:
+            dst = dst_provider.upload(src, dst_dir)
+        else:
+            with tempfile.TemporaryDirectory(prefix="maini-") as tmp:
+                dst = dst_provider.upload(src_provider.download(src, tmp), dst_dir)
+        if move and src_provider is not dst_provider:
+            src_provider.remove(src)
+        dst_provider.invalidate(dst_dir)
+        if move:
+            src_provider.invalidate(src_provider.parent(src))
+        return dst
@@ -0,0 +1,436 @@
+import copy
+import functools
+import operator
+import os
+import re
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import compress
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .filetypes import shared_type_cache
+from .snapshot import FLAG_DIR, EXT_NONE, EXT_OTHER, NameIndex, dir_mask, extension_column, name_extension
+
+# Фильтр в строке поиска: обычные слова ищутся в имени, а поля задают условия:
+#   ext:log,txt  size:>100M  size:1M..1G  modified:<7d  modified:>2024-01-01
+#   name:/regex/  name:*.tar.*  type:image  is:dir  -ext:tmp (минус — отрицание)
+# Запрос разбирается один раз, а проверяется сразу по столбцам листинга.
+
+# Столбцы одной папки: имена, признак папки, коды расширений (ext_table — их расшифровка)
+# и, если запрос их требует, размеры и время изменения. name_index() отдаёт NameIndex для поиска
+# по именам (строится при первом вызове); index — номера его записей по порядку столбцов
+# (None — те же номера).
+EntryColumns = namedtuple("EntryColumns", "root names is_dir sizes mtimes ext_codes ext_table name_index index")
+
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2,
+              "g": 1024 ** 3, "gb": 1024 ** 3, "t": 1024 ** 4, "tb": 1024 ** 4}
+AGE_UNITS = {"s": 1, "m": 60, "min": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "mo": 30 * 86400, "y": 365 * 86400}
+FIELDS = ("ext", "size", "modified", "name", "type", "is")
+DAY = 86400
+
+TOKEN = re.compile(r'-?\w+:/(?:\\.|[^/])*/i?|-?\w+:"[^"]*"|"[^"]*"|\S+')
+COMPARISON = re.compile(r"^(>=|<=|>|<|=)?(.+)$")
+
+# Без NumPy маска — bytes из нулей и единиц: translate и побитовые операции над большим
+# целым работают на уровне C, а не циклом по записям
+_NOT = bytes([1]) + bytes(255)
+
+class QueryError(ValueError):
+    pass
+
+def _parse_number(text, units, what):
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([a-zA-Z]*)", text.strip())
+    if not m or m.group(2).lower() not in units:
+        raise QueryError(f"Непонятное значение {what}: {text}")
+    return float(m.group(1)) * units[m.group(2).lower()]
+
+def _parse_range(text, parse):
+    """(low, high, low_strict, high_strict); "a..b" and ">=a" include the bound, ">a" does not"""
+    if ".." in text:
+        low, high = text.split("..", 1)
+        return (parse(low) if low else None), (parse(high) if high else None), False, False
+    op, value = COMPARISON.match(text).groups()
+    value = parse(value)
+    if op in (">", ">="):
+        return value, None, op == ">", False
+    if op in ("<", "<="):
+        return None, value, False, op == "<"
+    return value, value, False, False
+
+def _parse_time(text, now):
+    """(timestamp, is_age): "7d" means that long ago, otherwise an ISO date"""
+    try:
+        return now - _parse_number(text, AGE_UNITS, "времени"), True
+    except QueryError:
+        pass
+    try:
+        return time.mktime(time.strptime(text.strip(), "%Y-%m-%d")), False
+    except ValueError:
+        raise QueryError(f"Непонятное время: {text}") from None
+
+def _parse_time_range(text, now):
+    """(low, high, low_strict, high_strict) timestamps.
+
+    An age is a moment and "<7d" means newer than it; a date is a whole day, so ">2024-01-01"
+    starts the day after and "<=2024-01-01" ends with that day.
+    """
+    if ".." in text:
+        ends = [_parse_time(v, now) if v else None for v in text.split("..", 1)]
+        if None not in ends and ends[0][0] > ends[1][0]:
+            ends.reverse()
+        low, high = ends
+        if high is None:
+            return (low[0] if low else None), None, False, False
+        stamp, is_age = high
+        # Дата справа включает свой день целиком
+        return (low[0] if low else None), (stamp if is_age else stamp + DAY), False, not is_age
+    op, value = COMPARISON.match(text).groups()
+    stamp, is_age = _parse_time(value, now)
+    if is_age:
+        if op in (None, "=", "<", "<="):
+            return stamp, None, op == "<", False
+        return None, stamp, False, op == ">"
+    if op in (None, "="):
+        return stamp, stamp + DAY, False, True
+    if op == ">":
+        return stamp + DAY, None, False, False
+    if op == ">=":
+        return stamp, None, False, False
+    return None, (stamp if op == "<" else stamp + DAY), False, True
+
+def _as_mask(values):
+    return numpy.fromiter(values, dtype=bool, count=len(values)) if numpy is not None else bytes(values)
+
+def _invert(mask):
+    return ~mask if numpy is not None else bytes(mask).translate(_NOT)
+
+def _and(a, b):
+    if numpy is not None:
+        return a & b
+    return (int.from_bytes(a, "little") & int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+def _nonzero(mask):
+    return numpy.flatnonzero(mask).tolist() if numpy is not None else list(compress(range(len(mask)), mask))
+
+def _positions_mask(positions, count):
+    """Mask with True at the given positions"""
+    if numpy is not None:
+        mask = numpy.zeros(count, dtype=bool)
+        mask[positions] = True
+        return mask
+    mask = bytearray(count)
+    for p in positions:
+        mask[p] = 1
+    return bytes(mask)
+
+def _codes_mask(codes, wanted):
+    """Mask of the entries whose extension code is in wanted"""
+    if numpy is not None:
+        return numpy.isin(codes, list(wanted))
+    table = bytearray(256)
+    for code in wanted:
+        table[code] = 1
+    return bytes(codes).translate(table)
+
+def _name_positions(columns, hits):
+    """Column positions of name_index hits; both are ascending"""
+    index = columns.index
+    if index is None:
+        return hits
+    positions = []
+    for hit in hits:
+        p = bisect_left(index, hit)
+        if p < len(index) and index[p] == hit:
+            positions.append(p)
+    return positions
+
+def glob_pattern(glob):
+    """Compiled regex for a shell pattern that matches whole names inside NameIndex.text"""
+    parts, i = [], 0
+    while i < len(glob):
+        c = glob[i]
+        i += 1
+        if c == "*":
+            parts.append("[^\\x00]*")
+        elif c == "?":
+            parts.append("[^\\x00]")
+        elif c == "[":
+            j = i + 1 if glob[i:i + 1] == "!" else i
+            j = glob.find("]", j + 1 if glob[j:j + 1] == "]" else j)
+            if j < 0:
+                parts.append("\\[")
+                continue
+            body = re.sub(r"([&~|])", r"\\\1", glob[i:j].replace("\\", "\\\\"))
+            i = j + 1
+            negate = body.startswith("!")
+            if negate:
+                body = body[1:]
+            if body.startswith(("]", "^", "[")):
+                body = "\\" + body
+            # Отрицание не должно захватить разделитель имён
+            parts.append(f"[^\\x00{body}]" if negate else f"[{body}]")
+        else:
+            parts.append(re.escape(c))
+    # Совпадение занимает имя целиком: от NUL перед ним до следующего NUL или конца текста
+    return re.compile("\\x00" + "".join(parts) + "(?![^\\x00])", re.IGNORECASE)
+
+class _Term:
+    """One compiled condition; mask() returns a NumPy array of booleans or bytes of 0/1 over the columns"""
+
+    def __init__(self, field, value, negate, now):
+        self.field = field
+        self.negate = negate
+        if field == "ext":
+            self.exts = tuple("." + e.lower().lstrip(".") for e in value.split(",") if e)
+        elif field == "size":
+            self.low, self.high, self.low_strict, self.high_strict = _parse_range(
+                value, lambda v: _parse_number(v, SIZE_UNITS, "размера"))
+        elif field == "modified":
+            self.low, self.high, self.low_strict, self.high_strict = _parse_time_range(value, now)
+        elif field == "name":
+            # Подстрока и шаблон проверяются по общей строке имён в нижнем регистре,
+            # регулярное выражение — по одному имени
+            self.word = self.pattern = self.regex = None
+            if len(value) > 1 and value.startswith("/") and value.rstrip("i").endswith("/"):
+                try:
+                    self.regex = re.compile(value.rstrip("i")[1:-1], re.IGNORECASE if value.endswith("i") else 0)
+                except re.error as e:
+                    raise QueryError(f"Ошибка в регулярном выражении: {e}") from None
+            elif any(c in value for c in "*?["):
+                self.pattern = glob_pattern(value.lower())
+            else:
+                self.word = value.lower()
+        elif field == "type":
+            self.category = value.lower()
+        elif field == "is":
+            if value.lower() not in ("dir", "file"):
+                raise QueryError(f"is: бывает только dir или file, а не {value}")
+            self.want_dir = value.lower() == "dir"
+
+    @property
+    def needs_stat(self):
+        return self.field in ("size", "modified")
+
+    def _bounds_mask(self, column):
+        low_ok = operator.gt if self.low_strict else operator.ge
+        high_ok = operator.lt if self.high_strict else operator.le
+        low, high = self.low, self.high
+        if numpy is not None:
+            mask = numpy.ones(len(column), dtype=bool)
+            if low is not None:
+                mask &= low_ok(column, low)
+            if high is not None:
+                mask &= high_ok(column, high)
+            return mask
+        if high is None:
+            return bytes(len(column)).translate(_NOT) if low is None else bytes(low_ok(v, low) for v in column)
+        if low is None:
+            return bytes(high_ok(v, high) for v in column)
+        return bytes(low_ok(v, low) and high_ok(v, high) for v in column)
+
+    def mask(self, columns):
+        if self.field == "size":
+            # У папок в столбце размеров ноль, а не размер содержимого: size: их не выбирает
+            result = _and(self._bounds_mask(columns.sizes), _invert(columns.is_dir))
+        elif self.field == "modified":
+            result = self._bounds_mask(columns.mtimes)
+        elif self.field == "is":
+            result = columns.is_dir if self.want_dir else _invert(columns.is_dir)
+        elif self.field == "ext":
+            result = self._ext_mask(columns)
+        elif self.field == "type":
+            result = self._type_mask(columns)
+        else:
+            result = self._name_mask(columns)
+        return _invert(result) if self.negate else result
+
+    def _ext_mask(self, columns):
+        simple = {ext for ext in self.exts if "." not in ext[1:]}
+        result = _codes_mask(columns.ext_codes, {code for code, ext in enumerate(columns.ext_table) if ext in simple})
+        extra = []
+        # Составные (tar.gz) код не различает: их ищет индекс имён
+        for ext in self.exts:
+            if "." in ext[1:]:
+                extra.extend(p for p in _name_positions(columns, columns.name_index().ends_with(ext)) if not columns.is_dir[p])
+        # Расширения сверх таблицы снимка — по одному имени, их почти никогда нет
+        names = columns.names
+        extra.extend(p for p in _nonzero(_codes_mask(columns.ext_codes, {EXT_OTHER})) if name_extension(names[p]) in simple)
+        return _or_positions(result, extra)
+
+    def _type_mask(self, columns):
+        matches = lambda file_type: file_type is not None and self.category in (file_type.category, file_type.mime)
+        wanted, unknown = set(), {EXT_NONE, EXT_OTHER}
+        for code, ext in enumerate(columns.ext_table):
+            if code == EXT_NONE:
+                continue
+            file_type = shared_type_cache.from_extension("x" + ext)
+            if file_type is None:
+                unknown.add(code)  # .bin, .dat и незнакомые расширения распознаются по содержимому
+            elif matches(file_type):
+                wanted.add(code)
+        result = _codes_mask(columns.ext_codes, wanted)
+        # Папки и файлы без понятного расширения — по одному: их обычно немного
+        is_dir, names, extra = columns.is_dir, columns.names, []
+        for p in _nonzero(_codes_mask(columns.ext_codes, unknown)):
+            if is_dir[p]:
+                if self.category in ("dir", "folder"):
+                    extra.append(p)
+            elif matches(shared_type_cache.lookup(os.path.join(columns.root, names[p]))):
+                extra.append(p)
+        return _or_positions(result, extra)
+
+    def _name_mask(self, columns):
+        count = len(columns.names)
+        if self.word is not None:
+            return _positions_mask(_name_positions(columns, columns.name_index().find(self.word)), count)
+        if self.pattern is not None:
+            return _positions_mask(_name_positions(columns, columns.name_index().match(self.pattern)), count)
+        if self.regex.flags & re.IGNORECASE:
+            search = self.regex.search
+            hits = [i for i, name in enumerate(columns.name_index().lowered()) if search(name)]
+            return _positions_mask(_name_positions(columns, hits), count)
+        # С учётом регистра нужны исходные имена
+        return _as_mask([self.regex.search(name) is not None for name in columns.names])
+
+def _or_positions(mask, positions):
+    """mask with True added at positions"""
+    if not positions:
+        return mask
+    if numpy is not None:
+        mask[positions] = True
+        return mask
+    mask = bytearray(mask)
+    for p in positions:
+        mask[p] = 1
+    return bytes(mask)
+
+class Query:
+    """A parsed search box query; compile once with compile_query() and apply to many listings"""
+
+    def __init__(self, text, now=None):
+        self.text = text
+        self.words = []
+        self.terms = []
+        now = time.time() if now is None else now
+        for token in TOKEN.findall(text):
+            negate = token.startswith("-") and len(token) > 1
+            body = token[1:] if negate else token
+            field, sep, value = body.partition(":")
+            if sep and field.lower() in FIELDS and value:
+                value = value[1:-1] if len(value) > 1 and value[0] == value[-1] == '"' else value
+                self.terms.append(_Term(field.lower(), value, negate, now))
+            else:
+                # Обычное слово — подстрока имени, как и раньше
+                word = token.strip('"').lower()
+                if word:
+                    self.words.append(word)
+
+    @property
+    def structured(self):
+        return bool(self.terms)
+
+    @property
+    def needs_stat(self):
+        return any(term.needs_stat for term in self.terms)
+
+    def without_stat(self):
+        """Copy without the size: and modified: terms, for filtering before the stat columns are read"""
+        query = copy.copy(self)
+        query.terms = [term for term in self.terms if not term.needs_stat]
+        return query
+
+    def filter(self, columns):
+        """Names from columns that match every word and term, in their original order"""
+        return [columns.names[i] for i in self.filter_indices(columns)]
+
+    def filter_indices(self, columns):
+        """Positions in columns that match every word and term, ascending"""
+        candidates = None
+        for word in self.words:
+            hits = _name_positions(columns, columns.name_index().find(word))
+            if candidates is None:
+                candidates = hits
+            else:
+                keep = set(candidates)
+                candidates = [p for p in hits if p in keep]
+        if not self.terms:
+            return list(range(len(columns.names))) if candidates is None else candidates
+        mask = None
+        for term in self.terms:
+            term_mask = term.mask(columns)
+            if mask is None:
+                # Копия, чтобы не испортить столбец is_dir, который условие is: отдаёт как есть
+                mask = term_mask.copy() if numpy is not None else term_mask
+            else:
+                mask = _and(mask, term_mask)
+        if candidates is not None:
+            return [p for p in candidates if mask[p]]
+        return _nonzero(mask)
+
+def compile_query(text):
+    return Query(text)
+
+def _take(column, indices, typecode):
+    return array(typecode, map(column.__getitem__, indices))
+
+def snapshot_columns(snapshot, indices, with_stat=False):
+    """EntryColumns for the given entries of a DirSnapshot, taken straight from its arrays.
+
+    indices must be ascending, as visible_indices() returns them. Names are decoded only
+    when a filter asks for them; word and name: filters use the snapshot's name index.
+    """
+    if with_stat:
+        snapshot.ensure_stat()
+    whole = len(indices) == len(snapshot)
+    names = snapshot.names if whole else snapshot.names_at(indices)
+    if numpy is not None:
+        index = numpy.frombuffer(indices, dtype=numpy.uint32) if len(indices) else numpy.zeros(0, dtype=numpy.uint32)
+        is_dir = (numpy.frombuffer(snapshot.flags, dtype=numpy.uint8)[index] & FLAG_DIR) != 0 if len(snapshot) else numpy.zeros(0, dtype=bool)
+        ext_codes = numpy.frombuffer(snapshot.ext_codes, dtype=numpy.uint8)[index] if len(snapshot) else numpy.zeros(0, dtype=numpy.uint8)
+        sizes = numpy.frombuffer(snapshot.sizes, dtype=numpy.int64)[index] if len(snapshot) else numpy.zeros(0, dtype=numpy.int64)
+        mtimes = numpy.frombuffer(snapshot.mtimes, dtype=numpy.int64)[index] / 1e9 if len(snapshot) else numpy.zeros(0)
+    elif whole:
+        is_dir = dir_mask(snapshot.flags)
+        ext_codes = snapshot.ext_codes
+        sizes = snapshot.sizes
+        mtimes = array('d', map((1e-9).__mul__, snapshot.mtimes))
+    else:
+        is_dir = dir_mask(_take(snapshot.flags, indices, 'B'))
+        ext_codes = _take(snapshot.ext_codes, indices, 'B')
+        sizes = _take(snapshot.sizes, indices, 'q')
+        mtimes = array('d', map((1e-9).__mul__, _take(snapshot.mtimes, indices, 'q')))
+    return EntryColumns(snapshot.path, names, is_dir, sizes, mtimes, ext_codes, snapshot.ext_table,
+                        snapshot.name_index, None if whole else indices)
+
+def build_columns(root, names, dirs=(), with_stat=False):
+    """EntryColumns for names inside root; with_stat adds sizes and mtimes (one stat per entry)"""
+    names = list(names)
+    is_dir = [name in dirs for name in names]
+    ext_codes, ext_table = extension_column(names, [FLAG_DIR if d else 0 for d in is_dir])
+    sizes = mtimes = None
+    if with_stat:
+        sizes = array('q', bytes(8 * len(names)))
+        mtimes = array('d', bytes(8 * len(names)))
+        for i, name in enumerate(names):
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            sizes[i] = 0 if is_dir[i] else st.st_size
+            mtimes[i] = st.st_mtime
+    if numpy is not None:
+        is_dir = numpy.array(is_dir, dtype=bool)
+        ext_codes = numpy.frombuffer(ext_codes, dtype=numpy.uint8)
+        if with_stat:
+            sizes = numpy.frombuffer(sizes, dtype=numpy.int64)
+            mtimes = numpy.frombuffer(mtimes, dtype=numpy.float64)
+    else:
+        is_dir = bytes(is_dir)
+    return EntryColumns(root, names, is_dir, sizes, mtimes, ext_codes, ext_table,
+                        functools.cache(functools.partial(NameIndex.from_names, names)), None)
@@ -0,0 +1,169 @@
+import mmap
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def filter_by_name(entries, search_text):
+    """Case-insensitive substring filter used by the search box"""
+    search_text = search_text.strip().lower()
+    if not search_text:
+        return list(entries)
+    return [e for e in entries if search_text in e.lower()]
+
+def find_by_name(root, search_text, show_hidden=False):
+    """Recursively yield paths under root whose name contains search_text"""
+    search_text = search_text.strip().lower()
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if not show_hidden and entry.name.startswith('.'):
+                    continue
+                if search_text in entry.name.lower():
+                    yield entry.path
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                except OSError:
+                    pass
+
+# Поиск по содержимому файлов
+
+ContentMatch = namedtuple("ContentMatch", "path line_number line")
+
+DEFAULT_MAX_CONTENT_SIZE = 64 * 1024 * 1024
+BINARY_SNIFF_SIZE = 8192
+MAX_LINE_PREVIEW = 200
+
+def compile_content_pattern(query, case_sensitive=False):
+    """Compile a search-box query to a bytes regex; /.../ means a regular expression"""
+    query = query.strip()
+    if len(query) > 2 and query.startswith('/') and query.endswith('/'):
+        flags = 0 if case_sensitive else re.IGNORECASE
+        return re.compile(query[1:-1].encode("utf-8"), flags)
+    if case_sensitive:
+        return re.compile(re.escape(query.encode("utf-8")))
+    # re.IGNORECASE на bytes работает только для ASCII, поэтому для кириллицы
+    # и прочих символов перечисляем оба регистра явно
+    parts = []
+    for ch in query:
+        variants = {ch.lower().encode("utf-8"), ch.upper().encode("utf-8")}
+        if len(variants) == 1:
+            parts.append(re.escape(variants.pop()))
+        else:
+            parts.append(b"(?:" + b"|".join(re.escape(v) for v in sorted(variants)) + b")")
+    return re.compile(b"".join(parts))
+
+def is_binary_sample(sample):
+    """Files with NUL bytes near the start are treated as binary and skipped"""
+    return b"\0" in sample
+
+def search_file_content(path, pattern, max_size=DEFAULT_MAX_CONTENT_SIZE):
+    """Return the first ContentMatch in a file, or None; the file is mmap'ed, not read"""
+    try:
+        size = os.path.getsize(path)
+        if size == 0 or (max_size and size > max_size):
+            return None
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                # Ядро начинает читать файл заранее, пока поток ждёт GIL
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+                mm.madvise(mmap.MADV_WILLNEED)
+            if is_binary_sample(mm[:BINARY_SNIFF_SIZE]):
+                return None
+            m = pattern.search(mm)
+            if m is None:
+                return None
+            start = mm.rfind(b"\n", 0, m.start()) + 1
+            end = mm.find(b"\n", m.end())
+            if end == -1:
+                end = size
+            line_number = mm[:start].count(b"\n") + 1
+            line = mm[start:min(end, start + MAX_LINE_PREVIEW * 4)].decode("utf-8", "replace").strip()
+            return ContentMatch(path, line_number, line[:MAX_LINE_PREVIEW])
+    except (OSError, ValueError):
+        return None
+
+def iter_files(root, show_hidden=False):
+    """Yield regular files under root, depth-first, without following symlinks"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if not show_hidden and entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.path
+                except OSError:
+                    pass
+
+class ContentSearch:
+    """One content-search query over a tree; cancel() stops it from any thread.
+
+    Files are scanned on a thread pool with a bounded number in flight, so the
+    walk and the scan overlap and matches are delivered as soon as they are found.
+    """
+
+    def __init__(self, root, query, max_size=DEFAULT_MAX_CONTENT_SIZE, max_results=None,
+                 show_hidden=False, workers=None):
+        self.root = root
+        self.pattern = compile_content_pattern(query)
+        self.max_size = max_size
+        self.max_results = max_results
+        self.show_hidden = show_hidden
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self.scanned = 0
+        self.found = 0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _deliver(self, done, on_match):
+        for future in done:
+            self.scanned += 1
+            match = future.result()
+            if match is None or self.cancelled:
+                continue
+            self.found += 1
+            if on_match:
+                on_match(match)
+            if self.max_results and self.found >= self.max_results:
+                self.cancel()
+
+    def run(self, on_match=None):
+        """Scan the tree, calling on_match(ContentMatch) per file; returns the match count"""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            for path in iter_files(self.root, self.show_hidden):
+                if self.cancelled:
+                    break
+                pending.add(executor.submit(search_file_content, path, self.pattern, self.max_size))
+                if len(pending) >= self.workers * 4:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._deliver(done, on_match)
+            while pending and not self.cancelled:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self._deliver(done, on_match)
+            for future in pending:
+                future.cancel()
+        return self.found
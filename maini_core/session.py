@@ -0,0 +1,127 @@
+import os
+import struct
+from collections import namedtuple
+
+from .paths import get_cache_dir
+from .snapshot import DirSnapshot
+
+# Снимок сессии для быстрого старта: последняя папка, вид, масштаб, её листинг
+# и готовые миниатюры первого экрана. При запуске окно рисуется сразу из снимка,
+# а папка перечитывается в фоне.
+#
+# Формат (little-endian): MAGIC, u16 версия, затем
+#   str путь, str вид, str сортировка, f64 масштаб, u8 скрытые файлы,
+#   u32 длина + DirSnapshot.to_bytes() (0 — листинга нет),
+#   u32 число миниатюр и для каждой: str имя, i64 mtime_ns, i64 размер, u16 размер иконки, str mime, u32 длина + PNG.
+# str — это u32 длина + UTF-8. Снимок другой версии просто не читается.
+
+MAGIC = b"MAINISES"
+VERSION = 1
+MAX_SNAPSHOT_ENTRIES = 50000  # листинг огромной папки не сохраняем — его дешевле перечитать
+
+Thumbnail = namedtuple("Thumbnail", "name mtime_ns size icon_size mime png")
+
+class SessionSnapshot:
+    """What the window showed when it was closed; listing is a DirSnapshot or None"""
+
+    def __init__(self, path, view_mode="grid", sort_mode="name", scale_factor=1.0, show_hidden=False,
+                 listing=None, thumbnails=()):
+        self.path = path
+        self.view_mode = view_mode
+        self.sort_mode = sort_mode
+        self.scale_factor = scale_factor
+        self.show_hidden = show_hidden
+        self.listing = listing
+        self.thumbnails = list(thumbnails)
+
+    def to_bytes(self):
+        parts = [MAGIC, struct.pack("<H", VERSION)]
+        for text in (self.path, self.view_mode, self.sort_mode):
+            parts.append(_pack_str(text))
+        parts.append(struct.pack("<dB", self.scale_factor, bool(self.show_hidden)))
+        listing = b""
+        if self.listing is not None and len(self.listing) <= MAX_SNAPSHOT_ENTRIES:
+            listing = self.listing.to_bytes()
+        parts.append(struct.pack("<I", len(listing)))
+        parts.append(listing)
+        parts.append(struct.pack("<I", len(self.thumbnails)))
+        for thumb in self.thumbnails:
+            parts.append(_pack_str(thumb.name))
+            parts.append(struct.pack("<qqH", thumb.mtime_ns, thumb.size, thumb.icon_size))
+            parts.append(_pack_str(thumb.mime or ""))
+            parts.append(struct.pack("<I", len(thumb.png)))
+            parts.append(thumb.png)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Parse a snapshot; raises ValueError for a foreign, old or damaged file"""
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("это не снимок сессии")
+        reader = _Reader(memoryview(data), len(MAGIC))
+        version, = reader.unpack("<H")
+        if version != VERSION:
+            raise ValueError(f"снимок сессии версии {version}, нужна {VERSION}")
+        path, view_mode, sort_mode = reader.str(), reader.str(), reader.str()
+        scale_factor, show_hidden = reader.unpack("<dB")
+        listing_data = reader.bytes()
+        listing = DirSnapshot.from_bytes(path, listing_data) if listing_data else None
+        thumbnails = []
+        count, = reader.unpack("<I")
+        for _ in range(count):
+            name = reader.str()
+            mtime_ns, size, icon_size = reader.unpack("<qqH")
+            mime = reader.str() or None
+            thumbnails.append(Thumbnail(name, mtime_ns, size, icon_size, mime, bytes(reader.bytes())))
+        return cls(path, view_mode, sort_mode, scale_factor, bool(show_hidden), listing, thumbnails)
+
+def _pack_str(text):
+    data = text.encode("utf-8", "surrogateescape")
+    return struct.pack("<I", len(data)) + data
+
+class _Reader:
+    def __init__(self, view, pos):
+        self.view = view
+        self.pos = pos
+
+    def unpack(self, fmt):
+        try:
+            values = struct.unpack_from(fmt, self.view, self.pos)
+        except struct.error:
+            raise ValueError("обрезанный снимок сессии") from None
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def bytes(self):
+        length, = self.unpack("<I")
+        if self.pos + length > len(self.view):
+            raise ValueError("обрезанный снимок сессии")
+        data = self.view[self.pos:self.pos + length]
+        self.pos += length
+        return data
+
+    def str(self):
+        return bytes(self.bytes()).decode("utf-8", "surrogateescape")
+
+def default_session_path():
+    return os.path.join(get_cache_dir(), "session.bin")
+
+def save_session(session, path=None):
+    """Write atomically, so a crash while saving leaves the previous snapshot"""
+    path = path or default_session_path()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(session.to_bytes())
+    os.replace(tmp, path)
+
+def load_session(path=None):
+    """The saved SessionSnapshot, or None if there is none or it cannot be used"""
+    try:
+        with open(path or default_session_path(), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        return SessionSnapshot.from_bytes(data)
+    except ValueError:
+        return None
@@ -0,0 +1,39 @@
+import os
+import stat
+
+def format_size(size):
+    if size < 1024:
+        return f"{size} Б"
+    elif size < 1024 * 1024:
+        return f"{size // 1024} КБ"
+    elif size < 1024 * 1024 * 1024:
+        return f"{size // (1024 * 1024)} МБ"
+    return f"{size // (1024 * 1024 * 1024)} ГБ"
+
+def calculate_size(path, follow_symlinks=False):
+    """Return (total_bytes, file_count, dir_count) of path; hardlinked inodes are counted once"""
+    total = files = dirs = 0
+    seen = set()
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            st = os.stat(current, follow_symlinks=follow_symlinks)
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            dirs += 1
+            try:
+                with os.scandir(current) as it:
+                    stack.extend(entry.path for entry in it)
+            except OSError:
+                pass
+            continue
+        files += 1
+        if st.st_nlink > 1:
+            key = (st.st_dev, st.st_ino)
+            if key in seen:
+                continue
+            seen.add(key)
+        total += st.st_size
+    return total, files, dirs
@@ -0,0 +1,434 @@
+import operator
+import os
+import re
+import stat
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import namedtuple, OrderedDict
+from collections.abc import Sequence
+from itertools import accumulate, compress, islice
+
+from .fileops import is_tombstone
+
+# Листинги каталогов, общие для всех вкладок и панелей.
+# Архивы и WebDAV отдают простой DirListing, локальные папки — компактный DirSnapshot.
+DirListing = namedtuple("DirListing", "path mtime_ns names dirs")
+
+FLAG_DIR = 1
+FLAG_HIDDEN = 2
+FLAG_LINK = 4
+FLAG_TOMBSTONE = 8
+
+# Код расширения в столбце ext_codes: 0 — папка или файл без расширения, дальше — номер
+# в ext_table снимка; редкие расширения сверх 254 разных получают общий код EXT_OTHER
+EXT_NONE = 0
+EXT_OTHER = 255
+
+_DIR_BYTES = bytes(1 if value & FLAG_DIR else 0 for value in range(256))  # флаги -> 1 у папок
+
+def dir_mask(flags):
+    """bytes with 1 for every directory among flags and 0 elsewhere"""
+    return bytes(flags).translate(_DIR_BYTES)
+
+def name_extension(name):
+    """Lower-cased extension with the dot, as os.path.splitext sees it; "" if there is none"""
+    dot = name.rfind(".")
+    # Ведущие точки расширением не считаются: у ".bashrc" его нет, как и у splitext
+    if dot <= 0 or (name[0] == "." and not name[:dot].strip(".")):
+        return ""
+    return name[dot:].lower()
+
+def extension_column(names, flags):
+    """(codes, table): a byte per entry and the lower-cased extensions those bytes stand for"""
+    # Один проход без вызова функции на имя, дальше — словарь по уникальным расширениям
+    raw = [name[dot:] if (dot := name.rfind(".")) > 0 and (name[0] != "." or name[:dot].strip(".")) else ""
+           for name in names]
+    table = {"": EXT_NONE}
+    lookup = {}
+    for ext in set(raw):
+        lowered = ext.lower()
+        code = table.get(lowered)
+        if code is None:
+            code = len(table) if len(table) < EXT_OTHER else EXT_OTHER
+            if code != EXT_OTHER:
+                table[lowered] = code
+        lookup[ext] = code
+    codes = array('B', map(lookup.__getitem__, raw))
+    for i in compress(range(len(codes)), dir_mask(flags)):
+        codes[i] = EXT_NONE  # у папок расширения нет, даже если в имени есть точка
+    return codes, tuple(table)
+
+def _joined_names(blob, offsets):
+    """Names of a name buffer joined with NUL, which no file name contains"""
+    return b"\0".join(map(blob.__getitem__, map(slice, offsets, islice(offsets, 1, None))))
+
+class _NameView(Sequence):
+    """Read-only sequence of a snapshot's names (or of the entries at indices), decoded on access"""
+    __slots__ = ("_snapshot", "_indices")
+
+    def __init__(self, snapshot, indices=None):
+        self._snapshot = snapshot
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._snapshot) if self._indices is None else len(self._indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._snapshot.name(i if self._indices is None else self._indices[i])
+
+    def __iter__(self):
+        # Весь буфер декодируется за один вызов, а не по имени
+        names = self._snapshot.decode_names()
+        return iter(names) if self._indices is None else map(names.__getitem__, self._indices)
+
+class NameIndex:
+    """Lower-cased names of a listing in one string, each preceded by NUL, for name filters.
+
+    Built once per listing, so a word filter is a few str.find calls and a glob one regex
+    pass over this string, instead of decoding and lowering every name on every keystroke.
+    No file name contains NUL, so a match never spans two names; name i occupies
+    text[starts[i]:starts[i + 1] - 1].
+    """
+    __slots__ = ("text", "starts")
+
+    def __init__(self, text, starts):
+        self.text = text
+        self.starts = starts
+
+    @classmethod
+    def _from_text(cls, text):
+        # Длины берутся после lower(): у некоторых символов нижний регистр длиннее
+        lengths = map(len, text.split("\0"))
+        return cls("\0" + text, array('Q', accumulate(map((1).__add__, lengths), initial=1)))
+
+    @classmethod
+    def from_names(cls, names):
+        names = list(names)
+        return cls._from_text("\0".join(names).lower()) if names else cls("", array('Q', [1]))
+
+    @classmethod
+    def from_blob(cls, blob, offsets):
+        """Index of a snapshot's name buffer"""
+        if len(offsets) < 2:
+            return cls("", array('Q', [1]))
+        joined = _joined_names(blob, offsets)
+        decoded = joined.decode("utf-8", "surrogateescape")
+        if len(decoded) == len(joined):
+            # Один символ на байт (ASCII): перед именем i ровно i + 1 разделитель
+            return cls("\0" + decoded.lower(), array('Q', map(operator.add, offsets, range(1, len(offsets) + 1))))
+        return cls._from_text(decoded.lower())
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    @property
+    def nbytes(self):
+        return sys.getsizeof(self.text) + self.starts.itemsize * len(self.starts)
+
+    def _indices(self, positions):
+        starts = self.starts
+        return [bisect_right(starts, pos) - 1 for pos in positions]
+
+    def find(self, word):
+        """Ascending indices of the names containing word, which must be lower-case"""
+        text, starts = self.text, self.starts
+        hits = []
+        if not word or "\0" in word or not len(self):
+            return hits
+        pos = 0
+        while True:
+            pos = text.find(word, pos)
+            if pos < 0:
+                return hits
+            i = bisect_right(starts, pos) - 1
+            hits.append(i)
+            pos = starts[i + 1]  # одного совпадения на имя достаточно
+
+    def ends_with(self, suffix):
+        """Ascending indices of the names ending with suffix, which must be lower-case"""
+        if not suffix or "\0" in suffix or not len(self):
+            return []
+        pattern = re.compile(re.escape(suffix) + "(?![^\\x00])")
+        return self._indices(m.start() for m in pattern.finditer(self.text))
+
+    def match(self, pattern):
+        """Ascending indices of the names matched by a compiled pattern.
+
+        The pattern starts by matching the NUL in front of a name (glob_pattern() in query.py
+        builds such patterns), which lets the regex engine jump between names.
+        """
+        if not len(self):
+            return []
+        return self._indices(m.start() + 1 for m in pattern.finditer(self.text))
+
+    def lowered(self):
+        """Lower-cased names as a list, for patterns that have to look at one name at a time"""
+        return self.text.split("\0")[1:]
+
+class DirSnapshot:
+    """Listing of one folder, sorted by name, stored column by column.
+
+    Names live in one UTF-8 buffer with an offsets array; sizes, mtimes (ns), modes and flags
+    are parallel arrays. A 100k-entry folder takes a few MB instead of 100k str objects and
+    tuples, and panes page through it by index without copying lists. It has the same
+    path/mtime_ns/names/dirs attributes as DirListing.
+
+    Flags come from scandir for free; the stat columns stay zero until ensure_stat() fills
+    them, because a stat per entry costs several times the scandir itself on Linux.
+    ext_codes holds one byte per entry indexing ext_table, so ext: and type: filters compare
+    bytes instead of looking at names.
+    """
+    __slots__ = ("path", "mtime_ns", "local", "has_stat", "sizes", "mtimes", "modes", "flags", "ext_codes", "ext_table",
+                 "_blob", "_offsets", "_dirs", "_name_index")
+
+    def __init__(self, path, mtime_ns, names, flags, local=True):
+        """names and flags are parallel sequences already sorted by name; stat columns start zeroed"""
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.local = local  # Снимки архивов и WebDAV нельзя дополнить через os.stat
+        self.has_stat = False
+        encoded = [name.encode("utf-8", "surrogateescape") for name in names]
+        self._blob = b"".join(encoded)
+        self._offsets = array('Q', accumulate(map(len, encoded), initial=0))
+        self.flags = array('B', flags)
+        n = len(self.flags)
+        self.sizes = array('q', bytes(8 * n))
+        self.mtimes = array('q', bytes(8 * n))
+        self.modes = array('I', bytes(4 * n))
+        self.ext_codes, self.ext_table = extension_column(names, self.flags)
+        self._dirs = None
+        self._name_index = None
+
+    @staticmethod
+    def name_flags(name, is_dir, is_link=False):
+        flags = FLAG_DIR if is_dir else 0
+        if is_link:
+            flags |= FLAG_LINK
+        if name.startswith('.'):
+            # tombstone'ы тоже начинаются с точки, так что проверка нужна только здесь
+            flags |= FLAG_HIDDEN | FLAG_TOMBSTONE if is_tombstone(name) else FLAG_HIDDEN
+        return flags
+
+    @classmethod
+    def _from_names(cls, path, mtime_ns, names, special, local=True):
+        """Sort names and attach flags; special holds only the entries whose flags are non-zero"""
+        names.sort()  # строки сортируются заметно быстрее, чем кортежи (имя, флаги)
+        return cls(path, mtime_ns, names, [special.get(name, 0) for name in names], local)
+
+    @classmethod
+    def scan(cls, path, mtime_ns, with_stat=False):
+        """One scandir pass; with_stat also fills the stat columns right away"""
+        names, special = [], {}
+        name_flags = cls.name_flags
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                names.append(name)
+                try:
+                    is_dir = entry.is_dir()
+                    is_link = entry.is_symlink()
+                except OSError:
+                    is_dir = is_link = False
+                if is_dir or is_link or name[0] == '.':
+                    special[name] = name_flags(name, is_dir, is_link)
+        snapshot = cls._from_names(path, mtime_ns, names, special)
+        if with_stat:
+            snapshot.ensure_stat()
+        return snapshot
+
+    @classmethod
+    def from_listing(cls, listing):
+        """Snapshot of a DirListing (archives, WebDAV); stat columns stay zero"""
+        if isinstance(listing, cls):
+            return listing
+        dirs = listing.dirs
+        special = {name: cls.name_flags(name, name in dirs) for name in listing.names if name in dirs or name[:1] == '.'}
+        return cls._from_names(listing.path, listing.mtime_ns, list(listing.names), special, local=False)
+
+    def to_bytes(self):
+        """Names and flags as one buffer for from_bytes(); stat columns are not kept"""
+        header = struct.pack("<QII", self.mtime_ns, len(self), len(self._blob))
+        return header + self._offsets.tobytes() + self.flags.tobytes() + self._blob
+
+    @classmethod
+    def from_bytes(cls, path, data):
+        """Snapshot saved by to_bytes(); raises ValueError if data is truncated or inconsistent"""
+        try:
+            mtime_ns, count, blob_len = struct.unpack_from("<QII", data)
+        except struct.error:
+            raise ValueError("обрезанный снимок папки") from None
+        start = struct.calcsize("<QII")
+        offsets_end = start + 8 * (count + 1)
+        flags_end = offsets_end + count
+        if len(data) != flags_end + blob_len:
+            raise ValueError("обрезанный снимок папки")
+        snapshot = cls(path, mtime_ns, (), ())
+        snapshot._offsets = array('Q', bytes(data[start:offsets_end]))
+        if snapshot._offsets[-1] != blob_len:
+            raise ValueError("повреждённый снимок папки")
+        snapshot.flags = array('B', bytes(data[offsets_end:flags_end]))
+        snapshot._blob = bytes(data[flags_end:])
+        snapshot.sizes = array('q', bytes(8 * count))
+        snapshot.mtimes = array('q', bytes(8 * count))
+        snapshot.modes = array('I', bytes(4 * count))
+        snapshot.ext_codes, snapshot.ext_table = extension_column(snapshot.decode_names(), snapshot.flags)
+        return snapshot
+
+    def ensure_stat(self):
+        """Fill sizes, mtimes and modes with one stat per entry, once; safe to call from any thread"""
+        if self.has_stat or not self.local:
+            return
+        for i in range(len(self)):
+            path = os.path.join(self.path, self.name(i))
+            try:
+                st = os.stat(path)
+            except OSError:
+                try:
+                    st = os.lstat(path)  # битая ссылка
+                except OSError:
+                    continue
+            self.sizes[i] = 0 if stat.S_ISDIR(st.st_mode) else st.st_size
+            self.mtimes[i] = st.st_mtime_ns
+            self.modes[i] = st.st_mode
+        self.has_stat = True
+
+    def __len__(self):
+        return len(self.flags)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the snapshot, for the memory budget"""
+        columns = (self._offsets, self.flags, self.sizes, self.mtimes, self.modes, self.ext_codes)
+        total = len(self._blob) + sum(column.itemsize * len(column) for column in columns)
+        if self._dirs is not None:
+            total += sum(60 + len(name) for name in self._dirs)  # str и ячейка множества
+        if self._name_index is not None:
+            total += self._name_index.nbytes
+        return total
+
+    def name(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode("utf-8", "surrogateescape")
+
+    def is_dir(self, i):
+        return bool(self.flags[i] & FLAG_DIR)
+
+    @property
+    def names(self):
+        return _NameView(self)
+
+    def names_at(self, indices):
+        """Names of the entries at indices, decoded on access"""
+        return _NameView(self, indices)
+
+    def decode_names(self):
+        """All names as a list, decoded in one call"""
+        if not len(self):
+            return []
+        return _joined_names(self._blob, self._offsets).decode("utf-8", "surrogateescape").split("\0")
+
+    def name_index(self):
+        """NameIndex of all entries, built on the first name filter and kept with the snapshot"""
+        if self._name_index is None:
+            self._name_index = NameIndex.from_blob(self._blob, self._offsets)
+        return self._name_index
+
+    @property
+    def dirs(self):
+        if self._dirs is None:
+            self._dirs = frozenset(self.name(i) for i, f in enumerate(self.flags) if f & FLAG_DIR)
+        return self._dirs
+
+    def visible_indices(self, show_hidden=False):
+        """Indices of entries shown in a pane, in name order: no tombstones, no dotfiles unless show_hidden"""
+        hide = FLAG_TOMBSTONE if show_hidden else FLAG_TOMBSTONE | FLAG_HIDDEN
+        return array('I', (i for i, f in enumerate(self.flags) if not f & hide))
+
+    def indices_with(self, flag):
+        return array('I', (i for i, f in enumerate(self.flags) if f & flag))
+
+class ListingCache:
+    """Directory snapshots shared by all panes, revalidated by the directory mtime.
+
+    With a MemoryBudget, snapshots are also charged by size and evicted with the other caches.
+    """
+    def __init__(self, max_dirs=64, budget=None):
+        self.max_dirs = max_dirs
+        self.budget = budget
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+        if budget is not None:
+            budget.register("listings", self._evict)
+
+    def list_dir(self, path):
+        key = os.path.normcase(os.path.abspath(path))
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                self._listings.move_to_end(key)
+                if self.budget is not None:
+                    self.budget.touch("listings", key)
+                return cached
+        listing = DirSnapshot.scan(path, mtime_ns)
+        with self._lock:
+            self._listings[key] = listing
+            self._listings.move_to_end(key)
+            dropped = self._drop_excess()
+        self._account(key, listing, dropped)
+        return listing
+
+    def seed(self, snapshot):
+        """Add a snapshot restored from disk; like any entry it is used only while the mtime matches"""
+        key = os.path.normcase(os.path.abspath(snapshot.path))
+        with self._lock:
+            snapshot = self._listings.setdefault(key, snapshot)
+            self._listings.move_to_end(key)
+            dropped = self._drop_excess()
+        self._account(key, snapshot, dropped)
+
+    def _drop_excess(self):
+        dropped = []
+        while len(self._listings) > self.max_dirs:
+            dropped.append(self._listings.popitem(last=False)[0])
+        return dropped
+
+    def _account(self, key, listing, dropped):
+        # Бюджет вызывается вне своей блокировки: выселение зайдёт в _evict и возьмёт её
+        if self.budget is None:
+            return
+        for old in dropped:
+            self.budget.release("listings", old)
+        self.budget.charge("listings", key, listing.nbytes)
+
+    def _evict(self, key):
+        with self._lock:
+            self._listings.pop(key, None)
+
+    def peek(self, path):
+        """Snapshot cached for path without checking the disk, or None; may be slightly stale"""
+        with self._lock:
+            return self._listings.get(os.path.normcase(os.path.abspath(path)))
+
+    def invalidate(self, path):
+        key = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            self._listings.pop(key, None)
+        if self.budget is not None:
+            self.budget.release("listings", key)
+
+def visible_entries(names, show_hidden=False):
+    """Sorted entry names without tombstones and, unless show_hidden, dotfiles"""
+    entries = [e for e in names if not is_tombstone(e)]
+    if not show_hidden:
+        entries = [e for e in entries if not e.startswith('.')]
+    entries.sort()
+    return entries
@@ -0,0 +1,175 @@
+import os
+import shutil
+import stat
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .copyjob import part_path
+from .duplicates import full_digest
+from .ioscheduler import shared_io_scheduler
+from .trash import move_to_trash
+
+# Синхронизация папки с другой: сравниваются снимки обоих деревьев (размер и mtime),
+# копируются только новые и изменённые файлы, а лишние в цели по желанию удаляются в корзину.
+# Одинаковые деревья сравниваются за один проход scandir по каждому, без чтения файлов.
+
+# Файловые системы вроде FAT хранят время с точностью до 2 секунд
+MTIME_TOLERANCE_NS = 2 * 10 ** 9
+
+# kind: "copy" — нового файла нет в цели, "update" — файл изменился, "mkdir" — новая папка,
+# "touch" — содержимое совпало по хэшу, переносится только время изменения,
+# "delete" — есть только в цели (выполняется только в режиме зеркала)
+SyncAction = namedtuple("SyncAction", "kind rel size")
+
+# Запись снимка дерева: is_dir для папок, is_link для символических ссылок (не разыменовываются)
+TreeEntry = namedtuple("TreeEntry", "size mtime_ns is_dir is_link")
+
+def scan_tree(root, cancel_event=None):
+    """{relative path: TreeEntry} of everything under root; one lstat per entry"""
+    entries = {}
+    stack = [""]
+    while stack:
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        rel_dir = stack.pop()
+        try:
+            it = os.scandir(os.path.join(root, rel_dir) if rel_dir else root)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                is_dir = stat.S_ISDIR(st.st_mode)
+                entries[rel] = TreeEntry(0 if is_dir else st.st_size, st.st_mtime_ns, is_dir, stat.S_ISLNK(st.st_mode))
+                if is_dir:
+                    stack.append(rel)
+    return entries
+
+class SyncPlan:
+    """What syncing src into dst would do; deletions are listed but applied only with mirror"""
+
+    def __init__(self, src, dst, actions, hashed=0):
+        self.src = src
+        self.dst = dst
+        self.actions = actions
+        self.hashed = hashed  # сколько файлов пришлось сравнить по содержимому
+
+    def actions_for(self, mirror=False):
+        return [a for a in self.actions if mirror or a.kind != "delete"]
+
+    def summary(self, mirror=False):
+        """{kind: (count, bytes)} for the actions that would run"""
+        totals = {}
+        for action in self.actions_for(mirror):
+            count, size = totals.get(action.kind, (0, 0))
+            totals[action.kind] = (count + 1, size + action.size)
+        return totals
+
+def _same_metadata(a, b):
+    return a.size == b.size and abs(a.mtime_ns - b.mtime_ns) <= MTIME_TOLERANCE_NS
+
+def compare_trees(src, dst, use_hash=False, cancel_event=None, progress_callback=None):
+    """SyncPlan for making dst match src; None if cancelled.
+
+    A file is unchanged when size and mtime match. With use_hash, files whose size matches
+    but mtime differs are compared by content, so merely touched files are not recopied.
+    progress_callback(stage, done, total) reports "scan" and "hash".
+    """
+    src, dst = os.path.abspath(src), os.path.abspath(dst)
+    if progress_callback:
+        progress_callback("scan", 0, 0)
+    # Источник и цель часто на разных дисках, поэтому они читаются параллельно
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        src_future = executor.submit(scan_tree, src, cancel_event)
+        dst_future = executor.submit(scan_tree, dst, cancel_event) if os.path.isdir(dst) else None
+        src_tree = src_future.result()
+        dst_tree = dst_future.result() if dst_future is not None else {}
+    if src_tree is None or dst_tree is None:
+        return None
+    actions, suspects = [], []
+    for rel in sorted(src_tree):
+        entry = src_tree[rel]
+        other = dst_tree.get(rel)
+        if entry.is_dir:
+            if other is None:
+                actions.append(SyncAction("mkdir", rel, 0))
+            elif not other.is_dir:
+                actions.append(SyncAction("mkdir", rel, 0))  # файл на месте папки уйдёт в корзину
+            continue
+        if other is None:
+            actions.append(SyncAction("copy", rel, entry.size))
+        elif other.is_dir:
+            actions.append(SyncAction("update", rel, entry.size))  # папка на месте файла уйдёт в корзину
+        elif not _same_metadata(entry, other):
+            if use_hash and entry.size == other.size and not entry.is_link and not other.is_link:
+                suspects.append(rel)
+            else:
+                actions.append(SyncAction("update", rel, entry.size))
+    for i, rel in enumerate(suspects):
+        if progress_callback:
+            progress_callback("hash", i, len(suspects))
+        try:
+            src_digest = full_digest(os.path.join(src, rel), cancel_event)
+            dst_digest = full_digest(os.path.join(dst, rel), cancel_event)
+        except OSError:
+            src_digest, dst_digest = rel, None
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        # Совпавшим файлам переносим время, чтобы в следующий раз хватило сравнения по mtime
+        actions.append(SyncAction("update", rel, src_tree[rel].size) if src_digest != dst_digest else SyncAction("touch", rel, 0))
+    # Лишнее в цели: достаточно удалить верхнюю папку, её содержимое уйдёт вместе с ней
+    deleted_dirs = set()
+    for rel in sorted(dst_tree):
+        if rel in src_tree:
+            continue
+        parent = os.path.dirname(rel)
+        while parent and parent not in deleted_dirs:
+            parent = os.path.dirname(parent)
+        if parent:
+            continue
+        actions.append(SyncAction("delete", rel, dst_tree[rel].size))
+        if dst_tree[rel].is_dir:
+            deleted_dirs.add(rel)
+    return SyncPlan(src, dst, actions, len(suspects))
+
+def apply_sync(plan, mirror=False, cancel_event=None, progress_callback=None):
+    """Carry out a SyncPlan; deletions go to the trash. Returns the number of actions done.
+
+    Files are copied to a hidden part file and renamed into place, as in CopyJob.
+    progress_callback(done_bytes, total_bytes) is called after each file.
+    """
+    order = {"delete": 0, "mkdir": 1, "copy": 2, "update": 2, "touch": 3}
+    actions = sorted(plan.actions_for(mirror), key=lambda a: (order[a.kind], a.rel))
+    total = sum(a.size for a in actions if a.kind in ("copy", "update"))
+    copied = done = 0
+    for action in actions:
+        shared_io_scheduler.throttle(cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        src = os.path.join(plan.src, action.rel)
+        dst = os.path.join(plan.dst, action.rel)
+        if action.kind == "delete":
+            if os.path.lexists(dst):
+                move_to_trash(dst)
+        elif action.kind == "mkdir":
+            if os.path.lexists(dst) and not os.path.isdir(dst):
+                move_to_trash(dst)
+            os.makedirs(dst, exist_ok=True)
+        elif action.kind == "touch":
+            shutil.copystat(src, dst, follow_symlinks=False)
+        else:
+            if os.path.isdir(dst) and not os.path.islink(dst):
+                move_to_trash(dst)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            part = part_path(dst)
+            shutil.copy2(src, part, follow_symlinks=False)
+            os.replace(part, dst)
+            copied += action.size
+            if progress_callback:
+                progress_callback(copied, total)
+        done += 1
+    return done
@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+import itertools
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from .fileops import remove_path
+from .mounts import get_mount_points
+
+try:
+    import winshell
+except ImportError:
+    winshell = None
+
+# Корзина по спецификации freedesktop.org (Linux и другие не-Windows системы).
+# Перемещение в корзину — это rename в пределах одного устройства плюс
+# маленький .trashinfo файл, поэтому оно мгновенно для дерева любого размера.
+TrashItem = namedtuple("TrashItem", "name original_path deletion_date trash_dir")
+
+def get_home_trash_dir():
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(str(Path.home()), ".local", "share")
+    return os.path.join(data_home, "Trash")
+
+def find_mount_point(path):
+    """Walk up from path until the device id changes"""
+    path = os.path.realpath(path)
+    dev = os.lstat(path).st_dev
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return path
+        try:
+            if os.lstat(parent).st_dev != dev:
+                return path
+        except OSError:
+            return path
+        path = parent
+
+def _ensure_trash_dir(trash_dir):
+    os.makedirs(os.path.join(trash_dir, "files"), mode=0o700, exist_ok=True)
+    os.makedirs(os.path.join(trash_dir, "info"), mode=0o700, exist_ok=True)
+    return trash_dir
+
+def _topdir_trash_candidates(topdir):
+    """$topdir/.Trash/$uid (only if .Trash is a sticky non-symlink dir) and $topdir/.Trash-$uid"""
+    uid = os.getuid()
+    shared = os.path.join(topdir, ".Trash")
+    try:
+        st = os.lstat(shared)
+        if not os.path.islink(shared) and os.path.isdir(shared) and st.st_mode & 0o1000:
+            yield os.path.join(shared, str(uid))
+    except OSError:
+        pass
+    yield os.path.join(topdir, f".Trash-{uid}")
+
+def get_trash_dir_for(path):
+    """Return (trash_dir, topdir) on the same device as path; topdir is None for the home trash"""
+    dev = os.lstat(path).st_dev
+    home_trash = get_home_trash_dir()
+    home_base = os.path.dirname(home_trash)
+    os.makedirs(home_base, exist_ok=True)
+    if os.stat(home_base).st_dev == dev:
+        return _ensure_trash_dir(home_trash), None
+    topdir = find_mount_point(os.path.dirname(path))
+    for candidate in _topdir_trash_candidates(topdir):
+        try:
+            return _ensure_trash_dir(candidate), topdir
+        except OSError:
+            continue
+    raise OSError(f"Нет доступной корзины на устройстве: {topdir}")
+
+def get_all_trash_dirs():
+    dirs = []
+    home_trash = get_home_trash_dir()
+    if os.path.isdir(os.path.join(home_trash, "info")):
+        dirs.append((home_trash, None))
+    # Корзины есть и на скрытых из списка дисков точках (tmpfs в /tmp, /dev/shm и т. п.):
+    # get_trash_dir_for создаёт их там же, поэтому перебираем все точки монтирования
+    for topdir in get_mount_points(include_pseudo=True):
+        for candidate in _topdir_trash_candidates(topdir):
+            if os.path.isdir(os.path.join(candidate, "info")) and (candidate, topdir) not in dirs:
+                dirs.append((candidate, topdir))
+    return dirs
+
+def move_to_trash(path):
+    """Move path into the trash of its own device: O(1) regardless of tree size"""
+    path = os.path.join(os.path.realpath(os.path.dirname(os.path.abspath(path))), os.path.basename(path))
+    trash_dir, topdir = get_trash_dir_for(path)
+    stored_path = os.path.relpath(path, topdir) if topdir else path
+    deletion_date = time.strftime("%Y-%m-%dT%H:%M:%S")
+    info = "[Trash Info]\nPath={}\nDeletionDate={}\n".format(quote(stored_path), deletion_date)
+    name = os.path.basename(path)
+    base, ext = os.path.splitext(name)
+    # Резервируем имя атомарно через O_EXCL на .trashinfo, как требует спецификация
+    for n in itertools.count(1):
+        candidate = name if n == 1 else f"{base}.{n}{ext}"
+        info_path = os.path.join(trash_dir, "info", candidate + ".trashinfo")
+        try:
+            fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            continue
+        if os.path.lexists(os.path.join(trash_dir, "files", candidate)):
+            os.close(fd)
+            os.remove(info_path)
+            continue
+        break
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(info)
+    try:
+        os.rename(path, os.path.join(trash_dir, "files", candidate))
+    except OSError:
+        os.remove(info_path)
+        raise
+    return TrashItem(candidate, path, deletion_date.replace("T", " "), trash_dir)
+
+def read_trash_info(info_path, topdir=None):
+    original_path, deletion_date = "", ""
+    with open(info_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            key, _, value = line.strip().partition("=")
+            if key == "Path":
+                original_path = unquote(value)
+            elif key == "DeletionDate":
+                deletion_date = value.replace("T", " ")
+    if topdir and not os.path.isabs(original_path):
+        original_path = os.path.join(topdir, original_path)
+    return original_path, deletion_date
+
+def iter_trash():
+    """Lazily yield TrashItem for every entry in all trash dirs, reading one .trashinfo at a time"""
+    if winshell is not None and sys.platform.startswith("win"):
+        for item in winshell.recycle_bin():
+            yield TrashItem(os.path.basename(item.original_filename()), item.original_filename(), str(item.recycle_date()), None)
+        return
+    for trash_dir, topdir in get_all_trash_dirs():
+        try:
+            it = os.scandir(os.path.join(trash_dir, "info"))
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if not entry.name.endswith(".trashinfo"):
+                    continue
+                name = entry.name[:-len(".trashinfo")]
+                try:
+                    original_path, deletion_date = read_trash_info(entry.path, topdir)
+                except OSError:
+                    continue
+                yield TrashItem(name, original_path, deletion_date, trash_dir)
+
+def restore_from_trash(item):
+    if item.trash_dir is None:
+        winshell.undelete(item.original_path)
+        return
+    if os.path.lexists(item.original_path):
+        raise FileExistsError(f"Файл уже существует: {item.original_path}")
+    os.makedirs(os.path.dirname(item.original_path), exist_ok=True)
+    os.rename(os.path.join(item.trash_dir, "files", item.name), item.original_path)
+    os.remove(os.path.join(item.trash_dir, "info", item.name + ".trashinfo"))
+
+def delete_from_trash(item):
+    files_path = os.path.join(item.trash_dir, "files", item.name)
+    if os.path.lexists(files_path):
+        remove_path(files_path)
+    os.remove(os.path.join(item.trash_dir, "info", item.name + ".trashinfo"))
+
+def empty_trash(progress_callback=None):
+    """Permanently delete everything in the trash; returns number of removed items"""
+    if winshell is not None and sys.platform.startswith("win"):
+        winshell.recycle_bin().empty(confirm=False, show_progress=False, sound=False)
+        return 0
+    removed = 0
+    for trash_dir, _ in get_all_trash_dirs():
+        for sub in ("files", "info"):
+            sub_dir = os.path.join(trash_dir, sub)
+            try:
+                names = os.listdir(sub_dir)
+            except OSError:
+                continue
+            for name in names:
+                try:
+                    remove_path(os.path.join(sub_dir, name))
+                except OSError:
+                    continue
+                if sub == "files":
+                    removed += 1
+                    if progress_callback:
+                        progress_callback(removed)
+        sizes_cache = os.path.join(trash_dir, "directorysizes")
+        if os.path.exists(sizes_cache):
+            os.remove(sizes_cache)
+    return removed
@@ -0,0 +1,262 @@
+"""Headless soak run of the file manager window.
+
+Replays thousands of navigations, searches, zooms, tab switches and file operations
+against a generated folder tree and fails when live QObjects, Python objects or RSS
+keep growing after warm-up:
+
+    python maini_soak.py --steps 5000
+
+Runs on the offscreen Qt platform with its own XDG folders, so the real session,
+trash and caches are never touched. Exit code 1 means a leak threshold was crossed.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="длинный прогон окна без экрана с проверкой утечек")
+    parser.add_argument("--steps", type=int, default=3000, help="сколько действий выполнить")
+    parser.add_argument("--warmup", type=int, default=300, help="действий до базового замера (кэши успевают заполниться)")
+    parser.add_argument("--sample-every", type=int, default=250, help="как часто снимать счётчики")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-qobjects", type=int, default=500, help="допустимый рост числа QObject")
+    parser.add_argument("--max-pyobjects", type=int, default=50000, help="допустимый рост числа объектов Python")
+    parser.add_argument("--max-rss-mb", type=int, default=64, help="допустимый рост RSS, МБ")
+    parser.add_argument("--keep", action="store_true", help="не удалять временную папку после прогона")
+    args = parser.parse_args(argv)
+    if not 0 < args.warmup < args.steps:
+        parser.error("--warmup должен быть меньше --steps")
+    return args
+
+def make_fixture(root, images):
+    """Folder tree with text files, images and nested folders; returns the folder paths"""
+    dirs = [root]
+    for i in range(12):
+        folder = os.path.join(root, f"folder_{i}")
+        os.makedirs(os.path.join(folder, "nested", "deeper"))
+        dirs.extend([folder, os.path.join(folder, "nested"), os.path.join(folder, "nested", "deeper")])
+        for j in range(40):
+            with open(os.path.join(folder, f"file_{j}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"строка {j}\n" * (j + 1) + ("needle\n" if j % 7 == 0 else ""))
+        for j in range(6):
+            images(os.path.join(folder, f"image_{j}.png"), 64 + 16 * j)
+        with open(os.path.join(folder, ".hidden"), "w") as f:
+            f.write("x")
+    os.makedirs(os.path.join(root, "scratch"))
+    return dirs
+
+class Soak:
+    def __init__(self, app, window, dirs, scratch, rng):
+        self.app = app
+        self.window = window
+        self.dirs = dirs
+        self.scratch = scratch
+        self.rng = rng
+        self.counter = 0
+        self.actions = [
+            (30, self.navigate), (8, self.go_back), (6, self.go_up), (4, self.special_views),
+            (6, self.name_filter), (3, self.content_search), (6, self.zoom), (4, self.toggle_view),
+            (4, self.tabs), (3, self.dual_pane), (6, self.click_animation), (5, self.preview_image),
+            (8, self.file_ops), (2, self.copy_job), (2, self.breadcrumb_completion),
+        ]
+        self.weights = [weight for weight, _ in self.actions]
+
+    def pane(self):
+        return self.window.active_pane
+
+    def step(self):
+        _, action = self.rng.choices(self.actions, self.weights)[0]
+        action()
+        self.settle()
+
+    def reset(self):
+        """Put the window into the same state before each measurement.
+
+        Open tabs, the second pane, the preview and the view mode decide how many widgets
+        are alive, so without this the counters follow the last random action, not leaks.
+        """
+        window = self.window
+        while window.tabbar.count() > 1:
+            window.close_tab(window.tabbar.count() - 1)
+        if window.preview_visible:
+            window.toggle_preview()
+        if window.view_mode != "grid":
+            window.toggle_view_mode()
+        window.search_input.setText("")
+        window.scale_factor = 1.0
+        window.update_scale()
+        # Скрытая вторая панель не перестраивается при смене вида: открываем её заново и прячем
+        if window.second_pane is not None:
+            if not window.second_pane.isVisible():
+                window.toggle_dual_pane()
+            window.second_pane.open_dir(self.dirs[0], add_history=False)
+            window.toggle_dual_pane()
+        window.open_dir(self.dirs[0])
+        self.settle()
+
+    def settle(self):
+        """Deliver worker results and run deleteLater, as the event loop would between clicks"""
+        from PyQt6.QtCore import QCoreApplication, QEvent
+        self.window.thread_pool.pool.waitForDone(5000)
+        self.window.thread_pool.bulk_pool.waitForDone(5000)
+        # Удаление вкладки откладывает удаление её сигнальных прокси ещё на один проход
+        for _ in range(2):
+            self.app.processEvents()
+            QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+    def navigate(self):
+        self.pane().open_dir(self.rng.choice(self.dirs))
+
+    def go_back(self):
+        self.window.go_back()
+
+    def go_up(self):
+        pane = self.pane()
+        if pane.current_view == "dir" and pane.current_path != self.dirs[0]:
+            pane.open_dir(os.path.dirname(pane.current_path))
+
+    def special_views(self):
+        if self.rng.random() < 0.5:
+            self.window.open_recycle_bin_dir()
+        else:
+            self.window.open_disks_dir()
+
+    def name_filter(self):
+        self.window.search_input.setText(self.rng.choice(["file_1", "image", "ext:txt", "size:>10", "nested", ""]))
+        self.window.search_input.setText("")
+
+    def content_search(self):
+        # Поиск идёт по всем вложенным папкам, поэтому только внутри тестового дерева
+        self.pane().open_dir(self.rng.choice(self.dirs))
+        self.window.content_search_btn.setChecked(True)
+        self.window.search_input.setText("needle")
+        self.window.start_content_search()
+        self.settle()
+        self.window.content_search_btn.setChecked(False)
+        self.window.search_input.setText("")
+
+    def zoom(self):
+        self.window.scale_factor = self.rng.choice([0.5, 0.8, 1.0, 1.3, 2.0])
+        self.window.update_scale()
+
+    def toggle_view(self):
+        self.window.toggle_view_mode()
+
+    def tabs(self):
+        if self.window.tabbar.count() < 4 and self.rng.random() < 0.6:
+            self.window.new_tab(self.rng.choice(self.dirs))
+        else:
+            self.window.close_tab(self.window.tabbar.count() - 1)
+
+    def dual_pane(self):
+        self.window.toggle_dual_pane()
+
+    def file_widgets(self):
+        from maini import FileWidget
+        return self.pane().folders_widget.findChildren(FileWidget)
+
+    def click_animation(self):
+        widgets = self.file_widgets()
+        for widget in self.rng.sample(widgets, min(5, len(widgets))):
+            widget.animate_click()
+
+    def preview_image(self):
+        pane = self.pane()
+        if pane.current_view != "dir":
+            return
+        images = [os.path.join(pane.current_path, name) for name in os.listdir(pane.current_path) if name.endswith(".png")]
+        if images:
+            if not pane.preview.isVisible():
+                self.window.toggle_preview()
+            pane.file_clicked(self.rng.choice(images), False)
+
+    def file_ops(self):
+        from maini_core import make_tombstone
+        self.counter += 1
+        path = os.path.join(self.scratch, f"item_{self.counter}")
+        os.makedirs(os.path.join(path, "inner"))
+        with open(os.path.join(path, "inner", "data.txt"), "w") as f:
+            f.write("data" * 100)
+        renamed = path + "_renamed"
+        os.rename(path, renamed)
+        self.pane().open_dir(self.scratch)
+        # Как «Удалить навсегда»: tombstone сразу, удаление дерева в фоне
+        self.window.remove_tombstone_in_background(make_tombstone(renamed))
+        self.window.refresh_all_panes()
+
+    def copy_job(self):
+        src = os.path.join(self.dirs[0], "folder_0")
+        dst = os.path.join(self.scratch, f"copy_{self.counter}")
+        os.makedirs(dst)
+        self.window.transfer([src], dst)
+        self.settle()
+        shutil.rmtree(dst, ignore_errors=True)
+
+    def breadcrumb_completion(self):
+        self.window.breadcrumb_edit_mode()
+        self.window.breadcrumb_edit.setText(os.path.join(self.dirs[0], "fold"))
+        self.window.update_path_completions()
+        self.settle()
+        self.window.breadcrumb_edit_apply()
+
+def main(argv=None):
+    args = parse_args(argv)
+    work = tempfile.mkdtemp(prefix="maini-soak-")
+    # Свои XDG-папки: сессия, корзина и журналы прогона не смешиваются с настоящими
+    for name in ("XDG_STATE_HOME", "XDG_CACHE_HOME", "XDG_DATA_HOME", "XDG_CONFIG_HOME"):
+        os.environ[name] = os.path.join(work, name.lower())
+        os.makedirs(os.environ[name])
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # иконки ищутся в текущей папке
+
+    from PyQt6.QtCore import QObject
+    from PyQt6.QtGui import QColor, QImage
+    from PyQt6.QtWidgets import QApplication
+    from maini import CustomWindow
+    from maini_core.leakcheck import LeakTracker
+
+    app = QApplication(sys.argv[:1])
+
+    def write_image(path, size):
+        image = QImage(size, size, QImage.Format.Format_RGB32)
+        image.fill(QColor(size % 256, 80, 160))
+        image.save(path, "PNG")
+
+    dirs = make_fixture(os.path.join(work, "tree"), write_image)
+    window = CustomWindow()
+    window.show()
+
+    def count_qobjects():
+        # Виджеты без родителя (отцепленные setParent(None) и не удалённые) видны в allWidgets
+        return len(app.allWidgets()) + sum(1 for obj in window.findChildren(QObject) if not obj.isWidgetType())
+
+    tracker = LeakTracker(count_qobjects, {
+        "qobjects": args.max_qobjects, "pyobjects": args.max_pyobjects, "rss": args.max_rss_mb * 1024 * 1024})
+    soak = Soak(app, window, dirs, os.path.join(dirs[0], "scratch"), random.Random(args.seed))
+    print(f"{'шаг':>6} {'сек':>7} {'QObject':>8} {'объекты':>9} {'RSS, МБ':>8}")
+    try:
+        for step in range(1, args.steps + 1):
+            soak.step()
+            if step != args.warmup and step % args.sample_every and step != args.steps:
+                continue
+            soak.reset()
+            sample = tracker.mark_baseline(step) if step == args.warmup else tracker.sample(step)
+            print(f"{sample.step:>6} {sample.elapsed:>7.1f} {sample.qobjects:>8} {sample.pyobjects:>9} {sample.rss / 2 ** 20:>8.1f}")
+        failures = tracker.failures()
+        print("рост после разогрева:", ", ".join(f"{name} {grown:+}" for name, grown in tracker.growth().items()))
+        for name, count in tracker.type_growth():
+            print(f"  {name}: +{count}")
+    finally:
+        window.close()
+        soak.settle()
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+    for name, grown, limit in failures:
+        print(f"УТЕЧКА: {name} вырос на {grown}, порог {limit}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
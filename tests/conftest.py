@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+@pytest.fixture(autouse=True)
+def xdg_dirs(tmp_path, monkeypatch):
+    """Own XDG folders for every test: journals, caches and the trash never touch the real ones"""
+    # Корзины .Trash-$uid на настоящих дисках тесты не видят и не очищают
+    monkeypatch.setattr("maini_core.trash.get_mount_points", lambda include_pseudo=False: [])
+    dirs = {}
+    for name in ("XDG_STATE_HOME", "XDG_CACHE_HOME", "XDG_DATA_HOME", "XDG_CONFIG_HOME"):
+        path = tmp_path / "xdg" / name.lower()
+        path.mkdir(parents=True)
+        monkeypatch.setenv(name, str(path))
+        dirs[name] = path
+    return dirs
+
+@pytest.fixture
+def tree(tmp_path):
+    """Factory writing {relative path: bytes or str} under a fresh folder; returns the folder"""
+    counter = iter(range(1000))
+
+    def make(files, name=None):
+        root = tmp_path / (name or f"tree{next(counter)}")
+        root.mkdir()
+        for rel, data in files.items():
+            path = root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if data is None:
+                path.mkdir(exist_ok=True)
+            else:
+                path.write_bytes(data.encode() if isinstance(data, str) else data)
+        return root
+    return make
+
+def set_mtime(path, seconds):
+    os.utime(path, (seconds, seconds))
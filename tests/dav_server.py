@@ -0,0 +1,162 @@
+import base64
+import os
+import shutil
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+# Минимальный WebDAV-сервер поверх локальной папки для тестов WebDAVProvider:
+# PROPFIND (Depth 0/1), GET, PUT, DELETE и MKCOL с keep-alive соединениями
+
+class DAVServer(ThreadingHTTPServer):
+    """Serves root on 127.0.0.1 on a free port; counts connections and logs requests.
+
+    credentials ("user", "password") turn on Basic auth; fail maps a request path to a
+    status code the server answers with instead of handling the request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root, credentials=None):
+        super().__init__(("127.0.0.1", 0), DAVHandler)
+        self.root = str(root)
+        self.credentials = credentials
+        self.fail = {}
+        self.connections = 0
+        self.requests = []  # (method, path)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"dav://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def methods(self):
+        with self._lock:
+            return [method for method, _ in self.requests]
+
+class DAVHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _local(self):
+        path = unquote(urlsplit(self.path).path)
+        return os.path.join(self.server.root, os.path.normpath("/" + path).lstrip("/"))
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin(self):
+        """Read the request body; answer auth failures and forced errors and return None for them"""
+        body = self._body()
+        server = self.server
+        path = unquote(urlsplit(self.path).path)
+        with server._lock:
+            server.requests.append((self.command, path))
+        if server.credentials:
+            expected = "Basic " + base64.b64encode(":".join(server.credentials).encode()).decode()
+            if self.headers.get("Authorization") != expected:
+                self._send(401, headers={"WWW-Authenticate": 'Basic realm="test"'})
+                return None
+        status = server.fail.get(path.rstrip("/") or "/")
+        if status:
+            self._send(status)
+            return None
+        return body
+
+    def _propstat(self, local, href):
+        st = os.stat(local)
+        if os.path.isdir(local):
+            href = href.rstrip("/") + "/"
+            props = "<d:resourcetype><d:collection/></d:resourcetype>"
+        else:
+            props = f"<d:resourcetype/><d:getcontentlength>{st.st_size}</d:getcontentlength>"
+        props += f"<d:getlastmodified>{formatdate(st.st_mtime, usegmt=True)}</d:getlastmodified>"
+        return (f"<d:response><d:href>{escape(quote(href))}</d:href><d:propstat><d:prop>{props}</d:prop>"
+                "<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>")
+
+    def do_PROPFIND(self):
+        if self._begin() is None:
+            return
+        local = self._local()
+        if not os.path.exists(local):
+            return self._send(404)
+        href = unquote(urlsplit(self.path).path)
+        responses = [self._propstat(local, href)]
+        if self.headers.get("Depth") == "1" and os.path.isdir(local):
+            for name in sorted(os.listdir(local)):
+                responses.append(self._propstat(os.path.join(local, name), href.rstrip("/") + "/" + name))
+        body = ('<?xml version="1.0" encoding="utf-8"?><d:multistatus xmlns:d="DAV:">'
+                + "".join(responses) + "</d:multistatus>").encode()
+        self._send(207, body, {"Content-Type": "application/xml; charset=utf-8"})
+
+    def do_GET(self):
+        if self._begin() is None:
+            return
+        local = self._local()
+        if not os.path.isfile(local):
+            return self._send(404)
+        with open(local, "rb") as f:
+            self._send(200, f.read())
+
+    def do_PUT(self):
+        body = self._begin()
+        if body is None:
+            return
+        local = self._local()
+        if not os.path.isdir(os.path.dirname(local)):
+            return self._send(409)
+        existed = os.path.exists(local)
+        with open(local, "wb") as f:
+            f.write(body)
+        self._send(204 if existed else 201)
+
+    def do_DELETE(self):
+        if self._begin() is None:
+            return
+        local = self._local()
+        if not os.path.lexists(local):
+            return self._send(404)
+        if os.path.isdir(local):
+            shutil.rmtree(local)
+        else:
+            os.unlink(local)
+        self._send(204)
+
+    def do_MKCOL(self):
+        if self._begin() is None:
+            return
+        local = self._local()
+        if os.path.exists(local):
+            return self._send(405)
+        if not os.path.isdir(os.path.dirname(local.rstrip("/"))):
+            return self._send(409)
+        os.mkdir(local)
+        self._send(201)
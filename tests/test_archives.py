@@ -0,0 +1,72 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from maini_core.archives import ArchiveCache, archive_stem, is_archive, split_archive_path
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+
+def make_tar(path, members, mode="w:gz"):
+    with tarfile.open(path, mode) as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+def test_split_archive_path_and_stem(tree):
+    root = tree({"docs.tar.gz": "", "plain.zip/": None})
+    archive = str(root / "docs.tar.gz")
+    assert split_archive_path(archive + "/reports/2024.txt") == (archive, "reports/2024.txt")
+    assert split_archive_path(archive) == (archive, "")
+    assert split_archive_path(str(root / "plain.zip" / "x")) is None  # папка с именем архива — не архив
+    assert archive_stem(archive) == "docs" and archive_stem("/x/.tgz") == ".tgz"
+    assert is_archive(archive) and not is_archive(str(root / "plain.zip"))
+
+@pytest.mark.parametrize("kind", ["zip", "tar.gz"])
+def test_list_read_and_extract(tree, kind):
+    members = {"reports/2024.txt": b"year", "reports/q/1.txt": b"q1", "top.txt": b"top"}
+    root = tree({})
+    archive = str(root / f"docs.{kind}")
+    (make_zip if kind == "zip" else make_tar)(archive, members)
+    cache = ArchiveCache()
+    listing = cache.list_dir(archive)
+    assert sorted(listing.names) == ["reports", "top.txt"] and listing.dirs == frozenset({"reports"})
+    assert sorted(cache.list_dir(archive + "/reports").names) == ["2024.txt", "q"]
+    assert cache.member(archive + "/reports/2024.txt").size == 4
+    with cache.open_member(archive + "/reports/q/1.txt") as f:
+        assert f.read() == b"q1"
+    with pytest.raises(NotADirectoryError):
+        cache.list_dir(archive + "/missing")
+    with pytest.raises(FileNotFoundError):
+        cache.open_member(archive + "/reports")
+    out = tree({})
+    extracted = cache.extract(archive + "/reports", str(out))
+    assert (out / "reports" / "q" / "1.txt").read_bytes() == b"q1" and extracted == str(out / "reports")
+    assert open(cache.extract(archive + "/top.txt", str(out)), "rb").read() == b"top"
+
+def test_unsafe_member_names_are_dropped(tree):
+    root = tree({})
+    archive = str(root / "evil.zip")
+    make_zip(archive, {"../escape.txt": b"x", "/abs/ok.txt": b"y", "a/../../up.txt": b"z"})
+    listing = ArchiveCache().list_dir(archive)
+    assert sorted(listing.names) == ["abs"]
+
+def test_cache_reindexes_changed_archive(tree):
+    root = tree({})
+    archive = str(root / "data.zip")
+    make_zip(archive, {"one.txt": b"1"})
+    cache = ArchiveCache(max_archives=1)
+    assert cache.index(archive) is cache.index(archive)
+    make_zip(archive, {"one.txt": b"1", "two.txt": b"22"})
+    os.utime(archive, ns=(0, 10**18))
+    assert sorted(cache.list_dir(archive).names) == ["one.txt", "two.txt"]
+    broken = root / "broken.tar.gz"
+    broken.write_bytes(b"not an archive")
+    with pytest.raises(OSError):
+        cache.index(str(broken))
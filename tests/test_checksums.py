@@ -0,0 +1,45 @@
+import hashlib
+import threading
+
+from maini_core.checksums import compute_checksums, is_manifest, parse_manifest, verify_manifest
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def test_compute_checksums_matches_hashlib(tree):
+    data = b"x" * (3 * 1024 * 1024 + 7)
+    root = tree({"blob": data})
+    progress = []
+    digests = compute_checksums(str(root / "blob"), ["sha256", "blake2b"], lambda done, total: progress.append(done))
+    assert digests == {"sha256": sha256(data), "blake2b": hashlib.blake2b(data).hexdigest()}
+    assert progress[-1] == len(data) and progress == sorted(progress)
+    cancel = threading.Event()
+    cancel.set()
+    assert compute_checksums(str(root / "blob"), ["sha256"], cancel_event=cancel) is None
+
+def test_parse_gnu_and_bsd_lines(tree):
+    root = tree({"SHA256SUMS": f"# comment\n{sha256(b'a')}  a.txt\n{sha256(b'b')} *sub/b bin\n"
+                                f"SHA256 (c.txt) = {sha256(b'c').upper()}\nnot a line\n"})
+    entries = parse_manifest(str(root / "SHA256SUMS"))
+    assert [(e.name, e.algorithm, e.path) for e in entries] == [
+        ("a.txt", "sha256", str(root / "a.txt")), ("sub/b bin", "sha256", str(root / "sub/b bin")),
+        ("c.txt", "sha256", str(root / "c.txt")),
+    ]
+    assert entries[2].digest == sha256(b"c")
+    assert is_manifest("release.md5") and is_manifest("B2SUMS") and not is_manifest("notes.txt")
+
+def test_verify_reports_every_status(tree):
+    root = tree({"ok.txt": "ok", "bad.txt": "changed",
+                 "files.sha256": f"{sha256(b'ok')}  ok.txt\n{sha256(b'bad')}  bad.txt\n{sha256(b'x')}  gone.txt\n"})
+    results = verify_manifest(str(root / "files.sha256"), workers=2)
+    assert [(r.entry.name, r.status) for r in results] == [("ok.txt", "ok"), ("bad.txt", "mismatch"), ("gone.txt", "missing")]
+
+def test_names_outside_manifest_folder_are_errors(tree):
+    outside = tree({"secret.txt": "secret"})
+    digest = sha256(b"secret")
+    root = tree({"inner/SHA256SUMS": f"{digest}  {outside}/secret.txt\n{digest}  ../../{outside.name}/secret.txt\n"
+                                     f"SHA256 (sub/../../x) = {digest}\n{digest}  ..\\\\x\n{digest}  fine..name\n"})
+    results = verify_manifest(str(root / "inner" / "SHA256SUMS"))
+    # Файлы вне папки манифеста не открываются, даже если хэш совпал бы
+    assert [r.status for r in results] == ["error", "error", "error", "error", "missing"]
+    assert [r.entry.path is None for r in results] == [True, True, True, True, False]
@@ -0,0 +1,31 @@
+import os
+
+from maini_core.cli import main
+
+def test_ls_lists_sorted_with_dirs_marked(tree, capsys):
+    root = tree({"b.txt": "b", "a": None, ".hidden": "h"})
+    assert main(["ls", str(root)]) == 0
+    assert capsys.readouterr().out.splitlines() == ["a/", "b.txt"]
+    assert main(["ls", "-a", str(root)]) == 0
+    assert ".hidden" in capsys.readouterr().out.splitlines()
+
+def test_find_prints_matching_paths(tree, capsys):
+    root = tree({"x/report-2024.txt": "1", "y/notes.txt": "2"})
+    assert main(["find", str(root), "report"]) == 0
+    assert capsys.readouterr().out.splitlines() == [str(root / "x" / "report-2024.txt")]
+
+def test_rm_moves_to_trash_and_trash_restore(tree, capsys):
+    root = tree({"doc.txt": "d"})
+    assert main(["rm", str(root / "doc.txt")]) == 0
+    assert not (root / "doc.txt").exists()
+    assert main(["trash", "restore", "doc.txt"]) == 0
+    assert (root / "doc.txt").exists()
+
+def test_rm_permanent_leaves_nothing(tree):
+    root = tree({"dir/file.txt": "x"})
+    assert main(["rm", "--permanent", str(root / "dir")]) == 0
+    assert os.listdir(root) == []
+
+def test_os_errors_become_exit_code(tmp_path, capsys):
+    assert main(["ls", str(tmp_path / "missing")]) == 1
+    assert "Ошибка" in capsys.readouterr().err
@@ -0,0 +1,39 @@
+import os
+
+from maini_core.completion import complete_path, match_score, rank_completions, split_for_completion
+from maini_core.providers import ProviderRegistry
+
+def test_split_for_completion(monkeypatch):
+    monkeypatch.setenv("HOME", "/home/user")
+    assert split_for_completion("/usr/lo") == ("/usr", "lo")
+    assert split_for_completion("/usr/") == ("/usr", "")
+    assert split_for_completion("~/Doc") == ("/home/user", "Doc")
+    assert split_for_completion("Doc") == (None, "Doc")
+    assert split_for_completion("dav://host") == (None, "")
+    assert split_for_completion("dav://host/") == ("dav://host", "")
+    assert split_for_completion("dav://host/a/b") == ("dav://host/a", "b")
+
+def test_match_tiers():
+    assert match_score("Doc", "Documents") < match_score("doc", "Documents") < match_score("cum", "Documents")
+    assert match_score("dcmnt", "Documents")[0] == 3
+    assert match_score("xyz", "Documents") is None
+    assert match_score("", "anything") == (0, 0)
+
+def test_rank_completions_orders_and_limits():
+    names = ["music", "Music", "my-uploads", "Documents", "Desktop"]
+    assert rank_completions("Mu", names) == ["Music", "music", "my-uploads"]
+    assert rank_completions("mu", names) == ["music", "Music", "my-uploads"]  # нечёткое совпадение последним
+    assert rank_completions("ds", names) == ["my-uploads", "Desktop", "Documents"]  # подстрока раньше нечёткого
+    assert rank_completions("", names, limit=2) == ["Desktop", "Documents"]
+
+def test_complete_path_lists_folders_and_archives(tree):
+    root = tree({"Docs/": None, "downloads/": None, ".dotdir/": None, "data.zip": "", "notes.txt": ""})
+    registry = ProviderRegistry()
+    assert complete_path(str(root) + "/d", registry) == [
+        str(root / "data.zip"), str(root / "downloads"), str(root / "Docs"),
+    ]
+    assert complete_path(str(root) + "/.d", registry) == [str(root / ".dotdir")]
+    assert str(root / ".dotdir") in complete_path(str(root) + "/", registry, show_hidden=True)
+    assert complete_path(str(root / "missing") + "/x", registry) == []
+    assert complete_path("relative", registry) == []
+    assert os.path.basename(complete_path(str(root) + "/dcs", registry)[0]) == "Docs"
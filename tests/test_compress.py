@@ -0,0 +1,55 @@
+import os
+import tarfile
+import threading
+import zipfile
+
+import pytest
+
+from maini_core.compress import compress_formats, compress_paths, default_archive_path
+
+def test_default_archive_path_does_not_overwrite(tree):
+    root = tree({"docs/a.txt": "a", "docs.zip": "", "other.txt": ""})
+    assert default_archive_path([str(root / "docs")], "zip") == str(root / "docs (2).zip")
+    assert default_archive_path([str(root / "docs"), str(root / "other.txt")], "tar.gz") == str(root / "Архив.tar.gz")
+    assert compress_formats()[0] == "zip"
+
+def test_zip_keeps_tree_and_stores_precompressed(tree):
+    root = tree({"docs/a.txt": "a" * 5000, "docs/sub/photo.jpg": b"\xff\xd8" * 100, "docs/empty/": None})
+    progress = []
+    dst = compress_paths([str(root / "docs")], str(root / "docs.zip"), "zip",
+                         progress_callback=lambda done, total, speed: progress.append((done, total)))
+    with zipfile.ZipFile(dst) as zf:
+        infos = {info.filename: info for info in zf.infolist()}
+        assert zf.read("docs/a.txt") == b"a" * 5000
+    assert {"docs/", "docs/empty/", "docs/sub/", "docs/a.txt", "docs/sub/photo.jpg"} <= set(infos)
+    assert infos["docs/sub/photo.jpg"].compress_type == zipfile.ZIP_STORED
+    assert infos["docs/a.txt"].compress_type == zipfile.ZIP_DEFLATED
+    assert progress[-1] == (5200, 5200)
+    assert not os.path.exists(dst + ".part")
+
+@pytest.mark.parametrize("fmt", compress_formats()[1:])
+def test_tar_streams_files_and_links(tree, fmt):
+    root = tree({"data/a.bin": os.urandom(3 * 1024 * 1024), "data/b.txt": "b"})
+    os.symlink("b.txt", root / "data" / "link")
+    dst = compress_paths([str(root / "data")], str(root / f"data.{fmt}"), fmt)
+    if fmt == "tar.zst":
+        import zstandard
+        with open(dst, "rb") as fh, zstandard.ZstdDecompressor().stream_reader(fh) as reader:
+            (root / "data.tar").write_bytes(reader.read())
+        dst = str(root / "data.tar")
+    with tarfile.open(dst) as tf:
+        assert tf.extractfile("data/a.bin").read() == (root / "data" / "a.bin").read_bytes()
+        assert tf.getmember("data/link").issym()
+
+def test_cancel_removes_partial_archive(tree):
+    root = tree({"big.bin": os.urandom(2 * 1024 * 1024)})
+    cancel = threading.Event()
+    cancel.set()
+    assert compress_paths([str(root / "big.bin")], str(root / "big.zip"), "zip", cancel_event=cancel) is None
+    assert sorted(os.listdir(root)) == ["big.bin"]
+
+def test_unknown_format_cleans_up(tree):
+    root = tree({"a.txt": "a"})
+    with pytest.raises(ValueError):
+        compress_paths([str(root / "a.txt")], str(root / "a.rar"), "rar")
+    assert sorted(os.listdir(root)) == ["a.txt"]
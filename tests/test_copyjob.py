@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+
+import pytest
+
+from maini_core import copyjob
+from maini_core.copyjob import CopyJob, CopyJobBusy, part_path
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(copyjob, "CHUNK_SIZE", 1024)
+    monkeypatch.setattr(copyjob, "CHECKPOINT_BYTES", 4096)
+
+def cancel_after(limit):
+    """(cancel_event, progress_callback) that cancels once limit bytes were copied"""
+    cancel = threading.Event()
+    seen = []
+
+    def progress(done, total):
+        seen.append(done)
+        if done >= limit:
+            cancel.set()
+    return cancel, progress, seen
+
+def interrupted_job(tree, data, limit=10000):
+    src = tree({"big.bin": data})
+    dst = tree({})
+    job = CopyJob([str(src / "big.bin")], str(dst))
+    cancel, progress, _ = cancel_after(limit)
+    assert job.run(cancel, progress) is None
+    return src / "big.bin", dst, job.journal_path
+
+def test_copies_tree_and_removes_journal(tree):
+    src = tree({"docs/a.txt": "a", "docs/sub/b.txt": "b", "docs/empty/": None})
+    os.symlink("sub", src / "docs" / "link")
+    dst = tree({})
+    job = CopyJob([str(src / "docs")], str(dst))
+    assert job.run() == [str(dst / "docs")]
+    assert (dst / "docs" / "sub" / "b.txt").read_text() == "b" and (dst / "docs" / "empty").is_dir()
+    assert os.readlink(dst / "docs" / "link") == "sub"  # ссылка на папку остаётся ссылкой
+    assert not os.path.exists(job.journal_path) and CopyJob.pending() == []
+    with pytest.raises(OSError):
+        CopyJob([str(src / "docs")], str(src / "docs" / "sub")).run()  # в саму себя
+    assert CopyJob.pending() == [] and os.listdir(copyjob.journals_dir()) == []
+
+def test_resume_continues_from_checkpoint(tree, small_chunks):
+    data = os.urandom(40000)
+    src, dst, journal = interrupted_job(tree, data)
+    assert os.path.exists(part_path(str(dst / "big.bin"))) and not (dst / "big.bin").exists()
+    record = json.loads(open(journal).read().splitlines()[-1])
+    assert record["src_size"] == len(data) and record["offset"] >= 10000
+    [job] = CopyJob.pending()
+    progress = []
+    assert job.run(progress_callback=lambda done, total: progress.append(done)) == [str(dst / "big.bin")]
+    assert progress[0] == record["offset"]  # начато с контрольной точки, а не с нуля
+    assert (dst / "big.bin").read_bytes() == data
+    assert not os.path.exists(part_path(str(dst / "big.bin")))
+
+def test_changed_source_restarts_file(tree, small_chunks):
+    src, dst, _ = interrupted_job(tree, b"a" * 40000)
+    src.write_bytes(b"b" * 40000)  # тот же размер, другое содержимое и mtime
+    os.utime(src, ns=(0, os.stat(src).st_mtime_ns + 10**9))
+    [job] = CopyJob.pending()
+    progress = []
+    job.run(progress_callback=lambda done, total: progress.append(done))
+    assert progress[0] <= copyjob.CHUNK_SIZE
+    assert (dst / "big.bin").read_bytes() == b"b" * 40000
+
+def test_truncated_part_restarts_file(tree, small_chunks):
+    data = os.urandom(40000)
+    src, dst, _ = interrupted_job(tree, data)
+    with open(part_path(str(dst / "big.bin")), "r+b") as f:
+        f.truncate(100)
+    [job] = CopyJob.pending()
+    job.run()
+    assert (dst / "big.bin").read_bytes() == data
+
+def test_journal_lock_keeps_job_to_one_runner(tree, small_chunks):
+    src, dst, journal = interrupted_job(tree, os.urandom(40000))
+    first = CopyJob.load(journal)
+    assert first.claim()
+    # Пока задание занято, его не видит pending() и не может взять второй экземпляр
+    assert CopyJob.pending() == []
+    second = CopyJob.load(journal)
+    assert not second.claim() and not second.discard()
+    with pytest.raises(CopyJobBusy):
+        second.run()
+    assert first.run() == [str(dst / "big.bin")]
+    assert not second.claim()  # журнал удалён вместе с завершённым заданием
+
+def test_discard_removes_parts_and_journal(tree, small_chunks):
+    src, dst, journal = interrupted_job(tree, os.urandom(40000))
+    [job] = CopyJob.pending()
+    assert job.discard()
+    assert os.listdir(dst) == [] and not os.path.exists(journal)
+
+def failing_copystat(monkeypatch, messages):
+    """Make every file fail right before its rename, with the next message from messages"""
+    messages = iter(messages)
+
+    def fail(*args, **kwargs):
+        raise OSError(next(messages))
+    monkeypatch.setattr(copyjob.shutil, "copystat", fail)
+
+def test_recurring_error_stops_auto_resume(tree, monkeypatch):
+    src = tree({"a.txt": "alpha"})
+    dst = tree({})
+    failing_copystat(monkeypatch, ["Нет места", "Нет места"])
+    with pytest.raises(OSError):
+        CopyJob([str(src / "a.txt")], str(dst)).run()
+    [job] = CopyJob.pending()
+    assert job.errors == ["Нет места"] and job.should_auto_resume()
+    with pytest.raises(OSError):
+        job.run()
+    [job] = CopyJob.pending()
+    assert not job.should_auto_resume()
+    # Вручную задание по-прежнему можно продолжить
+    monkeypatch.undo()
+    assert job.run() == [str(dst / "a.txt")] and CopyJob.pending() == []
+
+def test_runs_without_progress_stop_auto_resume(tree, monkeypatch):
+    src = tree({"a.txt": "alpha"})
+    failing_copystat(monkeypatch, [f"ошибка {i}" for i in range(copyjob.MAX_AUTO_RESUMES)])
+    job = CopyJob([str(src / "a.txt")], str(tree({})))
+    for _ in range(copyjob.MAX_AUTO_RESUMES):
+        assert job.should_auto_resume()
+        with pytest.raises(OSError):
+            job.run()
+        [job] = CopyJob.pending()
+    assert job.attempts == copyjob.MAX_AUTO_RESUMES and not job.should_auto_resume()
+
+def test_progress_resets_failures(tmp_path):
+    journal = tmp_path / "job.json"
+    records = [{"version": copyjob.JOURNAL_VERSION, "sources": ["/src/a"], "dst_dir": "/dst"},
+               {"attempt": 1}, {"error": "e"}, {"attempt": 2}, {"error": "e"},
+               {"done": "a/x", "size": 1, "mtime_ns": 1}, {"attempt": 3}]
+    journal.write_text("".join(json.dumps(record) + "\n" for record in records))
+    job = CopyJob.load(str(journal))
+    assert (job.attempts, job.errors) == (1, []) and job.should_auto_resume()
+
+def test_discard_works_after_the_source_is_gone(tree, small_chunks):
+    src, dst, journal = interrupted_job(tree, os.urandom(40000))
+    os.remove(src)
+    [job] = CopyJob.pending()
+    assert job.discard()
+    assert os.listdir(dst) == [] and not os.path.exists(journal)
@@ -0,0 +1,70 @@
+import math
+import os
+import threading
+
+from maini_core.diskusage import TOP_FILES, DiskUsageCache, DiskUsageScan, disk_size, squarify
+
+def du(path):
+    """Reference total: every directory and each inode once, like du -s"""
+    seen = set()
+    total = disk_size(os.lstat(path))
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            st = os.lstat(os.path.join(dirpath, name))
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += disk_size(st)
+    return total
+
+def test_scan_matches_du_and_counts_hardlinks_once(tree):
+    files = {f"d{i}/sub{j}/f{k}.bin": os.urandom(5000 * (k + 1)) for i in range(3) for j in range(3) for k in range(4)}
+    root = tree(files)
+    os.link(root / "d0/sub0/f3.bin", root / "d1/hardlink.bin")
+    progress = []
+    scan = DiskUsageScan(str(root), max_workers=4)
+    node = scan.run(progress_callback=progress.append, interval=0.001)
+    assert node is scan.root and scan.finished and scan.errors == 0
+    assert node.size == du(str(root))
+    assert node.files == len(files) + 1 and node.dirs == 12
+    assert all(child.scanned for child in node.children.values())
+    # Жёсткая ссылка достаётся той папке, что просканирована первой, поэтому сверяем d2
+    d2 = scan.find(str(root / "d2"))
+    assert d2.path == str(root / "d2") and d2.size == du(str(root / "d2"))
+    assert scan.find(str(root / "d0" / "missing")) is None and scan.find("/") is None
+
+def test_entries_group_small_files(tree):
+    root = tree({f"f{i:03d}": b"x" * (4096 * (i + 1)) for i in range(TOP_FILES + 5)} | {"sub/a": "a"})
+    scan = DiskUsageScan(str(root))
+    entries = scan.run().entries()
+    kinds = [e.kind for e in entries]
+    assert kinds.count("file") == TOP_FILES and kinds.count("rest") == 1 and kinds.count("dir") == 1
+    assert [e.size for e in entries] == sorted((e.size for e in entries), reverse=True)
+    assert sum(e.size for e in entries) == scan.root.size - disk_size(os.stat(root))
+
+def test_cancelled_scan_returns_none(tree):
+    root = tree({"a/b/c.txt": "c"})
+    cancel = threading.Event()
+    cancel.set()
+    scan = DiskUsageScan(str(root))
+    assert scan.run(cancel) is None and not scan.finished
+
+def test_cache_finds_and_invalidates(tree):
+    root = tree({"a/b/c.txt": "c", "other/": None})
+    scan = DiskUsageScan(str(root))
+    scan.run()
+    cache = DiskUsageCache()
+    cache.put(scan)
+    found, node = cache.find(str(root / "a" / "b"))
+    assert found is scan and node.name == "b"
+    cache.invalidate(str(root / "other"))
+    assert cache.find(str(root))[0] is None
+
+def test_squarify_fills_the_rectangle():
+    sizes = [60, 30, 20, 10, 5, 5]
+    rects = squarify(sizes, 10, 20, 300, 200)
+    assert len(rects) == len(sizes)
+    total = 300 * 200
+    for size, (x, y, w, h) in zip(sizes, rects):
+        assert math.isclose(w * h, total * size / sum(sizes))
+        assert 10 - 1e-9 <= x and x + w <= 310 + 1e-9 and 20 - 1e-9 <= y and y + h <= 220 + 1e-9
+    assert squarify([0, 0], 0, 0, 10, 10) == [(0, 0, 0, 0), (0, 0, 0, 0)]
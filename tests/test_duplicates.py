@@ -0,0 +1,50 @@
+import os
+
+from maini_core.duplicates import PARTIAL_BLOCK, DuplicateFinder, HashCache
+
+def test_finds_groups_and_ignores_hardlinks(tree):
+    big = os.urandom(3 * PARTIAL_BLOCK)
+    # Совпадают начало и конец, отличается середина — отсеивает только полный хэш
+    tweaked = big[:PARTIAL_BLOCK + 10] + b"\0" + big[PARTIAL_BLOCK + 11:]
+    root = tree({"a/big": big, "b/big copy": big, "c/tweaked": tweaked,
+                 "small1": "same", "small2": "same", "unique": "other", "empty1": "", "empty2": ""})
+    os.link(root / "small1", root / "small1-link")
+    groups = DuplicateFinder(str(root), workers=2).run()
+    assert [(g.size, len(g.paths)) for g in groups] == [(len(big), 2), (4, 2)]
+    assert [os.path.relpath(p, root) for p in groups[0].paths] == ["a/big", "b/big copy"]
+    # Жёсткая ссылка — тот же файл: в группе одно из двух имён, а не три записи
+    assert os.path.relpath(groups[1].paths[1], root) == "small2"
+
+def test_hash_cache_roundtrip_and_lru_eviction(tmp_path):
+    path = str(tmp_path / "hashes.json")
+    files = []
+    for i in range(3):
+        (tmp_path / f"f{i}").write_text(str(i))
+        files.append(os.stat(tmp_path / f"f{i}"))
+    cache = HashCache(path, max_entries=2)
+    for i, st in enumerate(files[:2]):
+        cache.put(st, "full", f"digest{i}")
+    assert cache.get(files[0], "full") == "digest0"  # f0 теперь использовался последним
+    cache.put(files[2], "full", "digest2")
+    cache.save()
+    reloaded = HashCache(path, max_entries=2)
+    assert reloaded.get(files[0], "full") == "digest0"
+    assert reloaded.get(files[1], "full") is None
+    assert reloaded.get(files[2], "full") == "digest2"
+    assert reloaded.get(files[0], "partial") is None
+
+def test_finder_uses_and_fills_cache(tree, tmp_path):
+    root = tree({"x": "dup", "y": "dup"})
+    cache = HashCache(str(tmp_path / "hashes.json"))
+    assert len(DuplicateFinder(str(root), cache=cache).run()) == 1
+    st = os.stat(root / "x")
+    assert cache.get(st, "partial") is not None
+    cache.put(st, "partial", "forged")
+    # Кэш доверяется ключу (inode, размер, mtime), поэтому подменённый хэш разводит файлы
+    assert DuplicateFinder(str(root), cache=cache).run() == []
+
+def test_cancelled_finder_returns_nothing(tree):
+    root = tree({"x": "dup", "y": "dup"})
+    finder = DuplicateFinder(str(root))
+    finder.cancel()
+    assert finder.run() == []
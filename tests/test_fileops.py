@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from maini_core import fileops
+from maini_core.fileops import (
+    TOMBSTONE_PREFIX, copy_into, is_tombstone, make_tombstone, move_into, recover_tombstones,
+    RemovalError, remove_tombstone, remove_tree_parallel, tombstone_owner_alive,
+)
+
+DEAD_PID = 999999999  # больше pid_max, такого процесса быть не может
+
+def journal_lines():
+    with open(fileops._tombstone_journal_path(), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+def test_copy_and_move_into(tree):
+    src = tree({"docs/a.txt": "a", "docs/sub/b.txt": "b"})
+    dst = tree({"docs/old.txt": "old"})
+    copied = copy_into(str(src / "docs"), str(dst))
+    assert copied == str(dst / "docs")
+    assert sorted(os.listdir(copied)) == ["a.txt", "old.txt", "sub"]  # слияние с существующей папкой
+    moved = move_into(str(src / "docs" / "a.txt"), str(dst))
+    assert moved == str(dst / "a.txt") and not (src / "docs" / "a.txt").exists()
+    assert copy_into(moved, str(dst)) == moved  # копирование в ту же папку — ничего не делает
+
+def test_make_tombstone_hides_and_journals(tree):
+    root = tree({"victim/inner/file.txt": "data"})
+    tombstone = make_tombstone(str(root / "victim"))
+    name = os.path.basename(tombstone)
+    assert is_tombstone(name) and name.startswith(f"{TOMBSTONE_PREFIX}{os.getpid()}-")
+    assert not (root / "victim").exists() and os.path.isdir(tombstone)
+    assert tombstone_owner_alive(name)
+    remove_tombstone(tombstone)
+    assert not os.path.lexists(tombstone)
+    assert journal_lines() == ["+" + tombstone, "-" + tombstone]
+
+def test_remove_tree_parallel_deep_tree(tree):
+    files = {f"d{i}/" + "/".join(f"s{j}" for j in range(i)) + f"/f{k}.txt": "x" for i in range(5) for k in range(20)}
+    root = tree(files)
+    os.symlink("/etc", root / "link-outside")
+    remove_tree_parallel(str(root), max_workers=4)
+    assert not root.exists()
+    assert os.path.isdir("/etc")  # по ссылкам удаление не ходит
+
+def test_remove_tree_parallel_single_file_and_missing(tree):
+    root = tree({"one.txt": "1"})
+    remove_tree_parallel(str(root / "one.txt"))
+    assert not (root / "one.txt").exists()
+    remove_tree_parallel(str(root / "missing"))
+
+def test_owner_alive_for_dead_and_malformed_pid():
+    assert not tombstone_owner_alive(f"{TOMBSTONE_PREFIX}{DEAD_PID}-abc")
+    assert not tombstone_owner_alive(f"{TOMBSTONE_PREFIX}notapid-abc")
+
+def test_recover_tombstones_after_crash(tree):
+    root = tree({f"{TOMBSTONE_PREFIX}{DEAD_PID}-dead/x.txt": "x"})
+    stale = str(root / f"{TOMBSTONE_PREFIX}{DEAD_PID}-dead")
+    gone = str(root / f"{TOMBSTONE_PREFIX}{DEAD_PID}-gone")
+    live = make_tombstone(str(tree({"keep.txt": "k"}) / "keep.txt"))
+    fileops._journal_tombstone("+" + stale)
+    fileops._journal_tombstone("+" + gone)
+    assert recover_tombstones() == [stale]
+    assert not os.path.lexists(stale)
+    # Чужие живые tombstone'ы остаются в журнале, завершённые — вычёркиваются
+    lines = journal_lines()
+    assert "+" + live in lines and "-" + stale in lines and "-" + gone in lines
+    assert os.path.exists(live)
+
+def test_recover_tombstones_without_journal():
+    assert recover_tombstones() == []
+
+def fail_unlink_of(monkeypatch, name):
+    """Make unlinking files called name fail with EACCES, like a file held by another user"""
+    real_unlink = os.unlink
+
+    def unlink(path, *args, **kwargs):
+        if os.path.basename(path) == name:
+            raise PermissionError(13, "Permission denied", path)
+        return real_unlink(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "unlink", unlink)
+    monkeypatch.setattr(os, "supports_dir_fd", os.supports_dir_fd | {unlink})
+
+def test_remove_tree_parallel_collects_failures(tree, monkeypatch):
+    root = tree({"a/locked.txt": "x", "a/free.txt": "y", "b/c/other.txt": "z"})
+    fail_unlink_of(monkeypatch, "locked.txt")
+    failures = remove_tree_parallel(str(root))
+    # Одна ошибка на занятый файл, без лишних ENOTEMPTY от его родительских папок
+    assert [(path, type(error)) for path, error in failures] == [(str(root / "a" / "locked.txt"), PermissionError)]
+    assert sorted(p.name for p in root.rglob("*")) == ["a", "locked.txt"]
+
+def test_remove_tombstone_keeps_journal_on_failure(tree, monkeypatch):
+    root = tree({"victim/locked.txt": "x", "victim/free.txt": "y"})
+    tombstone = make_tombstone(str(root / "victim"))
+    fail_unlink_of(monkeypatch, "locked.txt")
+    with pytest.raises(RemovalError) as info:
+        remove_tombstone(tombstone)
+    assert len(info.value.failures) == 1 and "locked.txt" in str(info.value)
+    assert journal_lines() == ["+" + tombstone]
+    monkeypatch.undo()
+    remove_tombstone(tombstone)
+    assert not os.path.lexists(tombstone) and journal_lines()[-1] == "-" + tombstone
+
+def test_recover_tombstones_skips_failed(tree, monkeypatch):
+    root = tree({f"{TOMBSTONE_PREFIX}{DEAD_PID}-stuck/locked.txt": "x"})
+    stuck = str(root / f"{TOMBSTONE_PREFIX}{DEAD_PID}-stuck")
+    fileops._journal_tombstone("+" + stuck)
+    fail_unlink_of(monkeypatch, "locked.txt")
+    assert recover_tombstones() == []
+    assert journal_lines() == ["+" + stuck]
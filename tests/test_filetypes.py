@@ -0,0 +1,67 @@
+import os
+import struct
+
+from maini_core.filetypes import TypeCache, describe_type, sniff_type
+
+def bmp(width=2, height=2):
+    pixels = b"\0" * (4 * width * height)
+    dib = struct.pack("<IiiHHIIiiII", 40, width, height, 1, 32, 0, len(pixels), 0, 0, 0, 0)
+    header = struct.pack("<2sIHHI", b"BM", 14 + len(dib) + len(pixels), 0, 0, 14 + len(dib))
+    return header + dib + pixels
+
+def pe(pe_offset=0x80):
+    stub = bytearray(pe_offset + 24)
+    stub[:2] = b"MZ"
+    stub[60:64] = pe_offset.to_bytes(4, "little")
+    stub[pe_offset:pe_offset + 4] = b"PE\0\0"
+    return bytes(stub)
+
+def test_strong_signatures():
+    assert sniff_type(b"\x89PNG\r\n\x1a\n....").mime == "image/png"
+    assert sniff_type(b"%PDF-1.7").category == "document"
+    assert sniff_type(b"\0" * 257 + b"ustar\0").mime == "application/x-tar"
+    assert sniff_type(b"RIFF\0\0\0\0WEBPVP8 ").mime == "image/webp"
+    assert sniff_type(b"\0\0\0\x18ftypheic").mime == "image/heic"
+    assert sniff_type(b"plain words\n") == ("text/plain", "text", "magic")
+    assert sniff_type(b"\0\1\2").mime == "application/octet-stream"
+
+def test_bmp_needs_a_valid_header():
+    data = bmp()
+    assert sniff_type(data, len(data)).mime == "image/bmp"
+    assert sniff_type(data[:64]).mime == "image/bmp"  # размер файла неизвестен
+    assert sniff_type(data, len(data) + 1).mime != "image/bmp"
+    # Текст, который просто начинается с BM, остаётся текстом
+    assert sniff_type(b"BMW service log\n2024-01-01 oil change\n").mime == "text/plain"
+    broken = data[:14] + struct.pack("<I", 99) + data[18:]
+    assert sniff_type(broken, len(broken)).mime != "image/bmp"
+
+def test_pe_needs_e_lfanew_signature():
+    assert sniff_type(pe()).category == "executable"
+    assert sniff_type(b"MZ notes: text that starts like a DOS header" * 3).mime == "text/plain"
+    far = pe(0x400)[:512]  # PE-заголовок дальше прочитанных байтов
+    assert sniff_type(far).category == "executable"
+    wrong = bytearray(pe())
+    wrong[0x80:0x84] = b"NE\0\0"
+    assert sniff_type(bytes(wrong)).category != "executable"
+
+def test_type_cache_prefers_extension_and_revalidates(tree):
+    root = tree({"photo.JPG": b"", "blob": bmp(), "notes.bin": "hello"})
+    cache = TypeCache()
+    assert cache.detect(str(root / "photo.JPG")) == ("image/jpeg", "image", "ext")
+    assert cache.needs_sniff(str(root / "blob"))
+    assert cache.detect_many([str(root / "blob"), str(root / "notes.bin"), str(root / "missing")]) == {
+        str(root / "blob"): ("image/bmp", "image", "magic"),
+        str(root / "notes.bin"): ("text/plain", "text", "magic"),
+    }
+    assert cache.detect_many([str(root / "blob")]) == {}  # уже известен
+    (root / "blob").write_bytes(pe())
+    os.utime(root / "blob", ns=(0, 10**18))
+    assert cache.lookup(str(root / "blob")) is None
+    assert cache.detect(str(root / "blob")).category == "executable"
+
+def test_describe_type():
+    cache = TypeCache()
+    assert describe_type(cache.from_extension("a.png"), "a.png") == "Изображение PNG"
+    assert describe_type(sniff_type(pe())) == "Программа MSDOWNLOAD"
+    assert describe_type(sniff_type(b"text")) == "Текст"
+    assert describe_type(None) == "Файл"
@@ -0,0 +1,47 @@
+from maini_core.governor import QUALITY_LEVELS, RenderGovernor
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def make(**kwargs):
+    clock = Clock()
+    changes = []
+    governor = RenderGovernor(window=10, degrade_ratio=0.3, cooldown=1.0, recover_seconds=5.0,
+                              on_change=changes.append, clock=clock, **kwargs)
+    return governor, clock, changes
+
+def feed(governor, clock, seconds, count, step=0.05):
+    for _ in range(count):
+        clock.now += step
+        governor.record_frame(seconds)
+
+def test_single_slow_frame_does_not_degrade():
+    governor, clock, changes = make()
+    feed(governor, clock, 0.01, 30)
+    feed(governor, clock, 0.5, 1)
+    feed(governor, clock, 0.01, 9)
+    assert governor.level == 0 and changes == [] and governor.misses == 1
+
+def test_degrades_stepwise_with_cooldown_then_recovers():
+    governor, clock, changes = make()
+    feed(governor, clock, 0.1, 30)  # 1.5 с сплошных промахов
+    assert governor.degraded and governor.level == 1
+    assert changes == [QUALITY_LEVELS[1]] and not governor.quality.animations
+    feed(governor, clock, 0.1, 200)
+    assert governor.level == len(QUALITY_LEVELS) - 1  # ниже последней ступени не опускается
+    assert governor.quality.thumbnail_scale == 0.5
+    feed(governor, clock, 0.01, 60)  # 3 с без промахов — ещё рано
+    assert governor.level == len(QUALITY_LEVELS) - 1
+    feed(governor, clock, 0.01, 400)
+    assert governor.level == 0 and changes[-1] == QUALITY_LEVELS[0]
+
+def test_event_loop_latency_counts_as_a_miss():
+    governor, clock, changes = make(latency_budget=0.05)
+    for _ in range(30):
+        clock.now += 0.1
+        governor.record_latency(0.2)
+    assert governor.level >= 1 and governor.last_latency == 0.2
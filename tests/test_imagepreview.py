@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+# Декодирование и кэш кадров работают с QImage/QPixmap, поэтому живут в модуле окна
+pytest.importorskip("PyQt6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QColor, QImage, QPixmap
+from PyQt6.QtWidgets import QApplication
+
+import maini
+from maini_core.memory import MemoryBudget
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    return QApplication.instance() or QApplication([])
+
+def write_image(path, width, height):
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor("steelblue"))
+    assert image.save(str(path), "PNG")
+    return str(path)
+
+def frame(width, height):
+    pixmap = QPixmap(width, height)
+    pixmap.fill(QColor("white"))
+    return pixmap
+
+def test_decode_scales_down_to_the_box(tmp_path):
+    path = write_image(tmp_path / "wide.png", 1000, 500)
+    image, original = maini.decode_scaled_image(path, 200, 200)
+    assert (image.width(), image.height()) == (200, 100)
+    assert (original.width(), original.height()) == (1000, 500)
+
+def test_decode_never_upscales(tmp_path):
+    path = write_image(tmp_path / "small.png", 40, 30)
+    image, _ = maini.decode_scaled_image(path, 512, 512)
+    assert (image.width(), image.height()) == (40, 30)
+
+def test_decode_broken_file_raises(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 64)
+    with pytest.raises(OSError):
+        maini.decode_scaled_image(str(path), 128, 128)
+
+def test_frame_key_follows_file_changes(tmp_path):
+    path = write_image(tmp_path / "a.png", 10, 10)
+    key = maini.ImageFrameCache.key(path, 256, 256)
+    assert key == maini.ImageFrameCache.key(path, 256, 256)
+    assert key != maini.ImageFrameCache.key(path, 384, 256)
+    write_image(path, 20, 20)
+    os.utime(path, ns=(1, 1))
+    assert key != maini.ImageFrameCache.key(path, 256, 256)
+    assert maini.ImageFrameCache.key(str(tmp_path / "missing.png"), 256, 256)[1:3] == (0, 0)
+
+def test_frame_cache_evicts_least_recent_by_bytes():
+    cost = maini.pixmap_bytes(frame(100, 100))
+    cache = maini.ImageFrameCache(max_bytes=cost * 2)
+    for name in ("a", "b"):
+        cache.put(name, frame(100, 100), None)
+    assert cache.get("a") is not None
+    cache.put("c", frame(100, 100), None)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.used_bytes == cost * 2
+    cache.put("c", frame(50, 50), None)
+    assert cache.used_bytes == cost + maini.pixmap_bytes(frame(50, 50))
+
+def test_frame_cache_keeps_one_oversized_frame():
+    cache = maini.ImageFrameCache(max_bytes=10)
+    cache.put("big", frame(100, 100), None)
+    assert cache.get("big") is not None
+
+def test_frame_cache_charges_the_shared_budget():
+    cost = maini.pixmap_bytes(frame(100, 100))
+    budget = MemoryBudget(limit=cost * 2)
+    cache = maini.ImageFrameCache(max_bytes=cost * 10, budget=budget)
+    for name in ("a", "b", "c"):
+        cache.put(name, frame(100, 100), None)
+    # Общий лимит вытесняет старый кадр из кэша через обратный вызов
+    assert budget.usage()["image_frames"] == cost * 2
+    assert cache.get("a") is None
+    assert cache.used_bytes == cost * 2
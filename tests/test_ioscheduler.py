@@ -0,0 +1,50 @@
+import threading
+import time
+
+from maini_core.ioscheduler import IO_BULK, IOScheduler, set_io_priority
+
+def test_idle_scheduler_does_not_hold_back():
+    scheduler = IOScheduler(quiet=0.05)
+    start = time.monotonic()
+    scheduler.throttle()
+    assert time.monotonic() - start < 0.05 and not scheduler.busy()
+
+def test_throttle_waits_for_interactive_io_to_finish():
+    scheduler = IOScheduler(quiet=0.05, max_pause=5)
+    entered, release = threading.Event(), threading.Event()
+
+    def listing():
+        with scheduler.interactive():
+            entered.set()
+            release.wait()
+
+    thread = threading.Thread(target=listing)
+    thread.start()
+    entered.wait()
+    threading.Timer(0.2, release.set).start()
+    start = time.monotonic()
+    scheduler.throttle()
+    waited = time.monotonic() - start
+    thread.join()
+    # Фон ждал конца листинга и ещё quiet секунд тишины после него
+    assert 0.2 <= waited < 2 and scheduler.paused_seconds >= 0.2
+
+def test_pause_is_bounded_and_cancellable():
+    scheduler = IOScheduler(quiet=10, max_pause=0.2)
+    scheduler.note_interactive()
+    start = time.monotonic()
+    scheduler.throttle()
+    assert 0.2 <= time.monotonic() - start < 1
+    cancel = threading.Event()
+    cancel.set()
+    start = time.monotonic()
+    scheduler.throttle(cancel)
+    assert time.monotonic() - start < 0.1
+
+def test_bulk_priority_is_best_effort():
+    scheduler = IOScheduler()
+    with scheduler.bulk() as same:
+        assert same is scheduler
+    # На Linux ставится класс idle, на прочих системах вызов просто ничего не делает
+    assert set_io_priority(IO_BULK) in (True, False)
+    set_io_priority(None)
@@ -0,0 +1,31 @@
+from maini_core.leakcheck import LeakTracker, process_rss, python_object_types
+
+class Leaky:
+    pass
+
+def test_process_rss_and_type_counts():
+    assert process_rss() > 0
+    kept = [Leaky() for _ in range(50)]
+    assert python_object_types()["Leaky"] >= 50
+    del kept
+
+def test_tracker_reports_growth_past_limits():
+    qobjects = [100]
+    tracker = LeakTracker(lambda: qobjects[0], limits={"qobjects": 10, "pyobjects": 1000, "rss": 1 << 40})
+    assert tracker.growth() == {} and tracker.failures() == [] and tracker.type_growth() == []
+    tracker.mark_baseline(0)
+    leaked = [Leaky() for _ in range(5000)]
+    qobjects[0] = 150
+    sample = tracker.sample(10)
+    assert sample.step == 10 and sample.qobjects == 150
+    growth = tracker.growth()
+    assert growth["qobjects"] == 50 and growth["pyobjects"] >= 5000
+    assert {name for name, _, _ in tracker.failures()} == {"qobjects", "pyobjects"}
+    assert ("Leaky", 5000) in tracker.type_growth()
+    del leaked
+
+def test_without_qt_counter_qobjects_stay_zero():
+    tracker = LeakTracker()
+    tracker.mark_baseline(0)
+    tracker.sample(1)
+    assert tracker.growth()["qobjects"] == 0 and "qobjects" not in {name for name, _, _ in tracker.failures()}
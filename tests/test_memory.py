@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from maini_core.memory import DEFAULT_BUDGET, MemoryBudget, budget_from_env, parse_budget
+
+class FakeCache:
+    """Owner registered with the budget; add() stores an entry and charges it"""
+
+    def __init__(self, budget, name, visible=None, main_thread_only=False):
+        self.budget = budget
+        self.name = name
+        self.entries = set()
+        offscreen = (lambda key: key not in visible) if visible is not None else None
+        budget.register(name, self.entries.discard, offscreen, main_thread_only)
+
+    def add(self, key, cost):
+        self.entries.add(key)
+        self.budget.charge(self.name, key, cost)
+
+def test_parse_budget():
+    assert parse_budget("512M") == 512 * 1024 ** 2
+    assert parse_budget(" 1.5g ") == int(1.5 * 1024 ** 3)
+    assert parse_budget("64KiB") == 64 * 1024 and parse_budget("1000") == 1000
+    with pytest.raises(ValueError):
+        parse_budget("lots")
+
+def test_budget_from_env(monkeypatch):
+    monkeypatch.setenv("MAINI_MEMORY_BUDGET", "2G")
+    assert budget_from_env() == 2 * 1024 ** 3
+    monkeypatch.setenv("MAINI_MEMORY_BUDGET", "garbage")
+    assert budget_from_env() == DEFAULT_BUDGET
+
+def test_lru_across_caches_keeps_the_new_entry():
+    budget = MemoryBudget(limit=300)
+    thumbs, listings = FakeCache(budget, "thumbs"), FakeCache(budget, "listings")
+    for cache, key in ((thumbs, "a"), (listings, "b"), (thumbs, "c")):
+        cache.add(key, 100)
+    budget.touch("thumbs", "a")  # «a» недавно использовался, старейшим стал «b»
+    thumbs.add("d", 100)
+    assert thumbs.entries == {"a", "c", "d"} and listings.entries == set()
+    assert budget.used == 300 and budget.usage() == {"thumbs": 300, "listings": 0} and budget.evictions == 1
+    thumbs.add("huge", 1000)
+    assert thumbs.entries == {"huge"}  # только что добавленная запись не выселяется
+    budget.release("thumbs", "huge")
+    assert budget.used == 0
+
+def test_offscreen_entries_go_first():
+    budget = MemoryBudget(limit=250)
+    thumbs = FakeCache(budget, "thumbs", visible={"old-visible"})
+    thumbs.add("old-visible", 100)
+    thumbs.add("hidden", 100)
+    budget.set_limit(150)
+    assert thumbs.entries == {"old-visible"}
+
+def test_main_thread_only_owners_are_skipped_elsewhere():
+    budget = MemoryBudget(limit=100)
+    pixmaps = FakeCache(budget, "pixmaps", main_thread_only=True)
+    pixmaps.add("p", 100)
+    worker = threading.Thread(target=budget.set_limit, args=(0,))
+    worker.start()
+    worker.join()
+    assert pixmaps.entries == {"p"}  # из фонового потока QPixmap не трогаем
+    budget.trim()
+    assert pixmaps.entries == set()
@@ -0,0 +1,54 @@
+import os
+
+from maini_core import mounts
+from maini_core.mounts import MountInfo, mount_for_path, parse_mountinfo
+
+MOUNTINFO = """\
+22 1 8:2 / / rw,relatime shared:1 - ext4 /dev/sda2 rw
+23 22 0:5 / /proc rw,nosuid - proc proc rw
+24 22 0:21 / /sys rw - sysfs sysfs rw
+25 22 8:3 / /home rw,relatime - ext4 /dev/sda3 rw
+26 22 0:40 / /mnt/nas rw - nfs4 server:/export rw
+27 22 8:17 / /media/user/USB\\040Stick rw - vfat /dev/sdb1 rw
+28 22 0:30 / /run/user/1000 rw - tmpfs tmpfs rw
+29 22 8:4 / /boot/efi rw - vfat /dev/sda1 rw
+30 25 8:5 / /home rw - xfs /dev/sda5 rw
+broken line without separator
+"""
+
+def test_parse_mountinfo_kinds_and_filtering(monkeypatch):
+    monkeypatch.setattr(mounts, "_is_removable_device", lambda source: False)
+    found = {m.mount_point: m for m in parse_mountinfo(MOUNTINFO)}
+    assert set(found) == {"/", "/home", "/mnt/nas", "/media/user/USB Stick"}
+    assert found["/"].kind == "local"
+    assert found["/mnt/nas"].kind == "network"
+    assert found["/media/user/USB Stick"].kind == "removable"
+    # Повторное монтирование в ту же точку: видна последняя запись
+    assert found["/home"].source == "/dev/sda5" and found["/home"].fstype == "xfs"
+
+def test_mount_for_path_picks_longest_prefix():
+    table = [MountInfo("/", "", "", "local"), MountInfo("/home", "", "", "local"),
+             MountInfo("/home/user/data", "", "", "local")]
+    assert mount_for_path(table, "/home/user/data/file").mount_point == "/home/user/data"
+    assert mount_for_path(table, "/home/user/database").mount_point == "/home"
+    assert mount_for_path(table, "/etc").mount_point == "/"
+    assert mount_for_path([], "/etc") is None
+
+def test_disk_usage_is_cached(tmp_path, monkeypatch):
+    mounts.clear_disk_usage_cache()
+    calls = []
+    real_statvfs = os.statvfs
+    monkeypatch.setattr(os, "statvfs", lambda path: calls.append(path) or real_statvfs(path))
+    free, total = mounts.get_disk_usage(str(tmp_path))
+    assert 0 <= free <= total
+    assert mounts.get_disk_usage(str(tmp_path)) == (free, total)
+    assert len(calls) == 1
+    mounts.clear_disk_usage_cache()
+    mounts.get_disk_usage(str(tmp_path))
+    assert len(calls) == 2
+
+def test_parse_mountinfo_can_keep_system_mounts(monkeypatch):
+    monkeypatch.setattr(mounts, "_is_removable_device", lambda source: False)
+    found = {m.mount_point: m.kind for m in parse_mountinfo(MOUNTINFO, include_pseudo=True)}
+    assert found["/proc"] == found["/run/user/1000"] == found["/boot/efi"] == "system"
+    assert found["/"] == "local" and found["/mnt/nas"] == "network"
@@ -0,0 +1,34 @@
+import os
+
+from maini_core import calculate_size, format_size, get_cache_dir, get_state_dir
+
+def test_state_and_cache_dirs_follow_xdg(xdg_dirs):
+    assert get_state_dir() == os.path.join(xdg_dirs["XDG_STATE_HOME"], "maini")
+    assert get_cache_dir() == os.path.join(xdg_dirs["XDG_CACHE_HOME"], "maini")
+    assert os.path.isdir(get_state_dir()) and os.path.isdir(get_cache_dir())
+
+def test_format_size_units():
+    assert format_size(0) == "0 Б"
+    assert format_size(1023) == "1023 Б"
+    assert format_size(1024) == "1 КБ"
+    assert format_size(5 * 1024 ** 2) == "5 МБ"
+    assert format_size(3 * 1024 ** 3) == "3 ГБ"
+
+def test_calculate_size_counts_hardlinks_once(tree):
+    root = tree({"a.bin": b"x" * 100, "sub/b.bin": b"y" * 50, "empty": None})
+    os.link(root / "a.bin", root / "sub" / "a-link.bin")
+    total, files, dirs = calculate_size(str(root))
+    assert total == 150
+    assert files == 3
+    assert dirs == 3  # сама папка, sub и empty
+
+def test_calculate_size_does_not_follow_symlinks(tree):
+    target = tree({"big.bin": b"z" * 1000})
+    root = tree({"small.bin": b"s"})
+    os.symlink(target, root / "link")
+    total, files, _ = calculate_size(str(root))
+    assert files == 2
+    assert total < 1000
+
+def test_calculate_size_of_missing_path(tmp_path):
+    assert calculate_size(str(tmp_path / "missing")) == (0, 0, 0)
@@ -0,0 +1,55 @@
+import threading
+
+from maini_core.preview import INDEX_BLOCK, MAX_LINE_BYTES, FilePreview
+
+def open_preview(tree, data):
+    root = tree({"file": data})
+    return FilePreview(str(root / "file"))
+
+def test_pages_across_index_blocks(tree):
+    lines = [f"line {i:06d}" for i in range(30000)]  # около 350 КиБ — несколько блоков индекса
+    preview = open_preview(tree, "\n".join(lines) + "\n")
+    assert preview.is_text and preview.total_lines is None
+    assert preview.page_text(0, 3) == (lines[:3], False)
+    assert preview.page_text(25000, 2) == (lines[25000:25002], False)
+    assert preview.page_text(29998, 5) == (lines[29998:], True)
+    assert preview.page_text(30000, 5) == ([], True)
+    assert preview.tail_text(2) == lines[-2:]
+    progress = []
+    assert preview.build_index(progress_callback=progress.append) == 30000
+    assert preview.indexed_fraction == 1.0 and len(preview.block_lines) > 4
+    preview.close()
+    assert preview.page_text(1, 1) == ([], True)
+
+def test_last_line_without_newline_and_crlf(tree):
+    preview = open_preview(tree, "a\r\nb\r\nc")
+    assert preview.build_index() == 3
+    assert preview.page_text(0, 10) == (["a", "b", "c"], True)
+    assert preview.tail_text(1) == ["c"]
+    preview.close()
+
+def test_long_lines_are_cut(tree):
+    preview = open_preview(tree, "x" * (MAX_LINE_BYTES * 3) + "\nnext\n")
+    lines, _ = preview.page_text(0, 2)
+    assert [len(line) for line in lines] == [MAX_LINE_BYTES, 4]
+    preview.close()
+
+def test_empty_and_binary_files(tree):
+    empty = open_preview(tree, b"")
+    assert empty.total_lines == 0 and empty.page_text(0, 5) == ([], True) and empty.tail_text(3) == []
+    empty.close()
+    binary = open_preview(tree, bytes(range(256)) * 2)
+    assert not binary.is_text
+    rows = binary.hex_page(0, 32)
+    assert rows[0] == "00000000  " + " ".join(f"{b:02x}" for b in range(16)) + "  |" + "." * 16 + "|"
+    assert rows[1].startswith("00000010  10 11")
+    assert binary.hex_page(500, 100)[-1].startswith("000001f4  f4 f5")  # обрезано по концу файла
+    binary.close()
+
+def test_cancelled_index_stops_early(tree):
+    preview = open_preview(tree, "x\n" * (INDEX_BLOCK * 2))
+    cancel = threading.Event()
+    cancel.set()
+    assert preview.build_index(cancel) is None
+    assert 0 < preview.indexed_fraction < 1
+    preview.close()
@@ -0,0 +1,130 @@
+import errno
+import os
+import time
+
+import pytest
+
+from maini_core.providers import ArchiveProvider, LocalProvider, LocationProvider, ProviderRegistry, WebDAVProvider
+
+from .dav_server import DAVServer
+
+@pytest.fixture
+def dav(tree):
+    """Running DAV stub over a small tree; yields the server"""
+    root = tree({"docs/a.txt": "alpha", "docs/sub/b.txt": "beta", "docs/sub2/": None, "top.bin": b"\0" * 10,
+                 "с пробелом/файл.txt": "юникод"})
+    server = DAVServer(root).start()
+    yield server
+    server.stop()
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_listing_and_stat(dav):
+    provider = WebDAVProvider(prefetch=0)
+    listing = provider.list_dir(dav.url + "/")
+    assert listing.path == dav.url
+    assert sorted(listing.names) == ["docs", "top.bin", "с пробелом"]
+    assert listing.dirs == frozenset({"docs", "с пробелом"})
+    assert provider.list_dir(dav.url + "/с пробелом").names == ("файл.txt",)
+    assert provider.entry_size(dav.url + "/top.bin") == 10
+    assert provider.is_dir(dav.url + "/docs") and not provider.is_dir(dav.url + "/missing")
+    assert provider.parent(dav.url + "/docs/sub/") == dav.url + "/docs"
+    assert [label for label, _ in provider.breadcrumbs(dav.url + "/docs/sub")] == ["127.0.0.1", "docs", "sub"]
+
+def test_listing_prefetches_subfolders(dav):
+    provider = WebDAVProvider(prefetch=8)
+    provider.list_dir(dav.url + "/docs")
+    wait_for(lambda: provider.cached_listing(dav.url + "/docs/sub") is not None)
+    wait_for(lambda: provider.cached_listing(dav.url + "/docs/sub2") is not None)
+    assert provider.cached_listing(dav.url + "/docs/sub").names == ("b.txt",)
+
+def test_ttl_cache_and_invalidation(dav):
+    provider = WebDAVProvider(ttl=60, prefetch=0)
+    url = dav.url + "/docs"
+    first = provider.list_dir(url)
+    open(os.path.join(dav.root, "docs", "new.txt"), "w").close()
+    assert provider.list_dir(url) is first  # из кэша, без запроса
+    assert dav.methods().count("PROPFIND") == 1
+    provider.invalidate(url + "/")
+    assert "new.txt" in provider.list_dir(url).names
+    assert dav.methods().count("PROPFIND") == 2
+    expiring = WebDAVProvider(ttl=0, prefetch=0)
+    expiring.list_dir(url)
+    assert expiring.cached_listing(url) is None
+    expiring.list_dir(url)
+    assert dav.methods().count("PROPFIND") == 4
+
+def test_pool_reuses_keepalive_connection(dav):
+    provider = WebDAVProvider(prefetch=0, pool_size=2)
+    for _ in range(5):
+        provider.invalidate(dav.url + "/docs")
+        provider.list_dir(dav.url + "/docs")
+        provider.stat(dav.url + "/top.bin")
+    assert len(dav.requests) >= 10
+    assert dav.connections == 1
+
+def test_error_mapping(dav, tree):
+    provider = WebDAVProvider(prefetch=0)
+    with pytest.raises(FileNotFoundError):
+        provider.list_dir(dav.url + "/missing")
+    dav.fail["/docs"] = 500
+    with pytest.raises(OSError) as info:
+        provider.list_dir(dav.url + "/docs")
+    assert info.value.errno == errno.EIO and "HTTP 500" in str(info.value)
+    dav.fail["/docs"] = 403
+    with pytest.raises(PermissionError):
+        provider.list_dir(dav.url + "/docs")
+    secured = DAVServer(tree({"x.txt": "x"}), credentials=("user", "pa:ss")).start()
+    try:
+        with pytest.raises(PermissionError):
+            provider.list_dir(secured.url.replace("://", "://user:wrong@"))
+        assert provider.list_dir(secured.url.replace("://", "://user:pa%3Ass@")).names == ("x.txt",)
+    finally:
+        secured.stop()
+
+def test_upload_download_and_remove(dav, tree):
+    local = tree({"upload/one.txt": "1", "upload/nested/two.txt": "22"})
+    registry = ProviderRegistry()
+    provider = registry.for_path(dav.url)
+    assert isinstance(provider, WebDAVProvider)
+    provider.prefetch = 0
+    provider.list_dir(dav.url + "/docs")
+    dst = registry.transfer(str(local / "upload"), dav.url + "/docs")
+    assert dst == dav.url + "/docs/upload"
+    assert "upload" in provider.list_dir(dav.url + "/docs").names  # upload сбросил кэш папки
+    assert open(os.path.join(dav.root, "docs", "upload", "nested", "two.txt")).read() == "22"
+    back = tree({})
+    assert registry.transfer(dav.url + "/docs/upload", str(back), move=True) == str(back / "upload")
+    assert (back / "upload" / "nested" / "two.txt").read_text() == "22"
+    assert not os.path.exists(os.path.join(dav.root, "docs", "upload"))
+    with pytest.raises(FileNotFoundError):
+        provider.remove(dav.url + "/docs/upload")
+
+def test_registry_picks_provider(tree):
+    root = tree({"folder/": None})
+    registry = ProviderRegistry()
+    assert isinstance(registry.for_path("davs://host/x"), WebDAVProvider)
+    assert isinstance(registry.for_path(str(root / "folder")), LocalProvider)
+    (root / "a.zip").write_bytes(b"")
+    assert isinstance(registry.for_path(str(root / "a.zip" / "inner")), ArchiveProvider)
+
+def test_incomplete_provider_fails_on_creation():
+    class NoListing(LocationProvider):
+        def handles(self, path):
+            return True
+
+        def is_dir(self, path):
+            return False
+
+        def entry_size(self, path):
+            return 0
+
+        def download(self, src, dst_dir):
+            return None
+
+    with pytest.raises(TypeError, match="list_dir"):
+        NoListing()
@@ -0,0 +1,147 @@
+import fnmatch
+import os
+import time
+
+import pytest
+
+from maini_core.filetypes import shared_type_cache
+from maini_core.query import Query, QueryError, build_columns, glob_pattern, snapshot_columns
+from maini_core.snapshot import EXT_OTHER, DirSnapshot, NameIndex
+
+from .conftest import set_mtime
+
+NOW = time.mktime(time.strptime("2024-06-15 12:00", "%Y-%m-%d %H:%M"))
+DAY = 86400
+
+@pytest.fixture
+def folder(tree):
+    root = tree({
+        "ten.bin": b"x" * 10, "nine.bin": b"x" * 9, "small.txt": b"x" * 1998, "big.txt": b"x" * 1999,
+        "Report.TXT": "r", "archive.tar.gz": "z", "photo.jpg": "j", "README": "plain text\n",
+        ".hidden.txt": "h", "docs.txt": None, "Привет.log": "п",
+    })
+    for name, age in (("ten.bin", 1), ("nine.bin", 3), ("small.txt", 7), ("big.txt", 30)):
+        set_mtime(root / name, NOW - age * DAY)
+    set_mtime(root / "Report.TXT", time.mktime(time.strptime("2024-01-01 10:00", "%Y-%m-%d %H:%M")))
+    set_mtime(root / "photo.jpg", time.mktime(time.strptime("2024-01-02 00:00", "%Y-%m-%d %H:%M")))
+    return root
+
+def run(root, text, show_hidden=False):
+    """Names matched by text, through the snapshot columns the GUI and the CLI use"""
+    query = Query(text, now=NOW)
+    snapshot = DirSnapshot.scan(str(root), 0)
+    visible = snapshot.visible_indices(show_hidden)
+    return query.filter(snapshot_columns(snapshot, visible, query.needs_stat))
+
+def run_plain(root, text):
+    """The same through build_columns over a plain list of names"""
+    query = Query(text, now=NOW)
+    names = sorted(n for n in os.listdir(root) if not n.startswith("."))
+    dirs = {n for n in names if os.path.isdir(os.path.join(root, n))}
+    return query.filter(build_columns(str(root), names, dirs, query.needs_stat))
+
+@pytest.mark.parametrize("text, expected", [
+    ("size:<10", ["nine.bin"]),
+    ("size:<=10", ["nine.bin", "ten.bin"]),
+    ("size:>1998", ["big.txt"]),
+    ("size:>=1998", ["big.txt", "small.txt"]),
+    ("size:10", ["ten.bin"]),
+    ("size:9..10", ["nine.bin", "ten.bin"]),
+    ("size:1k..", ["big.txt", "small.txt"]),
+])
+def test_size_bounds_strict_and_inclusive(folder, text, expected):
+    sized = ("ten.bin", "nine.bin", "small.txt", "big.txt")
+    assert [n for n in run(folder, text) if n in sized] == expected
+    assert [n for n in run_plain(folder, text) if n in sized] == expected
+
+def test_size_never_matches_folders(folder):
+    assert "docs.txt" not in run(folder, "size:<1k")
+    assert "docs.txt" not in run(folder, "size:0")
+    assert "docs.txt" in run(folder, "-size:>0")  # отрицание условия по-прежнему включает папки
+
+@pytest.mark.parametrize("text, expected", [
+    ("modified:<3d", ["ten.bin"]),
+    ("modified:<=3d", ["nine.bin", "ten.bin"]),
+    ("modified:>7d", ["big.txt", "photo.jpg", "Report.TXT"]),
+    ("modified:>=7d", ["big.txt", "photo.jpg", "Report.TXT", "small.txt"]),
+    ("modified:2024-01-01", ["Report.TXT"]),
+    ("modified:>2024-01-01", ["big.txt", "nine.bin", "photo.jpg", "small.txt", "ten.bin"]),
+    ("modified:<2024-01-02", ["Report.TXT"]),
+    ("modified:<=2024-01-02", ["photo.jpg", "Report.TXT"]),
+    ("modified:2024-01-01..2024-01-02", ["photo.jpg", "Report.TXT"]),
+])
+def test_modified_bounds(folder, text, expected):
+    matched = [n for n in run(folder, text) if n in ("ten.bin", "nine.bin", "small.txt", "big.txt", "Report.TXT", "photo.jpg")]
+    assert sorted(matched) == sorted(expected)
+
+def test_ext_matches_files_only_case_insensitively(folder):
+    assert run(folder, "ext:txt") == ["Report.TXT", "big.txt", "small.txt"]
+    assert run(folder, "ext:txt", show_hidden=True) == [".hidden.txt", "Report.TXT", "big.txt", "small.txt"]
+    assert run(folder, "ext:.GZ,jpg") == ["archive.tar.gz", "photo.jpg"]
+    assert run(folder, "ext:tar.gz") == ["archive.tar.gz"]
+    assert run(folder, "ext:LOG") == ["Привет.log"]
+    assert "docs.txt" in run(folder, "-ext:txt")
+
+def test_type_uses_extension_and_sniffed_content(folder):
+    assert run(folder, "type:image") == ["photo.jpg"]
+    assert run(folder, "type:folder") == ["docs.txt"]
+    assert run(folder, "type:image/jpeg") == ["photo.jpg"]
+    assert "README" not in run(folder, "type:text")  # ещё не распознан по содержимому
+    shared_type_cache.detect(str(folder / "README"))
+    assert "README" in run(folder, "type:text")
+
+def test_words_and_name_terms(folder):
+    assert run(folder, "report") == ["Report.TXT"]
+    assert run(folder, "e t") == ["Report.TXT", "archive.tar.gz", "ten.bin"]
+    assert run(folder, "ПРИВ") == ["Привет.log"]
+    assert run(folder, "hidden") == []
+    assert run(folder, "hidden", show_hidden=True) == [".hidden.txt"]
+    assert run(folder, "name:*.txt") == ["Report.TXT", "big.txt", "docs.txt", "small.txt"]
+    assert run(folder, "name:?e*") == ["README", "Report.TXT", "ten.bin"]
+    assert run(folder, "name:/^[A-Z]/") == ["README", "Report.TXT"]
+    assert run(folder, "name:/^п/") == []
+    assert run(folder, "name:/^п/i") == ["Привет.log"]
+    assert run(folder, "name:/^r/i") == ["README", "Report.TXT"]
+    assert run(folder, "-name:*.*") == ["README"]
+    assert run_plain(folder, "name:*.txt report") == ["Report.TXT"]
+
+def test_terms_combine(folder):
+    assert run(folder, "ext:bin size:>9 modified:<2d") == ["ten.bin"]
+    assert run(folder, "is:file t -ext:txt") == ["archive.tar.gz", "photo.jpg", "ten.bin"]
+    assert run(folder, "is:dir") == ["docs.txt"]
+
+def test_without_stat_keeps_the_name_filter(folder):
+    query = Query("ext:bin size:>9 modified:<2d", now=NOW)
+    snapshot = DirSnapshot.scan(str(folder), 0)
+    partial = query.without_stat()
+    # Без размеров и дат фильтр работает по уже прочитанным столбцам и не трогает stat
+    assert not partial.needs_stat and query.needs_stat
+    assert partial.filter(snapshot_columns(snapshot, snapshot.visible_indices(False))) == ["nine.bin", "ten.bin"]
+    assert not snapshot.has_stat
+
+@pytest.mark.parametrize("text", ["size:>lots", "modified:<yesterday", "is:link", "name:/(/"])
+def test_bad_terms_raise(text):
+    with pytest.raises(QueryError):
+        Query(text)
+
+@pytest.mark.parametrize("pattern", ["*.log", "file_0[1-3]?.*", "*[!a-z]", "*.t?r.gz", "[]x]*", "*", "[!]]*", "a\\b*", "[^a]*", "[a&&b]*"])
+def test_glob_pattern_agrees_with_fnmatch(pattern):
+    names = ["file_01a.log", "file_04.log", "x.tar.gz", "]x", "X.TAR.GZ", "abc9", "a\\bc", "]", "file_02b.tar"]
+    index = NameIndex.from_names(names)
+    expected = [i for i, name in enumerate(names) if fnmatch.fnmatchcase(name.lower(), pattern.lower())]
+    assert index.match(glob_pattern(pattern)) == expected
+
+def test_name_index_does_not_match_across_names():
+    index = NameIndex.from_names(["abc", "def", "cde", "ΣΑΣ.txt"])
+    assert index.find("cd") == [2]
+    assert index.find("c") == [0, 2]
+    assert index.ends_with(".txt") == [3]
+    assert NameIndex.from_names([]).find("a") == []
+
+def test_many_extensions_overflow_into_shared_code(tree):
+    root = tree({f"f{i}.e{i}": "" for i in range(300)})
+    snapshot = DirSnapshot.scan(str(root), 0)
+    assert len(snapshot.ext_table) == EXT_OTHER
+    assert EXT_OTHER in snapshot.ext_codes
+    assert run(root, "ext:e299") == ["f299.e299"]
+    assert run(root, "ext:e1") == ["f1.e1"]
@@ -0,0 +1,50 @@
+import os
+
+from maini_core.search import (
+    ContentSearch, compile_content_pattern, filter_by_name, find_by_name, iter_files, search_file_content,
+)
+
+def test_filter_by_name_is_case_insensitive():
+    entries = ["Report.TXT", "notes.md", "отчёт.txt"]
+    assert filter_by_name(entries, " txt ") == ["Report.TXT", "отчёт.txt"]
+    assert filter_by_name(entries, "ОТЧ") == ["отчёт.txt"]
+    assert filter_by_name(entries, "") == entries
+
+def test_find_by_name_and_iter_files_skip_hidden(tree):
+    root = tree({"a/match.txt": "", "a/.hidden/match.py": "", ".match": "", "b/other": ""})
+    os.symlink(root / "a", root / "b" / "loop")
+    assert sorted(os.path.relpath(p, root) for p in find_by_name(str(root), "MATCH")) == ["a/match.txt"]
+    found = sorted(os.path.relpath(p, root) for p in find_by_name(str(root), "match", show_hidden=True))
+    assert found == [".match", "a/.hidden/match.py", "a/match.txt"]
+    # Ссылка на папку не обходится и файлом не считается
+    assert sorted(os.path.relpath(p, root) for p in iter_files(str(root))) == ["a/match.txt", "b/other"]
+
+def test_pattern_folds_case_beyond_ascii():
+    pattern = compile_content_pattern("Привет")
+    assert pattern.search("ну привет, мир".encode()) and pattern.search("ПРИВЕТ".encode())
+    assert not compile_content_pattern("Hello", case_sensitive=True).search(b"hello")
+    assert compile_content_pattern("/h.l+o/").search(b"HELLO")
+
+def test_search_file_content_reports_line(tree):
+    root = tree({"notes.txt": "first\nsecond line with needle\nthird\n", "bin.dat": b"\0needle", "empty": ""})
+    match = search_file_content(str(root / "notes.txt"), compile_content_pattern("NEEDLE"))
+    assert (match.line_number, match.line) == (2, "second line with needle")
+    assert search_file_content(str(root / "bin.dat"), compile_content_pattern("needle")) is None
+    assert search_file_content(str(root / "empty"), compile_content_pattern("needle")) is None
+    assert search_file_content(str(root / "notes.txt"), compile_content_pattern("needle"), max_size=10) is None
+    assert search_file_content(str(root / "missing"), compile_content_pattern("needle")) is None
+
+def test_content_search_runs_and_limits_results(tree):
+    root = tree({f"dir{i % 3}/f{i}.txt": "needle\n" if i % 2 else "hay\n" for i in range(40)})
+    matches = []
+    search = ContentSearch(str(root), "needle", workers=2)
+    assert search.run(matches.append) == 20
+    assert search.scanned == 40 and all(m.line == "needle" for m in matches)
+    limited = ContentSearch(str(root), "needle", max_results=3, workers=2)
+    assert limited.run() == 3 and limited.cancelled
+
+def test_content_search_cancelled_before_run(tree):
+    root = tree({"a.txt": "needle"})
+    search = ContentSearch(str(root), "needle")
+    search.cancel()
+    assert search.run() == 0
@@ -0,0 +1,37 @@
+import os
+import struct
+
+import pytest
+
+from maini_core import session as session_module
+from maini_core.session import MAGIC, SessionSnapshot, Thumbnail, load_session, save_session
+from maini_core.snapshot import DirSnapshot
+
+def test_roundtrip_with_listing_and_thumbnails(tree):
+    root = tree({"a.png": "", "sub/": None})
+    listing = DirSnapshot.scan(str(root), os.stat(root).st_mtime_ns)
+    thumbs = [Thumbnail("a.png", 123, 4, 96, "image/png", b"\x89PNG fake"), Thumbnail("b", 1, 2, 48, None, b"")]
+    saved = SessionSnapshot(str(root), "list", "size", 1.25, True, listing, thumbs)
+    save_session(saved)
+    loaded = load_session()
+    assert (loaded.path, loaded.view_mode, loaded.sort_mode, loaded.scale_factor, loaded.show_hidden) == (
+        str(root), "list", "size", 1.25, True)
+    assert list(loaded.listing.names) == ["a.png", "sub"] and loaded.listing.mtime_ns == listing.mtime_ns
+    assert loaded.thumbnails == thumbs
+    assert not os.path.exists(session_module.default_session_path() + ".tmp")
+
+def test_huge_listing_is_not_saved(monkeypatch):
+    monkeypatch.setattr(session_module, "MAX_SNAPSHOT_ENTRIES", 1)
+    listing = DirSnapshot("/x", 0, ["a", "b"], [0, 0])
+    loaded = SessionSnapshot.from_bytes(SessionSnapshot("/x", listing=listing).to_bytes())
+    assert loaded.listing is None and loaded.path == "/x"
+
+def test_damaged_or_foreign_files_are_rejected(tmp_path):
+    data = SessionSnapshot("/home/user").to_bytes()
+    for bad in (b"", b"NOTMAINI" + data[8:], data[:-1], MAGIC + struct.pack("<H", 99) + data[10:]):
+        with pytest.raises(ValueError):
+            SessionSnapshot.from_bytes(bad)
+    path = tmp_path / "session.bin"
+    path.write_bytes(data[:20])
+    assert load_session(str(path)) is None
+    assert load_session(str(tmp_path / "missing.bin")) is None
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from maini_core.fileops import TOMBSTONE_PREFIX
+from maini_core.memory import MemoryBudget
+from maini_core.snapshot import (
+    FLAG_DIR, FLAG_HIDDEN, FLAG_LINK, FLAG_TOMBSTONE, DirListing, DirSnapshot, ListingCache, name_extension,
+    visible_entries,
+)
+
+def scan(root, **kwargs):
+    return DirSnapshot.scan(str(root), os.stat(root).st_mtime_ns, **kwargs)
+
+def test_scan_sorts_and_flags(tree):
+    root = tree({"b.txt": "bb", "a/": None, ".hidden": "", f"{TOMBSTONE_PREFIX}1-x/": None, "Z.PY": "z"})
+    os.symlink("a", root / "link")
+    snapshot = scan(root)
+    assert list(snapshot.names) == sorted(os.listdir(root))
+    flags = {snapshot.name(i): snapshot.flags[i] for i in range(len(snapshot))}
+    assert flags["a"] == FLAG_DIR and flags["b.txt"] == 0 and flags[".hidden"] == FLAG_HIDDEN
+    assert flags["link"] == FLAG_DIR | FLAG_LINK
+    assert flags[f"{TOMBSTONE_PREFIX}1-x"] == FLAG_DIR | FLAG_HIDDEN | FLAG_TOMBSTONE
+    assert snapshot.dirs == frozenset({"a", "link", f"{TOMBSTONE_PREFIX}1-x"})
+    assert [snapshot.name(i) for i in snapshot.visible_indices()] == ["Z.PY", "a", "b.txt", "link"]
+    assert snapshot.name(snapshot.visible_indices(show_hidden=True)[0]) == ".hidden"
+    assert [snapshot.ext_table[c] for c in snapshot.ext_codes] == ["", "", ".py", "", ".txt", ""]
+
+def test_stat_columns_fill_once(tree):
+    root = tree({"data.bin": b"x" * 100, "sub/": None})
+    os.symlink("missing", root / "broken")
+    snapshot = scan(root)
+    assert not snapshot.has_stat and list(snapshot.sizes) == [0, 0, 0]
+    snapshot.ensure_stat()
+    sizes = dict(zip(snapshot.names, snapshot.sizes))
+    assert sizes["data.bin"] == 100 and sizes["sub"] == 0 and sizes["broken"] == len("missing")
+    assert snapshot.mtimes[list(snapshot.names).index("data.bin")] == os.stat(root / "data.bin").st_mtime_ns
+    assert scan(root, with_stat=True).has_stat
+
+def test_bytes_roundtrip_keeps_odd_names(tree):
+    root = tree({"обычный.txt": "", "sub/": None, ".dot": ""})
+    odd = os.fsdecode(b"bad\xffname.log")
+    (root / odd).write_bytes(b"")
+    snapshot = scan(root)
+    data = snapshot.to_bytes()
+    restored = DirSnapshot.from_bytes(snapshot.path, data)
+    assert list(restored.names) == list(snapshot.names) and odd in restored.names
+    assert restored.flags == snapshot.flags and restored.mtime_ns == snapshot.mtime_ns
+    assert restored.ext_table == snapshot.ext_table
+    assert restored.name_index().find("обыч") == snapshot.name_index().find("обыч")
+    with pytest.raises(ValueError):
+        DirSnapshot.from_bytes(snapshot.path, data[:-1])
+    with pytest.raises(ValueError):
+        DirSnapshot.from_bytes(snapshot.path, data[:5])
+    assert len(DirSnapshot.from_bytes("/x", DirSnapshot("/x", 0, [], []).to_bytes())) == 0
+
+def test_from_listing_and_helpers():
+    listing = DirListing("dav://h/x", 7, ("b", "a.tar.gz", ".c"), frozenset({"b"}))
+    snapshot = DirSnapshot.from_listing(listing)
+    assert list(snapshot.names) == [".c", "a.tar.gz", "b"] and not snapshot.local
+    assert snapshot.dirs == frozenset({"b"}) and DirSnapshot.from_listing(snapshot) is snapshot
+    snapshot.ensure_stat()
+    assert not snapshot.has_stat  # удалённый снимок через os.stat не дополнить
+    assert [name_extension(n) for n in ("a.TAR.GZ", ".bashrc", "..x", "noext", "x.")] == [".gz", "", "", "", "."]
+    assert visible_entries(["b", ".h", f"{TOMBSTONE_PREFIX}1-x", "a"]) == ["a", "b"]
+    assert visible_entries(["b", ".h", "a"], show_hidden=True) == [".h", "a", "b"]
+
+def test_listing_cache_revalidates_by_mtime(tree):
+    root = tree({"a.txt": ""})
+    cache = ListingCache()
+    first = cache.list_dir(str(root))
+    assert isinstance(first, DirSnapshot) and cache.list_dir(str(root) + "/") is first
+    (root / "b.txt").write_text("")
+    os.utime(root, ns=(0, first.mtime_ns + 10**9))
+    second = cache.list_dir(str(root))
+    assert second is not first and list(second.names) == ["a.txt", "b.txt"]
+    cache.invalidate(str(root))
+    assert cache.list_dir(str(root)) is not second
+
+def test_listing_cache_limits_and_seed(tree):
+    roots = [tree({f"f{i}": ""}) for i in range(3)]
+    budget = MemoryBudget(limit=10**9)
+    cache = ListingCache(max_dirs=2, budget=budget)
+    for root in roots:
+        cache.list_dir(str(root))
+    assert cache.peek(str(roots[0])) is None and cache.peek(str(roots[2])) is not None
+    assert budget.usage()["listings"] == sum(cache.peek(str(r)).nbytes for r in roots[1:])
+    seeded = scan(roots[0])
+    cache.seed(seeded)
+    assert cache.list_dir(str(roots[0])) is seeded  # mtime совпал — снимок с диска годится
+    budget.set_limit(0)
+    assert budget.usage()["listings"] == 0 and cache.peek(str(roots[0])) is None
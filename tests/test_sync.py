@@ -0,0 +1,63 @@
+import os
+import threading
+
+from maini_core.sync import SyncAction, apply_sync, compare_trees, scan_tree
+from maini_core.trash import iter_trash
+
+from .conftest import set_mtime
+
+def kinds(plan, mirror=True):
+    return {(a.kind, a.rel) for a in plan.actions_for(mirror)}
+
+def test_plan_and_apply_mirror(tree):
+    src = tree({"same.txt": "same", "changed.txt": "new!", "new/inner.txt": "n", "dir_now/": None, "file_now": "f"})
+    dst = tree({"same.txt": "same", "changed.txt": "old", "extra/deep/x.txt": "x", "dir_now": "was a file",
+                "file_now/y": "was a dir"})
+    set_mtime(src / "same.txt", 1_000_000)
+    set_mtime(dst / "same.txt", 1_000_001)  # в пределах точности FAT
+    plan = compare_trees(str(src), str(dst))
+    assert kinds(plan) == {
+        ("update", "changed.txt"), ("mkdir", "new"), ("copy", os.path.join("new", "inner.txt")),
+        ("mkdir", "dir_now"), ("update", "file_now"), ("delete", "extra"),
+        ("delete", os.path.join("file_now", "y")),
+    }
+    assert ("delete", "extra") not in kinds(plan, mirror=False)
+    assert plan.summary()["copy"] == (1, 1)
+    assert apply_sync(plan, mirror=True) == len(plan.actions)
+    assert compare_trees(str(src), str(dst)).actions == []
+    assert "extra" in {item.name for item in iter_trash()}  # удалённое — в корзине, а не стёрто
+
+def test_hash_mode_touches_identical_files(tree):
+    src = tree({"a.bin": "same bytes", "b.bin": "differ 1"})
+    dst = tree({"a.bin": "same bytes", "b.bin": "differ 2"})
+    for root, seconds in ((src, 2_000_000), (dst, 1_000_000)):
+        set_mtime(root / "a.bin", seconds)
+        set_mtime(root / "b.bin", seconds)
+    assert kinds(compare_trees(str(src), str(dst))) == {("update", "a.bin"), ("update", "b.bin")}
+    stages = []
+    plan = compare_trees(str(src), str(dst), use_hash=True, progress_callback=lambda *args: stages.append(args[0]))
+    assert kinds(plan) == {("touch", "a.bin"), ("update", "b.bin")} and plan.hashed == 2
+    assert stages[0] == "scan" and "hash" in stages
+    apply_sync(plan)
+    assert os.stat(dst / "a.bin").st_mtime_ns == os.stat(src / "a.bin").st_mtime_ns
+    assert (dst / "b.bin").read_text() == "differ 1"
+
+def test_missing_target_and_links(tree):
+    src = tree({"a.txt": "a"})
+    os.symlink("a.txt", src / "link")
+    dst = src.parent / "fresh"
+    plan = compare_trees(str(src), str(dst))
+    assert kinds(plan) == {("copy", "a.txt"), ("copy", "link")}
+    os.makedirs(dst)
+    apply_sync(plan)
+    assert os.readlink(dst / "link") == "a.txt"
+    assert scan_tree(str(dst))["link"].is_link
+
+def test_cancel_stops_compare_and_apply(tree):
+    src = tree({"a.txt": "a"})
+    cancel = threading.Event()
+    cancel.set()
+    assert compare_trees(str(src), str(src.parent / "dst"), cancel_event=cancel) is None
+    plan = compare_trees(str(src), str(src.parent / "dst"))
+    assert apply_sync(plan, cancel_event=cancel) == 0
+    assert plan.actions == [SyncAction("copy", "a.txt", 1)]
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from maini_core import trash
+from maini_core.mounts import parse_mountinfo
+from maini_core.trash import delete_from_trash, empty_trash, iter_trash, move_to_trash, restore_from_trash
+
+def home_trash(xdg_dirs):
+    return os.path.join(xdg_dirs["XDG_DATA_HOME"], "Trash")
+
+def test_move_to_trash_writes_trashinfo(tree, xdg_dirs):
+    root = tree({"report.txt": "data"})
+    item = move_to_trash(str(root / "report.txt"))
+    assert item.trash_dir == home_trash(xdg_dirs) and item.name == "report.txt"
+    assert not (root / "report.txt").exists()
+    with open(os.path.join(item.trash_dir, "info", "report.txt.trashinfo"), encoding="utf-8") as f:
+        info = f.read()
+    assert info.startswith("[Trash Info]\nPath=")
+    assert "DeletionDate=" in info
+
+def test_name_collisions_get_numbered(tree):
+    names = []
+    for i in range(3):
+        root = tree({"same name.txt": str(i)})
+        names.append(move_to_trash(str(root / "same name.txt")).name)
+    assert names == ["same name.txt", "same name.2.txt", "same name.3.txt"]
+
+def test_iter_restore_and_delete(tree):
+    root = tree({"a.txt": "a", "folder/b.txt": "b"})
+    move_to_trash(str(root / "a.txt"))
+    move_to_trash(str(root / "folder"))
+    items = {item.name: item for item in iter_trash()}
+    assert set(items) == {"a.txt", "folder"}
+    assert items["folder"].original_path == str(root / "folder")
+    restore_from_trash(items["a.txt"])
+    assert (root / "a.txt").read_text() == "a"
+    delete_from_trash(items["folder"])
+    assert list(iter_trash()) == []
+
+def test_restore_refuses_to_overwrite(tree):
+    root = tree({"a.txt": "old"})
+    item = move_to_trash(str(root / "a.txt"))
+    (root / "a.txt").write_text("new")
+    try:
+        restore_from_trash(item)
+    except FileExistsError:
+        pass
+    else:
+        raise AssertionError("restore overwrote an existing file")
+    assert (root / "a.txt").read_text() == "new"
+
+def test_restore_recreates_missing_parent(tree):
+    root = tree({"deep/dir/file.txt": "x"})
+    item = move_to_trash(str(root / "deep" / "dir" / "file.txt"))
+    os.rmdir(root / "deep" / "dir")
+    restore_from_trash(item)
+    assert (root / "deep" / "dir" / "file.txt").exists()
+
+def test_empty_trash_counts_and_reports(tree):
+    root = tree({f"f{i}.txt": str(i) for i in range(4)})
+    for i in range(4):
+        move_to_trash(str(root / f"f{i}.txt"))
+    progress = []
+    assert empty_trash(progress.append) == 4
+    assert progress == [1, 2, 3, 4]
+    assert list(iter_trash()) == []
+
+def test_iter_trash_skips_foreign_files(xdg_dirs, tree):
+    root = tree({"a.txt": "a"})
+    item = move_to_trash(str(root / "a.txt"))
+    with open(os.path.join(item.trash_dir, "info", "README"), "w") as f:
+        f.write("not a trashinfo")
+    assert [i.name for i in iter_trash()] == ["a.txt"]
+    assert trash.get_home_trash_dir() == home_trash(xdg_dirs)
+
+def test_trash_on_hidden_mount_is_listed_and_emptied(monkeypatch, tmp_path):
+    # /dev/shm — tmpfs, которого нет в списке дисков; корзина .Trash-$uid на нём должна быть видна
+    shm = "/dev/shm"
+    trash_dir = os.path.join(shm, f".Trash-{os.getuid()}")
+    if (not os.path.isdir(shm) or not os.access(shm, os.W_OK) or os.path.lexists(trash_dir)
+            or os.stat(shm).st_dev == os.stat(tmp_path).st_dev):
+        pytest.skip("нужен отдельный tmpfs /dev/shm без своей корзины")
+    table = "26 25 0:24 / /dev/shm rw,relatime - tmpfs tmpfs rw\n"
+    assert parse_mountinfo(table) == []
+    monkeypatch.setattr(trash, "get_mount_points",
+                        lambda include_pseudo=False: [m.mount_point for m in parse_mountinfo(table, include_pseudo)])
+    folder = tempfile.mkdtemp(dir=shm)
+    try:
+        with open(os.path.join(folder, "scratch.txt"), "w") as f:
+            f.write("x")
+        item = move_to_trash(os.path.join(folder, "scratch.txt"))
+        assert item.trash_dir == trash_dir
+        assert [(i.name, i.original_path) for i in iter_trash()] == [("scratch.txt", os.path.join(folder, "scratch.txt"))]
+        assert empty_trash() == 1
+        assert list(iter_trash()) == [] and os.listdir(os.path.join(trash_dir, "files")) == []
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        shutil.rmtree(trash_dir, ignore_errors=True)